@@ -0,0 +1,21 @@
+"""
+DocuQuery AI - Baseline Middleware (benchmark reference)
+
+Verbatim copies of the ``BaseHTTPMiddleware`` classes from ``src/app/middleware``
+as they were before the pure-ASGI pipeline, kept so
+``bench_middleware.py`` measures the real previous stack. Do not edit.
+"""
+
+from .request_id import RequestIDMiddleware
+from .logging import LoggingMiddleware
+from .timing import TimingMiddleware
+from .rate_limit import RateLimitMiddleware
+from .security_headers import SecurityHeadersMiddleware
+
+__all__ = [
+    "RequestIDMiddleware",
+    "LoggingMiddleware",
+    "TimingMiddleware",
+    "RateLimitMiddleware",
+    "SecurityHeadersMiddleware",
+]
@@ -0,0 +1,70 @@
+"""
+DocuQuery AI - Logging Middleware
+
+This middleware provides structured logging for all HTTP requests and responses,
+including request details, response status, and timing information.
+"""
+
+import time
+import logging
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+class LoggingMiddleware(BaseHTTPMiddleware):
+    """Middleware for structured request/response logging."""
+    
+    def __init__(self, app, logger_name: str = "docuquery.api"):
+        super().__init__(app)
+        self.logger = logging.getLogger(logger_name)
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Log request details and response information.
+        
+        Args:
+            request: The incoming HTTP request
+            call_next: The next middleware or endpoint handler
+            
+        Returns:
+            The HTTP response
+        """
+        # TODO: Implement structured logging
+        # TODO: Add request correlation ID
+        # TODO: Log request parameters and headers
+        # TODO: Log response status and timing
+        # TODO: Implement log level based on response status
+        
+        start_time = time.time()
+        
+        # Log request details
+        self.logger.info(
+            f"Request started: {request.method} {request.url.path}",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "query_params": dict(request.query_params),
+                "client_ip": request.client.host if request.client else None,
+                "user_agent": request.headers.get("user-agent"),
+            }
+        )
+        
+        # Process the request
+        response = await call_next(request)
+        
+        # Calculate processing time
+        process_time = time.time() - start_time
+        
+        # Log response details
+        self.logger.info(
+            f"Request completed: {request.method} {request.url.path} - {response.status_code}",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "process_time": process_time,
+            }
+        )
+        
+        return response
@@ -0,0 +1,119 @@
+"""
+DocuQuery AI - Rate Limiting Middleware
+
+This middleware implements rate limiting to prevent API abuse and ensure fair usage
+across all users and tenants.
+"""
+
+import time
+from typing import Callable, Dict, Tuple
+from fastapi import Request, Response, HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Middleware for implementing rate limiting."""
+    
+    def __init__(self, app, requests_per_window: int = 100, window_seconds: int = 60):
+        super().__init__(app)
+        self.requests_per_window = requests_per_window
+        self.window_seconds = window_seconds
+        self.rate_limit_store: Dict[str, Tuple[int, float]] = {}
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Apply rate limiting to incoming requests.
+        
+        Args:
+            request: The incoming HTTP request
+            call_next: The next middleware or endpoint handler
+            
+        Returns:
+            The HTTP response
+            
+        Raises:
+            HTTPException: When rate limit is exceeded
+        """
+        # TODO: Implement Redis-based rate limiting
+        # TODO: Add tenant-specific rate limits
+        # TODO: Implement progressive rate limiting
+        # TODO: Add rate limit headers to responses
+        # TODO: Implement rate limit bypass for certain endpoints
+        
+        # Get client identifier (IP address or user ID)
+        client_id = self._get_client_id(request)
+        
+        # Check rate limit
+        if not self._is_allowed(client_id):
+            raise HTTPException(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded. Please try again later.",
+                headers={
+                    "X-RateLimit-Limit": str(self.requests_per_window),
+                    "X-RateLimit-Window": str(self.window_seconds),
+                    "Retry-After": str(self.window_seconds),
+                }
+            )
+        
+        # Process the request
+        response = await call_next(request)
+        
+        # Add rate limit headers
+        remaining = self._get_remaining_requests(client_id)
+        response.headers["X-RateLimit-Limit"] = str(self.requests_per_window)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        response.headers["X-RateLimit-Reset"] = str(int(time.time() + self.window_seconds))
+        
+        return response
+    
+    def _get_client_id(self, request: Request) -> str:
+        """Get unique client identifier for rate limiting."""
+        # TODO: Implement proper client identification
+        # TODO: Support for user-based rate limiting
+        # TODO: Support for tenant-based rate limiting
+        
+        # Placeholder: use IP address
+        if request.client:
+            return request.client.host
+        return "unknown"
+    
+    def _is_allowed(self, client_id: str) -> bool:
+        """Check if request is allowed based on rate limiting."""
+        # TODO: Implement proper rate limiting logic
+        # TODO: Add Redis integration for distributed rate limiting
+        
+        current_time = time.time()
+        
+        if client_id not in self.rate_limit_store:
+            self.rate_limit_store[client_id] = (1, current_time)
+            return True
+        
+        count, window_start = self.rate_limit_store[client_id]
+        
+        # Reset window if expired
+        if current_time - window_start > self.window_seconds:
+            self.rate_limit_store[client_id] = (1, current_time)
+            return True
+        
+        # Check if limit exceeded
+        if count >= self.requests_per_window:
+            return False
+        
+        # Increment count
+        self.rate_limit_store[client_id] = (count + 1, window_start)
+        return True
+    
+    def _get_remaining_requests(self, client_id: str) -> int:
+        """Get remaining requests for client in current window."""
+        if client_id not in self.rate_limit_store:
+            return self.requests_per_window
+        
+        count, window_start = self.rate_limit_store[client_id]
+        current_time = time.time()
+        
+        # Reset if window expired
+        if current_time - window_start > self.window_seconds:
+            return self.requests_per_window
+        
+        return max(0, self.requests_per_window - count)
@@ -0,0 +1,45 @@
+"""
+DocuQuery AI - Request ID Middleware
+
+This middleware generates a unique request ID for each incoming request
+and adds it to the response headers for tracing and debugging purposes.
+"""
+
+import uuid
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+class RequestIDMiddleware(BaseHTTPMiddleware):
+    """Middleware for generating and tracking request IDs."""
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Process the request and add request ID to headers.
+        
+        Args:
+            request: The incoming HTTP request
+            call_next: The next middleware or endpoint handler
+            
+        Returns:
+            The HTTP response with request ID header
+        """
+        # TODO: Implement request ID generation
+        # TODO: Add request ID to request state
+        # TODO: Add request ID to response headers
+        # TODO: Implement request ID logging
+        
+        # Placeholder implementation
+        request_id = str(uuid.uuid4())
+        
+        # Add request ID to request state for internal use
+        request.state.request_id = request_id
+        
+        # Process the request
+        response = await call_next(request)
+        
+        # Add request ID to response headers
+        response.headers["X-Request-ID"] = request_id
+        
+        return response
@@ -0,0 +1,55 @@
+"""
+DocuQuery AI - Security Headers Middleware
+
+This middleware adds security-related HTTP headers to all responses to protect
+against common web vulnerabilities and improve security posture.
+"""
+
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Middleware for adding security headers to responses."""
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Add security headers to the response.
+        
+        Args:
+            request: The incoming HTTP request
+            call_next: The next middleware or endpoint handler
+            
+        Returns:
+            The HTTP response with security headers
+        """
+        # TODO: Implement configurable security headers
+        # TODO: Add Content Security Policy (CSP)
+        # TODO: Add HSTS headers for HTTPS
+        # TODO: Implement header value customization
+        # TODO: Add security header validation
+        
+        # Process the request
+        response = await call_next(request)
+        
+        # Add security headers
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        
+        # Content Security Policy (basic)
+        csp_policy = (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self'; "
+            "connect-src 'self'; "
+            "frame-ancestors 'none';"
+        )
+        response.headers["Content-Security-Policy"] = csp_policy
+        
+        return response
@@ -0,0 +1,45 @@
+"""
+DocuQuery AI - Timing Middleware
+
+This middleware measures and records request processing times for performance monitoring
+and adds timing information to response headers.
+"""
+
+import time
+from typing import Callable
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """Middleware for measuring request processing times."""
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Measure request processing time and add timing headers.
+        
+        Args:
+            request: The incoming HTTP request
+            call_next: The next middleware or endpoint handler
+            
+        Returns:
+            The HTTP response with timing headers
+        """
+        # TODO: Implement precise timing measurement
+        # TODO: Add timing metrics to monitoring system
+        # TODO: Implement performance thresholds and alerts
+        # TODO: Add timing breakdown for different processing stages
+        
+        start_time = time.time()
+        
+        # Process the request
+        response = await call_next(request)
+        
+        # Calculate processing time
+        process_time = time.time() - start_time
+        
+        # Add timing headers
+        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+        response.headers["X-Process-Time-MS"] = f"{int(process_time * 1000)}"
+        
+        return response
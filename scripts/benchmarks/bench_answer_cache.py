@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Semantic Answer Cache Replay
+
+Replays a query log through the semantic answer cache at several similarity
+thresholds and reports the hit rate, the share of hits that served the
+answer of a different question (false hits) and the lookup cost. The ideal
+hit rate counts queries whose intent was asked before.
+
+Without ``--log``, a synthetic log is generated: intents cluster into topics
+(related but different questions), each query is a paraphrase of an intent
+at a random distance, and intent popularity is Zipf distributed. A real log
+is a JSON lines file with ``tenant_id``, ``intent`` (a label for questions
+that deserve the same answer) and ``embedding`` per query.
+
+Usage:
+    python scripts/benchmarks/bench_answer_cache.py [--queries N] [--log FILE]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.retrieval.answer_cache import SemanticAnswerCache  # noqa: E402
+from app.retrieval.schemas import Citation  # noqa: E402
+
+Query = Tuple[str, str, np.ndarray]
+
+THRESHOLDS = [0.70, 0.75, 0.80, 0.85, 0.88, 0.90, 0.92, 0.94, 0.95, 0.96, 0.98]
+
+
+def unit_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+def synthetic_log(queries: int, dimensions: int, topics: int, intents_per_topic: int, seed: int) -> List[Query]:
+    rng = np.random.default_rng(seed)
+    topic_vectors = unit_rows(rng.standard_normal((topics, dimensions)))
+    # Intents of one topic have a cosine similarity of roughly 0.8 to each other
+    offsets = unit_rows(rng.standard_normal((topics, intents_per_topic, dimensions)))
+    intents = unit_rows(topic_vectors[:, None, :] + 0.5 * offsets).reshape(-1, dimensions)
+
+    ranks = np.arange(1, len(intents) + 1)
+    popularity = 1.0 / ranks
+    chosen = rng.choice(len(intents), size=queries, p=popularity / popularity.sum())
+    # Paraphrase distance r gives a cosine of about 1 / sqrt(1 + r^2) to the intent
+    distances = rng.uniform(0.1, 0.6, size=queries)
+    noise = unit_rows(rng.standard_normal((queries, dimensions))) * distances[:, None]
+    vectors = unit_rows(intents[chosen] + noise).astype(np.float32)
+    return [("tenant", f"intent-{i}", vector) for i, vector in zip(chosen, vectors)]
+
+
+def load_log(path: str) -> List[Query]:
+    log = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                row = json.loads(line)
+                vector = np.asarray(row["embedding"], dtype=np.float32)
+                log.append((row.get("tenant_id", "tenant"), str(row["intent"]), vector))
+    return log
+
+
+def replay(log: List[Query], threshold: float, max_entries: int) -> Tuple[float, float, float]:
+    cache = SemanticAnswerCache(threshold=threshold, max_entries=max_entries)
+    scope = cache.scope(5, None)
+    hits = false_hits = 0
+    lookup_seconds = 0.0
+    for tenant_id, intent, vector in log:
+        started = time.perf_counter()
+        found = cache.lookup(tenant_id, vector, scope)
+        lookup_seconds += time.perf_counter() - started
+        if found is None:
+            citation = Citation(document_id=intent, chunk_id="0", document_title="", content="", relevance_score=1.0)
+            cache.store(tenant_id, vector, scope, intent, [citation])
+        else:
+            hits += 1
+            false_hits += found[0].answer != intent
+    return hits / len(log), false_hits / max(hits, 1), lookup_seconds / len(log)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--log", help="JSON lines query log to replay")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=60)
+    parser.add_argument("--intents-per-topic", type=int, default=6)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.log:
+        log = load_log(args.log)
+    else:
+        log = synthetic_log(args.queries, args.dimensions, args.topics, args.intents_per_topic, args.seed)
+
+    seen = set()
+    repeats = 0
+    for tenant_id, intent, _ in log:
+        repeats += (tenant_id, intent) in seen
+        seen.add((tenant_id, intent))
+    print(f"{len(log)} queries, {len(seen)} intents, ideal hit rate {repeats / len(log):.1%}")
+    print(f"{'threshold':>9} {'hit rate':>9} {'false hits':>11} {'lookup':>10}")
+    for threshold in THRESHOLDS:
+        hit_rate, false_rate, lookup = replay(log, threshold, args.max_entries)
+        print(f"{threshold:9.2f} {hit_rate:9.1%} {false_rate:11.2%} {lookup * 1e6:8.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
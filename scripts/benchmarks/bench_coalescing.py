@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Query Coalescing Benchmark
+
+Fires concurrent questions at the retrieval service and reports throughput
+and p50/p99 latency with and without micro-batching of query embeddings and
+single-flight sharing of identical questions. Questions follow a Zipf
+distribution over a fixed set, as when a dashboard asks the same few
+questions for many users.
+
+The embedding provider and the LLM are fakes with a fixed latency per call
+and a cap on concurrent calls, standing in for provider rate limits; the
+figures reflect round trips saved, not any particular provider.
+
+Usage:
+    python scripts/benchmarks/bench_coalescing.py [--clients N] [--questions Q]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.llm.client import ChatCompletion  # noqa: E402
+from app.retrieval.embeddings import BatchingEmbedder, Embedder, EmbeddingCache  # noqa: E402
+from app.retrieval.local_index import NumpyVectorStore  # noqa: E402
+from app.retrieval.schemas import QueryRequest  # noqa: E402
+from app.retrieval.service import RetrievalService  # noqa: E402
+from app.retrieval.vector_store import ChunkRecord  # noqa: E402
+
+DIMENSIONS = 256
+
+
+class FakeEmbedder(Embedder):
+    model = "fake"
+
+    def __init__(self, latency: float, concurrency: int):
+        self.latency = latency
+        self.calls = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        async with self._slots:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+        rows = [np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(DIMENSIONS) for text in texts]
+        return np.asarray(rows, dtype=np.float32)
+
+
+class FakeLLM:
+    def __init__(self, latency: float, concurrency: int):
+        self.latency = latency
+        self.calls = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def chat(self, messages, model, max_tokens, temperature) -> ChatCompletion:
+        async with self._slots:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+        return ChatCompletion("answer [1]", prompt_tokens=100, completion_tokens=10)
+
+
+async def run(args: argparse.Namespace, batching: bool, coalesce: bool, seed: int) -> None:
+    embedder = FakeEmbedder(args.embed_ms / 1000, args.provider_concurrency)
+    llm = FakeLLM(args.llm_ms / 1000, args.provider_concurrency)
+    store = NumpyVectorStore()
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((1000, DIMENSIONS)).astype(np.float32)
+    store.add("t", [ChunkRecord(f"c{i}", f"d{i % 50}", "Doc", f"chunk {i}", vectors[i]) for i in range(1000)])
+    source: Embedder = BatchingEmbedder(embedder, max_batch=64, max_wait=0.005) if batching else embedder
+    service = RetrievalService(EmbeddingCache(source), store, llm, chat_model="m", coalesce=coalesce)
+
+    weights = 1 / np.arange(1, args.questions + 1) ** args.zipf
+    picks = rng.choice(args.questions, size=args.clients, p=weights / weights.sum())
+    latencies: List[float] = []
+
+    async def client(question: int) -> None:
+        started = time.perf_counter()
+        await service.answer("t", QueryRequest(question=f"question {seed} number {question}?"))
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(int(q)) for q in picks))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{'on' if batching else 'off':>8} {'on' if coalesce else 'off':>9} "
+        f"{args.clients / elapsed:8.0f}/s {np.percentile(latencies, 50) * 1000:7.0f} ms "
+        f"{np.percentile(latencies, 99) * 1000:7.0f} ms {embedder.calls:12d} {llm.calls:9d}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=100, help="Distinct questions")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Skew of question popularity")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="Embedding provider latency per call")
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="LLM latency per call")
+    parser.add_argument("--provider-concurrency", type=int, default=16, help="Concurrent calls per provider")
+    args = parser.parse_args()
+
+    print(f"{args.clients} concurrent clients, {args.questions} questions, zipf {args.zipf}")
+    print(
+        f"{'batching':>8} {'coalesce':>9} {'throughput':>10} {'p50':>10} {'p99':>10} "
+        f"{'embed calls':>12} {'llm calls':>9}"
+    )
+    for batching, coalesce in [(False, False), (True, False), (False, True), (True, True)]:
+        asyncio.run(run(args, batching, coalesce, seed=0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
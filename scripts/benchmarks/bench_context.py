@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Context Packing Benchmark
+
+Times packing N retrieved chunks into the prompt budget with the knapsack
+packer, with token counts stored at ingestion and with counts computed at
+query time. It compares the relevance packed with greedy filling in rank
+order, which skips a chunk that no longer fits and stops after
+``--greedy-stop`` consecutive misses.
+
+Chunk lengths and scores are random, so the relevance figures show how the
+two strategies compare on varied chunk sizes, not on a particular corpus.
+
+Usage:
+    python scripts/benchmarks/bench_context.py [--candidates N ...] [--window W]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.llm.context import ContextPacker  # noqa: E402
+from app.llm.tokens import TokenCounter  # noqa: E402
+from app.retrieval.vector_store import SearchHit  # noqa: E402
+
+WORDS = ["the", "termination", "notice", "period", "is", "thirty", "days", "party", "(b)", "1,200", "clause"]
+
+
+def greedy(packer: ContextPacker, question: str, hits: List[SearchHit], stop: int) -> List[int]:
+    """Indices filled in rank order until ``stop`` chunks in a row do not fit."""
+    budget = packer.budget(question)
+    used, chosen, misses = 0, [], 0
+    for i, hit in enumerate(hits):
+        cost = hit.tokens + packer._header_tokens(hit.title)
+        if used + cost <= budget:
+            used += cost
+            chosen.append(i)
+            misses = 0
+        else:
+            misses += 1
+            if misses >= stop:
+                break
+    return chosen
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50, 200])
+    parser.add_argument("--window", type=int, default=8192, help="Context window in tokens")
+    parser.add_argument("--completion", type=int, default=4000, help="Tokens reserved for the answer")
+    parser.add_argument("--greedy-stop", type=int, default=1, help="Misses before greedy filling stops")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    question = "What is the notice period for termination?"
+    print(f"window {args.window}, {args.completion} reserved for the answer")
+    print(f"{'N':>5} {'stored':>10} {'counted':>10} {'greedy value':>13} {'knapsack value':>15}")
+    for count in args.candidates:
+        counter = TokenCounter()
+        packer = ContextPacker(counter, args.window, args.completion)
+        hits = []
+        for i in range(count):
+            text = " ".join(rng.choice(WORDS, size=int(rng.integers(40, 900))))
+            score = float(np.clip(0.9 - 0.002 * i + rng.normal(0, 0.05), 0.05, 1))
+            hits.append(SearchHit(f"d{i % 13}", f"c{i}", "Master Services Agreement", text, score, position=i))
+        counts = counter.count_many([hit.text for hit in hits])
+        for hit, tokens in zip(hits, counts):
+            hit.tokens = tokens
+        uncounted = [SearchHit(h.document_id, h.chunk_id, h.title, h.text, h.score, position=h.position) for h in hits]
+
+        stored = best_of(lambda: packer.pack(question, hits), args.repeat)
+        # Query-time counting of every chunk, with a cold cache each time
+        counted = best_of(
+            lambda: ContextPacker(TokenCounter(), args.window, args.completion).pack(question, uncounted),
+            args.repeat,
+        )
+
+        score_of = {hit.chunk_id: hit.score for hit in hits}
+        packed = packer.pack(question, hits)
+        assert packed.tokens <= packed.budget
+        greedy_value = sum(hits[i].score for i in greedy(packer, question, hits, args.greedy_stop))
+        knapsack_value = sum(score_of[hit.chunk_id] for hit in packed.hits)
+        print(
+            f"{count:5d} {stored * 1000:7.2f} ms {counted * 1000:7.2f} ms "
+            f"{greedy_value:13.2f} {knapsack_value:15.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
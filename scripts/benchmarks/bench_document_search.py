@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Document Search Benchmark
+
+Builds one tenant's document search index and times search box queries as
+they are typed, a keystroke at a time, against a scan that tests every
+document the way ``ILIKE '%term%'`` does, with and without a status filter.
+Also reports the time to build the index, as on a cold start, and to apply
+document update events.
+
+Titles, filenames and tags are drawn from a Zipf-distributed vocabulary, so
+a few words are in a large share of documents, as in real catalogs.
+
+Usage:
+    python scripts/benchmarks/bench_document_search.py [--documents N] [--queries Q]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.documents.search import DocumentEntry, TenantDocumentIndex, words  # noqa: E402
+
+STATUSES = ["ready", "ready", "ready", "processing", "failed"]
+EXTENSIONS = ["pdf", "docx", "txt", "md"]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return list({"".join(rng.choice(letters) for _ in range(rng.randint(3, 11))) for _ in range(size)})
+
+
+def make_documents(count: int, vocabulary: List[str], seed: int) -> List[DocumentEntry]:
+    rng = random.Random(seed)
+    cum_weights = np.cumsum(1.0 / np.arange(1, len(vocabulary) + 1)).tolist()
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    documents = []
+    for i in range(count):
+        title = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 7))
+        stem = "_".join(title[: rng.randint(1, len(title))])
+        documents.append(
+            DocumentEntry(
+                f"doc{i}",
+                " ".join(title).title(),
+                f"{stem}-v{rng.randint(1, 9)}.{rng.choice(EXTENSIONS)}",
+                rng.choices(vocabulary[:200], k=rng.randint(0, 3)),
+                rng.choice(STATUSES),
+                base + timedelta(seconds=i),
+            )
+        )
+    return documents
+
+
+def keystrokes(documents: List[DocumentEntry], queries: int, seed: int) -> List[str]:
+    """Every prefix of queries typed from one or two words of random titles."""
+    rng = random.Random(seed)
+    typed = []
+    for _ in range(queries):
+        title = words(rng.choice(documents).title)
+        query = " ".join(rng.sample(title, k=min(len(title), rng.randint(1, 2))))
+        typed.extend(query[:length] for length in range(1, len(query) + 1) if not query[length - 1].isspace())
+    return typed
+
+
+class ScanSearch:
+    """Substring match over every document, ordered by recency, like the SQL fallback."""
+
+    def __init__(self, documents: List[DocumentEntry]):
+        self.rows = [
+            (" ".join(field.casefold() for field in document.fields()), document.status, document)
+            for document in reversed(documents)
+        ]
+
+    def search(self, text: str, status: Optional[str], limit: int) -> int:
+        terms = words(text)
+        matched = [
+            row for row in self.rows
+            if all(term in row[0] for term in terms) and (status is None or row[1] == status)
+        ]
+        return len(matched[:limit])
+
+
+def latencies(run: Callable[[str], object], queries: List[str]) -> np.ndarray:
+    times = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        run(query)
+        times[i] = time.perf_counter() - started
+    return times * 1000
+
+
+def report(label: str, times: np.ndarray) -> None:
+    p50, p99 = np.percentile(times, [50, 99])
+    print(f"{label:<32} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms   max {times.max():8.3f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=30_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=100, help="Keystrokes timed for the scan")
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(random.Random(args.seed), args.vocabulary)
+    documents = make_documents(args.documents, vocabulary, args.seed)
+    typed = keystrokes(documents, args.queries, args.seed + 1)
+
+    started = time.perf_counter()
+    index = TenantDocumentIndex.build(documents)
+    build = time.perf_counter() - started
+    print(f"{args.documents} documents, {len(typed)} keystrokes, {args.size} per page")
+    print(f"index build {build:.2f} s")
+
+    totals = [index.search(query, None, 0, args.size).total for query in typed]
+    print(f"matches per keystroke: median {int(np.median(totals))}, max {max(totals)}")
+    report("index", latencies(lambda q: index.search(q, None, 0, args.size), typed))
+    report("index, status=ready", latencies(lambda q: index.search(q, "ready", 0, args.size), typed))
+    report("index, page 10", latencies(lambda q: index.search(q, None, 9 * args.size, args.size), typed))
+    report("index, empty search", latencies(lambda q: index.search("", None, 0, args.size), typed[:200]))
+
+    scan = ScanSearch(documents)
+    sample = typed[:: max(1, len(typed) // args.scan_queries)]
+    report("scan", latencies(lambda q: scan.search(q, None, args.size), sample))
+    report("scan, status=ready", latencies(lambda q: scan.search(q, "ready", args.size), sample))
+
+    rng = random.Random(args.seed + 2)
+    updates = make_documents(2000, vocabulary, args.seed + 3)
+    for update in updates:
+        update.document_id = f"doc{rng.randrange(args.documents)}"
+    started = time.perf_counter()
+    for update in updates:
+        index.add(update)
+    per_event = (time.perf_counter() - started) / len(updates) * 1e6
+    print(f"update event {per_event:.1f} us; after {len(updates)} updates:")
+    report("index", latencies(lambda q: index.search(q, None, 0, args.size), typed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Filtered Search Benchmark
+
+Measures filtered vector search in the in-process index at 0.1%, 5% and 60%
+selectivity. It compares post-filtering (search unfiltered, then drop
+non-matching hits) with the two pre-filtering plans: scanning every row with
+a bitmap-derived mask, and scoring only the matching rows. For each it
+reports query latency and recall@10 against the exact filtered result, plus
+the plan the planner picks and the memory of the metadata bitmaps.
+
+Each selectivity is a tag assigned to a random share of the chunks, so the
+matching rows are scattered across the matrix as they would be for a
+tag or date filter over documents ingested over time.
+
+Usage:
+    python scripts/benchmarks/bench_filters.py [--chunks N] [--dimensions D]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.retrieval.filters import SearchFilter, plan  # noqa: E402
+from app.retrieval.local_index import TenantIndex  # noqa: E402
+from app.retrieval.vector_store import ChunkRecord  # noqa: E402
+
+TOP_K = 10
+SELECTIVITIES = (0.001, 0.05, 0.6)
+
+
+def build(chunks: int, dimensions: int, seed: int) -> TenantIndex:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((chunks, dimensions)).astype(np.float32)
+    draws = rng.random((len(SELECTIVITIES), chunks))
+    records = []
+    for i in range(chunks):
+        tags = [f"s{s}" for s, d in zip(SELECTIVITIES, draws[:, i]) if d < s]
+        records.append(ChunkRecord(f"c{i}", f"d{i // 20}", "", "", vectors[i], tags=tags))
+    index = TenantIndex(dimensions, capacity=chunks)
+    index.append(records)
+    return index
+
+
+def timed(search: Callable[[np.ndarray], List[str]], queries: np.ndarray, repeat: int) -> Tuple[List[List[str]], float]:
+    results = [search(q) for q in queries]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for q in queries:
+            search(q)
+        best = min(best, time.perf_counter() - started)
+    return results, best / len(queries)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--post-filter-factor", type=int, default=10, help="Hits fetched per requested hit")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    index = build(args.chunks, args.dimensions, args.seed)
+    queries = np.random.default_rng(args.seed + 1).standard_normal((args.queries, args.dimensions)).astype(np.float32)
+    default_ratio = index.brute_force_ratio
+    print(f"{args.chunks} chunks x {args.dimensions} dimensions, {args.queries} queries, top {TOP_K}")
+    print(f"metadata bitmaps: {index.metadata.nbytes / 2**20:.2f} MiB for {len(index.metadata.bitmaps)} keys")
+    print(f"unfiltered scan: {timed(lambda q: [h.chunk_id for h in index.search(q, TOP_K)], queries, args.repeat)[1] * 1000:.2f} ms")
+    print(f"{'selectivity':>11} {'matching':>9} {'post-filter':>18} {'mask scan':>10} {'brute force':>12} {'planner':>12}")
+
+    for selectivity in SELECTIVITIES:
+        tag = f"s{selectivity}"
+        search_filter = SearchFilter(tags=[tag])
+        matching = len(index._filter(search_filter)[1])
+
+        def prefiltered(ratio: float) -> Callable[[np.ndarray], List[str]]:
+            def search(q: np.ndarray) -> List[str]:
+                index.brute_force_ratio = ratio
+                return [h.chunk_id for h in index.search(q, TOP_K, search_filter)]
+
+            return search
+
+        def post_filtered(q: np.ndarray) -> List[str]:
+            hits = index.search(q, TOP_K * args.post_filter_factor)
+            return [h.chunk_id for h in hits if tag in index.records[index._rows_by_chunk[h.chunk_id]].tags][:TOP_K]  # type: ignore[union-attr]
+
+        expected, scan = timed(prefiltered(0.0), queries, args.repeat)
+        found, brute = timed(prefiltered(1.0), queries, args.repeat)
+        assert found == expected
+        post, post_latency = timed(post_filtered, queries, args.repeat)
+        recall = np.mean([len(set(e) & set(p)) / len(e) for e, p in zip(expected, post)])
+        chosen = plan(matching, index.size, default_ratio)
+        print(
+            f"{selectivity:11.1%} {matching:9d} {post_latency * 1000:7.2f} ms r={recall:.2f} "
+            f"{scan * 1000:7.2f} ms {brute * 1000:9.2f} ms {chosen:>12}"
+        )
+    index.brute_force_ratio = default_ratio
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Access Logging Benchmark
+
+Measures the time the event loop spends in access logging per request. The
+"before" case runs the baseline ``LoggingMiddleware.dispatch`` (vendored
+verbatim in ``baseline_middleware/``) with a synchronous stream handler; the
+"after" cases run the logging stage's completion hook with the queue-backed
+JSON pipeline, with and without sampling. Output goes to ``os.devnull`` so
+the numbers show formatting and handler cost rather than terminal speed.
+
+Usage:
+    python scripts/benchmarks/bench_logging.py [--requests N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+import baseline_middleware as baseline  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+from app.middleware import LoggingMiddleware, RequestContext  # noqa: E402
+from app.telemetry.logs import (  # noqa: E402
+    AccessLogSampler,
+    configure_logging,
+    shutdown_logging,
+)
+
+LOGGER = "docuquery.bench"
+
+
+def make_scope() -> dict:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/documents",
+        "raw_path": b"/api/v1/documents",
+        "query_string": b"limit=20&offset=40",
+        "headers": [(b"user-agent", b"bench/1.0"), (b"host", b"bench")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("bench", 80),
+        "scheme": "http",
+        "root_path": "",
+        "state": {},
+    }
+
+
+def reset_logger(handler: logging.Handler = None) -> logging.Logger:
+    logger = logging.getLogger(LOGGER)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if handler is not None:
+        logger.addHandler(handler)
+    return logger
+
+
+async def bench_before(requests: int, sink) -> float:
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    reset_logger(handler)
+    middleware = baseline.LoggingMiddleware(None, logger_name=LOGGER)
+    response = Response(status_code=200)
+
+    async def call_next(request):
+        return response
+
+    scope = make_scope()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await middleware.dispatch(Request(scope), call_next)
+    return time.perf_counter() - started
+
+
+def bench_after(requests: int, sink, sampler: AccessLogSampler) -> float:
+    target = logging.StreamHandler(sink)
+    reset_logger()
+    pipeline = configure_logging(
+        queue_size=requests,
+        static_fields={"service": "docuquery", "environment": "bench"},
+        loggers=(LOGGER,),
+        target=target,
+    )
+    stage = LoggingMiddleware(logger_name=LOGGER, sampler=sampler)
+    scope = make_scope()
+    try:
+        started = time.perf_counter()
+        for _ in range(requests):
+            ctx = RequestContext(scope)
+            ctx.status_code = 200
+            stage.on_response_complete(ctx)
+        return time.perf_counter() - started
+    finally:
+        shutdown_logging()
+        assert pipeline.dropped == 0
+
+
+def report(name: str, seconds: float, requests: int) -> None:
+    print(f"{name:<34} {seconds / requests * 1e6:8.2f} us/request on the loop")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as sink:
+        report(
+            "before (2x logger.info, sync)",
+            asyncio.run(bench_before(args.requests, sink)),
+            args.requests,
+        )
+        report(
+            "after (1 record, queued JSON)",
+            bench_after(args.requests, sink, AccessLogSampler()),
+            args.requests,
+        )
+        report(
+            "after (10% sampled)",
+            bench_after(args.requests, sink, AccessLogSampler(default_rate=0.1)),
+            args.requests,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
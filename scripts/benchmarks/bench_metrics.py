@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Metrics Recording Benchmark
+
+Measures the per-request cost of recording metrics: the bare
+``MetricsRegistry.observe`` call, and the metrics stage's request and
+completion hooks, which add the in-flight gauge and the route template
+lookup. Both the private and the file-backed (multi-worker) registry are
+measured; each figure is the best of several runs to filter scheduler noise.
+
+Usage:
+    python scripts/benchmarks/bench_metrics.py [--iterations N] [--repeat R]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from fastapi.routing import APIRoute  # noqa: E402
+
+from app.middleware import MetricsMiddleware, RequestContext  # noqa: E402
+from app.telemetry.metrics import MetricsRegistry  # noqa: E402
+
+ROUTES = ["/api/v1/documents/{document_id}", "/api/v1/query", "/api/v1/health"]
+
+
+def _noop(method: str, route: str, status_code: int, seconds: float) -> None:
+    pass
+
+
+def bench_observe(registry: Optional[MetricsRegistry], iterations: int) -> float:
+    observe = registry.observe if registry is not None else _noop
+    durations = [0.0007, 0.013, 0.21, 1.7]
+    started = time.perf_counter()
+    for i in range(iterations):
+        observe("GET", ROUTES[i % 3], 200, durations[i & 3])
+    return time.perf_counter() - started
+
+
+def bench_stage(registry: MetricsRegistry, iterations: int) -> float:
+    stage = MetricsMiddleware(registry=registry)
+
+    async def endpoint():
+        return None
+
+    route = APIRoute(ROUTES[0], endpoint)
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/documents/x", "route": route}
+    ctx = RequestContext(scope)
+    ctx.status_code = 200
+    on_request = stage.on_request
+    on_complete = stage.on_response_complete
+
+    async def run() -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await on_request(ctx)
+            on_complete(ctx)
+        return time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def report(name: str, seconds: float, iterations: int) -> None:
+    print(f"{name:<36} {seconds / iterations * 1e9:8.0f} ns/request")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def best(bench, registry) -> float:
+        return min(bench(registry, args.iterations) for _ in range(args.repeat))
+
+    # Cost of the benchmark loop and the call itself, for reference
+    report("loop + empty call", best(bench_observe, None), args.iterations)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, registry in (
+            ("private", MetricsRegistry()),
+            ("file-backed", MetricsRegistry(directory=directory)),
+        ):
+            report(f"observe ({name})", best(bench_observe, registry), args.iterations)
+            report(f"stage hooks ({name})", best(bench_stage, registry), args.iterations)
+            registry.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Middleware Pipeline Benchmark
+
+Compares requests/sec and p99 latency on ``GET /api/v1/health`` for the
+previous stack of five ``BaseHTTPMiddleware`` classes against the single
+pure-ASGI ``MiddlewarePipeline``. The "before" stack is the baseline code
+vendored verbatim in ``baseline_middleware/``, with only the rate limit raised
+so no request is rejected. Requests are driven in-process through httpx's ASGI
+transport so the numbers isolate middleware overhead.
+
+Usage:
+    python scripts/benchmarks/bench_middleware.py [--requests N] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+import baseline_middleware as baseline  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.api.v1.router import api_router  # noqa: E402
+from app.middleware import (  # noqa: E402
+    LoggingMiddleware,
+    MiddlewarePipeline,
+    RateLimitMiddleware,
+    RequestIDMiddleware,
+    SecurityHeadersMiddleware,
+    TimingMiddleware,
+)
+
+UNLIMITED = 10**9
+
+
+def build_legacy_app() -> FastAPI:
+    """Baseline stack, registered in the same order as the old ``create_app``."""
+    app = FastAPI()
+    app.add_middleware(baseline.RequestIDMiddleware)
+    app.add_middleware(baseline.LoggingMiddleware)
+    app.add_middleware(baseline.TimingMiddleware)
+    app.add_middleware(baseline.RateLimitMiddleware, requests_per_window=UNLIMITED)
+    app.add_middleware(baseline.SecurityHeadersMiddleware)
+    app.include_router(api_router, prefix="/api/v1")
+    return app
+
+
+def build_pipeline_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        MiddlewarePipeline,
+        stages=[
+            RequestIDMiddleware(),
+            TimingMiddleware(),
+            LoggingMiddleware(),
+            RateLimitMiddleware(requests_per_window=UNLIMITED),
+            SecurityHeadersMiddleware(),
+        ],
+    )
+    app.include_router(api_router, prefix="/api/v1")
+    return app
+
+
+async def run(app: FastAPI, total: int, concurrency: int) -> Tuple[List[float], float]:
+    """Issue ``total`` requests from ``concurrency`` workers.
+
+    Returns:
+        Per-request latencies and the wall-clock time of the measured phase
+    """
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get("/api/v1/health")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+        # Warm up routing and lazily built middleware stacks
+        await worker(100)
+        latencies.clear()
+        per_worker = total // concurrency
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return latencies, wall
+
+
+def report(name: str, latencies: List[float], wall: float) -> None:
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[int(len(ordered) * 0.99) - 1] * 1000
+    print(
+        f"{name:<22} {len(latencies) / wall:>10.0f} req/s   "
+        f"p50 {p50:6.3f} ms   p99 {p99:6.3f} ms   "
+        f"mean {statistics.fmean(latencies) * 1000:6.3f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"GET /api/v1/health, {args.requests} requests, concurrency {args.concurrency}")
+    for name, factory in (
+        ("before (5x BaseHTTP)", build_legacy_app),
+        ("after (ASGI pipeline)", build_pipeline_app),
+    ):
+        latencies, wall = asyncio.run(run(factory(), args.requests, args.concurrency))
+        report(name, latencies, wall)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Distributed Rate Limiter Benchmark
+
+Counts Redis round-trips per 1k requests for the leasing rate limiter at
+several lease sizes, with several workers sharing one Redis. By default it
+runs against fakeredis; pass ``--redis-url`` to use a local redis-server.
+
+Usage:
+    python scripts/benchmarks/bench_rate_limit_redis.py [--redis-url URL]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.ratelimit import DistributedRateLimiter  # noqa: E402
+
+
+def make_client(args, server):
+    if args.redis_url:
+        import redis.asyncio as redis
+
+        return redis.from_url(args.redis_url)
+    import fakeredis
+
+    return fakeredis.aioredis.FakeRedis(server=server)
+
+
+async def run(args, lease_size: int) -> None:
+    server = None
+    if not args.redis_url:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+    workers = [
+        DistributedRateLimiter(
+            make_client(args, server),
+            args.limit,
+            60,
+            lease_size=lease_size,
+            key_prefix=f"bench:{time.time_ns()}:",
+        )
+        for _ in range(args.workers)
+    ]
+    clients = [f"10.0.0.{i}" for i in range(args.clients)]
+    rng = random.Random(0)
+
+    allowed = 0
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        worker = rng.choice(workers)
+        allowed += (await worker.acquire(rng.choice(clients))).allowed
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        await worker.aclose()
+
+    trips = sum(worker.round_trips for worker in workers)
+    print(
+        f"lease {lease_size:>3}: {trips * 1000 / args.requests:7.1f} round-trips/1k requests   "
+        f"allowed {allowed:>6}/{args.requests}   {args.requests / elapsed:8.0f} req/s"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, {args.workers} workers, {args.clients} clients, "
+        f"limit {args.limit}/60s, backend {'redis' if args.redis_url else 'fakeredis'}"
+    )
+    for lease_size in (1, 5, 10, 25, 50):
+        asyncio.run(run(args, lease_size))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Reranking Benchmark
+
+Times maximal marginal relevance selection, vectorized over a precomputed
+similarity matrix against a per-candidate Python loop. It also times scoring
+candidates one call at a time against batched calls through the reranker,
+using a simulated model with a fixed cost per call plus a cost per candidate.
+
+The simulated model sleeps rather than computing, so the scoring figures show
+the effect of call overhead and concurrency, not of any particular model.
+
+Usage:
+    python scripts/benchmarks/bench_rerank.py [--candidates N] [--dimensions D]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.retrieval.rerank import Reranker, ThreadPoolScorer, mmr, similarity_matrix  # noqa: E402
+from app.retrieval.vector_store import SearchHit  # noqa: E402
+
+
+def naive_mmr(relevance: np.ndarray, vectors: List[np.ndarray], k: int, diversity: float) -> List[int]:
+    """MMR computing each similarity when needed, one candidate at a time."""
+    scaled = (relevance - relevance.min()) / (relevance.max() - relevance.min())
+    picked: List[int] = []
+    while len(picked) < k:
+        best, best_value = -1, -np.inf
+        for i in range(len(vectors)):
+            if i in picked:
+                continue
+            redundancy = max(
+                (float(vectors[i] @ vectors[j] / np.linalg.norm(vectors[i]) / np.linalg.norm(vectors[j])) for j in picked),
+                default=0.0,
+            )
+            value = (1 - diversity) * scaled[i] - diversity * redundancy
+            if value > best_value:
+                best, best_value = i, value
+        picked.append(best)
+    return picked
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--diversity", type=float, default=0.3)
+    parser.add_argument("--call-ms", type=float, default=5.0, help="Simulated model cost per call")
+    parser.add_argument("--item-ms", type=float, default=0.5, help="Simulated model cost per candidate")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"top {args.top_k} of N candidates, {args.dimensions} dimensions, diversity {args.diversity}")
+    print(f"{'N':>5} {'mmr loop':>10} {'mmr numpy':>10} {'1 call/chunk':>13} {'batched':>9}")
+    for count in args.candidates:
+        vectors = rng.standard_normal((count, args.dimensions)).astype(np.float32)
+        relevance = rng.random(count).astype(np.float32)
+        hits = [SearchHit("d", f"c{i}", "", f"text {i}", float(relevance[i]), None, vectors[i]) for i in range(count)]
+
+        loop = best_of(lambda: naive_mmr(relevance, list(vectors), args.top_k, args.diversity), args.repeat)
+        vectorized = best_of(
+            lambda: mmr(relevance, similarity_matrix(hits), args.top_k, args.diversity), args.repeat
+        )
+        assert naive_mmr(relevance, list(vectors), args.top_k, args.diversity) == mmr(
+            relevance, similarity_matrix(hits), args.top_k, args.diversity
+        ).tolist()
+
+        def model(question: str, texts: List[str]) -> List[float]:
+            time.sleep((args.call_ms + args.item_ms * len(texts)) / 1000)
+            return [0.0] * len(texts)
+
+        async def timed_rerank(batch_size: int) -> float:
+            reranker = Reranker(ThreadPoolScorer(model, workers=2), batch_size, 4, timeout=60, diversity=args.diversity)
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await reranker.rerank("q", hits, args.top_k)
+                best = min(best, time.perf_counter() - started)
+            reranker.close()
+            return best
+
+        def score(batch_size: int) -> float:
+            return asyncio.run(timed_rerank(batch_size))
+
+        print(
+            f"{count:5d} {loop * 1000:7.2f} ms {vectorized * 1000:7.2f} ms "
+            f"{score(1) * 1000:10.1f} ms {score(32) * 1000:6.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
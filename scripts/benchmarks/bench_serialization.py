@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Response Serialization Benchmark
+
+Measures the time to turn a query response with 50 citations into response
+bytes along the paths FastAPI offers: a plain dict through
+``jsonable_encoder`` and stdlib ``json``, a typed ``response_model`` through
+FastAPI's validation and encoding, the same dict rendered by
+``FastJSONResponse``, and a ``ModelResponse`` serialized straight from the
+models. Each figure is the best of several runs to filter scheduler noise.
+
+Usage:
+    python scripts/benchmarks/bench_serialization.py [--iterations N] [--repeat R]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from app.common.serialization import HAS_ORJSON, FastJSONResponse, ModelResponse  # noqa: E402
+from app.retrieval.schemas import Citation, QueryMetadata, QueryResponse  # noqa: E402
+
+CHUNK = (
+    "Section 4.2 of the agreement requires the supplier to notify the customer "
+    "of any material change to the processing of personal data — including "
+    "sub-processors, storage locations and retention periods — no later than "
+    "thirty (30) days before the change takes effect. "
+) * 3
+
+
+def build_response(citations: int) -> QueryResponse:
+    return QueryResponse(
+        query_id="q_7f3c2a",
+        query="What notice period applies to changes in data processing?",
+        answer="The supplier must give thirty days' notice. " * 20,
+        citations=[
+            Citation(
+                document_id=f"doc_{i // 5}",
+                document_title=f"Master Services Agreement v{i % 3}",
+                chunk_id=f"chunk_{i}",
+                content=CHUNK,
+                page_number=i + 1,
+                relevance_score=0.9 - i / 100,
+            )
+            for i in range(citations)
+        ],
+        metadata=QueryMetadata(
+            model_used="gpt-4",
+            prompt_tokens=3120,
+            completion_tokens=240,
+            processing_time_ms=812.5,
+            stages_ms={"embed": 12.1, "vector_search": 8.4, "rerank": 31.0, "llm": 760.2},
+        ),
+        created_at=datetime(2024, 1, 15, 12, 30),
+    )
+
+
+def timed(render: Callable[[], bytes], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--citations", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    model = build_response(args.citations)
+    payload = model.model_dump()
+    field = create_response_field(name="Response_submit_query", type_=QueryResponse)
+    loop = asyncio.new_event_loop()
+
+    def typed_route() -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=model, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    paths = [
+        ("dict, jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(payload)).body),
+        ("response_model, FastAPI encode", typed_route),
+        ("dict, FastJSONResponse", lambda: FastJSONResponse(jsonable_encoder(payload)).body),
+        ("ModelResponse", lambda: ModelResponse(model).body),
+    ]
+
+    size = len(ModelResponse(model).body)
+    print(f"{args.citations} citations, {size / 1024:.1f} KiB body, orjson={HAS_ORJSON}")
+    baseline = None
+    for name, render in paths:
+        seconds = min(timed(render, args.iterations) for _ in range(args.repeat))
+        per_call = seconds / args.iterations * 1e6
+        baseline = baseline or per_call
+        print(f"{name:<34} {per_call:9.1f} us/response   {baseline / per_call:5.1f}x")
+    loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Stage Timer Benchmark
+
+Measures the cost of ``with stage(...)`` around an empty block, with no timer
+active (timing disabled) and with a request timer active. Each figure is the
+best of several runs.
+
+Usage:
+    python scripts/benchmarks/bench_stage_timing.py [--iterations N] [--repeat R]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.telemetry.stages import StageTimer, stage  # noqa: E402
+
+
+def bench(iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with stage("vector_search"):
+            pass
+    return time.perf_counter() - started
+
+
+def bench_baseline(iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--iterations", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def best(fn) -> float:
+        seconds = min(fn(args.iterations) for _ in range(args.repeat))
+        return seconds / args.iterations * 1e9
+
+    print(f"{'empty loop':<28} {best(bench_baseline):8.0f} ns")
+    print(f"{'stage() disabled':<28} {best(bench):8.0f} ns")
+    timer = StageTimer().activate()
+    try:
+        print(f"{'stage() with active timer':<28} {best(bench):8.0f} ns")
+    finally:
+        timer.deactivate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Upload Memory Benchmark
+
+Sends concurrent document uploads through the upload endpoints and reports
+the peak resident memory (VmHWM) of the process serving them, against an
+endpoint that reads each request body whole before hashing and storing it.
+Half the uploads are text, chunked and indexed while they stream, half are
+PDFs, stored only. Each configuration runs in a fresh process so that its
+peak is its own.
+
+Request bodies are produced in 64 KiB pieces and sent through the ASGI
+transport of httpx, which streams them to the application as a server
+would; the embedder and vector store are fakes that discard their input, so
+the figures measure the upload path, not indexing.
+
+Usage:
+    python scripts/benchmarks/bench_uploads.py [--uploads N] [--size-mb MB]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Sequence
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.common.error_handlers import register_error_handlers  # noqa: E402
+from app.documents.ingest import UploadManager  # noqa: E402
+from app.documents.routes import document_router  # noqa: E402
+from app.documents.search import DocumentSearch  # noqa: E402
+from app.retrieval.embeddings import Embedder, EmbeddingCache  # noqa: E402
+from app.retrieval.service import RetrievalService  # noqa: E402
+from app.retrieval.vector_store import ChunkRecord, VectorStore  # noqa: E402
+from app.storage.blobs import LocalBlobStore  # noqa: E402
+
+PIECE = 64 * 1024
+LINE = b"Quarterly budget review: forecasts, costs and revenue by region and product line.\n"
+
+
+class FakeEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return np.zeros((len(texts), 8), dtype=np.float32)
+
+
+class DiscardingStore(VectorStore):
+    def __init__(self) -> None:
+        self.chunks = 0
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        self.chunks += len(records)
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        return None
+
+
+def peak_rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+async def body(kind: str, size: int) -> AsyncIterator[bytes]:
+    if kind == "text":
+        block = first = (LINE * (PIECE // len(LINE) + 1))[:PIECE]
+    else:
+        block = os.urandom(PIECE)
+        first = b"%PDF-1.7\n" + block[9:]
+    for sent in range(0, size, PIECE):
+        # A new object per piece, as bytes read from a socket would be
+        yield memoryview(first if sent == 0 else block)[: size - sent].tobytes()
+        # Let the other uploads' pieces arrive in between, as over the network
+        await asyncio.sleep(0)
+
+
+def build_app(mode: str, directory: str, store: DiscardingStore) -> FastAPI:
+    app = FastAPI()
+    register_error_handlers(app)
+    if mode == "stream":
+        retrieval = RetrievalService(EmbeddingCache(FakeEmbedder()), store, None, chat_model="fake")
+        app.state.uploads = UploadManager(
+            LocalBlobStore(directory), DocumentSearch(), retrieval, max_bytes=1 << 40, max_concurrent=64
+        )
+        app.include_router(document_router, prefix="/documents")
+        return app
+
+    @app.put("/buffered/{name}")
+    async def buffered(name: str, request: Request) -> Dict[str, str]:
+        data = await request.body()
+        digest = hashlib.sha256(data).hexdigest()
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(data)
+        return {"sha256": digest}
+
+    return app
+
+
+async def upload(client: httpx.AsyncClient, mode: str, kind: str, size: int, name: str) -> None:
+    if mode == "buffered":
+        response = await client.put(f"/buffered/{name}", content=body(kind, size))
+        response.raise_for_status()
+        return
+    created = await client.post(
+        "/documents/uploads", json={"filename": f"{name}.{'txt' if kind == 'text' else 'pdf'}", "size": size}
+    )
+    created.raise_for_status()
+    location = created.headers["location"]
+    response = await client.patch(location, content=body(kind, size), headers={"Upload-Offset": "0"})
+    response.raise_for_status()
+    while response.json()["status"] == "processing":
+        await asyncio.sleep(0.05)
+        response = await client.get(location)
+
+
+async def run(mode: str, uploads: int, size: int) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="docuquery-bench-uploads-")
+    store = DiscardingStore()
+    app = build_app(mode, directory, store)
+    before = rss_mb()
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+        ) as client:
+            kinds = ["text" if i % 2 == 0 else "pdf" for i in range(uploads)]
+            await asyncio.gather(*(upload(client, mode, kind, size, f"u{i}") for i, kind in enumerate(kinds)))
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "rss_before_mb": before,
+        "peak_rss_mb": peak_rss_mb(),
+        "seconds": elapsed,
+        "throughput_mb_s": uploads * size / elapsed / 2**20,
+        "chunks_indexed": store.chunks,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", default=["stream", "buffered"], choices=["stream", "buffered"])
+    parser.add_argument("--child", choices=["stream", "buffered"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = args.size_mb * 2**20
+
+    if args.child:
+        print(json.dumps(asyncio.run(run(args.child, args.uploads, size))))
+        return 0
+
+    print(f"{args.uploads} concurrent uploads of {args.size_mb} MB, half text, half PDF")
+    results: List[str] = []
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--uploads", str(args.uploads), "--size-mb", str(args.size_mb)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(
+            f"{mode:<9} peak RSS {result['peak_rss_mb']:7.1f} MB (idle {result['rss_before_mb']:.1f} MB)   "
+            f"{result['throughput_mb_s']:6.1f} MB/s   {result['chunks_indexed']} chunks indexed"
+        )
+    print("\n".join(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
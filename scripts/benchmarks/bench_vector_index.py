@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+DocuQuery AI - Local Vector Index Benchmark
+
+Measures single-threaded search throughput of the in-process NumPy index as
+the tenant corpus grows: unfiltered top-k, a selective document filter (one
+document in a hundred) and a broad one (half of the documents). For
+comparison, a Qdrant search from the API costs a network round trip of
+typically 1-5 ms before any scoring happens. Each figure is the best of
+several runs to filter scheduler noise.
+
+Usage:
+    python scripts/benchmarks/bench_vector_index.py [--dimensions D] [--sizes N,N,...]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# Add src to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from app.retrieval.local_index import TenantIndex  # noqa: E402
+from app.retrieval.vector_store import ChunkRecord  # noqa: E402
+
+DOCUMENTS = 100
+
+
+def build_index(size: int, dimensions: int, rng: np.random.Generator) -> TenantIndex:
+    index = TenantIndex(dimensions)
+    vectors = rng.standard_normal((size, dimensions), dtype=np.float32)
+    batch = 5000
+    for start in range(0, size, batch):
+        index.append([
+            ChunkRecord(f"c{i}", f"d{i % DOCUMENTS}", "", "", vectors[i])
+            for i in range(start, min(start + batch, size))
+        ])
+    return index
+
+
+def qps(index: TenantIndex, queries: np.ndarray, top_k: int, documents: Optional[List[str]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, top_k, documents)
+        best = min(best, time.perf_counter() - started)
+    return len(queries) / best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--sizes", default="1000,5000,10000,50000,100000")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    selective = ["d7"]
+    broad = [f"d{i}" for i in range(0, DOCUMENTS, 2)]
+    print(f"{args.dimensions} dimensions, top {args.top_k}, single thread")
+    print(f"{'chunks':>8} {'MiB':>7} {'unfiltered':>12} {'1% filter':>12} {'50% filter':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        index = build_index(size, args.dimensions, rng)
+        # Enough queries for roughly a quarter second per measurement
+        count = max(20, min(2000, 20_000_000 // size))
+        queries = rng.standard_normal((count, args.dimensions), dtype=np.float32)
+        index.search(queries[0], args.top_k, selective)
+        index.search(queries[0], args.top_k, broad)
+        results = [qps(index, queries, args.top_k, documents, args.repeat) for documents in (None, selective, broad)]
+        print(
+            f"{size:8d} {index.nbytes / 2**20:7.1f} "
+            + " ".join(f"{value:8.0f} q/s" for value in results)
+        )
+        del index
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,123 +5,90 @@ This endpoint provides system health information and dependency status.
 """
 
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Request
 from typing import Dict, Any
 
+from app.common.serialization import FastJSONResponse
+from app.config import get_settings
+from app.telemetry.health import HEALTHY, HealthMonitor
+
 health_router = APIRouter()
 
+# Used when the application was built without a monitor, e.g. bare routers
+_NO_MONITOR = HealthMonitor([])
+
+
+def _monitor(request: Request) -> HealthMonitor:
+    monitor = getattr(request.app.state, "health", None)
+    return monitor if monitor is not None else _NO_MONITOR
+
 
 @health_router.get("/health")
-async def health_check() -> Dict[str, Any]:
+async def health_check(request: Request) -> Dict[str, Any]:
     """
     Check system health and dependencies.
     
+    Answers from the results cached by the health monitor's background
+    refresher; it never probes a dependency itself.
+    
     Returns:
         Health status information including system status and dependency health
     """
-    # TODO: Implement actual health checks
-    # TODO: Check database connectivity
-    # TODO: Check Redis connectivity
-    # TODO: Check Qdrant connectivity
-    # TODO: Check OpenAI API status
-    
-    try:
-        # Placeholder health check implementation
-        health_status = {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "version": "0.1.0",
-            "environment": "development",
-            "dependencies": {
-                "database": "healthy",  # TODO: Implement actual check
-                "redis": "healthy",      # TODO: Implement actual check
-                "qdrant": "healthy",     # TODO: Implement actual check
-                "openai": "healthy"      # TODO: Implement actual check
-            },
-            "uptime": "0d 0h 0m 0s",   # TODO: Calculate actual uptime
-            "checks": {
-                "database_connection": True,    # TODO: Implement actual check
-                "redis_connection": True,       # TODO: Implement actual check
-                "qdrant_connection": True,      # TODO: Implement actual check
-                "openai_api": True             # TODO: Implement actual check
-            }
-        }
-        
-        return health_status
-        
-    except Exception as e:
-        # TODO: Implement proper error handling
-        # TODO: Add error logging
-        # TODO: Return appropriate error status
-        raise HTTPException(
-            status_code=500,
-            detail=f"Health check failed: {str(e)}"
-        )
+    monitor = _monitor(request)
+    settings = get_settings()
+    statuses = monitor.statuses()
+    return {
+        "status": monitor.overall_status(statuses),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "version": settings.APP_VERSION,
+        "environment": settings.ENVIRONMENT,
+        "dependencies": statuses,
+        "uptime": monitor.uptime(),
+        "uptime_seconds": round(monitor.uptime_seconds(), 3),
+        "checks": monitor.probe_details(),
+    }
 
 
 @health_router.get("/health/ready")
-async def readiness_check() -> Dict[str, Any]:
+async def readiness_check(request: Request) -> FastJSONResponse:
     """
     Check if the system is ready to serve requests.
     
     Returns:
-        Readiness status for load balancers and orchestration systems
+        Readiness status for load balancers and orchestration systems;
+        503 until every critical dependency has a fresh healthy result
     """
-    # TODO: Implement readiness checks
-    # TODO: Check if all required services are available
-    # TODO: Check if system has completed startup procedures
-    
-    try:
-        # Placeholder readiness check
-        readiness_status = {
-            "status": "ready",
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "checks": {
-                "database_ready": True,     # TODO: Implement actual check
-                "redis_ready": True,        # TODO: Implement actual check
-                "qdrant_ready": True,       # TODO: Implement actual check
-                "worker_ready": True        # TODO: Implement actual check
-            }
-        }
-        
-        return readiness_status
-        
-    except Exception as e:
-        # TODO: Implement proper error handling
-        raise HTTPException(
-            status_code=503,
-            detail=f"Readiness check failed: {str(e)}"
-        )
+    monitor = _monitor(request)
+    statuses = monitor.statuses()
+    ready = monitor.is_ready()
+    readiness_status = {
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "checks": {
+            f"{name}_ready": status == HEALTHY for name, status in statuses.items()
+        },
+    }
+    return FastJSONResponse(readiness_status, status_code=200 if ready else 503)
 
 
 @health_router.get("/health/live")
-async def liveness_check() -> Dict[str, Any]:
+async def liveness_check(request: Request) -> Dict[str, Any]:
     """
     Check if the system is alive and responsive.
     
+    Dependencies are deliberately not consulted: a failing database should
+    make the service unready, not get it restarted.
+    
     Returns:
         Liveness status for health monitoring systems
     """
-    # TODO: Implement liveness checks
-    # TODO: Check if application is responsive
-    # TODO: Check basic system functionality
-    
-    try:
-        # Placeholder liveness check
-        liveness_status = {
-            "status": "alive",
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "checks": {
-                "application_responsive": True,  # TODO: Implement actual check
-                "basic_functionality": True      # TODO: Implement actual check
-            }
-        }
-        
-        return liveness_status
-        
-    except Exception as e:
-        # TODO: Implement proper error handling
-        raise HTTPException(
-            status_code=503,
-            detail=f"Liveness check failed: {str(e)}"
-        )
+    monitor = _monitor(request)
+    return {
+        "status": "alive",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "uptime": monitor.uptime(),
+        "checks": {
+            "application_responsive": True,
+            "health_refresher_running": monitor.is_running(),
+        },
+    }
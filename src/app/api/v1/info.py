@@ -4,40 +4,51 @@ DocuQuery AI - System Information Endpoint
 This endpoint provides system information, capabilities, and configuration details.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from typing import Dict, Any, List
 
+from app.common.response_cache import response_cache
+from app.config import get_settings
+
 info_router = APIRouter()
 
 
 @info_router.get("/info")
-async def get_system_info() -> Dict[str, Any]:
+async def get_system_info(request: Request) -> Response:
     """
     Get system information and capabilities.
     
+    The payload only changes when settings reload, so it is served from the
+    response cache with an ETag.
+    
     Returns:
         System information including name, version, features, and capabilities
     """
-    # TODO: Load actual configuration values
+    return response_cache.respond(request, ("info",), build_system_info)
+
+
+def build_system_info() -> Dict[str, Any]:
+    """Build the system information payload from the current settings."""
     # TODO: Implement dynamic feature detection
     # TODO: Add build information and git commit details
     
+    settings = get_settings()
     system_info = {
-        "name": "DocuQuery AI",
-        "version": "0.1.0",
+        "name": settings.APP_NAME,
+        "version": settings.APP_VERSION,
         "description": "Production-ready AI Document Q&A API",
         "build_info": {
             "build_date": "2024-01-15T00:00:00Z",  # TODO: Get from build process
             "git_commit": "dev",                     # TODO: Get from git
             "git_branch": "main",                    # TODO: Get from git
-            "environment": "development"             # TODO: Get from config
+            "environment": settings.ENVIRONMENT
         },
         "features": {
-            "multi_tenancy": True,           # TODO: Get from config
-            "oauth2": True,                  # TODO: Get from config
-            "document_ocr": True,            # TODO: Get from config
-            "vector_search": True,           # TODO: Get from config
-            "citation_generation": True,     # TODO: Get from config
+            "multi_tenancy": settings.FEATURE_MULTI_TENANCY,
+            "oauth2": settings.FEATURE_OAUTH_ENABLED,
+            "document_ocr": settings.FEATURE_DOCUMENT_OCR,
+            "vector_search": settings.FEATURE_VECTOR_SEARCH,
+            "citation_generation": settings.FEATURE_CITATION_GENERATION,
             "streaming": True,               # TODO: Get from config
             "background_processing": True    # TODO: Get from config
         },
@@ -58,10 +69,10 @@ async def get_system_info() -> Dict[str, Any]:
             "pgvector"      # TODO: Get from actual store capabilities
         ],
         "capabilities": {
-            "max_document_size_mb": 100,        # TODO: Get from config
-            "max_concurrent_uploads": 10,       # TODO: Get from config
+            "max_document_size_mb": settings.MAX_DOCUMENT_SIZE_MB,
+            "max_concurrent_uploads": settings.MAX_CONCURRENT_UPLOADS,
             "max_query_length": 1000,           # TODO: Get from config
-            "max_response_tokens": 4000,        # TODO: Get from config
+            "max_response_tokens": settings.OPENAI_MAX_TOKENS,
             "supported_languages": ["en"],      # TODO: Get from config
             "ocr_support": True,                # TODO: Get from config
             "table_extraction": True,           # TODO: Get from config
@@ -74,9 +85,9 @@ async def get_system_info() -> Dict[str, Any]:
             "openapi_spec": "/openapi.json"
         },
         "limits": {
-            "rate_limit_requests": 100,         # TODO: Get from config
-            "rate_limit_window": 60,            # TODO: Get from config
-            "max_file_size_mb": 100,           # TODO: Get from config
+            "rate_limit_requests": settings.RATE_LIMIT_REQUESTS,
+            "rate_limit_window": settings.RATE_LIMIT_WINDOW,
+            "max_file_size_mb": settings.MAX_DOCUMENT_SIZE_MB,
             "max_documents_per_tenant": 10000, # TODO: Get from config
             "max_users_per_tenant": 1000       # TODO: Get from config
         }
@@ -86,35 +97,40 @@ async def get_system_info() -> Dict[str, Any]:
 
 
 @info_router.get("/info/features")
-async def get_feature_info() -> Dict[str, Any]:
+async def get_feature_info(request: Request) -> Response:
     """
     Get detailed feature information and status.
     
     Returns:
         Detailed feature information including status and configuration
     """
+    return response_cache.respond(request, ("info", "features"), build_feature_info)
+
+
+def build_feature_info() -> Dict[str, Any]:
+    """Build the feature information payload from the current settings."""
     # TODO: Implement actual feature detection
     # TODO: Check feature availability dynamically
-    # TODO: Return actual feature status
     
+    settings = get_settings()
     feature_info = {
         "authentication": {
             "jwt": {
                 "enabled": True,
-                "algorithm": "HS256",
-                "access_token_expiry_minutes": 30,
-                "refresh_token_expiry_days": 7
+                "algorithm": settings.JWT_ALGORITHM,
+                "access_token_expiry_minutes": settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
+                "refresh_token_expiry_days": settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS
             },
             "oauth2": {
-                "enabled": True,
+                "enabled": settings.FEATURE_OAUTH_ENABLED,
                 "providers": {
                     "google": {
                         "enabled": True,        # TODO: Check actual config
-                        "client_id_configured": False  # TODO: Check actual config
+                        "client_id_configured": settings.GOOGLE_CLIENT_ID is not None
                     },
                     "microsoft": {
                         "enabled": True,        # TODO: Check actual config
-                        "client_id_configured": False  # TODO: Check actual config
+                        "client_id_configured": settings.MICROSOFT_CLIENT_ID is not None
                     }
                 }
             }
@@ -126,7 +142,7 @@ async def get_feature_info() -> Dict[str, Any]:
                 "supported_formats": ["pdf", "docx", "txt", "md"]
             },
             "ocr": {
-                "enabled": True,                # TODO: Check actual capability
+                "enabled": settings.FEATURE_DOCUMENT_OCR,
                 "languages": ["en"],            # TODO: Get from config
                 "quality": "standard"           # TODO: Get from config
             },
@@ -138,18 +154,18 @@ async def get_feature_info() -> Dict[str, Any]:
             }
         },
         "vector_search": {
-            "enabled": True,
+            "enabled": settings.FEATURE_VECTOR_SEARCH,
             "provider": "qdrant",              # TODO: Get from config
-            "embedding_model": "text-embedding-ada-002",
+            "embedding_model": settings.OPENAI_EMBEDDING_MODEL,
             "index_type": "hnsw",              # TODO: Get from config
             "similarity_metric": "cosine"      # TODO: Get from config
         },
         "llm_integration": {
             "enabled": True,
             "primary_provider": "openai",      # TODO: Get from config
-            "model": "gpt-4",                  # TODO: Get from config
-            "max_tokens": 4000,                # TODO: Get from config
-            "temperature": 0.1,                # TODO: Get from config
+            "model": settings.OPENAI_MODEL,
+            "max_tokens": settings.OPENAI_MAX_TOKENS,
+            "temperature": settings.OPENAI_TEMPERATURE,
             "streaming": True                  # TODO: Get from config
         }
     }
@@ -1 +1,40 @@
-"""`nDocuQuery AI - API v1 Router`n`nThis module contains the main API router for version 1 of the API.`nIt includes all feature-specific routers and provides a centralized entry point.`n"""`n`nfrom fastapi import APIRouter`n`nfrom .health import health_router`nfrom .info import info_router`n`n# Main API router`napi_router = APIRouter()`n`n# Include core routers`napi_router.include_router(health_router, tags=["Health"])`napi_router.include_router(info_router, tags=["Information"])`n`n# TODO: Include feature routers as they are implemented`n# from app.auth.routes import auth_router`n# from app.tenants.routes import tenant_router`n# from app.users.routes import user_router`n# from app.documents.routes import document_router`n# from app.retrieval.routes import retrieval_router`n`n# api_router.include_router(auth_router, prefix="/auth", tags=["Authentication"])`n# api_router.include_router(tenant_router, prefix="/tenants", tags=["Tenants"])`n# api_router.include_router(user_router, prefix="/users", tags=["Users"])`n# api_router.include_router(document_router, prefix="/documents", tags=["Documents"])`n# api_router.include_router(retrieval_router, prefix="/query", tags=["Query"])`n`n`ndef include_feature_routers():`n    """Include all feature-specific routers in the main API router."""`n    # TODO: Implement dynamic router inclusion`n    # TODO: Add router validation and error handling`n    # TODO: Implement router dependency management`n    pass
+"""
+DocuQuery AI - API v1 Router
+
+This module contains the main API router for version 1 of the API.
+It includes all feature-specific routers and provides a centralized entry point.
+"""
+
+from fastapi import APIRouter
+
+from app.documents.routes import document_router
+from app.retrieval.routes import retrieval_router
+
+from .health import health_router
+from .info import info_router
+
+# Main API router
+api_router = APIRouter()
+
+# Include core routers
+api_router.include_router(health_router, tags=["Health"])
+api_router.include_router(info_router, tags=["Information"])
+api_router.include_router(retrieval_router, prefix="/query", tags=["Query"])
+api_router.include_router(document_router, prefix="/documents", tags=["Documents"])
+
+# TODO: Include feature routers as they are implemented
+# from app.auth.routes import auth_router
+# from app.tenants.routes import tenant_router
+# from app.users.routes import user_router
+
+# api_router.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+# api_router.include_router(tenant_router, prefix="/tenants", tags=["Tenants"])
+# api_router.include_router(user_router, prefix="/users", tags=["Users"])
+
+
+def include_feature_routers():
+    """Include all feature-specific routers in the main API router."""
+    # TODO: Implement dynamic router inclusion
+    # TODO: Add router validation and error handling
+    # TODO: Implement router dependency management
+    pass
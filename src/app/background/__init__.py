@@ -0,0 +1,15 @@
+"""
+DocuQuery AI - Background Package
+
+This package contains helpers for work that runs outside the request: asyncio
+tasks, thread pools and ingestion task workers.
+"""
+
+from .tracing import run_in_thread, spawn, task_headers, traced_task
+
+__all__ = [
+    "run_in_thread",
+    "spawn",
+    "task_headers",
+    "traced_task",
+]
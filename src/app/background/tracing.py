@@ -0,0 +1,87 @@
+"""
+DocuQuery AI - Background Task Tracing
+
+This module carries the trace of the request that scheduled background work
+into that work: ``asyncio`` tasks spawned from a request, blocking calls sent
+to a thread pool, and task messages consumed by ingestion workers in another
+process. Producers attach ``task_headers()`` to the message; the worker-side
+function is decorated with ``traced_task`` and continues the same trace.
+"""
+
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.telemetry.tracing import extract, inject, run_in_executor, start_span
+
+T = TypeVar("T")
+
+# Keyword argument carrying the trace context inside a task message
+TRACE_CONTEXT_KWARG = "trace_context"
+
+
+def task_headers() -> Dict[str, str]:
+    """
+    Trace context of the current request, to send along with a task message.
+
+    Example:
+        process_document.delay(document_id, trace_context=task_headers())
+    """
+    return inject({})
+
+
+def traced_task(name: Optional[str] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Run a task function inside a span continuing the producer's trace.
+
+    The wrapped function accepts an optional ``trace_context`` keyword
+    argument, as produced by ``task_headers``, which is consumed here and not
+    passed on. Coroutine functions and plain functions are both supported.
+
+    Args:
+        name: Span name; defaults to the function's qualified name
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        span_name = name or f"task {func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                parent = extract(kwargs.pop(TRACE_CONTEXT_KWARG, None))
+                with start_span(span_name, parent=parent):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            parent = extract(kwargs.pop(TRACE_CONTEXT_KWARG, None))
+            with start_span(span_name, parent=parent):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def spawn(coro: Awaitable[T], name: str) -> "asyncio.Task[T]":
+    """
+    Start a detached ``asyncio`` task traced as a child of the current span.
+
+    The task may outlive the request; its span is exported with the rest of
+    the trace if the trace was kept.
+    """
+
+    async def run() -> T:
+        with start_span(name):
+            return await coro
+
+    return asyncio.create_task(run(), name=name)
+
+
+def run_in_thread(func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+    """Run a blocking call in the default thread pool, keeping the current trace."""
+    return run_in_executor(None, func, *args)
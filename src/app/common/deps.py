@@ -0,0 +1,86 @@
+"""
+DocuQuery AI - Request Dependencies
+
+This module provides FastAPI dependencies shared by the feature routers.
+"""
+
+from fastapi import Request
+
+from app.common.exceptions import DocuQueryException
+
+
+def get_current_tenant(request: Request) -> str:
+    """
+    Tenant a request acts for.
+
+    Read from the ``X-Tenant-ID`` header, the same key the rate limiter
+    charges quotas to. The header is trusted as received: the service must
+    run behind a gateway that authenticates the caller and sets it,
+    replacing any value the client sent.
+    """
+    # TODO: Resolve the tenant from the authenticated user once auth lands
+    tenant_id = request.headers.get("x-tenant-id")
+    if not tenant_id:
+        return "default"
+    # Bound key size; the header is client supplied
+    return tenant_id[:64]
+
+
+def get_retrieval_service(request: Request):
+    """The retrieval service built at application startup."""
+    service = getattr(request.app.state, "retrieval", None)
+    if service is None:
+        raise DocuQueryException(
+            "Query service is not configured",
+            error_code="SERVICE_UNAVAILABLE",
+            status_code=503,
+        )
+    return service
+
+
+def get_query_jobs(request: Request):
+    """Background execution of asynchronous queries, built at application startup."""
+    jobs = getattr(request.app.state, "query_jobs", None)
+    if jobs is None:
+        raise DocuQueryException(
+            "Asynchronous queries are not enabled",
+            error_code="SERVICE_UNAVAILABLE",
+            status_code=503,
+        )
+    return jobs
+
+
+def get_query_history(request: Request):
+    """The query history store, when a database is configured."""
+    history = getattr(getattr(request.app.state, "retrieval", None), "history", None)
+    if history is None:
+        raise DocuQueryException(
+            "Query history is not enabled",
+            error_code="SERVICE_UNAVAILABLE",
+            status_code=503,
+        )
+    return history
+
+
+def get_document_search(request: Request):
+    """The document search index built at application startup."""
+    search = getattr(request.app.state, "document_search", None)
+    if search is None:
+        raise DocuQueryException(
+            "Document search is not configured",
+            error_code="SERVICE_UNAVAILABLE",
+            status_code=503,
+        )
+    return search
+
+
+def get_uploads(request: Request):
+    """Streaming document uploads, built at application startup."""
+    uploads = getattr(request.app.state, "uploads", None)
+    if uploads is None:
+        raise DocuQueryException(
+            "Document uploads are not configured",
+            error_code="SERVICE_UNAVAILABLE",
+            status_code=503,
+        )
+    return uploads
@@ -5,56 +5,74 @@ This module provides centralized error handling for the FastAPI application,
 including custom exception handlers and error response formatting.
 """
 
+from datetime import datetime
+from functools import lru_cache
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from starlette.responses import Response
+from typing import Dict, Any, Optional
+
+from app.telemetry.tracing import current_span
 
 from .exceptions import DocuQueryException
+from .serialization import ErrorBody, FastJSONResponse
+
+# Pre-rendered body of unexpected errors
+_INTERNAL_ERROR = ErrorBody(
+    "Internal server error", "INTERNAL_ERROR", "An unexpected error occurred"
+)
+
+
+def _request_id(request: Request) -> Optional[str]:
+    """Request ID set by the request ID stage, if it ran."""
+    return getattr(request.state, "request_id", None)
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+@lru_cache(maxsize=256)
+def _static_body(message: str, code: str) -> ErrorBody:
+    """Pre-rendered body of an exception raised without details."""
+    return ErrorBody(message, code, {})
 
 
 def register_error_handlers(app: FastAPI) -> None:
     """Register custom error handlers with the FastAPI application."""
     # TODO: Implement custom exception handlers
     # TODO: Add logging for errors
-    # TODO: Implement error response formatting
     # TODO: Add error tracking integration
     
     @app.exception_handler(DocuQueryException)
-    async def docuquery_exception_handler(request: Request, exc: DocuQueryException) -> JSONResponse:
+    async def docuquery_exception_handler(request: Request, exc: DocuQueryException) -> Response:
         """Handle DocuQuery custom exceptions."""
-        # TODO: Implement proper error handling
         # TODO: Add error logging
-        # TODO: Format error response
+        
+        span = current_span()
+        if span is not None and exc.status_code >= 500:
+            span.record_error(exc)
+        
+        code = exc.error_code or "UNKNOWN_ERROR"
+        if not exc.details:
+            body = _static_body(exc.message, code).render(_timestamp(), _request_id(request))
+            return Response(body, status_code=exc.status_code, media_type="application/json")
         
         error_response = {
             "error": exc.message,
-            "code": exc.error_code or "UNKNOWN_ERROR",
+            "code": code,
             "details": exc.details,
-            "timestamp": "2024-01-15T00:00:00Z",  # TODO: Get actual timestamp
-            "request_id": "placeholder",            # TODO: Get actual request ID
+            "timestamp": _timestamp(),
+            "request_id": _request_id(request),
         }
-        
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=exc.status_code,
             content=error_response
         )
     
     @app.exception_handler(Exception)
-    async def generic_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+    async def generic_exception_handler(request: Request, exc: Exception) -> Response:
         """Handle generic exceptions."""
-        # TODO: Implement generic error handling
         # TODO: Add error logging
-        # TODO: Sanitize error messages for production
-        
-        error_response = {
-            "error": "Internal server error",
-            "code": "INTERNAL_ERROR",
-            "details": "An unexpected error occurred",
-            "timestamp": "2024-01-15T00:00:00Z",  # TODO: Get actual timestamp
-            "request_id": "placeholder",            # TODO: Get actual request ID
-        }
         
-        return JSONResponse(
-            status_code=500,
-            content=error_response
-        )
+        body = _INTERNAL_ERROR.render(_timestamp(), _request_id(request))
+        return Response(body, status_code=500, media_type="application/json")
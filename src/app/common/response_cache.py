@@ -0,0 +1,155 @@
+"""
+DocuQuery AI - Response Cache
+
+This module caches the serialized bodies of read-mostly GET endpoints. A
+payload is built and encoded to JSON bytes once, tagged with a strong ETag,
+and served as-is until it is invalidated; requests carrying a matching
+``If-None-Match`` get ``304 Not Modified`` without a body. Entries are keyed
+by tenant so tenant-scoped resources can share the mechanism, and the whole
+cache is dropped when ``reload_settings()`` runs.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import Settings, add_reload_listener
+
+# Tenant key of entries that are the same for every tenant
+GLOBAL_TENANT = "*"
+
+CacheKey = Tuple[Hashable, ...]
+
+
+class CachedPayload:
+    """A serialized response body with its validator."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def serialize(payload: Any) -> bytes:
+    """Encode a payload the way the cache stores it."""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an ``If-None-Match`` header against an ETag.
+
+    Uses the weak comparison required for ``If-None-Match``, so ``W/"x"``
+    matches ``"x"``.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized GET responses keyed by tenant and resource.
+
+    Args:
+        max_entries: Entries kept before the least recently used is dropped
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CachedPayload]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(
+        self, tenant: str, key: CacheKey, builder: Callable[[], Any]
+    ) -> CachedPayload:
+        """
+        Return the cached payload for a key, building and encoding it on a miss.
+
+        Args:
+            tenant: Tenant owning the resource, or ``GLOBAL_TENANT``
+            key: Resource key, e.g. ``("documents", document_id)``
+            builder: Returns the payload to serialize
+        """
+        full_key = (tenant,) + key
+        entry = self._entries.get(full_key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(full_key)
+            return entry
+        self.misses += 1
+        entry = CachedPayload(serialize(builder()))
+        self._entries[full_key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def respond(
+        self,
+        request: Request,
+        key: CacheKey,
+        builder: Callable[[], Any],
+        tenant: str = GLOBAL_TENANT,
+        cache_control: str = "no-cache",
+    ) -> Response:
+        """
+        Serve a cached payload, or ``304 Not Modified`` if the client has it.
+
+        Args:
+            request: The incoming request, read for ``If-None-Match``
+            key: Resource key
+            builder: Returns the payload to serialize on a miss
+            tenant: Tenant owning the resource
+            cache_control: ``Cache-Control`` value; the default lets clients
+                store the body but revalidate it on every use
+        """
+        entry = self.get_or_build(tenant, key, builder)
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+        if tenant != GLOBAL_TENANT:
+            headers["Vary"] = "X-Tenant-ID, Authorization"
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, tenant: Optional[str] = None, prefix: CacheKey = ()) -> int:
+        """
+        Drop entries of a tenant (all tenants if None) whose key starts with ``prefix``.
+
+        Returns:
+            Number of entries dropped
+        """
+        size = len(prefix)
+        doomed = [
+            key
+            for key in self._entries
+            if (tenant is None or key[0] == tenant) and key[1 : 1 + size] == prefix
+        ]
+        for key in doomed:
+            del self._entries[key]
+        return len(doomed)
+
+    def clear(self, settings: Optional[Settings] = None) -> None:
+        """Drop every entry; registered to run on settings reload."""
+        self._entries.clear()
+
+
+# Process-wide cache for read-mostly endpoints
+response_cache = ResponseCache()
+add_reload_listener(response_cache.clear)
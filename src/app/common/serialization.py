@@ -0,0 +1,112 @@
+"""
+DocuQuery AI - Serialization
+
+This module provides the JSON encoding used for API responses. ``dumps``
+uses orjson when it is installed and falls back to the standard library
+otherwise. ``FastJSONResponse`` is the application's default response class,
+``ModelResponse`` serializes a typed response model in one pass without
+FastAPI's ``jsonable_encoder`` round trip, and ``ErrorBody`` pre-renders the
+static part of error payloads.
+"""
+
+import json
+from typing import Any, Mapping, Optional
+
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            return obj.model_dump(mode="json")
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(obj: Any) -> bytes:
+        """Encode an object as compact UTF-8 JSON."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+else:
+
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            return obj.model_dump(mode="json")
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if hasattr(obj, "isoformat"):
+            return obj.isoformat()
+        return str(obj)
+
+    def dumps(obj: Any) -> bytes:
+        """Encode an object as compact UTF-8 JSON."""
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with ``dumps``."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ModelResponse(Response):
+    """
+    Response rendering a pydantic model straight to JSON bytes.
+
+    Returning this from a handler bypasses FastAPI's response validation and
+    ``jsonable_encoder`` pass; declare the model as ``response_model`` on the
+    route to keep it in the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: BaseModel,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        super().__init__(content, status_code, headers, self.media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+class ErrorBody:
+    """
+    An error payload whose static fields are rendered once.
+
+    Only the timestamp and request ID are encoded per response.
+
+    Args:
+        error: Human readable message
+        code: Machine readable error code
+        details: Static details
+    """
+
+    __slots__ = ("prefix",)
+
+    def __init__(self, error: str, code: str, details: Any = None):
+        static = dumps({"error": error, "code": code, "details": details})
+        self.prefix = static[:-1] + b',"timestamp":'
+
+    def render(self, timestamp: str, request_id: Optional[str]) -> bytes:
+        """Complete the payload with the per-request fields."""
+        return b"".join(
+            (self.prefix, dumps(timestamp), b',"request_id":', dumps(request_id), b"}")
+        )
@@ -0,0 +1,115 @@
+"""
+DocuQuery AI - Server-Sent Events
+
+This module renders an async source of ``(event, data)`` pairs as a
+``text/event-stream`` response. The source runs in its own task and hands
+encoded events over through a small bounded queue: when a client reads
+slowly, sends block, the queue fills and the source is paused at its next
+event, so no buffer grows without bound. A comment line is sent whenever the
+source is quiet for the heartbeat interval, which keeps proxies and load
+balancers from closing idle connections. When the client disconnects, the
+source task is cancelled and the source closed, which in turn closes any
+upstream stream it was reading.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+from .exceptions import DocuQueryException
+from .serialization import dumps
+
+logger = logging.getLogger("docuquery.sse")
+
+HEARTBEAT = b": heartbeat\n\n"
+
+# Response headers that keep proxies from buffering or caching the stream
+_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def encode_event(event: str, data: Any) -> bytes:
+    """One SSE event with a JSON ``data`` line."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def _error_event(exc: Exception) -> bytes:
+    if isinstance(exc, DocuQueryException):
+        return encode_event("error", {"error": exc.message, "code": exc.error_code or "UNKNOWN_ERROR"})
+    logger.exception("Event stream failed", exc_info=exc)
+    return encode_event("error", {"error": "Internal server error", "code": "INTERNAL_ERROR"})
+
+
+async def event_stream(
+    source: AsyncGenerator[Tuple[str, Any], None],
+    heartbeat: float = 15.0,
+    buffer: int = 4,
+) -> AsyncIterator[bytes]:
+    """
+    Encode events from a source, with heartbeats and bounded buffering.
+
+    An exception raised by the source is sent as a final ``error`` event,
+    since the response status has already been sent.
+
+    Args:
+        source: Async generator of ``(event, data)`` pairs
+        heartbeat: Seconds of silence before a heartbeat comment
+        buffer: Encoded events held while the client is behind
+
+    Yields:
+        Encoded SSE frames
+    """
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=buffer)
+
+    async def produce() -> None:
+        try:
+            async for event, data in source:
+                await queue.put(encode_event(event, data))
+        except Exception as exc:
+            await queue.put(_error_event(exc))
+        finally:
+            await source.aclose()
+        await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    pending: Optional["asyncio.Future[Optional[bytes]]"] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait((pending,), timeout=heartbeat)
+            if not done:
+                yield HEARTBEAT
+                continue
+            frame = pending.result()
+            pending = None
+            if frame is None:
+                break
+            yield frame
+    finally:
+        # Runs on completion and when the client goes away mid-stream
+        if pending is not None:
+            pending.cancel()
+        producer.cancel()
+
+
+class EventSourceResponse(StreamingResponse):
+    """
+    Streaming ``text/event-stream`` response over an event source.
+
+    Args:
+        source: Async generator of ``(event, data)`` pairs
+        heartbeat: Seconds of silence before a heartbeat comment
+        buffer: Encoded events held while the client is behind
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        source: AsyncGenerator[Tuple[str, Any], None],
+        heartbeat: float = 15.0,
+        buffer: int = 4,
+    ):
+        super().__init__(event_stream(source, heartbeat, buffer), headers=_STREAM_HEADERS)
@@ -0,0 +1,100 @@
+"""
+DocuQuery AI - Tenant Data Versions
+
+This module tells worker processes when their in-memory copies of a
+tenant's data are stale. Every write bumps a per-tenant counter in Redis;
+each worker remembers the counter its copy was loaded at and compares it
+with the current one before serving from memory. The current value is
+cached for ``check_interval`` seconds, so a hot tenant costs at most one
+Redis round trip per interval and a copy is at most that stale after a
+write made by another worker.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger("docuquery.versions")
+
+
+class TenantVersions:
+    """
+    Per-tenant write counters shared by all workers.
+
+    ``get`` returns None when Redis cannot be reached; callers must then
+    treat their copies as stale.
+
+    Args:
+        redis: Async Redis client
+        namespace: Kind of data the counters version, part of the key
+        check_interval: Seconds a read counter is trusted before it is read again
+        max_tenants: Tenants whose counters are cached at most
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        namespace: str,
+        check_interval: float = 1.0,
+        max_tenants: int = 65536,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.redis = redis
+        self.key_prefix = f"docuquery:versions:{namespace}"
+        self.check_interval = check_interval
+        self.max_tenants = max_tenants
+        self.clock = clock
+        # Tenant -> (counter or None if unreadable, read time), least recently read first
+        self._read: "OrderedDict[str, Tuple[Optional[int], float]]" = OrderedDict()
+        self.errors = 0
+
+    async def get(self, tenant_id: str, fresh: bool = False) -> Optional[int]:
+        """
+        The tenant's write counter, 0 if it was never written.
+
+        Args:
+            tenant_id: Tenant whose counter is read
+            fresh: Read Redis even if a recent value is cached
+
+        Returns:
+            The counter, or None when Redis is unavailable
+        """
+        now = self.clock()
+        cached = self._read.get(tenant_id)
+        if not fresh and cached is not None and now - cached[1] < self.check_interval:
+            return cached[0]
+        try:
+            raw = await self.redis.get(f"{self.key_prefix}:{tenant_id}")
+            version: Optional[int] = int(raw or 0)
+        except Exception as exc:
+            self._failed(exc)
+            version = None
+        self._remember(tenant_id, version, now)
+        return version
+
+    async def bump(self, tenant_id: str) -> Optional[int]:
+        """
+        Record a write; call after the authoritative store accepted it.
+
+        Returns:
+            The new counter, or None when Redis is unavailable
+        """
+        try:
+            version: Optional[int] = int(await self.redis.incr(f"{self.key_prefix}:{tenant_id}"))
+        except Exception as exc:
+            self._failed(exc)
+            version = None
+        self._remember(tenant_id, version, self.clock())
+        return version
+
+    def _remember(self, tenant_id: str, version: Optional[int], now: float) -> None:
+        self._read[tenant_id] = (version, now)
+        self._read.move_to_end(tenant_id)
+        while len(self._read) > self.max_tenants:
+            self._read.popitem(last=False)
+
+    def _failed(self, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Reading tenant data versions from Redis failed: %s", exc)
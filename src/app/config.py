@@ -5,7 +5,7 @@ This module contains the application configuration using Pydantic Settings.
 All configuration values are loaded from environment variables with sensible defaults.
 """
 
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -19,6 +19,14 @@ class Settings(BaseSettings):
     DEBUG: bool = Field(default=False, description="Debug mode")
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
     ENVIRONMENT: str = Field(default="development", description="Environment name")
+    LOG_FORMAT: str = Field(default="json", description="Log output format (json, text)")
+    LOG_QUEUE_SIZE: int = Field(default=10000, description="Log records buffered before new ones are dropped")
+    LOG_SAMPLE_RATE: float = Field(default=1.0, description="Default access log sampling rate")
+    LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = Field(
+        default={"/api/v1/health": 0.01},
+        description="Access log sampling rate per path prefix"
+    )
+    LOG_SLOW_REQUEST_MS: float = Field(default=1000.0, description="Requests slower than this are always logged")
     
     # Server Configuration
     HOST: str = Field(default="0.0.0.0", description="Server host")
@@ -40,6 +48,18 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = Field(default=20, description="Database connection pool size")
     DATABASE_MAX_OVERFLOW: int = Field(default=30, description="Database max overflow")
     DATABASE_POOL_TIMEOUT: int = Field(default=30, description="Database pool timeout")
+    QUERY_HISTORY_ENABLED: bool = Field(
+        default=False, description="Record answered queries in the database for GET /query/history"
+    )
+    DOCUMENT_CATALOG_ENABLED: bool = Field(
+        default=False, description="Load the document search index from the database documents table"
+    )
+    DOCUMENT_SEARCH_MAX_DOCUMENTS: int = Field(
+        default=1_000_000, description="Documents held in the in-memory search index across tenants"
+    )
+    DOCUMENT_SEARCH_REFRESH_SECONDS: float = Field(
+        default=300.0, description="Seconds before a tenant's document search index is reloaded"
+    )
     
     # Redis Configuration
     REDIS_URL: str = Field(
@@ -48,6 +68,12 @@ class Settings(BaseSettings):
     )
     REDIS_POOL_SIZE: int = Field(default=10, description="Redis connection pool size")
     REDIS_MAX_CONNECTIONS: int = Field(default=20, description="Redis max connections")
+    SHARED_DATA_VERSIONS: bool = Field(
+        default=True, description="Track tenant writes in Redis so in-process copies see other workers' writes"
+    )
+    DATA_VERSION_CHECK_SECONDS: float = Field(
+        default=1.0, description="Seconds an in-process copy may lag a write made by another worker"
+    )
     
     # Qdrant Configuration
     QDRANT_URL: str = Field(
@@ -56,6 +82,53 @@ class Settings(BaseSettings):
     )
     QDRANT_API_KEY: Optional[str] = Field(default=None, description="Qdrant API key")
     QDRANT_TIMEOUT: int = Field(default=30, description="Qdrant request timeout")
+    QDRANT_COLLECTION: str = Field(default="docuquery_chunks", description="Qdrant collection of document chunks")
+    VECTOR_STORE_BACKEND: str = Field(
+        default="hybrid",
+        description="Vector store (qdrant, memory, hybrid: small tenants searched in process)"
+    )
+    LOCAL_INDEX_MAX_TENANT_CHUNKS: int = Field(default=5000, description="Largest tenant searched in process")
+    LOCAL_INDEX_MAX_TOTAL_CHUNKS: int = Field(default=25000, description="Chunks held in process across tenants")
+    LOCAL_INDEX_REFRESH_SECONDS: int = Field(default=300, description="Reload interval of in-process tenants")
+    LOCAL_INDEX_DIRECTORY: Optional[str] = Field(
+        default=None, description="Directory of full-precision vectors of compressed tenants (default: temp dir)"
+    )
+    LOCAL_INDEX_QUANTIZE_MIN_CHUNKS: int = Field(default=1000, description="Smallest in-process tenant compressed")
+    VECTOR_QUANTIZATION: str = Field(
+        default="none", description="Stored vector compression with exact rescoring (none, int8, pq)"
+    )
+    VECTOR_PQ_SUBSPACES: Optional[int] = Field(
+        default=None, description="Product quantization subspaces (default: one per 16 dimensions)"
+    )
+    VECTOR_RESCORE_OVERSAMPLING: float = Field(
+        default=4.0, description="Compressed-search candidates rescored per requested hit"
+    )
+    QDRANT_EXACT_SEARCH_MAX_POINTS: int = Field(
+        default=5000, description="Filtered searches matching at most this many points skip the HNSW graph"
+    )
+    LEXICAL_SEARCH_ENABLED: bool = Field(default=True, description="Fuse BM25 keyword search with vector search")
+    LEXICAL_INDEX_MAX_TENANT_CHUNKS: int = Field(default=200000, description="Largest tenant indexed for BM25")
+    HYBRID_FUSION_K: int = Field(default=60, description="Reciprocal rank fusion smoothing constant")
+    HYBRID_FUSION_DEPTH: int = Field(default=20, description="Hits fetched from each search before fusion")
+    STREAM_HEARTBEAT_SECONDS: float = Field(
+        default=15.0, description="Idle seconds before a streamed answer sends a heartbeat comment"
+    )
+    STREAM_BUFFER_EVENTS: int = Field(
+        default=4, description="Streamed events buffered for a slow client before generation pauses"
+    )
+    RERANK_ENABLED: bool = Field(default=False, description="Rerank and diversify retrieved chunks")
+    RERANK_MODEL: Optional[str] = Field(
+        default=None,
+        description="Cross-encoder model (needs sentence-transformers); unset diversifies retrieval scores",
+    )
+    RERANK_DEPTH: int = Field(default=20, description="Candidates retrieved for reranking")
+    RERANK_BATCH_SIZE: int = Field(default=32, description="Candidates per scorer call")
+    RERANK_CONCURRENCY: int = Field(default=4, description="Scorer calls in flight per worker")
+    RERANK_THREADS: int = Field(default=2, description="Threads running a local reranking model")
+    RERANK_TIMEOUT_MS: int = Field(default=300, description="Reranking deadline before falling back to retrieval scores")
+    RERANK_DIVERSITY: float = Field(
+        default=0.3, ge=0.0, le=1.0, description="MMR weight of redundancy against relevance (0 disables)"
+    )
     
     # OpenAI Configuration
     OPENAI_API_KEY: Optional[str] = Field(default=None, description="OpenAI API key")
@@ -64,6 +137,53 @@ class Settings(BaseSettings):
     OPENAI_EMBEDDING_MODEL: str = Field(default="text-embedding-ada-002", description="OpenAI embedding model")
     OPENAI_MAX_TOKENS: int = Field(default=4000, description="OpenAI max tokens")
     OPENAI_TEMPERATURE: float = Field(default=0.1, description="OpenAI temperature")
+    OPENAI_BASE_URL: str = Field(default="https://api.openai.com/v1", description="OpenAI API base URL")
+    OPENAI_CONTEXT_WINDOW: int = Field(default=8192, description="Context length of the chat model in tokens")
+    CONTEXT_PACKING_ENABLED: bool = Field(
+        default=True, description="Fit retrieved chunks to the token budget left after OPENAI_MAX_TOKENS"
+    )
+    TOKEN_CACHE_SIZE: int = Field(default=4096, description="Texts whose token counts are cached")
+    
+    # Query Embedding Cache
+    EMBEDDING_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="Memory budget of the in-process embedding cache"
+    )
+    EMBEDDING_CACHE_TTL: int = Field(default=3600, description="In-process embedding cache TTL in seconds")
+    EMBEDDING_CACHE_DTYPE: str = Field(default="float16", description="Stored embedding type (float16, float32)")
+    EMBEDDING_CACHE_SHARED: bool = Field(default=True, description="Share query embeddings across workers via Redis")
+    EMBEDDING_CACHE_SHARED_TTL: int = Field(default=86400, description="Redis embedding cache TTL in seconds")
+    EMBEDDING_BATCH_MAX_SIZE: int = Field(default=64, description="Query texts per embedding provider call")
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = Field(
+        default=5.0, description="Time a query embedding waits for others to batch with (0 disables batching)"
+    )
+    QUERY_COALESCING_ENABLED: bool = Field(
+        default=True, description="Share one answer between identical concurrent queries"
+    )
+    
+    # Asynchronous Queries
+    ASYNC_QUERIES_ENABLED: bool = Field(default=True, description="Accept mode=async query submissions")
+    ASYNC_QUERY_WORKERS: int = Field(default=8, description="Asynchronous queries answered concurrently per worker")
+    ASYNC_QUERY_MAX_PENDING: int = Field(default=1000, description="Queued asynchronous queries before refusing more")
+    ASYNC_QUERY_RESULT_TTL: int = Field(default=600, description="Seconds a finished asynchronous result is kept")
+    ASYNC_QUERY_MAX_RESULTS: int = Field(default=10000, description="Asynchronous results kept per worker")
+    QUERY_LONG_POLL_MAX_SECONDS: float = Field(default=30.0, description="Longest wait of GET /query/{id}?wait=")
+    TENANT_TIERS: Dict[str, str] = Field(default_factory=dict, description="Tier of each tenant ID")
+    DEFAULT_TENANT_TIER: str = Field(default="free", description="Tier of tenants not in TENANT_TIERS")
+    TIER_QUERY_PRIORITIES: Dict[str, int] = Field(
+        default={"enterprise": 0, "pro": 1, "free": 2},
+        description="Asynchronous query priority of each tier, lower runs first",
+    )
+    
+    # Semantic Answer Cache
+    ANSWER_CACHE_ENABLED: bool = Field(default=True, description="Serve paraphrased questions from earlier answers")
+    ANSWER_CACHE_THRESHOLD: float = Field(
+        default=0.95, description="Minimum cosine similarity for serving a cached answer"
+    )
+    ANSWER_CACHE_MAX_ENTRIES: int = Field(default=1000, description="Cached answers per tenant and scope")
+    ANSWER_CACHE_TTL: int = Field(default=86400, description="Cached answer TTL in seconds")
+    ANSWER_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="Memory budget of the answer cache across all tenants"
+    )
     
     # Authentication Configuration
     JWT_SECRET: str = Field(
@@ -86,10 +206,44 @@ class Settings(BaseSettings):
     STORAGE_REGION: str = Field(default="us-east-1", description="Storage region")
     STORAGE_ACCESS_KEY: Optional[str] = Field(default=None, description="Storage access key")
     STORAGE_SECRET_KEY: Optional[str] = Field(default=None, description="Storage secret key")
+    STORAGE_LOCAL_DIRECTORY: Optional[str] = Field(
+        default=None, description="Directory of the local storage type; a temporary directory if unset"
+    )
+    MAX_DOCUMENT_SIZE_MB: int = Field(default=100, description="Largest document accepted for upload")
+    MAX_CONCURRENT_UPLOADS: int = Field(default=10, description="Upload requests streaming at once per worker")
+    UPLOAD_BUFFER_BYTES: int = Field(
+        default=1024 * 1024, description="Bytes of an upload hashed, stored and extracted together"
+    )
+    UPLOAD_SESSION_TTL: float = Field(
+        default=86400.0, description="Seconds an interrupted upload can be resumed"
+    )
+    INGEST_CHUNK_CHARACTERS: int = Field(default=2000, description="Characters per chunk of extracted text")
     
     # Rate Limiting Configuration
     RATE_LIMIT_REQUESTS: int = Field(default=100, description="Rate limit requests per window")
     RATE_LIMIT_WINDOW: int = Field(default=60, description="Rate limit window in seconds")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=65536, description="Max client keys tracked by the in-process limiter")
+    RATE_LIMIT_SHARDS: int = Field(default=16, description="Shards of the in-process limiter key table (power of two)")
+    RATE_LIMIT_BACKEND: str = Field(default="local", description="Rate limit backend (local, redis)")
+    RATE_LIMIT_LEASE_SIZE: int = Field(default=10, description="Tokens each worker leases per key from Redis")
+    RATE_LIMIT_QUOTAS_ENABLED: bool = Field(default=True, description="Enable cost-weighted tenant quotas")
+    RATE_LIMIT_GLOBAL_UNITS: int = Field(default=200000, description="Global quota in cost units per window")
+    RATE_LIMIT_TENANT_UNITS: int = Field(default=20000, description="Per-tenant quota in cost units per window")
+    RATE_LIMIT_USER_UNITS: int = Field(default=5000, description="Per-user quota in cost units per window")
+    RATE_LIMIT_ROUTE_UNITS: int = Field(default=3000, description="Per-user, per-route quota in cost units per window")
+    RATE_LIMIT_TOKENS_PER_UNIT: int = Field(default=100, description="LLM tokens charged as one cost unit")
+    RATE_LIMIT_ROUTE_COSTS: Dict[str, float] = Field(
+        default={
+            "POST /api/v1/query": 100,
+            "POST /api/v1/query/stream": 100,
+            "POST /api/v1/documents/upload-url": 10,
+        },
+        description="Declared cost per route, keyed by 'METHOD /path'"
+    )
+    RATE_LIMIT_BYPASS_PATHS: List[str] = Field(
+        default=["/api/v1/health", "/api/v1/info"],
+        description="Path prefixes exempt from quotas"
+    )
     
     # Feature Flags
     FEATURE_MULTI_TENANCY: bool = Field(default=True, description="Enable multi-tenancy")
@@ -102,6 +256,26 @@ class Settings(BaseSettings):
     SENTRY_DSN: Optional[str] = Field(default=None, description="Sentry DSN for error tracking")
     PROMETHEUS_ENABLED: bool = Field(default=True, description="Enable Prometheus metrics")
     PROMETHEUS_PORT: int = Field(default=9090, description="Prometheus metrics port")
+    TRACING_ENABLED: bool = Field(default=True, description="Enable request tracing")
+    TRACING_EXPORTER: str = Field(default="none", description="Span exporter (file, http, none)")
+    TRACING_FILE_PATH: str = Field(
+        default="/var/log/docuquery/spans.jsonl", description="Span file of the file exporter, an absolute path"
+    )
+    TRACING_COLLECTOR_URL: Optional[str] = Field(default=None, description="Collector URL for the http exporter")
+    TRACING_SAMPLE_RATE: float = Field(default=0.1, description="Fraction of healthy, fast traces kept")
+    TRACING_SLOW_TRACE_MS: float = Field(default=1000.0, description="Traces slower than this are always kept")
+    HEALTH_CHECK_INTERVAL: float = Field(default=10.0, description="Seconds between dependency probes")
+    HEALTH_PROBE_TIMEOUT: float = Field(default=2.0, description="Timeout of a single dependency probe")
+    HEALTH_STALE_AFTER: float = Field(default=30.0, description="Age after which a probe result is unknown")
+    HEALTH_HISTORY_SIZE: int = Field(default=60, description="Probe latencies kept per dependency")
+    SERVER_TIMING_ENABLED: bool = Field(
+        default=True, description="Report per-stage timings in a Server-Timing header"
+    )
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = Field(
+        default=None,
+        description="Directory for per-worker metrics files; unset keeps metrics per process"
+    )
+    PROMETHEUS_MAX_ROUTES: int = Field(default=512, description="Method/route series tracked per worker")
     
     class Config:
         """Pydantic configuration."""
@@ -113,6 +287,9 @@ class Settings(BaseSettings):
 # Global settings instance
 _settings: Optional[Settings] = None
 
+# Callbacks run after the settings were reloaded
+_reload_listeners: List[Callable[[Settings], None]] = []
+
 
 def get_settings() -> Settings:
     """Get the global settings instance."""
@@ -124,8 +301,16 @@ def get_settings() -> Settings:
     return _settings
 
 
+def add_reload_listener(listener: Callable[[Settings], None]) -> None:
+    """Register a callback run with the new settings after every reload."""
+    if listener not in _reload_listeners:
+        _reload_listeners.append(listener)
+
+
 def reload_settings() -> Settings:
     """Reload settings from environment variables."""
     global _settings
     _settings = Settings()
+    for listener in list(_reload_listeners):
+        listener(_settings)
     return _settings
@@ -0,0 +1,122 @@
+"""
+DocuQuery AI - Document Catalog
+
+This module reads the ``documents`` table for the in-memory document search
+index: whole tenants, in batches, to load it, and filtered pages for tenants
+whose index is not loaded yet. The fallback search matches every term as a
+case-insensitive substring of the title, filename or tags, like the index
+does, but ranks by recency only. Uploads create and update rows as their
+documents are stored and extracted.
+"""
+
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.documents.search import DocumentEntry, DocumentSearchResult, DocumentSource, words
+from app.storage.blobs import StoredFile
+
+from .models import DocumentRecord
+
+
+def document_entry(record: DocumentRecord) -> DocumentEntry:
+    """The searchable fields of a catalog row."""
+    return DocumentEntry(
+        record.id, record.title, record.filename, record.tags or (), record.status, record.updated_at
+    )
+
+
+def _like(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SqlDocumentSource(DocumentSource):
+    """
+    Document catalog in PostgreSQL.
+
+    Args:
+        sessions: Session factory, see ``app.db.session.session_factory``
+        engine: Engine to dispose of on ``aclose``, if owned by the source
+    """
+
+    def __init__(
+        self, sessions: "async_sessionmaker[AsyncSession]", engine: Optional[AsyncEngine] = None
+    ):
+        self.sessions = sessions
+        self.engine = engine
+
+    async def search(
+        self, tenant_id: str, text: Optional[str], status: Optional[str], offset: int, limit: int
+    ) -> DocumentSearchResult:
+        haystack = func.concat_ws(
+            " ", DocumentRecord.title, DocumentRecord.filename, func.array_to_string(DocumentRecord.tags, " ")
+        )
+        conditions = [DocumentRecord.tenant_id == tenant_id]
+        conditions.extend(haystack.ilike(_like(term), escape="\\") for term in words(text or ""))
+        facets_statement = (
+            select(DocumentRecord.status, func.count()).where(*conditions).group_by(DocumentRecord.status)
+        )
+        statement = select(DocumentRecord).where(*conditions)
+        if status is not None:
+            statement = statement.where(DocumentRecord.status == status)
+        statement = (
+            statement.order_by(DocumentRecord.updated_at.desc(), DocumentRecord.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        async with self.sessions() as session:
+            facets = {name: int(count) for name, count in (await session.execute(facets_statement)).all()}
+            rows = (await session.scalars(statement)).all()
+        total = facets.get(status, 0) if status is not None else sum(facets.values())
+        return DocumentSearchResult([document_entry(row) for row in rows], total, facets)
+
+    async def scroll(self, tenant_id: str, batch_size: int = 1000) -> AsyncIterator[List[DocumentEntry]]:
+        statement = (
+            select(DocumentRecord)
+            .where(DocumentRecord.tenant_id == tenant_id)
+            .order_by(DocumentRecord.updated_at, DocumentRecord.id)
+            .limit(batch_size)
+        )
+        after = None
+        while True:
+            page = statement
+            if after is not None:
+                page = page.where(tuple_(DocumentRecord.updated_at, DocumentRecord.id) > after)
+            async with self.sessions() as session:
+                rows = list((await session.scalars(page)).all())
+            if rows:
+                yield [document_entry(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            after = tuple_(rows[-1].updated_at, rows[-1].id)
+
+    async def save(self, tenant_id: str, entry: DocumentEntry, stored: Optional[StoredFile] = None) -> None:
+        """Create or update a document's row, with its stored file if given."""
+        values = {
+            "title": entry.title,
+            "filename": entry.filename,
+            "tags": list(entry.tags),
+            "status": entry.status,
+            "updated_at": entry.updated_at,
+        }
+        if stored is not None:
+            values.update(
+                storage_key=stored.key,
+                content_type=stored.content_type,
+                size_bytes=stored.size,
+                sha256=stored.sha256,
+            )
+        statement = (
+            insert(DocumentRecord)
+            .values(id=entry.document_id, tenant_id=tenant_id, **values)
+            .on_conflict_do_update(index_elements=[DocumentRecord.id], set_=values)
+        )
+        async with self.sessions() as session, session.begin():
+            await session.execute(statement)
+
+    async def aclose(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
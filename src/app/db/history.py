@@ -0,0 +1,142 @@
+"""
+DocuQuery AI - Query History Store
+
+This module records answered queries and reads a tenant's history back,
+newest first. Pages are fetched by keyset pagination: the cursor carries the
+``(created_at, id)`` of the last row returned, and the next page is the rows
+strictly after it in the index order, so reading page 10,000 costs the same
+as reading page 1. Date ranges become bounds on ``created_at`` within the
+same index range scan.
+
+Page numbers are still accepted for older clients; they are served with
+``OFFSET``, whose cost grows with the page number, and each page carries the
+cursor of the next one so clients can switch.
+"""
+
+from datetime import date, timezone
+from typing import Optional
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.retrieval.schemas import QueryResponse
+
+from .models import QueryRecord
+from .pagination import Page, date_bounds, decode_cursor, encode_cursor
+
+
+class QueryHistory:
+    """
+    Tenant query history in PostgreSQL.
+
+    Args:
+        sessions: Session factory, see ``app.db.session.session_factory``
+        engine: Engine to dispose of on ``aclose``, if owned by the history
+    """
+
+    def __init__(
+        self, sessions: "async_sessionmaker[AsyncSession]", engine: Optional[AsyncEngine] = None
+    ):
+        self.sessions = sessions
+        self.engine = engine
+
+    async def record(self, tenant_id: str, response: QueryResponse, user_id: Optional[str] = None) -> None:
+        """Store an answered query."""
+        created_at = response.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        async with self.sessions() as session, session.begin():
+            session.add(
+                QueryRecord(
+                    id=response.query_id,
+                    tenant_id=tenant_id,
+                    user_id=user_id,
+                    question=response.query,
+                    answer=response.answer,
+                    status="completed",
+                    details=response.metadata.model_dump(mode="json"),
+                    created_at=created_at,
+                    completed_at=created_at,
+                )
+            )
+
+    async def get(self, tenant_id: str, query_id: str) -> Optional[QueryRecord]:
+        """A tenant's recorded query, or None if unknown or another tenant's."""
+        async with self.sessions() as session:
+            record = await session.get(QueryRecord, query_id)
+        if record is None or record.tenant_id != tenant_id:
+            return None
+        return record
+
+    async def page(
+        self,
+        tenant_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Page[QueryRecord]:
+        """
+        A page of a tenant's queries, newest first.
+
+        Args:
+            tenant_id: Tenant whose history is read
+            limit: Queries per page
+            cursor: ``next_cursor`` of the previous page; None for the first
+            start: First day included, in UTC
+            end: Last day included, in UTC
+
+        Returns:
+            The queries and the cursor of the next page, None on the last
+
+        Raises:
+            ValidationError: When the cursor is malformed
+        """
+        statement = self._select(tenant_id, start, end)
+        if cursor is not None:
+            after = decode_cursor(cursor)
+            # Row comparison matches the index order, so it is a seek, not a filter
+            statement = statement.where(
+                tuple_(QueryRecord.created_at, QueryRecord.id) < tuple_(after.created_at, after.id)
+            )
+        return await self._fetch(statement, limit)
+
+    async def page_number(
+        self,
+        tenant_id: str,
+        page: int,
+        size: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Page[QueryRecord]:
+        """
+        Page ``page`` (from 1) of a tenant's queries; for clients sending page numbers.
+
+        Cost grows with the page number; clients should move to the cursor
+        returned with each page.
+        """
+        statement = self._select(tenant_id, start, end).offset((page - 1) * size)
+        return await self._fetch(statement, size)
+
+    @staticmethod
+    def _select(tenant_id: str, start: Optional[date], end: Optional[date]) -> Select:
+        lower, upper = date_bounds(start, end)
+        statement = select(QueryRecord).where(QueryRecord.tenant_id == tenant_id)
+        if lower is not None:
+            statement = statement.where(QueryRecord.created_at >= lower)
+        if upper is not None:
+            statement = statement.where(QueryRecord.created_at < upper)
+        return statement.order_by(QueryRecord.created_at.desc(), QueryRecord.id.desc())
+
+    async def _fetch(self, statement: Select, limit: int) -> Page[QueryRecord]:
+        # One extra row tells whether another page follows
+        async with self.sessions() as session:
+            rows = list((await session.scalars(statement.limit(limit + 1))).all())
+        if len(rows) <= limit:
+            return Page(rows, None)
+        last = rows[limit - 1]
+        return Page(rows[:limit], encode_cursor(last.created_at, last.id))
+
+    async def aclose(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
@@ -0,0 +1,85 @@
+"""
+DocuQuery AI - Database Models
+
+This module defines the tables of the DocuQuery database.
+
+``queries`` holds the history of answered questions. History pages are read
+newest first per tenant, optionally within a date range, by keyset
+pagination on ``(created_at, id)``; the composite index
+``(tenant_id, created_at DESC, id DESC)`` serves the tenant equality, the
+date range and the cursor seek as one index range scan that stops after a
+page of rows, with no sort step.
+
+``documents`` is the document catalog. The search box of the document list
+is answered from an in-memory index (``app.documents.search``); the catalog
+is read whole, per tenant, to load that index, through the
+``(tenant_id, updated_at, id)`` index, and searched directly only for
+tenants whose index is not loaded yet. Uploaded documents also record
+where their file is stored, its size, detected MIME type and SHA-256.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .session import Base
+
+
+class QueryRecord(Base):
+    """A question asked by a tenant and the outcome of answering it."""
+
+    __tablename__ = "queries"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    user_id: Mapped[Optional[str]] = mapped_column(String(64))
+    question: Mapped[str] = mapped_column(Text, nullable=False)
+    answer: Mapped[Optional[str]] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="completed")
+    details: Mapped[Dict[str, Any]] = mapped_column("metadata", JSONB, nullable=False, default=dict)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+
+Index(
+    "ix_queries_tenant_created_id",
+    QueryRecord.tenant_id,
+    QueryRecord.created_at.desc(),
+    QueryRecord.id.desc(),
+)
+
+
+class DocumentRecord(Base):
+    """A document in a tenant's catalog."""
+
+    __tablename__ = "documents"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    filename: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    tags: Mapped[List[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    storage_key: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_type: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    size_bytes: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+Index(
+    "ix_documents_tenant_updated_id",
+    DocumentRecord.tenant_id,
+    DocumentRecord.updated_at,
+    DocumentRecord.id,
+)
@@ -0,0 +1,104 @@
+"""
+DocuQuery AI - Keyset Pagination
+
+This module holds the database-independent parts of keyset pagination:
+opaque cursors over a ``(created_at, id)`` sort key and the translation of
+a date range into a half-open timestamp range. A page is fetched by seeking
+past the last key of the previous page through an index on that key, so its
+cost does not depend on how deep the page is, unlike ``OFFSET``, which reads
+and discards every earlier row.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Generic, List, NamedTuple, Optional, Tuple, TypeVar
+
+from app.common.exceptions import ValidationError
+
+T = TypeVar("T")
+
+_CURSOR_VERSION = 1
+
+
+class Cursor(NamedTuple):
+    """Sort key of the last row of a page; the next page starts after it."""
+
+    created_at: datetime
+    id: str
+
+
+class Page(Generic[T]):
+    """One page of rows, newest first, and the cursor of the next page."""
+
+    __slots__ = ("items", "next_cursor")
+
+    def __init__(self, items: List[T], next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque, URL-safe cursor for the position after a row."""
+    raw = json.dumps([_CURSOR_VERSION, created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Parse a cursor made by ``encode_cursor``.
+
+    Raises:
+        ValidationError: When the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, created_at, row_id = json.loads(raw)
+        if version != _CURSOR_VERSION or not isinstance(row_id, str):
+            raise ValueError(version)
+        return Cursor(datetime.fromisoformat(created_at), row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValidationError("Invalid pagination cursor", error_code="INVALID_CURSOR") from exc
+
+
+def date_bounds(
+    start: Optional[date], end: Optional[date]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Inclusive UTC dates as a half-open ``[lower, upper)`` timestamp range.
+
+    Comparing the indexed column against constants, rather than casting it
+    to a date, keeps the filter usable as an index range condition.
+    """
+    lower = datetime.combine(start, time.min, timezone.utc) if start is not None else None
+    upper = datetime.combine(end + timedelta(days=1), time.min, timezone.utc) if end is not None else None
+    return lower, upper
+
+
+def parse_date_range(value: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Parse the legacy ``date_range`` parameter, ``START..END`` in ISO dates.
+
+    Either side may be empty for an open range; a single date means that day.
+
+    Raises:
+        ValidationError: When the range is malformed or reversed
+    """
+    if not value:
+        return None, None
+    first, separator, second = value.partition("..")
+    if not separator:
+        second = first
+    try:
+        start = date.fromisoformat(first) if first else None
+        end = date.fromisoformat(second) if second else None
+    except ValueError as exc:
+        raise ValidationError(
+            "date_range must be START..END in ISO dates", error_code="INVALID_DATE_RANGE"
+        ) from exc
+    if start is not None and end is not None and start > end:
+        raise ValidationError(
+            "date_range start must not be after its end", error_code="INVALID_DATE_RANGE"
+        )
+    return start, end
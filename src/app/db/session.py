@@ -0,0 +1,40 @@
+"""
+DocuQuery AI - Database Sessions
+
+This module creates the async SQLAlchemy engine and session factory for the
+PostgreSQL database, using the psycopg 3 driver, and the declarative base
+the table models derive from.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+
+from app.config import Settings
+
+
+class Base(DeclarativeBase):
+    """Declarative base of the DocuQuery tables."""
+
+
+def async_url(url: str) -> str:
+    """The database URL with the async psycopg driver selected."""
+    for prefix in ("postgresql+psycopg://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+def create_engine(settings: Settings) -> AsyncEngine:
+    """Engine with the configured connection pool."""
+    return create_async_engine(
+        async_url(settings.DATABASE_URL),
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+def session_factory(engine: AsyncEngine) -> "async_sessionmaker[AsyncSession]":
+    """Sessions bound to an engine; objects stay usable after commit."""
+    return async_sessionmaker(engine, expire_on_commit=False)
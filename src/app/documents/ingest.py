@@ -0,0 +1,706 @@
+"""
+DocuQuery AI - Streaming Uploads
+
+This module receives document files as resumable, streamed uploads. A
+client creates an upload with the file's size, sends the bytes in one or
+more ``PATCH`` requests starting at the offset the server reports, and
+after an interruption reads that offset back and continues from it.
+
+Request bodies are never held whole: each is copied into one fixed-size
+buffer, and every full buffer is, in a single pass, added to the SHA-256
+digest, appended to storage and, for text formats, decoded into chunks,
+before the buffer is reused. A worker thus holds ``buffer_bytes`` per
+request in progress, at most ``max_concurrent`` of them, whatever the file
+sizes. The MIME type is detected from the first bytes, so unsupported files
+are refused before most of them is sent.
+
+Plain text and Markdown are chunked and embedded while the upload is still
+running. The embedded chunks are staged next to the partial file and only
+added to the search indexes once the file is complete and matches its
+checksum, so the document is searchable moments after its last byte arrives
+but never before it is verified. Word documents need the zip directory at
+the end of the file and are extracted once complete; PDFs are stored and
+left ``pending`` for the extraction pipeline.
+
+Uploads in progress are held by the worker that created them, so requests
+of one upload must reach the same worker (sticky routing), as for
+asynchronous queries.
+"""
+
+import asyncio
+import base64
+import codecs
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, BinaryIO, Callable, List, Optional, Sequence, Set
+from xml.etree import ElementTree
+
+import numpy as np
+
+from app.common.exceptions import ConflictError, DocuQueryException, NotFoundError, RateLimitError, ValidationError
+from app.retrieval.vector_store import ChunkRecord
+from app.storage.blobs import Block, BlobStore, StoredFile
+from app.telemetry.tracing import run_in_executor
+
+from .schemas import UploadStatus
+from .search import DocumentEntry, DocumentSearch
+
+logger = logging.getLogger("docuquery.uploads")
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TEXT = "text/plain"
+MARKDOWN = "text/markdown"
+
+UPLOADING = "uploading"
+PROCESSING = "processing"
+# Stored, waiting for the extraction pipeline
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+# Bytes inspected to detect the MIME type
+SNIFF_BYTES = 512
+
+_STREAMED = (TEXT, MARKDOWN)
+_EMBED_BATCH = 64
+_BINARY = re.compile(rb"[\x00-\x08\x0b\x0e-\x1a\x1c-\x1f]")
+_UNSAFE = re.compile(r"[^\w.\-]+")
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _tenant_segment(tenant_id: str) -> str:
+    """
+    The tenant ID as one component of a storage key.
+
+    Raises:
+        ValidationError: When the ID would name no directory or a parent
+            one, such as ``..``, escaping the tenant's namespace
+    """
+    segment = _UNSAFE.sub("_", tenant_id)
+    if not segment.strip("."):
+        raise ValidationError("Tenant ID cannot name a storage directory", error_code="INVALID_TENANT")
+    return segment
+
+
+def sniff(head: bytes, filename: str, complete: bool = False) -> Optional[str]:
+    """
+    MIME type of a supported document from its first bytes, or None.
+
+    Args:
+        head: First bytes of the file, ``SNIFF_BYTES`` unless it is shorter
+        filename: Name of the file, telling Word documents from other zips
+        complete: ``head`` is the whole file, so no character is cut off
+    """
+    if head.startswith(b"%PDF-"):
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        # word/document.xml is checked for on extraction
+        return DOCX if filename.lower().endswith(".docx") else None
+    if _BINARY.search(head):
+        return None
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+    except UnicodeDecodeError:
+        return None
+    return MARKDOWN if filename.lower().endswith((".md", ".markdown")) else TEXT
+
+
+class TextChunker:
+    """
+    Splits UTF-8 text fed in arbitrary pieces into chunks of at most
+    ``size`` characters, cut at a paragraph, line or word break when there
+    is one in the second half of the chunk.
+    """
+
+    def __init__(self, size: int = 2000):
+        self.size = size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._text = ""
+
+    def feed(self, data: Block) -> List[str]:
+        """Chunks completed by the next bytes of the file."""
+        return self.add(self._decoder.decode(data))
+
+    def add(self, text: str) -> List[str]:
+        """Chunks completed by the next characters of the text."""
+        text = self._text + text
+        size, start, chunks = self.size, 0, []
+        while len(text) - start > size:
+            end = start + size
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut >= 0:
+                    cut += len(separator)
+                    break
+            else:
+                cut = end
+            chunk = text[start:cut].strip()
+            if chunk:
+                chunks.append(chunk)
+            start = cut
+        self._text = text[start:]
+        return chunks
+
+    def finish(self) -> List[str]:
+        """The remaining chunks, at the end of the text."""
+        chunks = self.add(self._decoder.decode(b"", final=True))
+        rest, self._text = self._text.strip(), ""
+        return chunks + [rest] if rest else chunks
+
+
+def docx_chunks(file: BinaryIO, size: int = 2000) -> List[str]:
+    """Chunks of the paragraphs of a Word document, parsed incrementally."""
+    chunker = TextChunker(size)
+    chunks: List[str] = []
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        for _, element in ElementTree.iterparse(xml):
+            if element.tag == _W + "p":
+                text = "".join(node.text or "" for node in element.iter(_W + "t"))
+                chunks.extend(chunker.add(text + "\n\n"))
+                element.clear()
+    return chunks + chunker.finish()
+
+
+class Upload:
+    """A document upload in progress or, until it expires, finished."""
+
+    __slots__ = (
+        "upload_id", "tenant_id", "document_id", "filename", "title", "tags", "size", "expected_sha256",
+        "offset", "content_type", "sha256", "status", "error", "created_at", "expires_at", "writing",
+        "done", "hash", "head", "chunker", "chunks", "extraction", "indexed",
+    )
+
+    def __init__(
+        self,
+        tenant_id: str,
+        filename: str,
+        size: int,
+        title: str,
+        tags: Sequence[str],
+        expected_sha256: Optional[str],
+        expires_at: float,
+    ):
+        self.upload_id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.document_id = uuid.uuid4().hex
+        self.filename = filename
+        self.title = title
+        self.tags = tuple(tags)
+        self.size = size
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.offset = 0
+        self.content_type: Optional[str] = None
+        self.sha256: Optional[str] = None
+        self.status = UPLOADING
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.expires_at = expires_at
+        self.writing = False
+        # Set once the document reaches its final status
+        self.done = asyncio.Event()
+        self.hash = hashlib.sha256()
+        self.head = b""
+        self.chunker: Optional[TextChunker] = None
+        self.chunks: Optional["asyncio.Queue[Optional[List[str]]]"] = None
+        self.extraction: Optional["asyncio.Task[None]"] = None
+        self.indexed = False
+
+    @property
+    def part_key(self) -> str:
+        """Storage key of the bytes received so far."""
+        return f"uploads/{_tenant_segment(self.tenant_id)}/{self.upload_id}"
+
+    @property
+    def staged_key(self) -> str:
+        """Storage key of the chunks embedded before the upload is verified."""
+        return f"{self.part_key}.chunks"
+
+    @property
+    def key(self) -> str:
+        """Storage key of the complete file."""
+        filename = _UNSAFE.sub("_", self.filename).strip("._") or "document"
+        return f"tenants/{_tenant_segment(self.tenant_id)}/documents/{self.document_id}/{filename}"
+
+    def to_status(self) -> UploadStatus:
+        """The upload as returned by the upload endpoints."""
+        return UploadStatus(
+            id=self.upload_id,
+            document_id=self.document_id,
+            filename=self.filename,
+            size=self.size,
+            offset=self.offset,
+            content_type=self.content_type,
+            sha256=self.sha256,
+            status=self.status,
+            error=self.error,
+            created_at=self.created_at,
+        )
+
+
+class UploadManager:
+    """
+    Resumable, streaming document uploads.
+
+    Args:
+        store: Storage of the files
+        search: Optional document search index, sent an event when an
+            upload becomes a document and when its status changes
+        retrieval: Optional retrieval service indexing the extracted
+            chunks; without it files are stored and left ``pending``
+        catalog: Optional document catalog, see
+            ``app.db.documents.SqlDocumentSource``
+        max_bytes: Largest file accepted
+        buffer_bytes: Bytes gathered from a request body before they are
+            hashed, stored and extracted together
+        max_concurrent: Requests streaming file bytes at once; more are refused
+        max_uploads: Unfinished uploads held at once
+        chunk_characters: Characters per chunk of extracted text
+        ttl: Seconds an upload can be resumed after its last request, and
+            read after it finished
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        search: Optional[DocumentSearch] = None,
+        retrieval: Optional[Any] = None,
+        catalog: Optional[Any] = None,
+        max_bytes: int = 100 * 1024 * 1024,
+        buffer_bytes: int = 1024 * 1024,
+        max_concurrent: int = 10,
+        max_uploads: int = 10000,
+        chunk_characters: int = 2000,
+        ttl: float = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.store = store
+        self.search = search
+        self.retrieval = retrieval
+        self.catalog = catalog
+        self.max_bytes = max_bytes
+        self.buffer_bytes = buffer_bytes
+        self.max_concurrent = max_concurrent
+        self.max_uploads = max_uploads
+        self.chunk_characters = chunk_characters
+        self.ttl = ttl
+        self.clock = clock
+        # Ordered by expiry: an upload moves to the back on each request
+        self._uploads: "OrderedDict[str, Upload]" = OrderedDict()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.active = 0
+
+    async def create(
+        self,
+        tenant_id: str,
+        filename: str,
+        size: int,
+        title: Optional[str] = None,
+        tags: Sequence[str] = (),
+        sha256: Optional[str] = None,
+    ) -> Upload:
+        """
+        Start an upload.
+
+        Raises:
+            DocuQueryException: When the file is larger than ``max_bytes``
+            RateLimitError: When ``max_uploads`` uploads are unfinished
+            ValidationError: When the tenant ID cannot name a storage directory
+        """
+        _tenant_segment(tenant_id)
+        if size > self.max_bytes:
+            raise DocuQueryException(
+                f"Documents are limited to {self.max_bytes} bytes",
+                error_code="DOCUMENT_TOO_LARGE",
+                status_code=413,
+            )
+        await self._purge()
+        if len(self._uploads) >= self.max_uploads:
+            raise RateLimitError("Too many unfinished uploads; retry later", error_code="UPLOADS_FULL")
+        upload = Upload(
+            tenant_id,
+            filename,
+            size,
+            title or filename.rsplit(".", 1)[0],
+            tags,
+            sha256,
+            self.clock() + self.ttl,
+        )
+        self._uploads[upload.upload_id] = upload
+        return upload
+
+    def get(self, tenant_id: str, upload_id: str) -> Upload:
+        """
+        A tenant's upload.
+
+        Raises:
+            NotFoundError: When the upload is unknown, expired or another tenant's
+        """
+        upload = self._uploads.get(upload_id)
+        if upload is None or upload.tenant_id != tenant_id or (
+            upload.expires_at <= self.clock() and not upload.writing
+        ):
+            raise NotFoundError("Upload not found", error_code="UPLOAD_NOT_FOUND")
+        return upload
+
+    async def write(
+        self,
+        tenant_id: str,
+        upload_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        length: Optional[int] = None,
+    ) -> Upload:
+        """
+        Receive the next bytes of an upload, streamed from a request body.
+
+        Bytes received before a failure or disconnect are kept, and the
+        upload can be resumed from its new offset. Once the last byte is
+        in, the file is moved to its final key and the document is
+        extracted in the background.
+
+        Args:
+            tenant_id: Tenant uploading
+            upload_id: Upload written to
+            offset: Position of the first byte of ``body`` in the file
+            body: The bytes
+            length: Length of ``body`` if known, to refuse an overrun at once
+
+        Raises:
+            NotFoundError: When the upload is unknown
+            ConflictError: When the upload is complete, being written by
+                another request or at another offset
+            RateLimitError: When ``max_concurrent`` requests are streaming
+            DocuQueryException: When the file turns out larger than declared
+                (413) or of an unsupported type (415)
+            ValidationError: When the file does not match its declared SHA-256
+        """
+        upload = self.get(tenant_id, upload_id)
+        if upload.status != UPLOADING:
+            raise ConflictError("Upload is already complete", error_code="UPLOAD_COMPLETE")
+        if upload.writing:
+            raise ConflictError("Upload is being written by another request", error_code="UPLOAD_IN_PROGRESS")
+        if offset != upload.offset:
+            raise ConflictError(
+                f"Upload continues at offset {upload.offset}",
+                error_code="UPLOAD_OFFSET_MISMATCH",
+                details={"offset": upload.offset},
+            )
+        if length is not None and offset + length > upload.size:
+            raise self._overrun(upload)
+        if self.active >= self.max_concurrent:
+            raise RateLimitError("Too many uploads in progress; retry later", error_code="UPLOADS_BUSY")
+        self.active += 1
+        upload.writing = True
+        try:
+            await self._receive(upload, body)
+        finally:
+            self.active -= 1
+            upload.writing = False
+            upload.expires_at = self.clock() + self.ttl
+            if upload.upload_id in self._uploads:
+                self._uploads.move_to_end(upload.upload_id)
+        if upload.offset == upload.size:
+            await self._complete(upload)
+        return upload
+
+    async def abort(self, tenant_id: str, upload_id: str) -> None:
+        """
+        Cancel an unfinished upload and discard what it stored.
+
+        Raises:
+            NotFoundError: When the upload is unknown
+            ConflictError: When the upload is complete or being written
+        """
+        upload = self.get(tenant_id, upload_id)
+        if upload.status != UPLOADING or upload.writing:
+            raise ConflictError("Upload can no longer be cancelled", error_code="UPLOAD_COMPLETE")
+        del self._uploads[upload_id]
+        await self._discard(upload)
+
+    async def _receive(self, upload: Upload, body: AsyncIterator[bytes]) -> None:
+        buffer = memoryview(bytearray(self.buffer_bytes))
+        filled = 0
+        try:
+            async for piece in body:
+                if upload.offset + filled + len(piece) > upload.size:
+                    raise self._overrun(upload)
+                data = memoryview(piece)
+                while data:
+                    taken = min(len(data), self.buffer_bytes - filled)
+                    buffer[filled : filled + taken] = data[:taken]
+                    data = data[taken:]
+                    filled += taken
+                    if filled == self.buffer_bytes:
+                        filled = 0
+                        await self._flush(upload, buffer)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Keep what arrived intact, so that the client can resume after it
+            if filled and upload.status == UPLOADING:
+                await self._flush(upload, buffer[:filled])
+            raise
+        if filled:
+            await self._flush(upload, buffer[:filled])
+
+    async def _flush(self, upload: Upload, data: memoryview) -> None:
+        """Hash, store and extract the next block of a file."""
+        unchunked = self._sniff(upload, data) if upload.content_type is None else b""
+        try:
+            # hashlib releases the GIL on large blocks, so hashing overlaps the write
+            await asyncio.gather(
+                run_in_executor(None, upload.hash.update, data),
+                self.store.append(upload.part_key, data),
+            )
+        except Exception:
+            logger.exception("Storing upload %s failed", upload.upload_id)
+            upload.status, upload.error = FAILED, "Storage failed"
+            self._uploads.pop(upload.upload_id, None)
+            await self._discard(upload)
+            raise
+        upload.offset += len(data)
+        if upload.chunker is not None:
+            if unchunked:
+                await self._extracted(upload, upload.chunker.feed(unchunked))
+            await self._extracted(upload, upload.chunker.feed(data))
+
+    def _sniff(self, upload: Upload, data: memoryview) -> bytes:
+        """
+        Detect the file type once ``SNIFF_BYTES`` are in, and set up its
+        extraction; returns the bytes stored before ``data`` that are yet
+        to be extracted.
+        """
+        stored = upload.head
+        upload.head = stored + bytes(data[: SNIFF_BYTES - len(stored)])
+        if len(upload.head) < min(SNIFF_BYTES, upload.size):
+            return b""
+        content_type = sniff(upload.head, upload.filename, complete=len(upload.head) == upload.size)
+        if content_type is None:
+            upload.status, upload.error = FAILED, "Unsupported file type"
+            self._uploads.pop(upload.upload_id, None)
+            task = asyncio.get_running_loop().create_task(self._discard(upload))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            raise DocuQueryException(
+                "Unsupported file type; upload PDF, Word, text or Markdown documents",
+                error_code="UNSUPPORTED_MEDIA_TYPE",
+                status_code=415,
+            )
+        upload.content_type = content_type
+        if content_type in _STREAMED and self.retrieval is not None:
+            # Embed chunks as they are extracted, while the upload goes on
+            upload.chunker = TextChunker(self.chunk_characters)
+            upload.chunks = asyncio.Queue(maxsize=2)
+            upload.extraction = asyncio.get_running_loop().create_task(self._index_stream(upload))
+        return stored
+
+    async def _extracted(self, upload: Upload, texts: List[str]) -> None:
+        # A bounded queue: the upload slows down to the pace of indexing
+        # rather than piling up chunks
+        if texts and upload.chunks is not None:
+            await upload.chunks.put(texts)
+
+    async def _index_stream(self, upload: Upload) -> None:
+        assert upload.chunks is not None
+        position = 0
+        while True:
+            texts = await upload.chunks.get()
+            if texts is None:
+                return
+            # After a failure keep draining, so that the upload is not blocked
+            if upload.error is None:
+                try:
+                    async for records in self._embed(upload, texts, position):
+                        await self._stage(upload, records)
+                except Exception:
+                    logger.exception("Indexing document %s failed", upload.document_id)
+                    upload.error = "Indexing failed"
+            position += len(texts)
+
+    async def _embed(self, upload: Upload, texts: List[str], position: int) -> AsyncIterator[List[ChunkRecord]]:
+        """Embed chunks in batches."""
+        for start in range(0, len(texts), _EMBED_BATCH):
+            batch = texts[start : start + _EMBED_BATCH]
+            vectors = await self.retrieval.embeddings.embedder.embed(batch)
+            yield [
+                self._record(upload, text, vector, position + start + i)
+                for i, (text, vector) in enumerate(zip(batch, vectors))
+            ]
+
+    @staticmethod
+    def _record(upload: Upload, text: str, vector: np.ndarray, position: int) -> ChunkRecord:
+        return ChunkRecord(
+            f"{upload.document_id}:{position}",
+            upload.document_id,
+            upload.title,
+            text,
+            vector,
+            tags=upload.tags,
+            date=upload.created_at.date(),
+            position=position,
+        )
+
+    async def _index(self, upload: Upload, texts: List[str], position: int) -> None:
+        """Embed chunks and add them to the vector store and the lexical index."""
+        upload.indexed = True
+        async for records in self._embed(upload, texts, position):
+            await self.retrieval.index_chunks(upload.tenant_id, records)
+
+    async def _stage(self, upload: Upload, records: List[ChunkRecord]) -> None:
+        """Keep embedded chunks out of the indexes until the upload is verified."""
+        lines = "".join(
+            json.dumps(
+                {
+                    "position": record.position,
+                    "text": record.text,
+                    "vector": base64.b64encode(np.asarray(record.vector, dtype=np.float32).tobytes()).decode("ascii"),
+                }
+            )
+            + "\n"
+            for record in records
+        )
+        await self.store.append(upload.staged_key, lines.encode("utf-8"))
+
+    async def _index_staged(self, upload: Upload) -> None:
+        """
+        Add the staged chunks of a verified upload to the indexes, a batch
+        at a time, then remove them; only remove them after a failure.
+        """
+        try:
+            if upload.error is not None or await self.store.size(upload.staged_key) == 0:
+                return
+            upload.indexed = True
+            file = await run_in_executor(None, self.store.open, upload.staged_key)
+            try:
+                while True:
+                    lines = await run_in_executor(None, self._read_lines, file, _EMBED_BATCH)
+                    if not lines:
+                        break
+                    records = []
+                    for line in lines:
+                        staged = json.loads(line)
+                        vector = np.frombuffer(base64.b64decode(staged["vector"]), dtype=np.float32)
+                        records.append(self._record(upload, staged["text"], vector, staged["position"]))
+                    await self.retrieval.index_chunks(upload.tenant_id, records)
+            finally:
+                await run_in_executor(None, file.close)
+        finally:
+            await self.store.delete(upload.staged_key)
+
+    @staticmethod
+    def _read_lines(file: BinaryIO, count: int) -> List[bytes]:
+        lines = []
+        for _ in range(count):
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line)
+        return lines
+
+    async def _complete(self, upload: Upload) -> None:
+        upload.sha256 = upload.hash.hexdigest()
+        if upload.expected_sha256 is not None and upload.sha256 != upload.expected_sha256:
+            upload.status, upload.error = FAILED, "Checksum mismatch"
+            self._uploads.pop(upload.upload_id, None)
+            await self._discard(upload)
+            raise ValidationError(
+                "The file received does not match its SHA-256", error_code="CHECKSUM_MISMATCH"
+            )
+        await self.store.move(upload.part_key, upload.key)
+        upload.status = PROCESSING
+        await self._publish(upload)
+        task = asyncio.get_running_loop().create_task(self._finish(upload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _finish(self, upload: Upload) -> None:
+        """Extract what is left of a complete document and publish its status."""
+        try:
+            if upload.chunker is not None and upload.chunks is not None and upload.extraction is not None:
+                await self._extracted(upload, upload.chunker.finish())
+                await upload.chunks.put(None)
+                await upload.extraction
+                await self._index_staged(upload)
+            elif upload.content_type == DOCX and self.retrieval is not None:
+                texts = await run_in_executor(None, self._docx_chunks, upload.key)
+                await self._index(upload, texts, 0)
+            else:
+                upload.status = PENDING
+        except Exception:
+            logger.exception("Extracting document %s failed", upload.document_id)
+            upload.error = upload.error or "Extraction failed"
+        if upload.status == PROCESSING:
+            upload.status = FAILED if upload.error is not None else READY
+        try:
+            await self._publish(upload)
+        finally:
+            upload.done.set()
+
+    def _docx_chunks(self, key: str) -> List[str]:
+        with self.store.open(key) as file:
+            return docx_chunks(file, self.chunk_characters)
+
+    async def _publish(self, upload: Upload) -> None:
+        """Record the document in the catalog and the search index."""
+        entry = DocumentEntry(
+            upload.document_id,
+            upload.title,
+            upload.filename,
+            upload.tags,
+            upload.status,
+            datetime.now(timezone.utc),
+        )
+        if self.catalog is not None:
+            stored = StoredFile(upload.key, upload.size, upload.sha256 or "", upload.content_type or "")
+            await self.catalog.save(upload.tenant_id, entry, stored)
+        if self.search is not None:
+            await self.search.upsert(upload.tenant_id, entry)
+
+    async def _discard(self, upload: Upload) -> None:
+        """Remove what an upload that did not become a document left behind."""
+        if upload.extraction is not None:
+            upload.extraction.cancel()
+        await self.store.delete(upload.part_key)
+        await self.store.delete(upload.staged_key)
+        if upload.indexed:
+            await self.retrieval.delete_document(upload.tenant_id, upload.document_id)
+
+    async def _purge(self) -> None:
+        uploads = self._uploads
+        now = self.clock()
+        while uploads:
+            upload = next(iter(uploads.values()))
+            if upload.expires_at > now or upload.writing:
+                break
+            uploads.popitem(last=False)
+            if upload.status == UPLOADING:
+                await self._discard(upload)
+
+    @staticmethod
+    def _overrun(upload: Upload) -> DocuQueryException:
+        return DocuQueryException(
+            f"Upload is larger than its declared size of {upload.size} bytes",
+            error_code="UPLOAD_SIZE_EXCEEDED",
+            status_code=413,
+        )
+
+    def __len__(self) -> int:
+        return len(self._uploads)
+
+    async def aclose(self) -> None:
+        """Stop background extraction and release the store."""
+        for task in list(self._tasks):
+            task.cancel()
+        for upload in self._uploads.values():
+            if upload.extraction is not None:
+                upload.extraction.cancel()
+        await self.store.aclose()
@@ -2,16 +2,24 @@
 DocuQuery AI - Document Management Routes
 
 This module contains the document management endpoints including upload,
-retrieval, processing status, and metadata management.
+retrieval, processing status, and metadata management. Files are uploaded
+as resumable streams: ``POST /uploads`` starts an upload, ``PATCH`` requests
+send its bytes and ``GET`` reports the offset to resume from.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status, UploadFile, File
+from typing import Dict, Any, List, Optional
+
+from app.common.deps import get_current_tenant, get_document_search, get_uploads
+from app.common.serialization import ModelResponse
+from app.documents.ingest import UploadManager
+from app.documents.schemas import DocumentList, DocumentPagination, DocumentSummary, UploadCreate, UploadStatus
+from app.documents.search import DocumentSearch
 
 # TODO: Import actual schemas and services
-# from app.documents.schemas import DocumentCreate, DocumentResponse, DocumentList
+# from app.documents.schemas import DocumentCreate, DocumentResponse
 # from app.documents.service import DocumentService
-# from app.common.deps import get_current_user, get_current_tenant
+# from app.common.deps import get_current_user
 
 document_router = APIRouter()
 
@@ -41,37 +49,168 @@ async def get_upload_url(request: Dict[str, Any]) -> Dict[str, Any]:
     )
 
 
-@document_router.get("/")
+@document_router.post("/uploads", response_model=UploadStatus, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload: UploadCreate,
+    request: Request,
+    tenant_id: str = Depends(get_current_tenant),
+    uploads: UploadManager = Depends(get_uploads),
+):
+    """
+    Start a resumable document upload.
+    
+    The file is then sent with ``PATCH`` requests to the URL in the
+    ``Location`` header.
+    
+    Args:
+        upload: File name, size and document metadata
+        request: The HTTP request, for the upload URL
+        tenant_id: Tenant uploading
+        uploads: Document uploads
+        
+    Returns:
+        The upload, at offset 0, as a ``ModelResponse``
+        
+    Raises:
+        DocuQueryException: When the file is larger than ``MAX_DOCUMENT_SIZE_MB``
+    """
+    started = await uploads.create(
+        tenant_id, upload.filename, upload.size, upload.title, upload.tags, upload.sha256
+    )
+    return ModelResponse(
+        started.to_status(),
+        status_code=status.HTTP_201_CREATED,
+        headers={"Location": f"{request.url.path.rstrip('/')}/{started.upload_id}"},
+    )
+
+
+@document_router.patch("/uploads/{upload_id}", response_model=UploadStatus)
+async def write_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(ge=0, description="Position of the first byte of the body in the file"),
+    content_length: Optional[int] = Header(default=None, ge=0),
+    tenant_id: str = Depends(get_current_tenant),
+    uploads: UploadManager = Depends(get_uploads),
+):
+    """
+    Send the next bytes of an upload as the raw request body.
+    
+    ``Upload-Offset`` must equal the upload's ``offset``. The body is
+    streamed to storage as it arrives; if the request fails or the
+    connection drops, the bytes received are kept and ``GET`` tells where to
+    resume. The request completing the file returns status ``processing``.
+    
+    Args:
+        upload_id: Upload identifier
+        request: The HTTP request, whose body is streamed
+        upload_offset: Offset of the body in the file
+        content_length: Body length, to refuse an overrun before reading
+        tenant_id: Tenant uploading
+        uploads: Document uploads
+        
+    Returns:
+        The upload with its new offset, as a ``ModelResponse``
+        
+    Raises:
+        NotFoundError: When the upload is unknown or expired
+        ConflictError: When the offset is not the upload's, or the upload
+            is complete or being written by another request
+        DocuQueryException: When the file is larger than declared or of an
+            unsupported type
+        ValidationError: When the file does not match its declared SHA-256
+    """
+    upload = await uploads.write(tenant_id, upload_id, upload_offset, request.stream(), content_length)
+    return ModelResponse(upload.to_status())
+
+
+@document_router.get("/uploads/{upload_id}", response_model=UploadStatus)
+async def get_upload(
+    upload_id: str,
+    tenant_id: str = Depends(get_current_tenant),
+    uploads: UploadManager = Depends(get_uploads),
+):
+    """
+    Get an upload's offset and, once complete, its processing status.
+    
+    Args:
+        upload_id: Upload identifier
+        tenant_id: Tenant uploading
+        uploads: Document uploads
+        
+    Returns:
+        The upload, as a ``ModelResponse``
+        
+    Raises:
+        NotFoundError: When the upload is unknown or expired
+    """
+    return ModelResponse(uploads.get(tenant_id, upload_id).to_status())
+
+
+@document_router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    tenant_id: str = Depends(get_current_tenant),
+    uploads: UploadManager = Depends(get_uploads),
+) -> Response:
+    """
+    Cancel an unfinished upload, discarding the bytes received.
+    
+    Args:
+        upload_id: Upload identifier
+        tenant_id: Tenant uploading
+        uploads: Document uploads
+        
+    Raises:
+        NotFoundError: When the upload is unknown or expired
+        ConflictError: When the upload is already complete
+    """
+    await uploads.abort(tenant_id, upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@document_router.get("/", response_model=DocumentList)
 async def list_documents(
-    page: int = 1,
-    size: int = 20,
-    search: str = None,
-    status: str = None
-) -> Dict[str, Any]:
+    page: int = Query(default=1, ge=1, description="Page number"),
+    size: int = Query(default=20, ge=1, le=100, description="Documents per page"),
+    search: Optional[str] = Query(default=None, max_length=200, description="Words of the title, filename or tags"),
+    status_filter: Optional[str] = Query(default=None, alias="status", description="Document status filter"),
+    tenant_id: str = Depends(get_current_tenant),
+    index: DocumentSearch = Depends(get_document_search),
+):
     """
     List documents with pagination and filtering.
     
+    ``search`` matches as the user types: every word must be found in the
+    title, filename or tags, words of one or two letters as word prefixes.
+    Matches are ranked by where they are found, then newest first; without
+    ``search`` documents are listed newest first.
+    
     Args:
         page: Page number
         size: Page size
         search: Search query
-        status: Document status filter
+        status_filter: Document status filter
+        tenant_id: Tenant whose documents are listed
+        index: Document search index
         
     Returns:
-        Paginated list of documents
-        
-    Raises:
-        HTTPException: When document retrieval fails
+        Paginated list of documents with status facets, as a ``ModelResponse``
     """
-    # TODO: Implement document listing
-    # TODO: Add pagination
-    # TODO: Add search functionality
-    # TODO: Add filtering
-    
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Document listing not implemented yet"
-    )
+    result = await index.search(tenant_id, search, status_filter, page, size)
+    documents = [
+        DocumentSummary(
+            id=entry.document_id,
+            title=entry.title,
+            filename=entry.filename,
+            tags=list(entry.tags),
+            status=entry.status,
+            updated_at=entry.updated_at,
+        )
+        for entry in result.items
+    ]
+    pagination = DocumentPagination(page=page, size=size, total=result.total, pages=-(-result.total // size))
+    return ModelResponse(DocumentList(documents=documents, pagination=pagination, facets=result.facets))
 
 
 @document_router.get("/{document_id}")
@@ -0,0 +1,70 @@
+"""
+DocuQuery AI - Document Schemas
+
+This module defines the request and response models of the document
+endpoints.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DocumentSummary(BaseModel):
+    """A document in the document list."""
+
+    id: str
+    title: str
+    filename: str
+    tags: List[str] = Field(default_factory=list)
+    status: str
+    updated_at: datetime
+
+
+class DocumentPagination(BaseModel):
+    """Position of a document list page."""
+
+    page: int
+    size: int
+    total: int = Field(description="Documents matching the search and status filter")
+    pages: int
+
+
+class DocumentList(BaseModel):
+    """A page of documents, best match first, with status facets."""
+
+    documents: List[DocumentSummary] = Field(default_factory=list)
+    pagination: DocumentPagination
+    facets: Dict[str, int] = Field(
+        default_factory=dict, description="Documents matching the search, by status, before the status filter"
+    )
+
+
+class UploadCreate(BaseModel):
+    """A document upload to start."""
+
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0, description="File size in bytes")
+    title: Optional[str] = Field(
+        default=None, max_length=500, description="Document title; the filename without extension by default"
+    )
+    tags: List[str] = Field(default_factory=list, max_length=50)
+    sha256: Optional[str] = Field(
+        default=None, pattern="^[0-9a-fA-F]{64}$", description="SHA-256 of the file, checked once it is received"
+    )
+
+
+class UploadStatus(BaseModel):
+    """Progress of a document upload."""
+
+    id: str
+    document_id: str
+    filename: str
+    size: int
+    offset: int = Field(description="Bytes received; the next PATCH starts here")
+    content_type: Optional[str] = Field(default=None, description="Detected from the first bytes of the file")
+    sha256: Optional[str] = Field(default=None, description="SHA-256 of the file, once complete")
+    status: str = Field(description="uploading, processing, then ready, pending or failed")
+    error: Optional[str] = None
+    created_at: datetime
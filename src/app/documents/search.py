@@ -0,0 +1,659 @@
+"""
+DocuQuery AI - Document Search Index
+
+This module answers the document list's search box from memory. Each tenant
+has an index over the words of document titles, filenames and tags: every
+word has a postings list of the documents using it in each field, and the
+vocabulary is indexed by trigrams. A search resolves each term to the words
+containing it through their trigrams, which only touches the vocabulary, far
+smaller than the document set, and merges those words' postings, so it never
+scans titles the way ``ILIKE '%term%'`` does. One- and two-character terms,
+typed first in a search box, have their own postings of word prefixes.
+
+Matches are ranked by the fields they are found in, word prefixes and exact
+titles, then by recency; status facets are counted over the matches before
+the status filter is applied. Indexes are kept current by document events,
+``upsert`` and ``delete``, and loaded from the database the first time a
+tenant searches, while the database answers for it.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.common.versions import TenantVersions
+from app.telemetry.tracing import run_in_executor
+
+logger = logging.getLogger("docuquery.documents")
+
+# Weight of a term found in the title, filename and tags
+FIELD_WEIGHTS = (3, 2, 1)
+# Added when a title or filename word starts with the term
+PREFIX_BONUS = 1
+# Added when the whole query is the title
+EXACT_TITLE_BONUS = 4
+
+# Terms shorter than this match word prefixes, through per-prefix postings
+_PREFIX_TERM_LENGTH = 3
+
+# Letters and digits; separators, including underscores, split words
+_WORD = re.compile(r"[^\W_]+")
+
+# Below one in this many slots matching, later terms are checked per match
+_SPARSE_FRACTION = 64
+
+# Term masks kept per tenant
+_DENSE_CACHE_SIZE = 8
+
+# Events replayed onto a tenant loaded concurrently before giving up on the load
+_MAX_REPLAYED_EVENTS = 10_000
+
+
+class DocumentEntry:
+    """The searchable fields of a document."""
+
+    __slots__ = ("document_id", "title", "filename", "tags", "status", "updated_at")
+
+    def __init__(
+        self,
+        document_id: str,
+        title: str,
+        filename: str = "",
+        tags: Sequence[str] = (),
+        status: str = "ready",
+        updated_at: Optional[datetime] = None,
+    ):
+        self.document_id = document_id
+        self.title = title
+        self.filename = filename
+        self.tags = tuple(tags)
+        self.status = status
+        self.updated_at = updated_at or datetime.now(timezone.utc)
+
+    def fields(self) -> Tuple[str, str, str]:
+        return self.title, self.filename, " ".join(self.tags)
+
+
+class DocumentSearchResult:
+    """A page of matching documents, the number of matches and status facets."""
+
+    __slots__ = ("items", "total", "facets")
+
+    def __init__(self, items: List[DocumentEntry], total: int, facets: Dict[str, int]):
+        self.items = items
+        self.total = total
+        self.facets = facets
+
+
+class DocumentSource:
+    """Authoritative document catalog, normally the database."""
+
+    async def search(
+        self, tenant_id: str, text: Optional[str], status: Optional[str], offset: int, limit: int
+    ) -> DocumentSearchResult:
+        """Search without an index, for tenants not loaded yet."""
+        raise NotImplementedError
+
+    def scroll(self, tenant_id: str, batch_size: int = 1000) -> AsyncIterator[List[DocumentEntry]]:
+        """Every document of a tenant, in batches."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _last(mask: np.ndarray, count: int) -> np.ndarray:
+    """Positions of the last ``count`` set entries of a mask, last first."""
+    found: List[np.ndarray] = []
+    end, block, total = mask.size, 4096, 0
+    while end > 0 and total < count:
+        start = max(0, end - block)
+        hits = np.flatnonzero(mask[start:end])[::-1][: count - total] + start
+        found.append(hits)
+        total += hits.size
+        end, block = start, block * 2
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+
+def words(text: str) -> List[str]:
+    """Lowercase words of a title, filename or query; ``Q3_report-v2.pdf`` has four."""
+    return _WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def _trigrams(word: str) -> List[str]:
+    return list(dict.fromkeys(word[i:i + 3] for i in range(len(word) - 2)))
+
+
+def _top(keys: np.ndarray, count: int) -> np.ndarray:
+    """Positions of the ``count`` largest of distinct keys, largest first."""
+    if count >= keys.size:
+        return np.argsort(-keys)
+    best = np.argpartition(-keys, count - 1)[:count]
+    return best[np.argsort(-keys[best])]
+
+
+def _view(postings: "array[int]") -> np.ndarray:
+    # Searches are synchronous, so postings cannot grow while a view is alive
+    return np.frombuffer(postings, dtype=np.int64)
+
+
+class _Term:
+    """Postings of a query term: per field, those of each word it matches."""
+
+    __slots__ = ("word", "fields", "starts", "size")
+
+    def __init__(
+        self, word: str, fields: List[List["array[int]"]], starts: Optional[List[List["array[int]"]]]
+    ):
+        self.word = word
+        self.fields = fields
+        # Postings of the title and filename words starting with the term; None when all do
+        self.starts = starts
+        self.size = sum(len(postings) for lists in fields for postings in lists)
+
+
+class TenantDocumentIndex:
+    """
+    Search index over one tenant's documents.
+
+    Documents occupy slots in the order they are indexed, which is also their
+    recency order: loads index documents oldest first, and every later create
+    or update event appends. Deleting or replacing a document only clears its
+    slot, and ``dead`` counts the cleared slots until the index is rebuilt.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Optional[DocumentEntry]] = []
+        self.slots: Dict[str, int] = {}
+        self.dead = 0
+        self._alive = np.zeros(0, dtype=bool)
+        # Status code of each slot, and the name and live documents of each code
+        self._status = np.zeros(0, dtype=np.int8)
+        self._status_names: List[str] = []
+        self._status_counts: List[int] = []
+        # Vocabulary: word -> id and words by id
+        self._word_ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        # Trigram -> ids of the words containing it, ascending
+        self._trigrams: Dict[str, "array[int]"] = {}
+        # Per field: word id -> slots of the documents using it, ascending
+        self._postings: Tuple[Dict[int, "array[int]"], ...] = ({}, {}, {})
+        # Per field: one- and two-character word prefix -> slots, ascending
+        self._prefixes: Tuple[Dict[str, "array[int]"], ...] = ({}, {}, {})
+        # Normalized title -> slots, for exact title matches
+        self._titles: Dict[str, "array[int]"] = {}
+        # Masks of recent common terms; typing reuses all but the last word
+        self._dense_cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+    @classmethod
+    def build(cls, entries: Sequence[DocumentEntry]) -> "TenantDocumentIndex":
+        index = cls()
+        index._reserve(len(entries))
+        for entry in sorted(entries, key=lambda entry: entry.updated_at):
+            index.add(entry)
+        return index
+
+    @property
+    def live(self) -> int:
+        return len(self.slots)
+
+    def add(self, entry: DocumentEntry) -> None:
+        """Index a document, replacing any earlier version."""
+        self.remove(entry.document_id)
+        self._dense_cache.clear()
+        slot = len(self.entries)
+        self._reserve(slot + 1)
+        self.entries.append(entry)
+        self.slots[entry.document_id] = slot
+        self._alive[slot] = True
+        code = self._status_code(entry.status)
+        self._status[slot] = code
+        self._status_counts[code] += 1
+        for postings, prefixes, text in zip(self._postings, self._prefixes, entry.fields()):
+            unique = list(dict.fromkeys(words(text)))
+            for word in unique:
+                postings.setdefault(self._word_id(word), array("q")).append(slot)
+            for prefix in {word[:length] for word in unique for length in range(1, _PREFIX_TERM_LENGTH)}:
+                prefixes.setdefault(prefix, array("q")).append(slot)
+        self._titles.setdefault(" ".join(words(entry.title)), array("q")).append(slot)
+
+    def remove(self, document_id: str) -> bool:
+        slot = self.slots.pop(document_id, None)
+        if slot is None:
+            return False
+        self._dense_cache.clear()
+        self._alive[slot] = False
+        self._status_counts[self._status[slot]] -= 1
+        self.entries[slot] = None
+        self.dead += 1
+        return True
+
+    def search(
+        self, text: Optional[str], status: Optional[str] = None, offset: int = 0, limit: int = 20
+    ) -> DocumentSearchResult:
+        """
+        Documents matching every term of ``text``, best first.
+
+        Terms of one or two characters match word prefixes; longer terms
+        match anywhere within a word. Equally good matches, and every
+        document when there are no terms, are listed newest first.
+        """
+        query = words(text or "")
+        terms: List[_Term] = []
+        for word in dict.fromkeys(query):
+            term = self._term(word)
+            if term is None:
+                return DocumentSearchResult([], 0, {})
+            terms.append(term)
+        if not terms:
+            return self._newest(status, offset, limit)
+
+        # Most selective term first. Terms are applied as masks over all slots
+        # while many documents match, then checked for each remaining match.
+        terms.sort(key=lambda term: term.size)
+        n = len(self.entries)
+        exact = self._titles.get(" ".join(query), array("q"))
+        if terms[0].size > n // _SPARSE_FRACTION:
+            matched = self._alive[:n].copy()
+            scores = np.zeros(n, dtype=np.int16)
+            while terms and np.count_nonzero(matched) > n // _SPARSE_FRACTION:
+                found, points = self._dense(terms.pop(0))
+                matched &= found
+                scores += points
+            scores[_view(exact)] += EXACT_TITLE_BONUS
+            if not terms:
+                return self._ranked_dense(matched, scores, status, offset, limit)
+            candidates = np.flatnonzero(matched)
+            scores = scores[candidates]
+        else:
+            # Few postings: start from the documents of the first term
+            slots = np.sort(np.concatenate([_view(postings) for lists in terms[0].fields for postings in lists]))
+            slots = slots[np.r_[True, slots[1:] != slots[:-1]]]
+            candidates = slots[self._alive[slots]]
+            scores = np.zeros(candidates.size, dtype=np.int16)
+            if exact:
+                scores[self._contains([exact], candidates)] += EXACT_TITLE_BONUS
+        for term in terms:
+            found, points = self._sparse(term, candidates)
+            candidates, scores = candidates[found], scores[found] + points[found]
+        return self._ranked_sparse(candidates, scores, status, offset, limit)
+
+    def _ranked_dense(
+        self, matched: np.ndarray, scores: np.ndarray, status: Optional[str], offset: int, limit: int
+    ) -> DocumentSearchResult:
+        """A page of the matches given as a mask over all slots."""
+        statuses = self._status[: matched.size]
+        facets = self._facets(
+            [np.count_nonzero(matched & (statuses == code)) if count else 0
+             for code, count in enumerate(self._status_counts)]
+        )
+        if status is not None:
+            matched &= statuses == self._status_names.index(status) if status in facets else False
+        total = int(np.count_nonzero(matched))
+        # Best score first; within a score, the most recent slots first
+        need, chosen = (min(offset + limit, total) if offset < total else 0), []
+        while need > 0:
+            level = (scores * matched).max()
+            at_level = matched & (scores == level)
+            found = _last(at_level, need)
+            chosen.append(found)
+            need -= found.size
+            matched &= ~at_level
+        slots = np.concatenate(chosen)[offset:].tolist() if chosen else []
+        return DocumentSearchResult([self.entries[slot] for slot in slots], total, facets)
+
+    def _ranked_sparse(
+        self, candidates: np.ndarray, scores: np.ndarray, status: Optional[str], offset: int, limit: int
+    ) -> DocumentSearchResult:
+        """A page of the matches given as ascending slots and their scores."""
+        codes = self._status[candidates]
+        facets = self._facets(np.bincount(codes, minlength=len(self._status_names)).tolist())
+        if status is not None:
+            selected = codes == self._status_names.index(status) if status in facets else False
+            candidates, scores = candidates[selected], scores[selected]
+        # Best score first, then the most recent slot
+        keys = scores.astype(np.int64) * (len(self.entries) + 1) + candidates
+        slots = candidates[_top(keys, offset + limit)[offset:]].tolist()
+        return DocumentSearchResult([self.entries[slot] for slot in slots], int(candidates.size), facets)
+
+    def _newest(self, status: Optional[str], offset: int, limit: int) -> DocumentSearchResult:
+        """Every document, newest first, without scoring."""
+        n = len(self.entries)
+        facets = self._facets(self._status_counts)
+        if status is None:
+            listed, total = self._alive[:n], self.live
+        elif status in facets:
+            listed = self._alive[:n] & (self._status[:n] == self._status_names.index(status))
+            total = facets[status]
+        else:
+            return DocumentSearchResult([], 0, facets)
+        slots = _last(listed, offset + limit)[offset:].tolist() if offset < total else []
+        return DocumentSearchResult([self.entries[slot] for slot in slots], total, facets)
+
+    def _term(self, word: str) -> Optional[_Term]:
+        """The postings a query word matches, or None when it matches nothing."""
+        if len(word) < _PREFIX_TERM_LENGTH:
+            fields = [[prefixes[word]] if word in prefixes else [] for prefixes in self._prefixes]
+            starts = None
+        else:
+            word_ids = self._matching_words(word)
+            fields = [[postings[i] for i in word_ids if i in postings] for postings in self._postings]
+            prefixed = [i for i in word_ids if self._words[i].startswith(word)]
+            starts = None
+            if len(prefixed) < len(word_ids):
+                starts = [[postings[i] for i in prefixed if i in postings] for postings in self._postings[:2]]
+        term = _Term(word, fields, starts)
+        return term if term.size else None
+
+    def _dense(self, term: _Term) -> Tuple[np.ndarray, np.ndarray]:
+        """Masks of the slots matching a term and of the scores it adds; not to be modified."""
+        cached = self._dense_cache.get(term.word)
+        if cached is not None:
+            self._dense_cache.move_to_end(term.word)
+            return cached
+        n = len(self.entries)
+        masks = [self._mask(lists, n) for lists in term.fields]
+        starts = masks[:2] if term.starts is None else [self._mask(lists, n) for lists in term.starts]
+        points = (starts[0] | starts[1]) * np.int16(PREFIX_BONUS)
+        for mask, weight in zip(masks, FIELD_WEIGHTS):
+            points += mask * np.int16(weight)
+        self._dense_cache[term.word] = points > 0, points
+        if len(self._dense_cache) > _DENSE_CACHE_SIZE:
+            self._dense_cache.popitem(last=False)
+        return self._dense_cache[term.word]
+
+    def _sparse(self, term: _Term, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which candidates match a term, and the scores it adds."""
+        hits = [self._contains(lists, candidates) for lists in term.fields]
+        starts = hits[:2] if term.starts is None else [self._contains(lists, candidates) for lists in term.starts]
+        points = (starts[0] | starts[1]).astype(np.int16) * np.int16(PREFIX_BONUS)
+        for hit, weight in zip(hits, FIELD_WEIGHTS):
+            points += hit * np.int16(weight)
+        return hits[0] | hits[1] | hits[2], points
+
+    @staticmethod
+    def _mask(lists: List["array[int]"], n: int) -> np.ndarray:
+        mask = np.zeros(n, dtype=bool)
+        for postings in lists:
+            mask[_view(postings)] = True
+        return mask
+
+    def _contains(self, lists: List["array[int]"], candidates: np.ndarray) -> np.ndarray:
+        """Which of the ascending candidates are in any of the ascending postings lists."""
+        if candidates.size * len(lists) > len(self.entries) // _SPARSE_FRACTION:
+            # Marking every posting is cheaper than probing for each candidate
+            return self._mask(lists, len(self.entries))[candidates]
+        hit = np.zeros(candidates.size, dtype=bool)
+        for postings in lists:
+            slots = _view(postings)
+            positions = np.minimum(np.searchsorted(slots, candidates), slots.size - 1)
+            hit |= slots[positions] == candidates
+        return hit
+
+    def _matching_words(self, term: str) -> List[int]:
+        """Ids of the words containing a term of three or more characters."""
+        candidates: Optional[np.ndarray] = None
+        for gram in sorted(_trigrams(term), key=lambda g: len(self._trigrams.get(g, ()))):
+            ids = self._trigrams.get(gram)
+            if ids is None:
+                return []
+            found = _view(ids)
+            candidates = found if candidates is None else np.intersect1d(candidates, found, assume_unique=True)
+            if not candidates.size:
+                return []
+        word_ids = candidates.tolist() if candidates is not None else []
+        if len(term) == 3:
+            return word_ids
+        # Sharing every trigram does not make a word contain the term
+        return [i for i in word_ids if term in self._words[i]]
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words)
+            self._words.append(word)
+            for gram in _trigrams(word):
+                self._trigrams.setdefault(gram, array("q")).append(word_id)
+        return word_id
+
+    def _facets(self, counts: Sequence[int]) -> Dict[str, int]:
+        return {name: int(count) for name, count in zip(self._status_names, counts) if count}
+
+    def _status_code(self, status: str) -> int:
+        if status not in self._status_names:
+            self._status_names.append(status)
+            self._status_counts.append(0)
+        return self._status_names.index(status)
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._alive.size:
+            return
+        capacity = max(size, 2 * self._alive.size, 64)
+
+        for name in ("_alive", "_status"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[: old.size] = old
+            setattr(self, name, grown)
+
+
+class DocumentSearch:
+    """
+    Per-tenant document search, in memory with the database as fallback.
+
+    A tenant is loaded in the background the first time it is searched; until
+    it is, searches go to ``source``. Document events are applied to loaded
+    tenants as they arrive, and those arriving during a load are replayed onto
+    the new index. With ``versions``, a tenant written through another
+    process goes back to ``source`` until it is reloaded, which starts as soon
+    as the write is seen; without, loaded tenants are reloaded after
+    ``refresh_after`` seconds to pick up such writes. Tenants are also
+    reloaded once more than half their slots are dead; the least recently
+    searched tenants are dropped to stay within ``max_documents``.
+
+    Without a source the index is the catalog: tenants start empty and are
+    never dropped.
+
+    Args:
+        source: Authoritative catalog, e.g. ``app.db.documents.SqlDocumentSource``
+        max_documents: Documents held in memory across all tenants
+        refresh_after: Seconds before a loaded tenant is reloaded
+        versions: Write counters shared with the other processes
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        source: Optional[DocumentSource] = None,
+        max_documents: int = 1_000_000,
+        refresh_after: float = 300.0,
+        versions: Optional[TenantVersions] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.source = source
+        self.max_documents = max_documents
+        self.refresh_after = refresh_after
+        self.versions = versions
+        self.clock = clock
+        self.tenants: Dict[str, TenantDocumentIndex] = {}
+        # Live documents of all loaded tenants
+        self.live = 0
+        # Tenant -> shared version of the loaded index
+        self._versions: Dict[str, Optional[int]] = {}
+        # Tenant -> load time, in least recently searched order
+        self._loaded: "OrderedDict[str, float]" = OrderedDict()
+        self._skip_until: Dict[str, float] = {}
+        self._loading: Dict[str, "asyncio.Task[bool]"] = {}
+        # Events received while a tenant loads, replayed onto the loaded index
+        self._replay: Dict[str, List[Tuple[str, object]]] = {}
+        self.local_searches = 0
+        self.fallback_searches = 0
+
+    def is_local(self, tenant_id: str) -> bool:
+        return tenant_id in self._loaded
+
+    async def search(
+        self,
+        tenant_id: str,
+        text: Optional[str] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        size: int = 20,
+    ) -> DocumentSearchResult:
+        """
+        A page of a tenant's documents matching ``text``, best match first.
+
+        Args:
+            tenant_id: Tenant whose documents are searched
+            text: Search box contents; every term must match
+            status: Only documents with this status
+            page: Page number, from 1
+            size: Documents per page
+        """
+        offset = (page - 1) * size
+        if self.source is None:
+            index = self.tenants.get(tenant_id)
+            self.local_searches += 1
+            return index.search(text, status, offset, size) if index else DocumentSearchResult([], 0, {})
+
+        now = self.clock()
+        loaded_at = self._loaded.get(tenant_id)
+        index = self.tenants.get(tenant_id)
+        if loaded_at is not None and self.versions is not None:
+            version = await self.versions.get(tenant_id)
+            if version is None:
+                # Cannot tell whether the index is current
+                self.fallback_searches += 1
+                return await self.source.search(tenant_id, text, status, offset, size)
+            if version != self._versions.get(tenant_id):
+                self._forget(tenant_id)
+                loaded_at = index = None
+        if loaded_at is None or now - loaded_at > self.refresh_after or (index and index.dead > index.live):
+            self._schedule_load(tenant_id, now)
+        if loaded_at is not None and index is not None:
+            self._loaded.move_to_end(tenant_id)
+            self.local_searches += 1
+            return index.search(text, status, offset, size)
+        self.fallback_searches += 1
+        return await self.source.search(tenant_id, text, status, offset, size)
+
+    async def upsert(self, tenant_id: str, entry: DocumentEntry) -> None:
+        """Apply a document create or update event; send it after the catalog write."""
+        await self._bump(tenant_id)
+        self._apply(tenant_id, "upsert", entry)
+
+    async def delete(self, tenant_id: str, document_id: str) -> None:
+        """Apply a document delete event; send it after the catalog write."""
+        await self._bump(tenant_id)
+        self._apply(tenant_id, "delete", document_id)
+
+    async def _bump(self, tenant_id: str) -> None:
+        """Publish a write; a loaded index that mirrors it stays current."""
+        if self.versions is None or self.source is None:
+            return
+        version = await self.versions.bump(tenant_id)
+        if tenant_id in self.tenants and version is not None and self._versions.get(tenant_id) == version - 1:
+            self._versions[tenant_id] = version
+
+    def _apply(self, tenant_id: str, kind: str, payload: object) -> None:
+        replay = self._replay.get(tenant_id)
+        if replay is not None:
+            replay.append((kind, payload))
+        index = self.tenants.get(tenant_id)
+        if index is None:
+            if self.source is not None:
+                return
+            index = self.tenants[tenant_id] = TenantDocumentIndex()
+        before = index.live
+        if kind == "upsert":
+            index.add(payload)  # type: ignore[arg-type]
+        else:
+            index.remove(payload)  # type: ignore[arg-type]
+        self.live += index.live - before
+        if self.source is not None:
+            self._enforce_budget()
+
+    def _schedule_load(self, tenant_id: str, now: float) -> None:
+        if tenant_id in self._loading or self._skip_until.get(tenant_id, 0.0) > now:
+            return
+        # Record events from now on: the load may read the catalog before or after them
+        self._replay[tenant_id] = []
+        task = asyncio.get_running_loop().create_task(self.load(tenant_id))
+        self._loading[tenant_id] = task
+        task.add_done_callback(lambda _: self._loading.pop(tenant_id, None))
+
+    async def load(self, tenant_id: str) -> bool:
+        """
+        Load a tenant from the source into memory.
+
+        Returns:
+            Whether the tenant is now served from memory
+        """
+        if self.source is None:
+            return tenant_id in self.tenants
+        replay = self._replay.setdefault(tenant_id, [])
+        version = None
+        if self.versions is not None:
+            version = await self.versions.get(tenant_id, fresh=True)
+            if version is None:
+                self._replay.pop(tenant_id, None)
+                self._skip_until[tenant_id] = self.clock() + min(self.refresh_after, 30.0)
+                return False
+        try:
+            entries: List[DocumentEntry] = []
+            async for batch in self.source.scroll(tenant_id):
+                entries.extend(batch)
+                if len(entries) > self.max_documents:
+                    self._forget(tenant_id)
+                    self._skip_until[tenant_id] = self.clock() + self.refresh_after
+                    return False
+            # Indexing is CPU-bound; keep the event loop serving while it runs
+            index = await run_in_executor(None, TenantDocumentIndex.build, entries)
+        except Exception as exc:
+            logger.warning("Loading documents of tenant %s failed: %s", tenant_id, exc)
+            self._skip_until[tenant_id] = self.clock() + min(self.refresh_after, 30.0)
+            return False
+        finally:
+            self._replay.pop(tenant_id, None)
+
+        if len(replay) > _MAX_REPLAYED_EVENTS:
+            return False
+        # Events may or may not be in the snapshot; replaying them is idempotent
+        for kind, payload in replay:
+            if kind == "upsert":
+                index.add(payload)  # type: ignore[arg-type]
+            else:
+                index.remove(payload)  # type: ignore[arg-type]
+        self._forget(tenant_id)
+        self.tenants[tenant_id] = index
+        self.live += index.live
+        self._versions[tenant_id] = version
+        self._loaded[tenant_id] = self.clock()
+        self._loaded.move_to_end(tenant_id)
+        self._enforce_budget()
+        return True
+
+    def _enforce_budget(self) -> None:
+        while len(self._loaded) > 1 and self.live > self.max_documents:
+            self._forget(next(iter(self._loaded)))
+
+    def _forget(self, tenant_id: str) -> None:
+        self._loaded.pop(tenant_id, None)
+        self._versions.pop(tenant_id, None)
+        index = self.tenants.pop(tenant_id, None)
+        if index is not None:
+            self.live -= index.live
+
+    async def aclose(self) -> None:
+        for task in list(self._loading.values()):
+            task.cancel()
+        if self.source is not None:
+            await self.source.aclose()
@@ -0,0 +1,191 @@
+"""
+DocuQuery AI - OpenAI Client
+
+This module provides a small asynchronous client for the OpenAI embeddings
+and chat completions endpoints. It shares one ``httpx.AsyncClient`` (and so
+one connection pool) across requests, propagates the current trace context
+and maps transport and API failures to ``LLMError``. Chat completions can
+also be streamed, token by token, as they are generated.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.common.exceptions import LLMError
+from app.telemetry.tracing import inject
+
+
+class ChatCompletion:
+    """The text of a chat completion and its token usage."""
+
+    __slots__ = ("text", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, text: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class OpenAIClient:
+    """
+    Client for the OpenAI REST API.
+
+    Args:
+        api_key: API key sent as a bearer token
+        organization: Optional organization header
+        base_url: API root, overridable for proxies and compatible servers
+        timeout: Request timeout in seconds
+        max_connections: Size of the shared connection pool
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        organization: Optional[str] = None,
+        base_url: str = "https://api.openai.com/v1",
+        timeout: float = 30.0,
+        max_connections: int = 20,
+    ):
+        headers = {}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        if organization:
+            headers["OpenAI-Organization"] = organization
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self._client.post(path, json=payload, headers=inject())
+        except httpx.HTTPError as exc:
+            raise LLMError(
+                "LLM provider unavailable", error_code="LLM_UNAVAILABLE", status_code=503
+            ) from exc
+        if response.status_code >= 400:
+            raise LLMError(
+                "LLM provider request failed",
+                error_code="LLM_REQUEST_FAILED",
+                details={"status": response.status_code},
+                status_code=502,
+            )
+        return response.json()
+
+    async def embed(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+            model: Embedding model name
+
+        Returns:
+            One embedding per text, in input order
+        """
+        data = await self._post("/embeddings", {"model": model, "input": list(texts)})
+        rows = sorted(data["data"], key=lambda row: row["index"])
+        return [row["embedding"] for row in rows]
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+    ) -> ChatCompletion:
+        """
+        Generate a chat completion.
+
+        Args:
+            messages: Chat messages with ``role`` and ``content``
+            model: Chat model name
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+
+        Returns:
+            The completion text and token usage
+        """
+        data = await self._post(
+            "/chat/completions",
+            {
+                "model": model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+        )
+        usage = data.get("usage") or {}
+        return ChatCompletion(
+            data["choices"][0]["message"]["content"] or "",
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+    ) -> AsyncIterator[ChatCompletion]:
+        """
+        Generate a chat completion, yielding text as it is produced.
+
+        Closing the iterator early closes the connection, which stops the
+        generation upstream.
+
+        Args:
+            messages: Chat messages with ``role`` and ``content``
+            model: Chat model name
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+
+        Yields:
+            Completions holding each new piece of text; the token usage
+            arrives on the last one
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        try:
+            async with self._client.stream(
+                "POST", "/chat/completions", json=payload, headers=inject()
+            ) as response:
+                if response.status_code >= 400:
+                    raise LLMError(
+                        "LLM provider request failed",
+                        error_code="LLM_REQUEST_FAILED",
+                        details={"status": response.status_code},
+                        status_code=502,
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    text = (choices[0].get("delta") or {}).get("content") or "" if choices else ""
+                    usage = chunk.get("usage") or {}
+                    if text or usage:
+                        yield ChatCompletion(
+                            text, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+                        )
+        except httpx.HTTPError as exc:
+            raise LLMError(
+                "LLM provider unavailable", error_code="LLM_UNAVAILABLE", status_code=503
+            ) from exc
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
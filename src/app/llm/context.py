@@ -0,0 +1,210 @@
+"""
+DocuQuery AI - Context Packing
+
+This module chooses which retrieved chunks go into the prompt and renders
+them as numbered sources. The set of chunks with the highest total relevance
+that fits the token budget is a 0/1 knapsack over token costs, solved by
+dynamic programming in NumPy with one vectorized update per chunk across all
+budgets. When the budget is large, costs are rounded up to a coarser unit so
+the table stays at most ``_MAX_COLUMNS`` wide; rounding up can leave a few
+tokens unused but never overfills the budget.
+
+Chosen chunks that are adjacent in the same document are merged into one
+source, saving a header and separator each. The tokens saved are offered to
+the best remaining chunks that still fit.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .prompts import build_messages, format_source
+from .tokens import TokenCounter
+
+# Widest dynamic programming table, in budget units
+_MAX_COLUMNS = 2048
+# Chat formatting tokens added per message by the API, plus the reply primer
+_TOKENS_PER_MESSAGE = 4
+_REPLY_TOKENS = 3
+
+
+class PackedContext:
+    """Sources chosen for a prompt, with the hits they were rendered from."""
+
+    __slots__ = ("sources", "hits", "tokens", "budget")
+
+    def __init__(self, sources: List[str], hits: List[Any], tokens: int, budget: int):
+        self.sources = sources
+        self.hits = hits
+        self.tokens = tokens
+        self.budget = budget
+
+
+def knapsack(costs: np.ndarray, values: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    Indices of the items of highest total value with total cost at most ``capacity``.
+
+    Args:
+        costs: Positive integer cost of each item
+        values: Non-negative value of each item
+        capacity: Budget
+
+    Returns:
+        Chosen indices, ascending
+    """
+    count = len(costs)
+    if capacity <= 0 or not count:
+        return np.zeros(0, dtype=np.intp)
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((count, capacity + 1), dtype=bool)
+    for i in range(count):
+        cost = int(costs[i])
+        if cost > capacity:
+            continue
+        # best[w - cost] + value, for every budget w that can afford the item
+        candidate = best[: capacity + 1 - cost] + values[i]
+        better = candidate > best[cost:]
+        taken[i, cost:] = better
+        best[cost:][better] = candidate[better]
+    chosen = []
+    remaining = capacity
+    for i in range(count - 1, -1, -1):
+        if taken[i, remaining]:
+            chosen.append(i)
+            remaining -= int(costs[i])
+    return np.array(chosen[::-1], dtype=np.intp)
+
+
+class ContextPacker:
+    """
+    Fits retrieved chunks into the prompt of a chat model.
+
+    Args:
+        counter: Token counter of the chat model
+        context_window: Context length of the chat model
+        completion_tokens: Tokens reserved for the answer
+        margin: Extra tokens left free, covering estimation error
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        context_window: int,
+        completion_tokens: int,
+        margin: int = 16,
+    ):
+        self.counter = counter
+        self.context_window = context_window
+        self.completion_tokens = completion_tokens
+        self.margin = margin
+
+    def budget(self, question: str) -> int:
+        """Tokens available for sources in the prompt of a question."""
+        messages = build_messages(question, [])
+        prompt = sum(self.counter.count(m["content"]) + _TOKENS_PER_MESSAGE for m in messages)
+        return self.context_window - self.completion_tokens - prompt - _REPLY_TOKENS - self.margin
+
+    def _chunk_tokens(self, hit: Any) -> int:
+        return hit.tokens if hit.tokens is not None else self.counter.count(hit.text)
+
+    def _header_tokens(self, title: str) -> int:
+        # Header and the blank line separating sources; two-digit numbers at most
+        return self.counter.count(format_source(99, title, "")) + 1
+
+    def pack(self, question: str, hits: Sequence[Any]) -> PackedContext:
+        """
+        Choose and render the sources for a question.
+
+        Args:
+            question: The user's question
+            hits: Retrieved chunks, best first, with ``score``, ``tokens``
+                (or None), ``document_id``, ``position`` and ``title``
+
+        Returns:
+            The rendered sources, most relevant first, and the hits used
+        """
+        budget = self.budget(question)
+        if not hits or budget <= 0:
+            return PackedContext([], [], 0, budget)
+        texts = np.array([self._chunk_tokens(hit) for hit in hits], dtype=np.int64)
+        headers = np.array([self._header_tokens(hit.title) for hit in hits], dtype=np.int64)
+        costs = texts + headers
+        values = _values(np.array([hit.score for hit in hits], dtype=np.float64))
+
+        unit = max(1, math.ceil(budget / _MAX_COLUMNS))
+        chosen = set(knapsack(-(-costs // unit), values, budget // unit).tolist())
+
+        groups = self._merge(hits, chosen)
+        used = self._tokens(groups, texts, headers)
+        # Offer the tokens freed by merging to the best chunks left out
+        for i in sorted(set(range(len(hits))) - chosen, key=lambda i: -values[i]):
+            if used + costs[i] <= budget:
+                chosen.add(i)
+                groups = self._merge(hits, chosen)
+                used = self._tokens(groups, texts, headers)
+
+        sources = []
+        packed = []
+        for number, group in enumerate(groups, 1):
+            first = hits[group[0]]
+            sources.append(format_source(number, first.title, "\n".join(hits[i].text for i in group)))
+            packed.extend(hits[i] for i in group)
+        return PackedContext(sources, packed, int(used), budget)
+
+    @staticmethod
+    def _merge(hits: Sequence[Any], chosen: "set[int]") -> List[List[int]]:
+        """Runs of consecutive chunks of one document, best run first."""
+        by_document: Dict[str, List[int]] = {}
+        for i in sorted(chosen):
+            by_document.setdefault(hits[i].document_id, []).append(i)
+        groups: List[List[int]] = []
+        for indices in by_document.values():
+            positioned = sorted(
+                (i for i in indices if hits[i].position is not None), key=lambda i: hits[i].position
+            )
+            groups.extend([i] for i in indices if hits[i].position is None)
+            run: List[int] = []
+            for i in positioned:
+                if run and hits[i].position == hits[run[-1]].position + 1:
+                    run.append(i)
+                else:
+                    if run:
+                        groups.append(run)
+                    run = [i]
+            if run:
+                groups.append(run)
+        # Hits arrive best first, so the lowest index is the best chunk of a group
+        groups.sort(key=min)
+        return groups
+
+    @staticmethod
+    def _tokens(groups: List[List[int]], texts: np.ndarray, headers: np.ndarray) -> int:
+        # One header per group; merged chunks are joined by a newline token
+        return sum(int(headers[g[0]] + texts[g].sum()) + len(g) - 1 for g in groups)
+
+
+def _values(scores: np.ndarray) -> np.ndarray:
+    """
+    Relevance as positive knapsack values.
+
+    Positive scores (cosine similarity, fused ranks) keep their ratios.
+    Scores that can be negative, such as cross-encoder logits, are rescaled
+    so the weakest candidate is worth 1% of the best one.
+    """
+    low, high = float(scores.min()), float(scores.max())
+    if low > 0:
+        return scores / high
+    if high <= low:
+        return np.ones(len(scores))
+    return 0.01 + 0.99 * (scores - low) / (high - low)
+
+
+def pack_sources(
+    packer: Optional[ContextPacker], question: str, hits: Sequence[Any]
+) -> Tuple[List[str], List[Any], int]:
+    """Sources, hits used and their tokens; every hit in order without a packer."""
+    if packer is None:
+        return [format_source(i, hit.title, hit.text) for i, hit in enumerate(hits, 1)], list(hits), 0
+    packed = packer.pack(question, hits)
+    return packed.sources, packed.hits, packed.tokens
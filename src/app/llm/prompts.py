@@ -0,0 +1,37 @@
+"""
+DocuQuery AI - Prompts
+
+This module builds the chat messages sent to the LLM for a question and the
+chunks retrieved for it.
+"""
+
+from typing import Dict, List, Sequence
+
+SYSTEM_PROMPT = (
+    "You answer questions about the user's documents. Use only the numbered "
+    "sources below. Cite the sources you use as [1], [2], ... If the sources "
+    "do not contain the answer, say so."
+)
+
+
+def format_source(number: int, title: str, text: str) -> str:
+    """Render one retrieved chunk as a numbered source."""
+    return f"[{number}] {title}\n{text}"
+
+
+def build_messages(question: str, sources: Sequence[str]) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for a question.
+
+    Args:
+        question: The user's question
+        sources: Rendered sources, see ``format_source``
+
+    Returns:
+        System and user messages
+    """
+    context = "\n\n".join(sources)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Sources:\n\n{context}\n\nQuestion: {question}"},
+    ]
@@ -0,0 +1,93 @@
+"""
+DocuQuery AI - Token Counting
+
+This module counts the tokens of texts sent to the LLM. It uses the model's
+tiktoken encoding when tiktoken is installed; otherwise it falls back to a
+conservative estimate from a regex split that mirrors the BPE pre-tokenizer
+(letter runs, up to three digits, punctuation runs and whitespace), charging
+long letter runs one token per four characters. The estimate errs high, so
+a prompt packed to the estimate never overflows the context window.
+
+Chunk counts are computed once at ingestion and stored with the chunk; the
+LRU cache covers text counted at query time, such as questions and chunks
+ingested before counts were stored.
+"""
+
+import math
+import re
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - exercised only with tiktoken
+    tiktoken = None
+
+_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]+|_+|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Upper estimate of the BPE tokens of a text, without a tokenizer."""
+    count = 0
+    for match in _PIECES.finditer(text):
+        piece = match.group()
+        if piece.isspace():
+            # Single spaces merge into the next word
+            count += len(piece) > 1
+        elif piece[0].isalpha():
+            count += max(1, math.ceil(len(piece) / 4))
+        else:
+            count += len(piece)
+    return count
+
+
+class TokenCounter:
+    """
+    Token counts for a model, with an LRU cache of recent texts.
+
+    Args:
+        model: Model whose encoding is used, if tiktoken is installed
+        cache_size: Texts whose counts are kept
+    """
+
+    def __init__(self, model: str = "gpt-4", cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._encoding: Optional[Any] = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the model's tokenizer rather than an estimate."""
+        return self._encoding is not None
+
+    def _count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode_ordinary(text))
+        return estimate_tokens(text)
+
+    def count(self, text: str) -> int:
+        """Tokens of a text."""
+        cache = self._cache
+        count = cache.get(text)
+        if count is not None:
+            cache.move_to_end(text)
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = cache[text] = self._count(text)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return count
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Tokens of each text, bypassing the cache; for ingestion batches."""
+        if self._encoding is not None:
+            return [len(tokens) for tokens in self._encoding.encode_ordinary_batch(list(texts))]
+        return [estimate_tokens(text) for text in texts]
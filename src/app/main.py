@@ -5,34 +5,406 @@ This module contains the FastAPI application factory and main configuration.
 It wires together all the routers and middleware without implementing business logic.
 """
 
+import logging
+import os
+import tempfile
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.middleware.pipeline import MiddlewarePipeline
 from app.middleware.request_id import RequestIDMiddleware
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.timing import TimingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.tracing import TracingMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.security_headers import SecurityHeadersMiddleware
+from app.ratelimit import DistributedRateLimiter, GCRALimiter, GCRAStore, QuotaEngine
+from app.telemetry import (
+    AccessLogSampler,
+    FileSpanExporter,
+    HTTPSpanExporter,
+    MetricsExporter,
+    MetricsRegistry,
+    SpanExporter,
+    configure_logging,
+    configure_tracing,
+    shutdown_logging,
+    shutdown_tracing,
+)
+from app.telemetry.health import HealthMonitor, build_default_probes
+from app.telemetry.logs import LOG_METRICS
+from app.llm.client import OpenAIClient
+from app.llm.context import ContextPacker
+from app.llm.tokens import TokenCounter
+from app.retrieval.answer_cache import SemanticAnswerCache
+from app.retrieval.embeddings import (
+    EMBEDDING_CACHE_METRICS,
+    BatchingEmbedder,
+    Embedder,
+    EmbeddingCache,
+    OpenAIEmbedder,
+)
+from app.retrieval.jobs import QueryJobs, ResultStore
+from app.retrieval.lexical import LexicalStore
+from app.retrieval.service import RetrievalService
+from app.retrieval.local_index import NumpyVectorStore, RoutingVectorStore
+from app.retrieval.quantization import quantize_index
+from app.retrieval.rerank import Reranker, cross_encoder_scorer
+from app.retrieval.vector_store import QdrantVectorStore, VectorStore
+from app.documents.ingest import UploadManager
+from app.documents.search import DocumentSearch
+from app.storage.blobs import LocalBlobStore
 from app.common.error_handlers import register_error_handlers
+from app.common.serialization import FastJSONResponse
+from app.common.versions import TenantVersions
 from app.api.v1.router import api_router
 
+logger = logging.getLogger("docuquery.main")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown events."""
+    settings = get_settings()
+    log_pipeline = configure_logging(
+        level=settings.LOG_LEVEL,
+        log_format=settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        static_fields={
+            "service": settings.APP_NAME,
+            "version": settings.APP_VERSION,
+            "environment": settings.ENVIRONMENT,
+        },
+    )
+    
+    if settings.TRACING_ENABLED:
+        configure_tracing(
+            build_span_exporter(settings),
+            sample_rate=settings.TRACING_SAMPLE_RATE,
+            slow_threshold_ms=settings.TRACING_SLOW_TRACE_MS,
+        )
+    
+    retrieval = getattr(app.state, "retrieval", None)
+    metrics = getattr(app.state, "metrics", None)
+    exporter = None
+    if metrics is not None:
+        metrics.add_source(log_pipeline.metric_samples, LOG_METRICS)
+        exporter = MetricsExporter(metrics, port=settings.PROMETHEUS_PORT)
+        await exporter.start()
+    
+    health = getattr(app.state, "health", None)
+    if health is not None:
+        health.start()
+    
     # TODO: Initialize database connections
     # TODO: Initialize Redis connections
-    # TODO: Initialize Qdrant connections
     # TODO: Start background workers
     
     yield
     
+    # Hand leased rate limit tokens back before the Redis client goes away
+    rate_limiter = getattr(app.state, "rate_limiter", None)
+    if rate_limiter is not None and hasattr(rate_limiter, "aclose"):
+        await rate_limiter.aclose()
+    
     # TODO: Close database connections
     # TODO: Close Redis connections
-    # TODO: Close Qdrant connections
     # TODO: Stop background workers
+    
+    query_jobs = getattr(app.state, "query_jobs", None)
+    if query_jobs is not None:
+        await query_jobs.aclose()
+    uploads = getattr(app.state, "uploads", None)
+    if uploads is not None:
+        await uploads.aclose()
+    document_search = getattr(app.state, "document_search", None)
+    if document_search is not None:
+        await document_search.aclose()
+    if retrieval is not None:
+        await retrieval.aclose()
+    
+    if health is not None:
+        await health.stop()
+    if exporter is not None:
+        await exporter.stop()
+    if metrics is not None:
+        metrics.close()
+    
+    shutdown_tracing()
+    
+    # Flush buffered log records last so shutdown messages are kept
+    shutdown_logging()
+
+
+def build_span_exporter(settings: Settings) -> Optional[SpanExporter]:
+    """Build the exporter for kept traces; none when only propagating context."""
+    if settings.TRACING_EXPORTER == "file":
+        try:
+            return FileSpanExporter(settings.TRACING_FILE_PATH)
+        except OSError as exc:
+            # A read-only or missing log directory must not stop the API from starting
+            logger.warning(
+                "Span file %s cannot be written, traces are not exported: %s", settings.TRACING_FILE_PATH, exc
+            )
+            return None
+    if settings.TRACING_EXPORTER == "http" and settings.TRACING_COLLECTOR_URL:
+        return HTTPSpanExporter(settings.TRACING_COLLECTOR_URL)
+    return None
+
+
+def build_tenant_versions(settings: Settings, namespace: str) -> Optional[TenantVersions]:
+    """Build the shared write counters of one kind of in-process data, if enabled."""
+    if not settings.SHARED_DATA_VERSIONS:
+        return None
+
+    import redis.asyncio as redis
+
+    client = redis.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=0.25,
+        socket_connect_timeout=0.25,
+    )
+    return TenantVersions(client, namespace, check_interval=settings.DATA_VERSION_CHECK_SECONDS)
+
+
+def build_vector_store(settings: Settings) -> VectorStore:
+    """Build the vector store for the configured backend."""
+    if settings.VECTOR_STORE_BACKEND == "memory":
+        return NumpyVectorStore()
+    quantization = None if settings.VECTOR_QUANTIZATION == "none" else settings.VECTOR_QUANTIZATION
+    qdrant = QdrantVectorStore(
+        settings.QDRANT_URL,
+        settings.QDRANT_COLLECTION,
+        api_key=settings.QDRANT_API_KEY,
+        timeout=settings.QDRANT_TIMEOUT,
+        quantization=quantization,
+        oversampling=settings.VECTOR_RESCORE_OVERSAMPLING,
+        exact_max_points=settings.QDRANT_EXACT_SEARCH_MAX_POINTS,
+        with_vectors=settings.RERANK_ENABLED and settings.RERANK_DIVERSITY > 0,
+    )
+    if settings.VECTOR_STORE_BACKEND != "hybrid":
+        return qdrant
+    compress = None
+    if quantization is not None:
+        compress = partial(
+            quantize_index,
+            mode=quantization,
+            directory=settings.LOCAL_INDEX_DIRECTORY
+            or os.path.join(tempfile.gettempdir(), "docuquery-vectors"),
+            rescore_factor=settings.VECTOR_RESCORE_OVERSAMPLING,
+            subspaces=settings.VECTOR_PQ_SUBSPACES,
+        )
+    return RoutingVectorStore(
+        qdrant,
+        max_tenant_chunks=settings.LOCAL_INDEX_MAX_TENANT_CHUNKS,
+        max_total_chunks=settings.LOCAL_INDEX_MAX_TOTAL_CHUNKS,
+        refresh_after=settings.LOCAL_INDEX_REFRESH_SECONDS,
+        compress=compress,
+        compress_min_chunks=settings.LOCAL_INDEX_QUANTIZE_MIN_CHUNKS,
+        versions=build_tenant_versions(settings, "vectors"),
+    )
+
+
+def build_retrieval_service(settings: Settings) -> RetrievalService:
+    """Build the query pipeline: cached embeddings, hybrid search and the LLM."""
+    llm = OpenAIClient(
+        settings.OPENAI_API_KEY,
+        organization=settings.OPENAI_ORGANIZATION,
+        base_url=settings.OPENAI_BASE_URL,
+    )
+    shared = None
+    if settings.EMBEDDING_CACHE_SHARED:
+        import redis.asyncio as redis
+
+        shared = redis.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=0.25,
+            socket_connect_timeout=0.25,
+        )
+    embedder: Embedder = OpenAIEmbedder(llm, settings.OPENAI_EMBEDDING_MODEL)
+    if settings.EMBEDDING_BATCH_MAX_WAIT_MS > 0:
+        embedder = BatchingEmbedder(
+            embedder,
+            max_batch=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait=settings.EMBEDDING_BATCH_MAX_WAIT_MS / 1000,
+        )
+    embeddings = EmbeddingCache(
+        embedder,
+        max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+        ttl=settings.EMBEDDING_CACHE_TTL,
+        dtype=settings.EMBEDDING_CACHE_DTYPE,
+        redis=shared,
+        shared_ttl=settings.EMBEDDING_CACHE_SHARED_TTL,
+    )
+    answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache = SemanticAnswerCache(
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl=settings.ANSWER_CACHE_TTL,
+            max_bytes=settings.ANSWER_CACHE_MAX_BYTES,
+        )
+    vector_store = build_vector_store(settings)
+    lexical = None
+    if settings.LEXICAL_SEARCH_ENABLED:
+        lexical = LexicalStore(
+            vector_store,
+            max_tenant_chunks=settings.LEXICAL_INDEX_MAX_TENANT_CHUNKS,
+            refresh_after=settings.LOCAL_INDEX_REFRESH_SECONDS,
+            versions=build_tenant_versions(settings, "lexical"),
+        )
+    reranker = None
+    if settings.RERANK_ENABLED:
+        scorer = None
+        if settings.RERANK_MODEL:
+            scorer = cross_encoder_scorer(settings.RERANK_MODEL, workers=settings.RERANK_THREADS)
+        reranker = Reranker(
+            scorer,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            max_concurrency=settings.RERANK_CONCURRENCY,
+            timeout=settings.RERANK_TIMEOUT_MS / 1000,
+            diversity=settings.RERANK_DIVERSITY,
+        )
+    packer = None
+    if settings.CONTEXT_PACKING_ENABLED:
+        packer = ContextPacker(
+            TokenCounter(settings.OPENAI_MODEL, cache_size=settings.TOKEN_CACHE_SIZE),
+            context_window=settings.OPENAI_CONTEXT_WINDOW,
+            completion_tokens=settings.OPENAI_MAX_TOKENS,
+        )
+    history = None
+    if settings.QUERY_HISTORY_ENABLED:
+        from app.db.history import QueryHistory
+        from app.db.session import create_engine, session_factory
+
+        engine = create_engine(settings)
+        history = QueryHistory(session_factory(engine), engine)
+    return RetrievalService(
+        embeddings,
+        vector_store,
+        llm,
+        chat_model=settings.OPENAI_MODEL,
+        max_tokens=settings.OPENAI_MAX_TOKENS,
+        temperature=settings.OPENAI_TEMPERATURE,
+        answer_cache=answer_cache,
+        lexical=lexical,
+        fusion_k=settings.HYBRID_FUSION_K,
+        fusion_depth=settings.HYBRID_FUSION_DEPTH,
+        reranker=reranker,
+        rerank_depth=settings.RERANK_DEPTH,
+        packer=packer,
+        coalesce=settings.QUERY_COALESCING_ENABLED,
+        history=history,
+    )
+
+
+def build_query_jobs(settings: Settings, retrieval: RetrievalService) -> Optional[QueryJobs]:
+    """Build the background executor of asynchronous queries, if enabled."""
+    if not settings.ASYNC_QUERIES_ENABLED:
+        return None
+    return QueryJobs(
+        retrieval.answer,
+        ResultStore(ttl=settings.ASYNC_QUERY_RESULT_TTL, max_entries=settings.ASYNC_QUERY_MAX_RESULTS),
+        workers=settings.ASYNC_QUERY_WORKERS,
+        max_pending=settings.ASYNC_QUERY_MAX_PENDING,
+        tenant_tiers=settings.TENANT_TIERS,
+        tier_priorities=settings.TIER_QUERY_PRIORITIES,
+        default_tier=settings.DEFAULT_TENANT_TIER,
+    )
+
+
+def build_document_search(settings: Settings) -> DocumentSearch:
+    """Build the document search index, backed by the database catalog if enabled."""
+    source = None
+    if settings.DOCUMENT_CATALOG_ENABLED:
+        from app.db.documents import SqlDocumentSource
+        from app.db.session import create_engine, session_factory
+
+        engine = create_engine(settings)
+        source = SqlDocumentSource(session_factory(engine), engine)
+    return DocumentSearch(
+        source,
+        max_documents=settings.DOCUMENT_SEARCH_MAX_DOCUMENTS,
+        refresh_after=settings.DOCUMENT_SEARCH_REFRESH_SECONDS,
+        versions=build_tenant_versions(settings, "documents") if source is not None else None,
+    )
+
+
+def build_upload_manager(
+    settings: Settings, retrieval: RetrievalService, search: DocumentSearch
+) -> Optional[UploadManager]:
+    """Build streaming document uploads over the configured file storage."""
+    if settings.STORAGE_TYPE != "local":
+        # TODO: S3, Azure Blob and GCS stores
+        return None
+    store = LocalBlobStore(
+        settings.STORAGE_LOCAL_DIRECTORY or os.path.join(tempfile.gettempdir(), "docuquery-documents")
+    )
+    return UploadManager(
+        store,
+        search=search,
+        retrieval=retrieval,
+        catalog=search.source,
+        max_bytes=settings.MAX_DOCUMENT_SIZE_MB * 1024 * 1024,
+        buffer_bytes=settings.UPLOAD_BUFFER_BYTES,
+        max_concurrent=settings.MAX_CONCURRENT_UPLOADS,
+        chunk_characters=settings.INGEST_CHUNK_CHARACTERS,
+        ttl=settings.UPLOAD_SESSION_TTL,
+    )
+
+
+def build_rate_limiter(settings: Settings) -> Optional[DistributedRateLimiter]:
+    """Build the shared rate limiter for the configured backend, if any."""
+    if settings.RATE_LIMIT_BACKEND != "redis":
+        return None
+
+    import redis.asyncio as redis
+
+    client = redis.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=0.25,
+        socket_connect_timeout=0.25,
+    )
+    return DistributedRateLimiter(
+        client,
+        settings.RATE_LIMIT_REQUESTS,
+        settings.RATE_LIMIT_WINDOW,
+        lease_size=settings.RATE_LIMIT_LEASE_SIZE,
+        fallback=GCRALimiter(
+            settings.RATE_LIMIT_REQUESTS,
+            settings.RATE_LIMIT_WINDOW,
+            store=GCRAStore(
+                capacity=settings.RATE_LIMIT_MAX_KEYS, shards=settings.RATE_LIMIT_SHARDS
+            ),
+        ),
+    )
+
+
+def build_quota_engine(settings: Settings) -> Optional[QuotaEngine]:
+    """Build the cost-weighted tenant quota engine, if enabled."""
+    if not settings.RATE_LIMIT_QUOTAS_ENABLED:
+        return None
+
+    return QuotaEngine(
+        global_units=settings.RATE_LIMIT_GLOBAL_UNITS,
+        tenant_units=settings.RATE_LIMIT_TENANT_UNITS,
+        user_units=settings.RATE_LIMIT_USER_UNITS,
+        route_units=settings.RATE_LIMIT_ROUTE_UNITS,
+        period=settings.RATE_LIMIT_WINDOW,
+        route_costs=settings.RATE_LIMIT_ROUTE_COSTS,
+        bypass_prefixes=settings.RATE_LIMIT_BYPASS_PATHS,
+        tokens_per_unit=settings.RATE_LIMIT_TOKENS_PER_UNIT,
+        max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    )
 
 
 def create_app() -> FastAPI:
@@ -47,6 +419,7 @@ def create_app() -> FastAPI:
         redoc_url="/redoc" if settings.DEBUG else None,
         openapi_url="/openapi.json" if settings.DEBUG else None,
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
     
     # Configure CORS
@@ -54,16 +427,62 @@ def create_app() -> FastAPI:
         CORSMiddleware,
         allow_origins=settings.ALLOWED_ORIGINS,
         allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         allow_headers=["*"],
     )
     
-    # Add custom middleware
-    app.add_middleware(RequestIDMiddleware)
-    app.add_middleware(LoggingMiddleware)
-    app.add_middleware(TimingMiddleware)
-    app.add_middleware(RateLimitMiddleware)
-    app.add_middleware(SecurityHeadersMiddleware)
+    rate_limiter = build_rate_limiter(settings)
+    app.state.rate_limiter = rate_limiter
+    
+    metrics = None
+    if settings.PROMETHEUS_ENABLED:
+        metrics = MetricsRegistry(
+            max_series=settings.PROMETHEUS_MAX_ROUTES,
+            directory=settings.PROMETHEUS_MULTIPROC_DIR,
+        )
+    app.state.metrics = metrics
+    
+    app.state.retrieval = build_retrieval_service(settings)
+    if metrics is not None and app.state.retrieval is not None:
+        metrics.add_source(app.state.retrieval.embeddings.metric_samples, EMBEDDING_CACHE_METRICS)
+    app.state.query_jobs = build_query_jobs(settings, app.state.retrieval)
+    app.state.document_search = build_document_search(settings)
+    app.state.uploads = build_upload_manager(settings, app.state.retrieval, app.state.document_search)
+    
+    app.state.health = HealthMonitor(
+        build_default_probes(settings, timeout=settings.HEALTH_PROBE_TIMEOUT),
+        interval=settings.HEALTH_CHECK_INTERVAL,
+        stale_after=settings.HEALTH_STALE_AFTER,
+        history_size=settings.HEALTH_HISTORY_SIZE,
+    )
+    
+    stages = [MetricsMiddleware(registry=metrics)] if metrics is not None else []
+    
+    # Add custom middleware as ordered stages of a single ASGI pipeline
+    app.add_middleware(
+        MiddlewarePipeline,
+        stages=stages + [
+            RequestIDMiddleware(),
+            TracingMiddleware(),
+            TimingMiddleware(server_timing=settings.SERVER_TIMING_ENABLED),
+            LoggingMiddleware(
+                sampler=AccessLogSampler(
+                    default_rate=settings.LOG_SAMPLE_RATE,
+                    route_rates=settings.LOG_ROUTE_SAMPLE_RATES,
+                    slow_threshold_ms=settings.LOG_SLOW_REQUEST_MS,
+                )
+            ),
+            RateLimitMiddleware(
+                requests_per_window=settings.RATE_LIMIT_REQUESTS,
+                window_seconds=settings.RATE_LIMIT_WINDOW,
+                max_keys=settings.RATE_LIMIT_MAX_KEYS,
+                shards=settings.RATE_LIMIT_SHARDS,
+                limiter=rate_limiter,
+                quotas=build_quota_engine(settings),
+            ),
+            SecurityHeadersMiddleware(),
+        ],
+    )
     
     # Register error handlers
     register_error_handlers(app)
@@ -76,7 +495,6 @@ def create_app() -> FastAPI:
     # app.include_router(tenant_router, prefix="/tenants", tags=["Tenants"])
     # app.include_router(user_router, prefix="/users", tags=["Users"])
     # app.include_router(document_router, prefix="/documents", tags=["Documents"])
-    # app.include_router(query_router, prefix="/query", tags=["Query"])
     
     return app
 
@@ -4,16 +4,24 @@ DocuQuery AI - Middleware Package
 This package contains custom middleware components for the FastAPI application.
 """
 
+from .pipeline import MiddlewarePipeline, PipelineStage, RequestContext
 from .request_id import RequestIDMiddleware
 from .logging import LoggingMiddleware
 from .timing import TimingMiddleware
+from .metrics import MetricsMiddleware
+from .tracing import TracingMiddleware
 from .rate_limit import RateLimitMiddleware
 from .security_headers import SecurityHeadersMiddleware
 
 __all__ = [
+    "MiddlewarePipeline",
+    "PipelineStage",
+    "RequestContext",
     "RequestIDMiddleware",
     "LoggingMiddleware",
     "TimingMiddleware",
+    "MetricsMiddleware",
+    "TracingMiddleware",
     "RateLimitMiddleware",
     "SecurityHeadersMiddleware",
 ]
@@ -5,66 +5,67 @@ This middleware provides structured logging for all HTTP requests and responses,
 including request details, response status, and timing information.
 """
 
-import time
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
 
+from starlette.types import ASGIApp
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for structured request/response logging."""
-    
-    def __init__(self, app, logger_name: str = "docuquery.api"):
+from app.telemetry.logs import AccessLogSampler
+
+from .pipeline import PipelineStage, RequestContext
+
+
+class LoggingMiddleware(PipelineStage):
+    """Pipeline stage writing one sampled access log record per request."""
+
+    def __init__(
+        self,
+        app: Optional[ASGIApp] = None,
+        logger_name: str = "docuquery.api",
+        sampler: Optional[AccessLogSampler] = None,
+    ):
         super().__init__(app)
         self.logger = logging.getLogger(logger_name)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        self.sampler = sampler if sampler is not None else AccessLogSampler()
+
+    def on_response_complete(self, ctx: RequestContext) -> None:
         """
-        Log request details and response information.
-        
+        Log method, path, status and timing once the response is complete.
+
+        Only cheap values are captured here; the record is formatted and
+        written by the logging pipeline's listener thread.
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or endpoint handler
-            
-        Returns:
-            The HTTP response
+            ctx: The per-request context
         """
-        # TODO: Implement structured logging
-        # TODO: Add request correlation ID
-        # TODO: Log request parameters and headers
-        # TODO: Log response status and timing
-        # TODO: Implement log level based on response status
-        
-        start_time = time.time()
-        
-        # Log request details
-        self.logger.info(
-            f"Request started: {request.method} {request.url.path}",
-            extra={
-                "method": request.method,
-                "path": request.url.path,
-                "query_params": dict(request.query_params),
-                "client_ip": request.client.host if request.client else None,
-                "user_agent": request.headers.get("user-agent"),
-            }
-        )
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Log response details
-        self.logger.info(
-            f"Request completed: {request.method} {request.url.path} - {response.status_code}",
-            extra={
-                "method": request.method,
-                "path": request.url.path,
-                "status_code": response.status_code,
-                "process_time": process_time,
-            }
-        )
-        
-        return response
+        status_code = ctx.status_code
+        if status_code >= 500:
+            level = logging.ERROR
+        elif status_code >= 400:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        if not self.logger.isEnabledFor(level):
+            return
+
+        duration_ms = ctx.elapsed() * 1000
+        path = ctx.path
+        if not self.sampler.should_log(path, status_code, duration_ms):
+            return
+
+        client = ctx.scope.get("client")
+        extra = {
+            "access": (
+                ctx.method,
+                path,
+                status_code,
+                round(duration_ms, 3),
+                ctx.request_id,
+                client[0] if client else None,
+            )
+        }
+        if ctx.span is not None:
+            extra["trace_id"] = ctx.span.context.trace_id
+        if ctx.stages is not None and ctx.stages.durations:
+            extra["stages_ms"] = ctx.stages.as_ms()
+        self.logger.log(level, "%s %s %s", ctx.method, path, status_code, extra=extra)
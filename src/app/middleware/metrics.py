@@ -0,0 +1,56 @@
+"""
+DocuQuery AI - Metrics Middleware
+
+This middleware records per-route latency histograms, status counters and the
+number of in-flight requests for the Prometheus exporter.
+"""
+
+from typing import Optional
+
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+from app.telemetry.metrics import UNMATCHED_ROUTE, MetricsRegistry
+
+from .pipeline import PipelineStage, RequestContext
+
+# Methods kept as label values; anything else is reported as OTHER
+_KNOWN_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+
+class MetricsMiddleware(PipelineStage):
+    """
+    Pipeline stage recording request metrics by route template.
+
+    Register it as the first stage so every request that is counted as in
+    flight is also counted as finished, including short-circuited ones.
+    """
+
+    def __init__(self, app: Optional[ASGIApp] = None, registry: Optional[MetricsRegistry] = None):
+        super().__init__(app)
+        self.registry = registry if registry is not None else MetricsRegistry()
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        self.registry.in_flight += 1
+        return None
+
+    def on_response_complete(self, ctx: RequestContext) -> None:
+        """
+        Record the finished request under its route template.
+
+        The router stores the matched route in the scope, so raw paths such
+        as document ids never become label values.
+
+        Args:
+            ctx: The per-request context
+        """
+        registry = self.registry
+        registry.in_flight -= 1
+        route = ctx.scope.get("route")
+        template = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+        method = ctx.method
+        if method not in _KNOWN_METHODS:
+            method = "OTHER"
+        registry.observe(method, template, ctx.status_code, ctx.elapsed())
@@ -0,0 +1,193 @@
+"""
+DocuQuery AI - Middleware Pipeline
+
+This module provides a single pure-ASGI middleware that runs the request-id,
+timing, logging, rate-limit and security-header stages as ordered hooks over
+the raw ASGI ``scope`` and ``send`` callables. Compared to stacking one
+``BaseHTTPMiddleware`` per concern, a request costs one wrapper instead of five
+and streaming responses are forwarded chunk by chunk instead of being buffered.
+"""
+
+import time
+from typing import Any, FrozenSet, List, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Raw ASGI header list, as found in ``http.response.start`` messages
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+def header_names(headers: RawHeaders) -> FrozenSet[bytes]:
+    """Lower-cased names of a raw header list, for use with ``replace_headers``."""
+    return frozenset(name.lower() for name, _ in headers)
+
+
+def replace_headers(
+    headers: RawHeaders, new_headers: RawHeaders, names: FrozenSet[bytes]
+) -> None:
+    """
+    Set headers in place, dropping any existing header with the same name.
+
+    Args:
+        headers: Mutable raw response headers
+        new_headers: Raw headers to set
+        names: Lower-cased names of ``new_headers``
+    """
+    if any(name.lower() in names for name, _ in headers):
+        headers[:] = [h for h in headers if h[0].lower() not in names]
+    headers.extend(new_headers)
+
+
+class RequestContext:
+    """Per-request state shared between the stages of a pipeline."""
+
+    __slots__ = (
+        "scope",
+        "start_time",
+        "request_id",
+        "client_id",
+        "rate_limit",
+        "rate_limited",
+        "status_code",
+        "stages",
+        "span",
+        "_request",
+    )
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.start_time = time.perf_counter()
+        self.request_id: Optional[str] = None
+        self.client_id: Optional[str] = None
+        self.rate_limit: Optional[Any] = None
+        self.rate_limited = False
+        self.status_code = 500
+        self.stages: Optional[Any] = None
+        self.span: Optional[Any] = None
+        self._request: Optional[Request] = None
+
+    @property
+    def request(self) -> Request:
+        """Lazily built Starlette request view over the ASGI scope."""
+        if self._request is None:
+            self._request = Request(self.scope)
+        return self._request
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    def elapsed(self) -> float:
+        """Seconds elapsed since the pipeline received the request."""
+        return time.perf_counter() - self.start_time
+
+
+class PipelineStage:
+    """
+    Base class for a stage run by ``MiddlewarePipeline``.
+
+    Subclasses override only the hooks they need; the pipeline skips hooks
+    that are not overridden. A stage can still be registered on its own with
+    ``app.add_middleware(StageClass)``, in which case it runs as a
+    single-stage pipeline around ``app``.
+    """
+
+    def __init__(self, app: Optional[ASGIApp] = None):
+        self.app = app
+        self._standalone = MiddlewarePipeline(app, [self]) if app is not None else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._standalone is None:
+            raise RuntimeError(
+                f"{type(self).__name__} was created without an app; "
+                "add it to a MiddlewarePipeline instead"
+            )
+        await self._standalone(scope, receive, send)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """
+        Run before the request reaches the application.
+
+        Args:
+            ctx: The per-request context
+
+        Returns:
+            A response to send instead of calling the application, or None
+        """
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """
+        Run when the response status and headers are sent.
+
+        Args:
+            ctx: The per-request context
+            headers: Mutable raw response headers
+        """
+
+    def on_response_complete(self, ctx: RequestContext) -> None:
+        """
+        Run once the application has finished, including on errors.
+
+        Args:
+            ctx: The per-request context
+        """
+
+
+def _overrides(stage: PipelineStage, hook: str) -> bool:
+    """Check whether a stage overrides one of the ``PipelineStage`` hooks."""
+    return getattr(type(stage), hook) is not getattr(PipelineStage, hook)
+
+
+class MiddlewarePipeline:
+    """Pure-ASGI middleware running an ordered list of stages."""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage]):
+        self.app = app
+        self.stages = list(stages)
+        # Resolve bound hooks once so the hot path only loops over real work
+        self._request_hooks = [
+            s.on_request for s in self.stages if _overrides(s, "on_request")
+        ]
+        self._start_hooks = [
+            s.on_response_start for s in self.stages if _overrides(s, "on_response_start")
+        ]
+        self._complete_hooks = [
+            s.on_response_complete
+            for s in self.stages
+            if _overrides(s, "on_response_complete")
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope)
+        start_hooks = self._start_hooks
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                ctx.status_code = message["status"]
+                headers = list(message.get("headers", ()))
+                for hook in start_hooks:
+                    hook(ctx, headers)
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            for hook in self._request_hooks:
+                response = await hook(ctx)
+                if response is not None:
+                    await response(scope, receive, send_wrapper)
+                    return
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            for complete in self._complete_hooks:
+                complete(ctx)
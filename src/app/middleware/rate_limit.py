@@ -5,115 +5,176 @@ This middleware implements rate limiting to prevent API abuse and ensure fair us
 across all users and tenants.
 """
 
+import inspect
+import math
 import time
-from typing import Callable, Dict, Tuple
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Any, Optional
+
+from fastapi import Request
+from starlette.responses import JSONResponse, Response
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+from starlette.types import ASGIApp
+
+from app.ratelimit import GCRALimiter, GCRAStore, QuotaEngine, QuotaTicket, RateLimitResult
+from app.ratelimit.quotas import QUOTA_LEVELS
+
+from .pipeline import PipelineStage, RawHeaders, RequestContext, replace_headers
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware for implementing rate limiting."""
-    
-    def __init__(self, app, requests_per_window: int = 100, window_seconds: int = 60):
+class RateLimitMiddleware(PipelineStage):
+    """Pipeline stage for implementing rate limiting."""
+
+    def __init__(
+        self,
+        app: Optional[ASGIApp] = None,
+        requests_per_window: int = 100,
+        window_seconds: int = 60,
+        max_keys: int = 65536,
+        shards: int = 16,
+        limiter: Optional[Any] = None,
+        quotas: Optional[QuotaEngine] = None,
+    ):
         super().__init__(app)
         self.requests_per_window = requests_per_window
         self.window_seconds = window_seconds
-        self.rate_limit_store: Dict[str, Tuple[int, float]] = {}
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # GCRA smooths the limit over the window instead of resetting it, so
+        # clients cannot burst twice the limit across a window boundary.
+        # A shared limiter (e.g. DistributedRateLimiter) may be injected instead.
+        if limiter is None:
+            limiter = GCRALimiter(
+                requests_per_window,
+                window_seconds,
+                store=GCRAStore(capacity=max_keys, shards=shards),
+            )
+        self.limiter = limiter
+        self._acquire_is_async = inspect.iscoroutinefunction(limiter.acquire)
+        self.quotas = quotas
+        self._limit_header = (b"x-ratelimit-limit", str(requests_per_window).encode())
+        self._header_names = frozenset(
+            (b"x-ratelimit-limit", b"x-ratelimit-remaining", b"x-ratelimit-reset")
+        )
+        self._rejected_names = frozenset(
+            (b"x-ratelimit-remaining", b"x-ratelimit-reset", b"retry-after")
+        )
+        self._quota_rejections = {
+            level: JSONResponse(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "detail": f"{level.capitalize()} quota exceeded. Please try again later.",
+                    "code": "RATE_LIMIT_001",
+                    "scope": level,
+                },
+            )
+            for level in QUOTA_LEVELS
+        }
+        # Rejections are the hot path under abuse: render body and static
+        # headers once and replay the same response for every rejected request;
+        # only the timing headers are added per request
+        self._rejected_response = JSONResponse(
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Rate limit exceeded. Please try again later."},
+            headers={
+                "X-RateLimit-Limit": str(self.requests_per_window),
+                "X-RateLimit-Window": str(self.window_seconds),
+            },
+        )
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
         """
         Apply rate limiting to incoming requests.
-        
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or endpoint handler
-            
+            ctx: The per-request context
+
         Returns:
-            The HTTP response
-            
-        Raises:
-            HTTPException: When rate limit is exceeded
+            A 429 response when the rate limit is exceeded, otherwise None
         """
-        # TODO: Implement Redis-based rate limiting
-        # TODO: Add tenant-specific rate limits
-        # TODO: Implement progressive rate limiting
-        # TODO: Add rate limit headers to responses
-        # TODO: Implement rate limit bypass for certain endpoints
-        
         # Get client identifier (IP address or user ID)
+        request = ctx.request
         client_id = self._get_client_id(request)
-        
-        # Check rate limit
-        if not self._is_allowed(client_id):
-            raise HTTPException(
-                status_code=HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later.",
-                headers={
-                    "X-RateLimit-Limit": str(self.requests_per_window),
-                    "X-RateLimit-Window": str(self.window_seconds),
-                    "Retry-After": str(self.window_seconds),
-                }
+        ctx.client_id = client_id
+
+        # Check rate limit; the result carries everything the headers need
+        if self._acquire_is_async:
+            result = await self.limiter.acquire(client_id)
+        else:
+            result = self.limiter.acquire(client_id)
+        ctx.rate_limit = result
+        if not result.allowed:
+            ctx.rate_limited = True
+            return self._rejected_response
+
+        if self.quotas is not None:
+            return self._check_quotas(ctx, request, client_id)
+        return None
+
+    def _check_quotas(
+        self, ctx: RequestContext, request: Request, client_id: str
+    ) -> Optional[Response]:
+        """Charge the route's cost against the global/tenant/user/route quotas."""
+        assert self.quotas is not None
+        route, cost = self.quotas.route_cost(ctx.method, ctx.path)
+        if route is None:
+            return None
+
+        ticket = QuotaTicket(self._get_tenant_id(request), client_id, route)
+        decision = self.quotas.acquire(ticket, cost)
+        if not decision.allowed:
+            ctx.rate_limit = decision.result
+            ctx.rate_limited = True
+            return self._quota_rejections[decision.level]
+
+        # Exposed so services can charge LLM usage once it is known
+        state = ctx.scope.setdefault("state", {})
+        state["quota"] = ticket
+        state["quota_engine"] = self.quotas
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """Add rate limit headers from the result computed in ``on_request``."""
+        result: Optional[RateLimitResult] = ctx.rate_limit
+        if result is None:
+            return
+
+        reset = b"%d" % math.ceil(time.time() + result.reset_after)
+        if ctx.rate_limited:
+            replace_headers(
+                headers,
+                [
+                    (b"x-ratelimit-remaining", b"0"),
+                    (b"x-ratelimit-reset", reset),
+                    (b"retry-after", b"%d" % math.ceil(result.retry_after)),
+                ],
+                self._rejected_names,
             )
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        remaining = self._get_remaining_requests(client_id)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_window)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(time.time() + self.window_seconds))
-        
-        return response
-    
+            return
+
+        replace_headers(
+            headers,
+            [
+                self._limit_header,
+                (b"x-ratelimit-remaining", b"%d" % result.remaining),
+                (b"x-ratelimit-reset", reset),
+            ],
+            self._header_names,
+        )
+
     def _get_client_id(self, request: Request) -> str:
         """Get unique client identifier for rate limiting."""
-        # TODO: Implement proper client identification
-        # TODO: Support for user-based rate limiting
-        # TODO: Support for tenant-based rate limiting
-        
-        # Placeholder: use IP address
+        # Requests are limited per client address until authentication runs first
         if request.client:
             return request.client.host
         return "unknown"
-    
-    def _is_allowed(self, client_id: str) -> bool:
-        """Check if request is allowed based on rate limiting."""
-        # TODO: Implement proper rate limiting logic
-        # TODO: Add Redis integration for distributed rate limiting
-        
-        current_time = time.time()
-        
-        if client_id not in self.rate_limit_store:
-            self.rate_limit_store[client_id] = (1, current_time)
-            return True
-        
-        count, window_start = self.rate_limit_store[client_id]
-        
-        # Reset window if expired
-        if current_time - window_start > self.window_seconds:
-            self.rate_limit_store[client_id] = (1, current_time)
-            return True
-        
-        # Check if limit exceeded
-        if count >= self.requests_per_window:
-            return False
-        
-        # Increment count
-        self.rate_limit_store[client_id] = (count + 1, window_start)
-        return True
-    
-    def _get_remaining_requests(self, client_id: str) -> int:
-        """Get remaining requests for client in current window."""
-        if client_id not in self.rate_limit_store:
-            return self.requests_per_window
-        
-        count, window_start = self.rate_limit_store[client_id]
-        current_time = time.time()
-        
-        # Reset if window expired
-        if current_time - window_start > self.window_seconds:
-            return self.requests_per_window
-        
-        return max(0, self.requests_per_window - count)
+
+    def _get_tenant_id(self, request: Request) -> str:
+        """
+        Get the tenant a request is charged to.
+
+        ``X-Tenant-ID`` is trusted as received, as in ``get_current_tenant``;
+        an authenticating gateway in front of the service must set it.
+        """
+        tenant_id = request.headers.get("x-tenant-id")
+        if not tenant_id:
+            return "default"
+        # Bound key size; the header is client supplied
+        return tenant_id[:64]
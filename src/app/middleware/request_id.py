@@ -6,40 +6,44 @@ and adds it to the response headers for tracing and debugging purposes.
 """
 
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
 
+from starlette.responses import Response
+from starlette.types import ASGIApp
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Middleware for generating and tracking request IDs."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+from .pipeline import PipelineStage, RawHeaders, RequestContext, replace_headers
+
+
+class RequestIDMiddleware(PipelineStage):
+    """Pipeline stage for generating and tracking request IDs."""
+
+    def __init__(self, app: Optional[ASGIApp] = None, header_name: str = "X-Request-ID"):
+        super().__init__(app)
+        self.header_name = header_name.lower().encode("latin-1")
+        self._names = frozenset((self.header_name,))
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
         """
-        Process the request and add request ID to headers.
-        
+        Generate the request ID and expose it on the request state.
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or endpoint handler
-            
+            ctx: The per-request context
+
         Returns:
-            The HTTP response with request ID header
+            None, the request always continues
         """
-        # TODO: Implement request ID generation
-        # TODO: Add request ID to request state
-        # TODO: Add request ID to response headers
         # TODO: Implement request ID logging
-        
-        # Placeholder implementation
+
         request_id = str(uuid.uuid4())
-        
+        ctx.request_id = request_id
+
         # Add request ID to request state for internal use
-        request.state.request_id = request_id
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
+        ctx.scope.setdefault("state", {})["request_id"] = request_id
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """Add the request ID to the response headers."""
+        if ctx.request_id is not None:
+            replace_headers(
+                headers, [(self.header_name, ctx.request_id.encode("latin-1"))], self._names
+            )
@@ -5,51 +5,61 @@ This middleware adds security-related HTTP headers to all responses to protect
 against common web vulnerabilities and improve security posture.
 """
 
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Dict, Optional
 
+from starlette.types import ASGIApp
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware for adding security headers to responses."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+from .pipeline import (
+    PipelineStage,
+    RawHeaders,
+    RequestContext,
+    header_names,
+    replace_headers,
+)
+
+# Content Security Policy (basic)
+DEFAULT_CSP_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "img-src 'self' data: https:; "
+    "font-src 'self'; "
+    "connect-src 'self'; "
+    "frame-ancestors 'none';"
+)
+
+DEFAULT_SECURITY_HEADERS: Dict[str, str] = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+    "Content-Security-Policy": DEFAULT_CSP_POLICY,
+}
+
+
+class SecurityHeadersMiddleware(PipelineStage):
+    """Pipeline stage for adding security headers to responses."""
+
+    def __init__(self, app: Optional[ASGIApp] = None, headers: Optional[Dict[str, str]] = None):
+        super().__init__(app)
+        # TODO: Add HSTS headers for HTTPS
+        # TODO: Add security header validation
+
+        merged = {**DEFAULT_SECURITY_HEADERS, **(headers or {})}
+        # Encode once; every response reuses the same byte tuples
+        self.raw_headers: RawHeaders = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in merged.items()
+        ]
+        self._names = header_names(self.raw_headers)
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
         """
-        Add security headers to the response.
-        
+        Add security headers to the response, replacing any the endpoint set.
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or endpoint handler
-            
-        Returns:
-            The HTTP response with security headers
+            ctx: The per-request context
+            headers: Mutable raw response headers
         """
-        # TODO: Implement configurable security headers
-        # TODO: Add Content Security Policy (CSP)
-        # TODO: Add HSTS headers for HTTPS
-        # TODO: Implement header value customization
-        # TODO: Add security header validation
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        # Content Security Policy (basic)
-        csp_policy = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: https:; "
-            "font-src 'self'; "
-            "connect-src 'self'; "
-            "frame-ancestors 'none';"
-        )
-        response.headers["Content-Security-Policy"] = csp_policy
-        
-        return response
+        replace_headers(headers, self.raw_headers, self._names)
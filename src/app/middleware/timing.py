@@ -5,41 +5,61 @@ This middleware measures and records request processing times for performance mo
 and adds timing information to response headers.
 """
 
-import time
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
 
+from starlette.responses import Response
+from starlette.types import ASGIApp
 
-class TimingMiddleware(BaseHTTPMiddleware):
-    """Middleware for measuring request processing times."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+from app.telemetry.stages import StageTimer
+
+from .pipeline import PipelineStage, RawHeaders, RequestContext
+
+
+class TimingMiddleware(PipelineStage):
+    """
+    Pipeline stage for measuring request processing times.
+
+    With ``server_timing`` enabled, a stage timer is made current for the
+    request so handlers and services can record phases with ``stage()``;
+    the phases finished before the response starts are sent back in a
+    ``Server-Timing`` header.
+    """
+
+    def __init__(self, app: Optional[ASGIApp] = None, server_timing: bool = True):
+        super().__init__(app)
+        self.server_timing = server_timing
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
         """
-        Measure request processing time and add timing headers.
-        
+        Start the stage timer of the request.
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or endpoint handler
-            
+            ctx: The per-request context
+
         Returns:
-            The HTTP response with timing headers
+            None, the request always continues
+        """
+        if self.server_timing:
+            ctx.stages = StageTimer().activate()
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """
+        Add timing headers once the response starts.
+
+        Args:
+            ctx: The per-request context
+            headers: Mutable raw response headers
         """
-        # TODO: Implement precise timing measurement
-        # TODO: Add timing metrics to monitoring system
         # TODO: Implement performance thresholds and alerts
-        # TODO: Add timing breakdown for different processing stages
-        
-        start_time = time.time()
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Add timing headers
-        response.headers["X-Process-Time"] = f"{process_time:.4f}"
-        response.headers["X-Process-Time-MS"] = f"{int(process_time * 1000)}"
-        
-        return response
+
+        process_time = ctx.elapsed()
+        headers.append((b"x-process-time", b"%.4f" % process_time))
+        headers.append((b"x-process-time-ms", b"%d" % int(process_time * 1000)))
+        if ctx.stages is not None:
+            headers.append((b"server-timing", ctx.stages.server_timing(process_time)))
+
+    def on_response_complete(self, ctx: RequestContext) -> None:
+        """Detach the stage timer; the context keeps it for later stages."""
+        if ctx.stages is not None:
+            ctx.stages.deactivate()
@@ -0,0 +1,71 @@
+"""
+DocuQuery AI - Tracing Middleware
+
+This middleware continues the caller's W3C trace, or starts a new one, and
+opens the server span that every span of the request descends from.
+"""
+
+from typing import Optional
+
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+from app.telemetry.tracing import Tracer, get_tracer, parse_traceparent
+
+from .pipeline import PipelineStage, RawHeaders, RequestContext, replace_headers
+
+_TRACEPARENT = b"traceparent"
+_NAMES = frozenset((_TRACEPARENT,))
+
+
+class TracingMiddleware(PipelineStage):
+    """Pipeline stage opening a server span per request."""
+
+    def __init__(self, app: Optional[ASGIApp] = None, tracer: Optional[Tracer] = None):
+        super().__init__(app)
+        self.tracer = tracer if tracer is not None else get_tracer()
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """
+        Start the server span from the incoming ``traceparent``, if any.
+
+        Args:
+            ctx: The per-request context
+
+        Returns:
+            None, the request always continues
+        """
+        parent = None
+        for name, value in ctx.scope["headers"]:
+            if name == _TRACEPARENT:
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        span = self.tracer.start_span(
+            f"{ctx.method} {ctx.path}",
+            parent=parent,
+            attributes={"http.method": ctx.method, "http.target": ctx.path},
+        )
+        if ctx.request_id is not None:
+            span.attributes["request_id"] = ctx.request_id
+        ctx.span = span.activate()
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """Return the server span's ``traceparent`` to the caller."""
+        if ctx.span is not None:
+            value = ctx.span.context.to_traceparent().encode("latin-1")
+            replace_headers(headers, [(_TRACEPARENT, value)], _NAMES)
+
+    def on_response_complete(self, ctx: RequestContext) -> None:
+        """End the server span, named after the matched route template."""
+        span = ctx.span
+        if span is None:
+            return
+        route = getattr(ctx.scope.get("route"), "path_format", None)
+        if route is not None:
+            span.name = f"{ctx.method} {route}"
+            span.attributes["http.route"] = route
+        span.attributes["http.status_code"] = ctx.status_code
+        if ctx.status_code >= 500:
+            span.error = True
+        span.end()
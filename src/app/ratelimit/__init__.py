@@ -0,0 +1,21 @@
+"""
+DocuQuery AI - Rate Limiting Package
+
+This package contains the rate limiting algorithms and stores used by the
+rate limit middleware stage.
+"""
+
+from .distributed import DistributedRateLimiter
+from .gcra import GCRALimiter, GCRAStore, RateLimitResult
+from .quotas import QuotaDecision, QuotaEngine, QuotaTicket, charge_llm_usage
+
+__all__ = [
+    "DistributedRateLimiter",
+    "GCRALimiter",
+    "GCRAStore",
+    "QuotaDecision",
+    "QuotaEngine",
+    "QuotaTicket",
+    "RateLimitResult",
+    "charge_llm_usage",
+]
@@ -0,0 +1,242 @@
+"""
+DocuQuery AI - Distributed Rate Limiter
+
+This module enforces one rate limit across every worker and pod by keeping the
+GCRA state in Redis. A single Lua script grants tokens atomically, and each
+worker leases a small batch of tokens per key so most requests are decided
+locally without a Redis round-trip. Unused tokens are handed back on shutdown,
+and when Redis is unreachable the limiter falls back to the in-process GCRA
+limiter until Redis recovers.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .gcra import GCRALimiter, RateLimitResult
+
+logger = logging.getLogger("docuquery.ratelimit")
+
+# KEYS[1]: bucket key
+# ARGV[1]: emission interval (us), ARGV[2]: period (us), ARGV[3]: tokens wanted;
+#          a negative count hands unused tokens back
+# Returns {granted, microseconds until the bucket is full again}
+LEASE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local granted = 0
+if want < 0 then
+    tat = math.max(now, tat + want * interval)
+else
+    granted = math.min(want, math.floor((now + period - tat) / interval))
+    if granted < 0 then granted = 0 end
+    tat = tat + granted * interval
+end
+if tat <= now then
+    redis.call('DEL', KEYS[1])
+    return {granted, 0}
+end
+redis.call('SET', KEYS[1], string.format('%d', tat), 'PX', math.ceil((tat - now) / 1000) + 1)
+return {granted, math.floor(tat - now)}
+"""
+
+
+class _Lease:
+    """Tokens a worker holds for one key, plus the bucket state when leased."""
+
+    __slots__ = ("tokens", "full_at")
+
+    def __init__(self, tokens: int, full_at: float):
+        self.tokens = tokens
+        self.full_at = full_at
+
+
+class DistributedRateLimiter:
+    """
+    Redis-backed GCRA limiter with local token leasing.
+
+    Leased tokens have already been deducted from the shared bucket, so using
+    them later never exceeds the global rate; the cost of leasing is that a
+    key's last few tokens may sit idle in another worker until it hands them
+    back. Keep ``lease_size`` small relative to the limit.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        limit: int,
+        period: float,
+        lease_size: int = 10,
+        max_leases: int = 10000,
+        key_prefix: str = "docuquery:ratelimit:",
+        fallback: Optional[GCRALimiter] = None,
+        retry_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit and period must be positive")
+        self.redis = redis_client
+        self.limit = limit
+        self.period = float(period)
+        self.emission_interval = self.period / limit
+        self.lease_size = max(1, min(lease_size, limit))
+        self.max_leases = max_leases
+        self.key_prefix = key_prefix
+        self.fallback = fallback if fallback is not None else GCRALimiter(limit, period)
+        self.retry_interval = retry_interval
+        self.clock = clock
+
+        self._script = redis_client.register_script(LEASE_SCRIPT)
+        self._interval_us = int(self.emission_interval * 1_000_000)
+        self._period_us = int(self.period * 1_000_000)
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._returns: Dict[str, int] = {}
+        self._inflight: Dict[str, "asyncio.Future[None]"] = {}
+        self._redis_down_until = 0.0
+        self.round_trips = 0
+
+    async def acquire(self, key: str, cost: float = 1.0) -> RateLimitResult:
+        """
+        Try to spend ``cost`` tokens for a key.
+
+        Args:
+            key: Client identifier
+            cost: Number of requests this call counts as
+
+        Returns:
+            The decision together with remaining quota and reset timing
+        """
+        tokens = max(1, math.ceil(cost))
+        lease = self._leases.get(key)
+        if lease is None or lease.tokens < tokens:
+            if self.clock() < self._redis_down_until:
+                return self.fallback.acquire(key, cost)
+            try:
+                await self._refill(key, tokens)
+            except Exception as exc:  # Redis errors differ between clients
+                logger.warning("Redis rate limiter unavailable, using local limiter: %s", exc)
+                self._redis_down_until = self.clock() + self.retry_interval
+                return self.fallback.acquire(key, cost)
+            lease = self._leases.get(key)
+
+        now = self.clock()
+        if lease is None or lease.tokens < tokens:
+            reset_after = max(0.0, lease.full_at - now) if lease is not None else 0.0
+            return RateLimitResult(
+                allowed=False,
+                limit=self.limit,
+                remaining=0,
+                reset_after=reset_after,
+                retry_after=max(
+                    self.emission_interval,
+                    reset_after - self.period + self.emission_interval * tokens,
+                ),
+            )
+
+        lease.tokens -= tokens
+        self._leases.move_to_end(key)
+        reset_after = max(0.0, lease.full_at - now)
+        shared_remaining = int((self.period - reset_after) / self.emission_interval)
+        return RateLimitResult(
+            allowed=True,
+            limit=self.limit,
+            remaining=max(0, shared_remaining) + lease.tokens,
+            reset_after=reset_after,
+            retry_after=0.0,
+        )
+
+    async def _refill(self, key: str, tokens: int) -> None:
+        """Lease tokens for a key, sharing one round-trip between concurrent callers."""
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            await asyncio.shield(pending)
+            lease = self._leases.get(key)
+            if lease is not None and lease.tokens >= tokens:
+                return
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            await self._lease(key, max(tokens, self.lease_size))
+        except Exception as exc:
+            # Waiters see the same error and fall back like this caller
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.set_result(None)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _lease(self, key: str, want: int) -> None:
+        """Fetch tokens for a key, piggybacking pending returns on the same round-trip."""
+        returns = self._take_returns()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for returned_key, count in returns:
+                await self._script(
+                    keys=[self.key_prefix + returned_key],
+                    args=[self._interval_us, self._period_us, -count],
+                    client=pipe,
+                )
+            await self._script(
+                keys=[self.key_prefix + key],
+                args=[self._interval_us, self._period_us, want],
+                client=pipe,
+            )
+            results = await pipe.execute()
+        self.round_trips += 1
+
+        granted, full_in_us = (int(v) for v in results[-1])
+        full_at = self.clock() + full_in_us / 1_000_000
+        lease = self._leases.get(key)
+        if lease is None:
+            lease = _Lease(0, full_at)
+            self._leases[key] = lease
+            self._evict_leases()
+        lease.tokens += granted
+        lease.full_at = full_at
+
+    def _evict_leases(self) -> None:
+        """Bound the lease table; tokens of evicted leases are returned later."""
+        while len(self._leases) > self.max_leases:
+            key, lease = self._leases.popitem(last=False)
+            if lease.tokens:
+                self._returns[key] = self._returns.get(key, 0) + lease.tokens
+
+    def _take_returns(self) -> List[Tuple[str, int]]:
+        returns = list(self._returns.items())
+        self._returns.clear()
+        return returns
+
+    async def aclose(self) -> None:
+        """Hand every unused leased token back to the shared buckets."""
+        for key, lease in self._leases.items():
+            if lease.tokens:
+                self._returns[key] = self._returns.get(key, 0) + lease.tokens
+        self._leases.clear()
+        returns = self._take_returns()
+        if not returns:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, count in returns:
+                    await self._script(
+                        keys=[self.key_prefix + key],
+                        args=[self._interval_us, self._period_us, -count],
+                        client=pipe,
+                    )
+                await pipe.execute()
+            self.round_trips += 1
+        except Exception as exc:
+            logger.warning("Could not return %d rate limit leases: %s", len(returns), exc)
@@ -0,0 +1,216 @@
+"""
+DocuQuery AI - GCRA Rate Limiter
+
+This module implements the generic cell rate algorithm (GCRA), a token-bucket
+equivalent that stores a single float per key: the theoretical arrival time
+(TAT) of the next request. Keys live in a fixed-capacity, sharded table whose
+slots are reclaimed by a clock sweep, so memory stays flat no matter how many
+distinct clients are seen.
+"""
+
+import time
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Absorbs float drift from summing emission intervals
+_EPSILON = 1e-9
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check, with everything needed for headers."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+
+class _Shard:
+    """One fixed-size slice of the key table with its own clock hand."""
+
+    __slots__ = ("index", "keys", "tats", "referenced", "free", "hand", "capacity")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.index: Dict[str, int] = {}
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.tats = array("d", bytes(8 * capacity))
+        self.referenced = bytearray(capacity)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.hand = 0
+
+
+class GCRAStore:
+    """
+    Fixed-capacity, sharded table mapping keys to their TAT.
+
+    A slot whose TAT is in the past belongs to an idle key: its bucket has
+    refilled completely, so dropping it is indistinguishable from keeping it.
+    When a shard is full the clock hand evicts the first idle slot it finds,
+    giving referenced slots a second chance; only if a whole sweep finds no
+    idle slot is a busy key evicted (counted in ``forced_evictions``).
+
+    The store is not thread-safe; it is meant to be used from the event loop.
+    """
+
+    def __init__(self, capacity: int = 65536, shards: int = 16):
+        if shards <= 0 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two")
+        per_shard = max(1, -(-capacity // shards))
+        self.capacity = per_shard * shards
+        self._mask = shards - 1
+        self._shards = [_Shard(per_shard) for _ in range(shards)]
+        self.evictions = 0
+        self.forced_evictions = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard.index) for shard in self._shards)
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) & self._mask]
+
+    def get(self, key: str) -> Optional[float]:
+        """Get the stored TAT for a key, or None if the key is not tracked."""
+        shard = self._shard(key)
+        slot = shard.index.get(key)
+        if slot is None:
+            return None
+        shard.referenced[slot] = 1
+        return shard.tats[slot]
+
+    def set(self, key: str, tat: float, now: float) -> None:
+        """Store the TAT for a key, evicting another key if the shard is full."""
+        shard = self._shard(key)
+        slot = shard.index.get(key)
+        if slot is None:
+            slot = shard.free.pop() if shard.free else self._evict(shard, now)
+            shard.index[key] = slot
+            shard.keys[slot] = key
+        shard.tats[slot] = tat
+        shard.referenced[slot] = 1
+
+    def _evict(self, shard: _Shard, now: float) -> int:
+        """Run the clock hand until a slot can be reused; amortized O(1)."""
+        tats = shard.tats
+        referenced = shard.referenced
+        capacity = shard.capacity
+        hand = shard.hand
+        # Two passes at most: the first clears reference bits
+        for _ in range(2 * capacity):
+            slot = hand
+            hand = hand + 1 if hand + 1 < capacity else 0
+            if tats[slot] <= now:
+                break
+            if referenced[slot]:
+                referenced[slot] = 0
+                continue
+            self.forced_evictions += 1
+            break
+        shard.hand = hand
+        del shard.index[shard.keys[slot]]
+        self.evictions += 1
+        return slot
+
+
+class GCRALimiter:
+    """Rate limiter allowing ``limit`` requests per ``period`` seconds per key."""
+
+    def __init__(
+        self,
+        limit: int,
+        period: float,
+        store: Optional[GCRAStore] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit and period must be positive")
+        self.limit = limit
+        self.period = float(period)
+        self.emission_interval = self.period / limit
+        self.store = store if store is not None else GCRAStore()
+        self.clock = clock
+
+    def acquire(self, key: str, cost: float = 1.0) -> RateLimitResult:
+        """
+        Try to spend ``cost`` units for a key.
+
+        Args:
+            key: Client identifier
+            cost: Number of requests this call counts as
+
+        Returns:
+            The decision together with remaining quota and reset timing
+        """
+        now = self.clock()
+        result, new_tat = self.check(key, cost, now)
+        if result.allowed:
+            self.store.set(key, new_tat, now)
+        return result
+
+    def check(self, key: str, cost: float, now: float) -> Tuple[RateLimitResult, float]:
+        """
+        Decide on ``cost`` units for a key without storing anything.
+
+        Callers that must admit several limits all-or-nothing check each one
+        first and then ``commit`` the returned TATs.
+
+        Returns:
+            The decision and the TAT to commit if it is allowed
+        """
+        stored = self.store.get(key)
+        tat = stored if stored is not None and stored > now else now
+        new_tat = tat + self.emission_interval * cost
+        # Reject when the new TAT would run further ahead than one full period
+        allow_at = new_tat - self.period
+        if allow_at - now > _EPSILON:
+            return (
+                RateLimitResult(
+                    allowed=False,
+                    limit=self.limit,
+                    remaining=0,
+                    reset_after=tat - now,
+                    retry_after=allow_at - now,
+                ),
+                tat,
+            )
+        return (
+            RateLimitResult(
+                allowed=True,
+                limit=self.limit,
+                remaining=int(
+                    (now + self.period - new_tat) / self.emission_interval + _EPSILON
+                ),
+                reset_after=new_tat - now,
+                retry_after=0.0,
+            ),
+            new_tat,
+        )
+
+    def commit(self, key: str, new_tat: float, now: float) -> None:
+        """Store a TAT returned by an allowed ``check``."""
+        self.store.set(key, new_tat, now)
+
+    def charge(self, key: str, cost: float) -> None:
+        """
+        Spend ``cost`` units unconditionally, e.g. for usage known only after
+        the request finished. The key may go into debt, which delays its next
+        admitted request until the debt has drained.
+        """
+        now = self.clock()
+        stored = self.store.get(key)
+        tat = stored if stored is not None and stored > now else now
+        self.store.set(key, tat + self.emission_interval * cost, now)
+
+    def peek(self, key: str) -> RateLimitResult:
+        """Report the current quota for a key without spending anything."""
+        now = self.clock()
+        stored = self.store.get(key)
+        tat = stored if stored is not None and stored > now else now
+        return RateLimitResult(
+            allowed=tat - now + self.emission_interval - self.period <= _EPSILON,
+            limit=self.limit,
+            remaining=int((now + self.period - tat) / self.emission_interval + _EPSILON),
+            reset_after=tat - now,
+            retry_after=max(0.0, tat + self.emission_interval - self.period - now),
+        )
@@ -0,0 +1,165 @@
+"""
+DocuQuery AI - Tenant Quota Engine
+
+This module implements cost-weighted, hierarchical quotas. Every request is
+charged its route's declared cost against nested limits - global, tenant,
+user, then route - and is admitted only if all of them have room. LLM token
+usage is charged afterwards against the same hierarchy, so one noisy tenant
+runs out of its own quota before it can exhaust shared LLM throughput.
+"""
+
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .gcra import GCRALimiter, GCRAStore, RateLimitResult
+
+QUOTA_LEVELS = ("global", "tenant", "user", "route")
+
+# Cost of a route that declares none
+DEFAULT_ROUTE_COST = 1.0
+
+
+class QuotaTicket(NamedTuple):
+    """Identity of an admitted request, kept for charging usage later."""
+
+    tenant: str
+    user: str
+    route: str
+
+
+class QuotaDecision(NamedTuple):
+    """Outcome of a quota check at the most constrained level."""
+
+    allowed: bool
+    level: str
+    result: RateLimitResult
+    ticket: QuotaTicket
+
+
+class QuotaEngine:
+    """
+    Admission control over nested global/tenant/user/route limits.
+
+    Limits are expressed in cost units per ``period`` seconds. Routes are
+    matched on ``"METHOD /path"`` without a trailing slash; routes under one
+    of the ``bypass_prefixes`` skip the engine entirely.
+    """
+
+    def __init__(
+        self,
+        global_units: int,
+        tenant_units: int,
+        user_units: int,
+        route_units: int,
+        period: float,
+        route_costs: Optional[Dict[str, float]] = None,
+        bypass_prefixes: Iterable[str] = (),
+        tokens_per_unit: int = 100,
+        max_keys: int = 65536,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.period = period
+        self.tokens_per_unit = tokens_per_unit
+        self.route_costs = {
+            self._route_key(*route.split(" ", 1)): float(cost)
+            for route, cost in (route_costs or {}).items()
+        }
+        self.bypass_prefixes = tuple(bypass_prefixes)
+        self.clock = clock
+        self._limiters = [
+            GCRALimiter(units, period, store=GCRAStore(capacity=capacity), clock=clock)
+            for units, capacity in (
+                (global_units, 16),
+                (tenant_units, max_keys),
+                (user_units, max_keys),
+                (route_units, max_keys),
+            )
+        ]
+
+    @staticmethod
+    def _route_key(method: str, path: str) -> str:
+        if len(path) > 1 and path.endswith("/"):
+            path = path[:-1]
+        return f"{method.upper()} {path}"
+
+    def route_cost(self, method: str, path: str) -> Tuple[Optional[str], float]:
+        """
+        Look up the declared route and its cost.
+
+        Returns:
+            The route key and its cost; the route key is None for bypassed
+            paths, and "*" for routes without a declared cost
+        """
+        if path.startswith(self.bypass_prefixes):
+            return None, 0.0
+        route = self._route_key(method, path)
+        cost = self.route_costs.get(route)
+        if cost is None:
+            return "*", DEFAULT_ROUTE_COST
+        return route, cost
+
+    def _keys(self, ticket: QuotaTicket) -> List[str]:
+        return [
+            "global",
+            ticket.tenant,
+            f"{ticket.tenant}\x00{ticket.user}",
+            f"{ticket.tenant}\x00{ticket.user}\x00{ticket.route}",
+        ]
+
+    def acquire(self, ticket: QuotaTicket, cost: float) -> QuotaDecision:
+        """
+        Admit a request only if every level has room for its cost.
+
+        Args:
+            ticket: Tenant, user and route of the request
+            cost: Declared cost of the route
+
+        Returns:
+            The decision, reporting the most constrained level
+        """
+        now = self.clock()
+        planned = []
+        tightest: Optional[Tuple[str, RateLimitResult]] = None
+        for level, limiter, key in zip(QUOTA_LEVELS, self._limiters, self._keys(ticket)):
+            result, new_tat = limiter.check(key, cost, now)
+            if not result.allowed:
+                return QuotaDecision(False, level, result, ticket)
+            planned.append((limiter, key, new_tat))
+            if tightest is None or result.remaining < tightest[1].remaining:
+                tightest = (level, result)
+
+        for limiter, key, new_tat in planned:
+            limiter.commit(key, new_tat, now)
+        assert tightest is not None
+        return QuotaDecision(True, tightest[0], tightest[1], ticket)
+
+    def charge_tokens(self, ticket: QuotaTicket, tokens: int) -> None:
+        """
+        Charge LLM token usage after the call completed.
+
+        The route level is left out: its cost was declared up front, while
+        token usage is shared capacity that counts against tenant and user.
+        """
+        units = tokens / self.tokens_per_unit
+        if units <= 0:
+            return
+        keys = self._keys(ticket)
+        for limiter, key in zip(self._limiters[:3], keys[:3]):
+            limiter.charge(key, units)
+
+
+def charge_llm_usage(state: object, tokens: int) -> None:
+    """
+    Charge LLM token usage for the request owning ``state``.
+
+    Services call this with ``request.state`` after an LLM call completes;
+    it is a no-op when quotas are disabled or the route bypassed them.
+
+    Args:
+        state: The request state carrying ``quota`` and ``quota_engine``
+        tokens: Prompt plus completion tokens reported by the provider
+    """
+    ticket = getattr(state, "quota", None)
+    engine = getattr(state, "quota_engine", None)
+    if ticket is not None and engine is not None:
+        engine.charge_tokens(ticket, tokens)
@@ -0,0 +1,300 @@
+"""
+DocuQuery AI - Semantic Answer Cache
+
+This module serves paraphrased questions from earlier answers. For each
+tenant it keeps the embeddings of answered questions in a small in-memory
+matrix; a new question whose cosine similarity to a stored one passes the
+threshold gets the stored answer and citations without vector search or an
+LLM call. Entries are grouped by retrieval scope (``top_k`` and document
+filter), expire after a TTL, and are dropped as soon as any document they
+cite is re-ingested or deleted. The memory held by all tenants together is
+bounded: past the budget, answers of the least recently used tenant and
+scope are evicted first, and indexes left empty are dropped.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from .filters import SearchFilter
+from .schemas import Citation
+
+# Retrieval options an answer depends on: top_k and the filter
+Scope = Tuple[int, Optional[Hashable]]
+
+# Rough bookkeeping cost of an entry and a citation beyond their text
+_ENTRY_OVERHEAD = 200
+_CITATION_OVERHEAD = 300
+
+
+class CachedAnswer:
+    """A stored answer with the citations it was grounded on."""
+
+    __slots__ = ("answer", "citations", "document_ids", "nbytes")
+
+    def __init__(self, answer: str, citations: Sequence[Citation]):
+        self.answer = answer
+        self.citations = list(citations)
+        self.document_ids = frozenset(c.document_id for c in self.citations)
+        # Approximate: the text dominates what an entry holds
+        self.nbytes = len(answer) + sum(
+            len(c.content) + len(c.document_title) + _CITATION_OVERHEAD for c in self.citations
+        ) + _ENTRY_OVERHEAD
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class _AnswerIndex:
+    """Answers of one tenant and scope with their unit-length question vectors."""
+
+    def __init__(self, dimensions: int, max_entries: int):
+        self.max_entries = max_entries
+        capacity = min(16, max_entries)
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Optional[CachedAnswer]] = []
+        self.by_document: Dict[str, Set[int]] = {}
+        self.size = 0
+        self.entry_bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the matrices and the stored answers."""
+        return self.vectors.nbytes + self.expires.nbytes + self.last_used.nbytes + self.entry_bytes
+
+    def _valid(self, now: float) -> np.ndarray:
+        return self.expires[: len(self.entries)] > now
+
+    def lookup(self, vector: np.ndarray, now: float) -> Tuple[int, float]:
+        """Slot and similarity of the closest live entry, or (-1, -1.0)."""
+        count = len(self.entries)
+        if not count:
+            return -1, -1.0
+        similarities = self.vectors[:count] @ vector
+        similarities[~self._valid(now)] = -np.inf
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def _free_slot(self, now: float) -> int:
+        count = len(self.entries)
+        free = np.flatnonzero(~self._valid(now))
+        if free.size:
+            slot = int(free[0])
+            self.remove(slot)
+            return slot
+        if count < self.max_entries:
+            if count == len(self.vectors):
+                capacity = min(count * 2, self.max_entries)
+                self.vectors = _grow(self.vectors, capacity)
+                self.expires = _grow(self.expires, capacity)
+                self.last_used = _grow(self.last_used, capacity)
+            self.entries.append(None)
+            return count
+        # Full: evict the least recently used answer
+        slot = int(np.argmin(self.last_used[:count]))
+        self.remove(slot)
+        return slot
+
+    def add(self, vector: np.ndarray, entry: CachedAnswer, now: float, ttl: float) -> None:
+        slot = self._free_slot(now)
+        self.vectors[slot] = vector
+        self.expires[slot] = now + ttl
+        self.last_used[slot] = now
+        self.entries[slot] = entry
+        self.size += 1
+        self.entry_bytes += entry.nbytes
+        for document_id in entry.document_ids:
+            self.by_document.setdefault(document_id, set()).add(slot)
+
+    def remove(self, slot: int) -> None:
+        entry = self.entries[slot]
+        self.expires[slot] = 0.0
+        self.entries[slot] = None
+        if entry is None:
+            return
+        self.size -= 1
+        self.entry_bytes -= entry.nbytes
+        for document_id in entry.document_ids:
+            slots = self.by_document.get(document_id)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self.by_document[document_id]
+
+    def evict_oldest(self) -> None:
+        """Remove the least recently used stored answer, expired or not."""
+        count = len(self.entries)
+        last_used = np.where(self.expires[:count] > 0, self.last_used[:count], np.inf)
+        self.remove(int(np.argmin(last_used)))
+
+    def live_count(self, now: float) -> int:
+        return int(np.count_nonzero(self._valid(now)))
+
+
+class SemanticAnswerCache:
+    """
+    Per-tenant cache of answers, looked up by question similarity.
+
+    Args:
+        threshold: Minimum cosine similarity for a stored answer to be served
+        max_entries: Answers kept per tenant and scope
+        ttl: Seconds an answer stays valid
+        max_bytes: Memory budget of all tenants and scopes together
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl: float = 86400.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._tenants: Dict[str, Dict[Scope, _AnswerIndex]] = {}
+        # Every index, least recently used first
+        self._recent: "OrderedDict[Tuple[str, Scope], _AnswerIndex]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope(top_k: int, filters: Union[SearchFilter, Sequence[str], None]) -> Scope:
+        search_filter = SearchFilter.coerce(filters)
+        return top_k, search_filter.key if search_filter is not None else None
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> Optional[np.ndarray]:
+        norm = float(np.linalg.norm(vector))
+        if not norm:
+            return None
+        return np.asarray(vector, dtype=np.float32) / norm
+
+    def lookup(
+        self, tenant_id: str, vector: np.ndarray, scope: Scope
+    ) -> Optional[Tuple[CachedAnswer, float]]:
+        """
+        Find a stored answer to a similar question.
+
+        Args:
+            tenant_id: Tenant asking
+            vector: Question embedding
+            scope: Retrieval scope, see ``scope``
+
+        Returns:
+            The answer and its similarity, or None below the threshold
+        """
+        index = self._tenants.get(tenant_id, {}).get(scope)
+        unit = self._unit(vector)
+        if index is None or unit is None:
+            self.misses += 1
+            return None
+        now = self.clock()
+        slot, similarity = index.lookup(unit, now)
+        if slot < 0 or similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._recent.move_to_end((tenant_id, scope))
+        index.last_used[slot] = now
+        entry = index.entries[slot]
+        assert entry is not None
+        return entry, similarity
+
+    def store(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        scope: Scope,
+        answer: str,
+        citations: Sequence[Citation],
+    ) -> None:
+        """
+        Remember an answer; answers without citations are not cached since
+        no document change could invalidate them.
+        """
+        unit = self._unit(vector)
+        if not citations or unit is None:
+            return
+        indexes = self._tenants.setdefault(tenant_id, {})
+        index = indexes.get(scope)
+        if index is None:
+            index = indexes[scope] = _AnswerIndex(len(unit), self.max_entries)
+            self._recent[(tenant_id, scope)] = index
+            before = 0
+        else:
+            self._recent.move_to_end((tenant_id, scope))
+            before = index.nbytes
+        index.add(unit, CachedAnswer(answer, citations), self.clock(), self.ttl)
+        self.bytes += index.nbytes - before
+        self._evict()
+
+    def _evict(self) -> None:
+        """Evict the oldest answers of the least recently used indexes until within budget."""
+        while self.bytes > self.max_bytes and self._recent:
+            (tenant_id, scope), index = next(iter(self._recent.items()))
+            if index.size:
+                before = index.nbytes
+                index.evict_oldest()
+                self.bytes += index.nbytes - before
+            if not index.size:
+                self._drop(tenant_id, scope)
+
+    def _drop(self, tenant_id: str, scope: Scope) -> None:
+        index = self._recent.pop((tenant_id, scope))
+        self.bytes -= index.nbytes
+        indexes = self._tenants[tenant_id]
+        del indexes[scope]
+        if not indexes:
+            del self._tenants[tenant_id]
+
+    def invalidate_document(self, tenant_id: str, document_id: str) -> int:
+        """
+        Drop every answer of a tenant citing a document.
+
+        Returns:
+            Number of answers dropped
+        """
+        dropped = 0
+        for scope, index in list(self._tenants.get(tenant_id, {}).items()):
+            slots = index.by_document.get(document_id)
+            if not slots:
+                continue
+            before = index.nbytes
+            for slot in list(slots):
+                index.remove(slot)
+                dropped += 1
+            self.bytes += index.nbytes - before
+            if not index.size:
+                self._drop(tenant_id, scope)
+        return dropped
+
+    def clear(self, tenant_id: Optional[str] = None) -> None:
+        """Drop the answers of a tenant, or of every tenant if None."""
+        if tenant_id is None:
+            self._tenants.clear()
+            self._recent.clear()
+            self.bytes = 0
+            return
+        for scope in list(self._tenants.get(tenant_id, ())):
+            self._drop(tenant_id, scope)
+
+    def __len__(self) -> int:
+        now = self.clock()
+        return sum(
+            index.live_count(now)
+            for indexes in self._tenants.values()
+            for index in indexes.values()
+        )
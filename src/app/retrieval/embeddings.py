@@ -0,0 +1,350 @@
+"""
+DocuQuery AI - Query Embeddings
+
+This module turns query text into embedding vectors and caches them in two
+tiers: an in-process LRU bounded by a byte budget and a TTL, holding compact
+float16 or float32 arrays, and a Redis tier shared by every worker. Keys are
+derived from the normalized query text, the embedding model and the tenant,
+so repeated questions skip the embedding API round trip. Concurrent misses
+on the same key share one embedding call, and ``BatchingEmbedder`` gathers
+misses on different keys into one provider call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.llm.client import OpenAIClient
+
+logger = logging.getLogger("docuquery.embeddings")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Per-entry bookkeeping (key, tuple, OrderedDict node) counted against the budget
+_ENTRY_OVERHEAD = 200
+
+# Metric families reported by ``EmbeddingCache.metric_samples``
+EMBEDDING_CACHE_METRICS = {
+    "docuquery_embedding_cache_requests_total": ("counter", "Query embedding lookups by result."),
+    "docuquery_embedding_cache_bytes": ("gauge", "Memory held by the in-process tier."),
+}
+
+
+def normalize_query(text: str) -> str:
+    """
+    Canonical form of a query for cache keys.
+
+    Applies NFKC normalization and case folding, collapses whitespace and
+    drops trailing sentence punctuation, so "What is X?" and "what is  x"
+    share an entry.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!. ")
+
+
+class Embedder:
+    """Produces embedding vectors for texts with one model."""
+
+    model: str = ""
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Returns:
+            A ``(len(texts), dimensions)`` float32 array
+        """
+        raise NotImplementedError
+
+
+class OpenAIEmbedder(Embedder):
+    """Embedder backed by the OpenAI embeddings endpoint."""
+
+    def __init__(self, client: OpenAIClient, model: str):
+        self.client = client
+        self.model = model
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows = await self.client.embed(texts, self.model)
+        return np.asarray(rows, dtype=np.float32)
+
+
+class BatchingEmbedder(Embedder):
+    """
+    Gathers concurrent embedding requests into one call of another embedder.
+
+    Texts wait until ``max_batch`` are pending or ``max_wait`` seconds have
+    passed since the first of them arrived, whichever is sooner, and are then
+    embedded together. Under light load a request waits at most
+    ``max_wait``; under heavy load batches fill before the deadline and
+    provider round trips drop by up to ``max_batch`` times.
+
+    Args:
+        embedder: Embedder receiving the batches
+        max_batch: Texts per provider call
+        max_wait: Seconds the first text of a batch waits for others
+    """
+
+    def __init__(self, embedder: Embedder, max_batch: int = 64, max_wait: float = 0.005):
+        self.embedder = embedder
+        self.model = embedder.model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Sequence[str], "asyncio.Future[np.ndarray]"]] = []
+        self._size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: "set[asyncio.Task[None]]" = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if len(texts) >= self.max_batch:
+            return await self.embedder.embed(texts)
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[np.ndarray]" = loop.create_future()
+        self._pending.append((texts, future))
+        self._size += len(texts)
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._size = self._pending, [], 0
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._run(pending))
+            # The loop keeps only weak references to tasks
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, pending: List[Tuple[Sequence[str], "asyncio.Future[np.ndarray]"]]) -> None:
+        texts = [text for part, _ in pending for text in part]
+        self.batches += 1
+        self.texts += len(texts)
+        try:
+            rows = await self.embedder.embed(texts)
+        except BaseException as exc:
+            for _, future in pending:
+                if future.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        start = 0
+        for part, future in pending:
+            # Callers that gave up are skipped; their rows are discarded
+            if not future.done():
+                future.set_result(rows[start : start + len(part)])
+            start += len(part)
+
+
+class EmbeddingCache:
+    """
+    Two-tier, tenant-scoped cache of query embeddings.
+
+    Args:
+        embedder: Source of embeddings on a miss
+        max_bytes: Memory budget of the in-process tier
+        ttl: Seconds an in-process entry stays valid
+        dtype: Storage type, ``float16`` halves memory and Redis traffic at a
+            precision loss far below retrieval noise
+        redis: Optional async Redis client for the shared tier
+        shared_ttl: Seconds a shared entry stays valid
+        key_prefix: Namespace of the shared tier keys
+        retry_after: Seconds to skip the shared tier after a Redis error
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 3600.0,
+        dtype: str = "float16",
+        redis: Optional[Any] = None,
+        shared_ttl: int = 86400,
+        key_prefix: str = "docuquery:emb",
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.embedder = embedder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.dtype = np.dtype(dtype)
+        self.redis = redis
+        self.shared_ttl = shared_ttl
+        self.key_prefix = f"{key_prefix}:{self.dtype.name}"
+        self.retry_after = retry_after
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[np.ndarray]"] = {}
+        self._shared_down_until = 0.0
+        self.bytes = 0
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_errors = 0
+
+    def key(self, tenant_id: str, text: str) -> str:
+        """Cache key of a query for a tenant under the embedder's model."""
+        raw = "\x1f".join((self.embedder.model, tenant_id, normalize_query(text)))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def get(self, tenant_id: str, text: str) -> np.ndarray:
+        """
+        Embedding of a query, from cache when possible.
+
+        Args:
+            tenant_id: Tenant issuing the query
+            text: Query text
+
+        Returns:
+            A read-only float32 vector
+        """
+        key = self.key(tenant_id, text)
+        vector = self._get_local(key)
+        if vector is not None:
+            self.local_hits += 1
+            return vector
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        # Its own task, so a caller going away does not cancel it for the others
+        task = asyncio.get_running_loop().create_task(self._load(key, text))
+        self._inflight[key] = task
+        task.add_done_callback(partial(self._landed, key))
+        return await asyncio.shield(task)
+
+    def _landed(self, key: str, task: "asyncio.Task[np.ndarray]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller went away before it finished
+            task.exception()
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at <= self.clock():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return self._to_vector(stored)
+
+    def _to_vector(self, stored: np.ndarray) -> np.ndarray:
+        if stored.dtype == np.float32:
+            return stored
+        vector = stored.astype(np.float32)
+        vector.flags.writeable = False
+        return vector
+
+    async def _load(self, key: str, text: str) -> np.ndarray:
+        stored = await self._get_shared(key)
+        if stored is not None:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            embedded = await self.embedder.embed([text])
+            stored = np.ascontiguousarray(embedded[0], dtype=self.dtype)
+            await self._set_shared(key, stored)
+        stored.flags.writeable = False
+        self._put_local(key, stored)
+        return self._to_vector(stored)
+
+    def _put_local(self, key: str, stored: np.ndarray) -> None:
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (self.clock() + self.ttl, stored)
+        self.bytes += stored.nbytes + _ENTRY_OVERHEAD
+        while self.bytes > self.max_bytes and self._entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        _, stored = self._entries.pop(key)
+        self.bytes -= stored.nbytes + _ENTRY_OVERHEAD
+
+    def _shared_available(self) -> bool:
+        return self.redis is not None and self.clock() >= self._shared_down_until
+
+    def _shared_failed(self, exc: Exception) -> None:
+        self.shared_errors += 1
+        self._shared_down_until = self.clock() + self.retry_after
+        logger.warning("Embedding cache shared tier unavailable: %s", exc)
+
+    async def _get_shared(self, key: str) -> Optional[np.ndarray]:
+        if not self._shared_available():
+            return None
+        try:
+            raw = await self.redis.get(f"{self.key_prefix}:{key}")
+        except Exception as exc:
+            self._shared_failed(exc)
+            return None
+        if not raw or len(raw) % self.dtype.itemsize:
+            return None
+        return np.frombuffer(raw, dtype=self.dtype).copy()
+
+    async def _set_shared(self, key: str, stored: np.ndarray) -> None:
+        if not self._shared_available():
+            return
+        try:
+            await self.redis.set(f"{self.key_prefix}:{key}", stored.tobytes(), ex=self.shared_ttl)
+        except Exception as exc:
+            self._shared_failed(exc)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and the hit rate across both tiers."""
+        lookups = self.local_hits + self.shared_hits + self.misses + self.coalesced
+        hits = lookups - self.misses
+        return {
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "shared_errors": self.shared_errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+    def metric_samples(self) -> List[Tuple[str, str, float]]:
+        """
+        Counters for the metrics registry, which sums them over workers.
+
+        Families are described by ``EMBEDDING_CACHE_METRICS``.
+        """
+        samples: List[Tuple[str, str, float]] = [
+            ("docuquery_embedding_cache_requests_total", f'result="{result}"', value)
+            for result, value in (
+                ("local_hit", self.local_hits),
+                ("shared_hit", self.shared_hits),
+                ("coalesced", self.coalesced),
+                ("miss", self.misses),
+            )
+        ]
+        samples.append(("docuquery_embedding_cache_bytes", "", self.bytes))
+        return samples
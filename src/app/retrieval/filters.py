@@ -0,0 +1,330 @@
+"""
+DocuQuery AI - Metadata Filters
+
+This module implements retrieval filters on document, tag and date. A
+``SearchFilter`` is the normalized form of the ``filters`` of a query. Each
+in-process index keeps a ``MetadataIndex``: one compressed bitmap of chunk
+rows per document, tag, month and day. Bitmaps are roaring-style: rows are
+split by their high 16 bits into containers holding either a sorted array
+of the low bits (sparse) or a 65536-bit bitset (dense), so both rare and
+common values are cheap to store and to intersect. A date range is answered
+from whole-month bitmaps plus the days at either end.
+
+Knowing exactly how many rows a filter matches lets the index pick a plan:
+score only the matching rows, or scan everything with the filter applied as
+a mask (see ``plan``).
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Containers with more rows than this are stored as bitsets
+_ARRAY_MAX = 4096
+_BITSET_WORDS = 1 << 10
+
+# Plans chosen by ``plan``
+BRUTE_FORCE = "brute_force"
+SCAN = "scan"
+
+
+def _popcount(bits: np.ndarray) -> int:
+    return int(np.unpackbits(bits.view(np.uint8)).sum())
+
+
+def _bitset_to_low(bits: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bits.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _low_to_bitset(low: np.ndarray) -> np.ndarray:
+    flags = np.zeros(1 << 16, dtype=bool)
+    flags[low] = True
+    return np.packbits(flags, bitorder="little").view(np.uint64)
+
+
+def _compact(container: np.ndarray) -> np.ndarray:
+    """Store a container in whichever representation fits its cardinality."""
+    if container.dtype == np.uint64:
+        if _popcount(container) <= _ARRAY_MAX:
+            return _bitset_to_low(container)
+        return container
+    if container.size > _ARRAY_MAX:
+        return _low_to_bitset(container)
+    return container
+
+
+class Bitmap:
+    """
+    Compressed set of non-negative row numbers.
+
+    Containers are uint16 arrays of sorted low bits or uint64 bitsets of
+    ``_BITSET_WORDS`` words, keyed by the high 16 bits of the rows.
+    """
+
+    __slots__ = ("containers",)
+
+    def __init__(self, containers: Optional[Dict[int, np.ndarray]] = None):
+        self.containers: Dict[int, np.ndarray] = containers or {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[int]) -> "Bitmap":
+        bitmap = cls()
+        bitmap.add(np.fromiter(rows, dtype=np.int64) if not isinstance(rows, np.ndarray) else rows)
+        return bitmap
+
+    def add(self, rows: np.ndarray) -> None:
+        """Add rows, in any order."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if not rows.size:
+            return
+        highs = rows >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        for part in np.split(rows, bounds):
+            high = int(part[0] >> 16)
+            low = (part & 0xFFFF).astype(np.uint16)
+            existing = self.containers.get(high)
+            if existing is None:
+                merged = low
+            elif existing.dtype == np.uint64:
+                merged = existing | _low_to_bitset(low)
+            else:
+                merged = np.union1d(existing, low)
+            self.containers[high] = _compact(merged)
+
+    def __len__(self) -> int:
+        return sum(
+            _popcount(c) if c.dtype == np.uint64 else c.size for c in self.containers.values()
+        )
+
+    def __contains__(self, row: int) -> bool:
+        container = self.containers.get(row >> 16)
+        if container is None:
+            return False
+        low = row & 0xFFFF
+        if container.dtype == np.uint64:
+            return bool((int(container[low >> 6]) >> (low & 63)) & 1)
+        position = int(np.searchsorted(container, low))
+        return position < container.size and int(container[position]) == low
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.containers.values())
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        containers = dict(self.containers)
+        for high, theirs in other.containers.items():
+            ours = containers.get(high)
+            if ours is None:
+                containers[high] = theirs
+            elif ours.dtype == np.uint64 or theirs.dtype == np.uint64:
+                a = ours if ours.dtype == np.uint64 else _low_to_bitset(ours)
+                b = theirs if theirs.dtype == np.uint64 else _low_to_bitset(theirs)
+                containers[high] = a | b
+            else:
+                containers[high] = _compact(np.union1d(ours, theirs))
+        return Bitmap(containers)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        containers = {}
+        for high, ours in self.containers.items():
+            theirs = other.containers.get(high)
+            if theirs is None:
+                continue
+            if ours.dtype == np.uint64 and theirs.dtype == np.uint64:
+                merged = _compact(ours & theirs)
+            elif ours.dtype == np.uint64 or theirs.dtype == np.uint64:
+                bits, low = (ours, theirs) if ours.dtype == np.uint64 else (theirs, ours)
+                words = bits[low >> 6]
+                merged = low[((words >> (low & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)]
+            else:
+                merged = np.intersect1d(ours, theirs, assume_unique=True)
+            if merged.size:
+                containers[high] = merged
+        return Bitmap(containers)
+
+    @staticmethod
+    def union(bitmaps: Sequence["Bitmap"]) -> "Bitmap":
+        result = Bitmap()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
+
+    def to_rows(self) -> np.ndarray:
+        """Sorted rows as int64."""
+        parts = []
+        for high in sorted(self.containers):
+            container = self.containers[high]
+            low = _bitset_to_low(container) if container.dtype == np.uint64 else container
+            parts.append(low.astype(np.int64) + (high << 16))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+class SearchFilter:
+    """
+    Restriction of a search to documents, tags and a date range.
+
+    Conditions of different kinds must all hold; a chunk passes the tag
+    condition if it has any of the tags, and the date condition if its
+    document date is within the inclusive range.
+
+    Args:
+        document_ids: Allowed documents
+        tags: Tags of which a chunk must have at least one
+        start: First allowed date
+        end: Last allowed date
+    """
+
+    __slots__ = ("document_ids", "tags", "start", "end")
+
+    def __init__(
+        self,
+        document_ids: Optional[Iterable[str]] = None,
+        tags: Optional[Iterable[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        self.document_ids: Optional[FrozenSet[str]] = frozenset(document_ids) if document_ids is not None else None
+        self.tags: Optional[FrozenSet[str]] = frozenset(tags) if tags is not None else None
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def coerce(cls, value: Union["SearchFilter", Sequence[str], None]) -> Optional["SearchFilter"]:
+        """Accept a filter, a list of document IDs or None; empty filters become None."""
+        if value is None:
+            return None
+        if not isinstance(value, SearchFilter):
+            value = cls(document_ids=value) if value else None
+        if value is None or value.is_empty:
+            return None
+        return value
+
+    @property
+    def is_empty(self) -> bool:
+        return self.document_ids is None and self.tags is None and self.start is None and self.end is None
+
+    @property
+    def key(self) -> Hashable:
+        """Hashable identity, for caches keyed by filter."""
+        return (self.document_ids, self.tags, self.start, self.end)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SearchFilter) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def matches(self, document_id: str, tags: Sequence[str], day: Optional[date]) -> bool:
+        """Whether a single chunk passes; for stores without a metadata index."""
+        if self.document_ids is not None and document_id not in self.document_ids:
+            return False
+        if self.tags is not None and self.tags.isdisjoint(tags):
+            return False
+        if self.start is not None or self.end is not None:
+            if day is None:
+                return False
+            if (self.start is not None and day < self.start) or (self.end is not None and day > self.end):
+                return False
+        return True
+
+
+def _date_keys(start: date, end: date) -> List[Tuple[str, str]]:
+    """Bitmap keys covering ``start..end``: whole months, and days at the ends."""
+    keys: List[Tuple[str, str]] = []
+    day = start
+    while day <= end:
+        month_end = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        if day.day == 1 and month_end <= end:
+            keys.append(("month", day.strftime("%Y-%m")))
+            day = month_end + timedelta(days=1)
+        else:
+            keys.append(("day", day.isoformat()))
+            day += timedelta(days=1)
+    return keys
+
+
+class MetadataIndex:
+    """Bitmaps of the rows of each document, tag, month and day."""
+
+    def __init__(self) -> None:
+        self.bitmaps: Dict[Tuple[str, str], Bitmap] = {}
+        self.first_day: Optional[date] = None
+        self.last_day: Optional[date] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values())
+
+    def add(self, start: int, records: Sequence[Any]) -> None:
+        """Index records stored at rows ``start, start + 1, ...``."""
+        grouped: Dict[Tuple[str, str], List[int]] = {}
+        for row, record in enumerate(records, start):
+            grouped.setdefault(("document", record.document_id), []).append(row)
+            for tag in record.tags:
+                grouped.setdefault(("tag", tag), []).append(row)
+            if record.date is not None:
+                grouped.setdefault(("month", record.date.strftime("%Y-%m")), []).append(row)
+                grouped.setdefault(("day", record.date.isoformat()), []).append(row)
+                if self.first_day is None or record.date < self.first_day:
+                    self.first_day = record.date
+                if self.last_day is None or record.date > self.last_day:
+                    self.last_day = record.date
+        for key, rows in grouped.items():
+            bitmap = self.bitmaps.get(key)
+            if bitmap is None:
+                bitmap = self.bitmaps[key] = Bitmap()
+            bitmap.add(np.asarray(rows, dtype=np.int64))
+
+    def get(self, kind: str, value: str) -> Bitmap:
+        return self.bitmaps.get((kind, value)) or Bitmap()
+
+    def _conditions(self, search_filter: SearchFilter) -> List[List[Bitmap]]:
+        """For each condition, the bitmaps whose union it matches."""
+        conditions = []
+        if search_filter.document_ids is not None:
+            conditions.append([self.get("document", d) for d in search_filter.document_ids])
+        if search_filter.tags is not None:
+            conditions.append([self.get("tag", t) for t in search_filter.tags])
+        if search_filter.start is not None or search_filter.end is not None:
+            if self.first_day is None:
+                conditions.append([])
+            else:
+                start = max(search_filter.start or self.first_day, self.first_day)
+                end = min(search_filter.end or self.last_day, self.last_day)  # type: ignore[type-var]
+                conditions.append([self.bitmaps[k] for k in _date_keys(start, end) if k in self.bitmaps])
+        return conditions
+
+    def estimate(self, search_filter: SearchFilter) -> int:
+        """Upper bound of the rows matching, from bitmap sizes alone."""
+        return min(
+            (sum(len(b) for b in bitmaps) for bitmaps in self._conditions(search_filter)),
+            default=0,
+        )
+
+    def lookup(self, search_filter: SearchFilter) -> Bitmap:
+        """Rows matching the filter, tombstoned rows included."""
+        result: Optional[Bitmap] = None
+        conditions = sorted(self._conditions(search_filter), key=lambda bs: sum(len(b) for b in bs))
+        for bitmaps in conditions:
+            matched = Bitmap.union(bitmaps)
+            result = matched if result is None else result & matched
+            if not result.containers:
+                break
+        return result if result is not None else Bitmap()
+
+
+def plan(matching: int, total: int, brute_force_ratio: float) -> str:
+    """
+    Choose how to search with a filter.
+
+    Args:
+        matching: Rows passing the filter, exact or estimated
+        total: Rows searched without the filter
+        brute_force_ratio: Selectivity below which scoring only the matching
+            rows is cheaper than scanning every row with a filter mask
+
+    Returns:
+        ``BRUTE_FORCE`` or ``SCAN``
+    """
+    return BRUTE_FORCE if matching < brute_force_ratio * total else SCAN
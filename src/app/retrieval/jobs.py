@@ -0,0 +1,266 @@
+"""
+DocuQuery AI - Asynchronous Queries
+
+This module runs queries submitted with ``mode=async`` in the background.
+The request returns a query ID at once; a fixed pool of workers takes jobs
+from a priority queue, ordered by the tier of the submitting tenant and then
+by arrival, so a burst of long questions neither holds HTTP connections open
+nor grows the number of concurrent LLM calls. Finished results live in an
+in-process store with a TTL, read by ID in constant time, and callers can
+long-poll until a job finishes.
+
+Jobs and results are held by the worker that accepted them, so polling must
+reach the same worker (sticky routing) until a shared store is configured.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.common.exceptions import DocuQueryException, RateLimitError
+from app.telemetry.stages import StageTimer
+from app.telemetry.tracing import start_span
+
+from .schemas import QueryRequest, QueryResponse, QueryStatus
+
+logger = logging.getLogger("docuquery.jobs")
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueryJob:
+    """A submitted query and, once finished, its outcome."""
+
+    __slots__ = (
+        "query_id", "tenant_id", "query", "status", "response", "error",
+        "created_at", "completed_at", "expires_at", "done", "context", "on_answer",
+    )
+
+    def __init__(self, tenant_id: str, query: QueryRequest, expires_at: float):
+        self.query_id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.query = query
+        self.status = PENDING
+        self.response: Optional[QueryResponse] = None
+        self.error: Optional[Dict[str, str]] = None
+        self.created_at = datetime.utcnow()
+        self.completed_at: Optional[datetime] = None
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        # Request context (request ID, trace) the job continues in
+        self.context = contextvars.copy_context()
+        # Called with the response once answered, e.g. to charge its tokens
+        self.on_answer: Optional[Callable[[QueryResponse], None]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def to_status(self) -> QueryStatus:
+        """The job as returned by ``GET /query/{query_id}``."""
+        response = self.response
+        return QueryStatus(
+            id=self.query_id,
+            query=self.query.question,
+            status=self.status,
+            answer=response.answer if response is not None else None,
+            citations=response.citations if response is not None else [],
+            metadata=response.metadata if response is not None else None,
+            error=self.error,
+            created_at=self.created_at,
+            completed_at=self.completed_at,
+        )
+
+
+class ResultStore:
+    """
+    Jobs by ID, dropped a TTL after they finish.
+
+    Entries are kept in expiry order: a job moves to the back when it
+    finishes, so expired results are always at the front and are purged on
+    each write without scanning. Unfinished jobs are never purged.
+
+    Args:
+        ttl: Seconds a job is kept after it was submitted or finished
+        max_entries: Jobs kept at most; the oldest finished ones go first
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._jobs: "OrderedDict[str, QueryJob]" = OrderedDict()
+
+    def create(self, tenant_id: str, query: QueryRequest) -> QueryJob:
+        job = QueryJob(tenant_id, query, self.clock() + self.ttl)
+        self._jobs[job.query_id] = job
+        self._purge()
+        return job
+
+    def finished(self, job: QueryJob) -> None:
+        """Start a finished job's TTL."""
+        job.expires_at = self.clock() + self.ttl
+        if job.query_id in self._jobs:
+            self._jobs.move_to_end(job.query_id)
+        self._purge()
+
+    def get(self, tenant_id: str, query_id: str) -> Optional[QueryJob]:
+        """A tenant's job, or None if unknown, expired or another tenant's."""
+        job = self._jobs.get(query_id)
+        if job is None or job.tenant_id != tenant_id:
+            return None
+        if job.finished and job.expires_at <= self.clock():
+            return None
+        return job
+
+    def _purge(self) -> None:
+        jobs = self._jobs
+        now = self.clock()
+        while jobs:
+            job = next(iter(jobs.values()))
+            if not job.finished or (job.expires_at > now and len(jobs) <= self.max_entries):
+                break
+            jobs.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class QueryJobs:
+    """
+    Bounded background execution of queries, prioritized by tenant tier.
+
+    Args:
+        run: Coroutine function answering a query, ``run(tenant_id, query, query_id)``
+        store: Where jobs and results are kept
+        workers: Queries answered concurrently
+        max_pending: Queued jobs at most; submitting beyond this is refused
+        tenant_tiers: Tier of each tenant; others are in ``default_tier``
+        tier_priorities: Priority of each tier, lower runs first
+        default_tier: Tier of tenants not listed
+    """
+
+    def __init__(
+        self,
+        run: Callable[[str, QueryRequest, str], Awaitable[QueryResponse]],
+        store: ResultStore,
+        workers: int = 4,
+        max_pending: int = 1000,
+        tenant_tiers: Optional[Mapping[str, str]] = None,
+        tier_priorities: Optional[Mapping[str, int]] = None,
+        default_tier: str = "free",
+    ):
+        self.run = run
+        self.store = store
+        self.workers = workers
+        self.tenant_tiers = dict(tenant_tiers or {})
+        self.tier_priorities = dict(tier_priorities or {})
+        self.default_tier = default_tier
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, QueryJob]]" = asyncio.PriorityQueue(max_pending)
+        self._sequence = itertools.count()
+        self._workers: List["asyncio.Task[None]"] = []
+
+    def priority(self, tenant_id: str) -> int:
+        """Queue priority of a tenant's jobs; lower runs first."""
+        tier = self.tenant_tiers.get(tenant_id, self.default_tier)
+        return self.tier_priorities.get(tier, max(self.tier_priorities.values(), default=0))
+
+    def submit(
+        self,
+        tenant_id: str,
+        query: QueryRequest,
+        on_answer: Optional[Callable[[QueryResponse], None]] = None,
+    ) -> QueryJob:
+        """
+        Queue a query.
+
+        Args:
+            tenant_id: Tenant submitting the query
+            query: The question and retrieval options
+            on_answer: Called with the response when the query is answered
+
+        Raises:
+            RateLimitError: When the queue is full
+        """
+        if self._queue.full():
+            raise RateLimitError("Too many queries waiting; retry later", error_code="QUERY_QUEUE_FULL")
+        if not self._workers:
+            self._workers = [
+                asyncio.get_running_loop().create_task(self._work(), name=f"query-worker-{i}")
+                for i in range(self.workers)
+            ]
+        job = self.store.create(tenant_id, query)
+        job.on_answer = on_answer
+        self._queue.put_nowait((self.priority(tenant_id), next(self._sequence), job))
+        return job
+
+    def get(self, tenant_id: str, query_id: str) -> Optional[QueryJob]:
+        return self.store.get(tenant_id, query_id)
+
+    async def wait(self, job: QueryJob, timeout: float) -> QueryJob:
+        """Wait up to ``timeout`` seconds for a job to finish."""
+        if timeout > 0 and not job.finished:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await asyncio.get_running_loop().create_task(self._execute(job), context=job.context)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: QueryJob) -> None:
+        # Runs in a copy of the submitting request's context, with its own stages
+        StageTimer().activate()
+        job.status = RUNNING
+        with start_span("query.async", attributes={"query.id": job.query_id}):
+            try:
+                job.response = await self.run(job.tenant_id, job.query, job.query_id)
+                job.status = COMPLETED
+                if job.on_answer is not None:
+                    try:
+                        job.on_answer(job.response)
+                    except Exception:
+                        logger.exception("Post-processing asynchronous query %s failed", job.query_id)
+            except DocuQueryException as exc:
+                job.status = FAILED
+                job.error = {"error": exc.message, "code": exc.error_code or "UNKNOWN_ERROR"}
+            except Exception:
+                logger.exception("Asynchronous query %s failed", job.query_id)
+                job.status = FAILED
+                job.error = {"error": "Query failed", "code": "INTERNAL_ERROR"}
+            finally:
+                if not job.finished:
+                    # Cancelled at shutdown
+                    job.status = FAILED
+                    job.error = {"error": "Query was cancelled", "code": "CANCELLED"}
+                job.completed_at = datetime.utcnow()
+                self.store.finished(job)
+                job.done.set()
+
+    async def aclose(self) -> None:
+        """Stop the workers, failing the jobs still running."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
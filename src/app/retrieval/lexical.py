@@ -0,0 +1,657 @@
+"""
+DocuQuery AI - Lexical Index
+
+This module provides BM25 keyword search over document chunks, for the exact
+identifiers, error codes and part numbers that embeddings match poorly.
+Each tenant has an inverted index whose postings lists are stored as
+delta-encoded varints in blocks of 128, with the largest term frequency and
+the shortest chunk of every block kept alongside. Queries are evaluated term
+at a time with MaxScore: once the best possible score of the remaining terms
+falls below the current k-th best score, those terms are only looked up for
+the surviving candidates, decoding just the blocks that contain them.
+
+``LexicalStore`` loads tenants from a vector store's payloads on first use
+and mirrors writes afterwards; ``reciprocal_rank_fusion`` merges its results
+with vector search results.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.common.versions import TenantVersions
+from app.telemetry.tracing import run_in_executor
+
+from .local_index import _top
+from .filters import MetadataIndex, SearchFilter
+from .vector_store import ChunkRecord, FilterLike, SearchHit, VectorStore
+
+logger = logging.getLogger("docuquery.lexical")
+
+# Postings per compressed block
+BLOCK_SIZE = 128
+
+# Words, optionally joined by separators: "ERR-1042", "v2.3.1", "user_id"
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_SEPARATORS = re.compile(r"[-_./:]+")
+_MAX_TOKEN_LENGTH = 64
+
+_NO_VECTOR = np.zeros(0, dtype=np.float32)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms.
+
+    Compound tokens such as ``ERR-1042`` are kept whole, so identifiers match
+    exactly, and are also indexed by their parts.
+    """
+    terms: List[str] = []
+    for token in _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if len(token) > _MAX_TOKEN_LENGTH:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in _SEPARATORS.split(token) if part)
+    return terms
+
+
+def _varint_sizes(values: np.ndarray) -> np.ndarray:
+    """Bytes taken by each value as a varint."""
+    sizes = np.ones(values.size, dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest = rest >> np.uint64(7)
+    return sizes
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128-encode non-negative integers, 7 bits per byte."""
+    values = np.asarray(values, dtype=np.uint64)
+    if not values.size:
+        return b""
+    sizes = _varint_sizes(values)
+    if sizes.max() == 1:
+        return values.astype(np.uint8).tobytes()
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    starts = np.cumsum(sizes) - sizes
+    remaining = values.copy()
+    for group in range(int(sizes.max())):
+        present = sizes > group
+        more = (sizes[present] > group + 1).astype(np.uint8) << 7
+        out[starts[present] + group] = (remaining[present] & np.uint64(0x7F)).astype(np.uint8) | more
+        remaining >>= np.uint64(7)
+    return out.tobytes()
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode LEB128 bytes (a uint8 array) into int64 values."""
+    last = data < 0x80
+    if last.all():
+        return data.astype(np.int64)
+    ends = np.flatnonzero(last)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    value_of = np.cumsum(last) - last
+    shifts = 7 * (np.arange(data.size) - starts[value_of])
+    parts = (data & 0x7F).astype(np.int64) << shifts
+    return np.add.reduceat(parts, starts)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of ``arange(start, end)`` for each pair."""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+
+
+class _Postings:
+    """
+    Rows containing a term and the term's frequency in each, ascending.
+
+    Full blocks are compressed; the most recent postings stay in a plain
+    tail until a block fills up. Row deltas run across block boundaries, so
+    block ``b`` decodes relative to the last row of block ``b - 1``.
+    """
+
+    __slots__ = (
+        "rows", "freqs", "row_ends", "freq_ends", "block_last", "block_max_tf",
+        "block_min_length", "tail_rows", "tail_freqs", "count",
+    )
+
+    def __init__(self) -> None:
+        self.rows = bytearray()
+        self.freqs = bytearray()
+        self.row_ends = array("q")
+        self.freq_ends = array("q")
+        self.block_last = array("q")
+        self.block_max_tf = array("i")
+        self.block_min_length = array("i")
+        self.tail_rows: List[int] = []
+        self.tail_freqs: List[int] = []
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.rows) + len(self.freqs) + 28 * len(self.block_last) + 16 * len(self.tail_rows)
+
+    def extend(self, rows: List[int], freqs: List[int], lengths: np.ndarray) -> None:
+        self.tail_rows.extend(rows)
+        self.tail_freqs.extend(freqs)
+        self.count += len(rows)
+        full = len(self.tail_rows) // BLOCK_SIZE * BLOCK_SIZE
+        if full:
+            self._flush(full, lengths)
+
+    def _flush(self, count: int, lengths: np.ndarray) -> None:
+        rows = np.asarray(self.tail_rows[:count], dtype=np.int64)
+        freqs = np.asarray(self.tail_freqs[:count], dtype=np.int64)
+        base = self.block_last[-1] if self.block_last else 0
+        deltas = np.diff(rows, prepend=base)
+        row_sizes = _varint_sizes(deltas.astype(np.uint64)).reshape(-1, BLOCK_SIZE).sum(axis=1)
+        freq_sizes = _varint_sizes(freqs.astype(np.uint64)).reshape(-1, BLOCK_SIZE).sum(axis=1)
+        self.row_ends.extend((len(self.rows) + np.cumsum(row_sizes)).tolist())
+        self.freq_ends.extend((len(self.freqs) + np.cumsum(freq_sizes)).tolist())
+        self.rows += encode_varints(deltas)
+        self.freqs += encode_varints(freqs)
+        self.block_last.extend(rows[BLOCK_SIZE - 1 :: BLOCK_SIZE].tolist())
+        self.block_max_tf.extend(freqs.reshape(-1, BLOCK_SIZE).max(axis=1).tolist())
+        self.block_min_length.extend(lengths[rows].reshape(-1, BLOCK_SIZE).min(axis=1).tolist())
+        del self.tail_rows[:count]
+        del self.tail_freqs[:count]
+
+    def decode(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All rows and frequencies."""
+        rows = np.cumsum(decode_varints(np.frombuffer(self.rows, dtype=np.uint8)))
+        freqs = decode_varints(np.frombuffer(self.freqs, dtype=np.uint8))
+        if self.tail_rows:
+            rows = np.concatenate((rows, self.tail_rows))
+            freqs = np.concatenate((freqs, self.tail_freqs))
+        return rows, freqs
+
+    def decode_containing(self, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and frequencies of the blocks that may contain sorted candidate rows."""
+        blocks = len(self.block_last)
+        last = np.frombuffer(self.block_last, dtype=np.int64) if blocks else np.zeros(0, np.int64)
+        needed = np.unique(np.searchsorted(last, candidates))
+        with_tail = bool(self.tail_rows) and needed.size and needed[-1] == blocks
+        needed = needed[needed < blocks]
+        rows = freqs = np.zeros(0, dtype=np.int64)
+        if needed.size:
+            row_ends = np.frombuffer(self.row_ends, dtype=np.int64)
+            freq_ends = np.frombuffer(self.freq_ends, dtype=np.int64)
+            row_starts = np.concatenate(([0], row_ends[:-1]))[needed]
+            freq_starts = np.concatenate(([0], freq_ends[:-1]))[needed]
+            raw_rows = np.frombuffer(self.rows, dtype=np.uint8)
+            raw_freqs = np.frombuffer(self.freqs, dtype=np.uint8)
+            deltas = decode_varints(raw_rows[_ranges(row_starts, row_ends[needed])])
+            bases = np.where(needed > 0, last[needed - 1], 0)
+            rows = (np.cumsum(deltas.reshape(-1, BLOCK_SIZE), axis=1) + bases[:, None]).ravel()
+            freqs = decode_varints(raw_freqs[_ranges(freq_starts, freq_ends[needed])])
+        if with_tail:
+            rows = np.concatenate((rows, self.tail_rows))
+            freqs = np.concatenate((freqs, self.tail_freqs))
+        return rows, freqs
+
+    def bounds(self, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Largest frequency and shortest chunk per block, tail included as the last block."""
+        max_tf = np.frombuffer(self.block_max_tf, dtype=np.int32) if self.block_max_tf else np.zeros(0, np.int32)
+        min_length = (
+            np.frombuffer(self.block_min_length, dtype=np.int32) if self.block_min_length else np.zeros(0, np.int32)
+        )
+        if self.tail_rows:
+            max_tf = np.append(max_tf, max(self.tail_freqs))
+            min_length = np.append(min_length, lengths[self.tail_rows].min())
+        return max_tf, min_length
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the chunks of one tenant.
+
+    Rows are numbered in insertion order. Replaced and deleted chunks are
+    tombstoned, and the index is rebuilt from the live chunks once a
+    quarter of the rows are dead. Reads and writes take ``lock``, so
+    searches can run in worker threads.
+
+    Args:
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization
+        compact_ratio: Share of tombstoned rows that triggers a rebuild
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.terms: Dict[str, _Postings] = {}
+        self.records: List[Optional[ChunkRecord]] = []
+        self.lengths = np.zeros(256, dtype=np.int32)
+        self.alive = np.zeros(256, dtype=bool)
+        self.live = 0
+        self.total_length = 0
+        self._rows_by_chunk: Dict[str, int] = {}
+        self.metadata = MetadataIndex()
+        self._norms: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the postings and row arrays, excluding chunk texts."""
+        postings = sum(p.nbytes for p in self.terms.values())
+        return postings + self.lengths.nbytes + self.alive.nbytes + self.metadata.nbytes
+
+    def _reserve(self, rows: int) -> None:
+        needed = self.size + rows
+        capacity = len(self.lengths)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("lengths", "alive"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[: self.size] = old[: self.size]
+            setattr(self, name, grown)
+
+    def add(self, records: Sequence[ChunkRecord]) -> None:
+        """Index chunks; a chunk ID already present replaces the stored chunk."""
+        with self.lock:
+            self._add(records)
+            self._maybe_compact()
+
+    def _add(self, records: Sequence[ChunkRecord]) -> None:
+        if not records:
+            return
+        self._reserve(len(records))
+        start = self.size
+        batch: Dict[str, Tuple[List[int], List[int]]] = {}
+        for record in records:
+            previous = self._rows_by_chunk.get(record.chunk_id)
+            if previous is not None:
+                self._kill(previous)
+            row = self.size
+            tokens = tokenize(f"{record.title}\n{record.text}")
+            for term, tf in Counter(tokens).items():
+                entry = batch.get(term)
+                if entry is None:
+                    batch[term] = ([row], [tf])
+                else:
+                    entry[0].append(row)
+                    entry[1].append(tf)
+            self.lengths[row] = len(tokens)
+            self.total_length += len(tokens)
+            self.alive[row] = True
+            self._rows_by_chunk[record.chunk_id] = row
+            self.live += 1
+            # Keep the payload only; vectors live in the vector store
+            self.records.append(record.with_vector(_NO_VECTOR))
+        for term, (rows, freqs) in batch.items():
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = _Postings()
+            postings.extend(rows, freqs, self.lengths)
+        self.metadata.add(start, records)
+        self._norms = None
+
+    def _kill(self, row: int) -> None:
+        if self.alive[row]:
+            self.alive[row] = False
+            self.live -= 1
+            record = self.records[row]
+            self.records[row] = None
+            if record is not None and self._rows_by_chunk.get(record.chunk_id) == row:
+                del self._rows_by_chunk[record.chunk_id]
+
+    def delete_document(self, document_id: str) -> int:
+        """Tombstone every chunk of a document; returns the number removed."""
+        with self.lock:
+            rows = self.metadata.get("document", document_id).to_rows()
+            rows = rows[self.alive[rows]]
+            for row in rows:
+                self._kill(int(row))
+            self._maybe_compact()
+            return int(rows.size)
+
+    def _maybe_compact(self) -> None:
+        dead = self.size - self.live
+        if dead >= 64 and dead > self.compact_ratio * self.size:
+            live = [record for record in self.records if record is not None]
+            self._reset()
+            self._add(live)
+
+    def _length_norms(self) -> np.ndarray:
+        """``k1 * (1 - b + b * length / average length)`` per row."""
+        if self._norms is None:
+            size = self.size
+            average = self.total_length / size if size else 1.0
+            self._norms = (
+                self.k1 * (1 - self.b + self.b * self.lengths[:size] / max(average, 1e-9))
+            ).astype(np.float32)
+        return self._norms
+
+    def search(
+        self,
+        text: str,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        """
+        Top-k chunks by BM25.
+
+        Args:
+            text: Query text
+            top_k: Number of hits
+            filters: Optional restriction by document, tag and date
+
+        Returns:
+            Hits ordered by decreasing score
+        """
+        with self.lock:
+            rows, scores = self._search(text, top_k, SearchFilter.coerce(filters))
+            return [self.records[row].to_hit(float(score)) for row, score in zip(rows, scores)]  # type: ignore[union-attr]
+
+    def _search(
+        self, text: str, top_k: int, search_filter: Optional[SearchFilter]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        size = self.size
+        terms = [self.terms[t] for t in dict.fromkeys(tokenize(text)) if t in self.terms]
+        if not terms or not self.live or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        allowed = self.alive[:size]
+        if search_filter is not None:
+            allowed = np.zeros(size, dtype=bool)
+            allowed[self.metadata.lookup(search_filter).to_rows()] = True
+            allowed &= self.alive[:size]
+        norms = self._length_norms()
+        average = self.total_length / size
+        k1, b = self.k1, self.b
+
+        idfs, bounds = [], []
+        for postings in terms:
+            idf = math.log(1 + (size - postings.count + 0.5) / (postings.count + 0.5))
+            max_tf, min_length = postings.bounds(self.lengths)
+            block_bounds = max_tf * (k1 + 1) / (max_tf + k1 * (1 - b + b * min_length / average))
+            idfs.append(idf)
+            bounds.append(idf * float(block_bounds.max()))
+        order = np.argsort(bounds)[::-1]
+
+        scores = np.zeros(size, dtype=np.float32)
+        remaining = float(sum(bounds))
+        threshold = 0.0
+        # Rows given a score so far, until only candidates are rescored
+        touched: List[np.ndarray] = []
+        candidates: Optional[np.ndarray] = None
+        for i in order:
+            postings, idf = terms[i], idfs[i]
+            if candidates is None and remaining <= threshold:
+                # No row outside the current candidates can reach the top k anymore
+                candidates = self._scored(scores, touched)
+            if candidates is None:
+                rows, freqs = postings.decode()
+                scores[rows] += self._contribution(idf, freqs, norms[rows]) * allowed[rows]
+                touched.append(rows)
+                scored = self._scored(scores, touched)
+                touched = [scored]
+            else:
+                candidates = candidates[scores[candidates] + remaining >= threshold]
+                if not candidates.size:
+                    break
+                rows, freqs = postings.decode_containing(candidates)
+                position = np.minimum(np.searchsorted(rows, candidates), max(rows.size - 1, 0))
+                matched = candidates[rows[position] == candidates] if rows.size else candidates[:0]
+                if matched.size:
+                    at = np.searchsorted(rows, matched)
+                    scores[matched] += self._contribution(idf, freqs[at], norms[matched])
+                scored = candidates
+            remaining -= bounds[i]
+            threshold = self._kth(scores[scored], top_k)
+
+        rows = self._scored(scores, touched) if candidates is None else candidates[scores[candidates] > 0]
+        best = _top(scores[rows], top_k)
+        return rows[best], scores[rows[best]]
+
+    def _contribution(self, idf: float, freqs: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        return (idf * freqs * (self.k1 + 1) / (freqs + norms)).astype(np.float32)
+
+    @staticmethod
+    def _scored(scores: np.ndarray, touched: List[np.ndarray]) -> np.ndarray:
+        """Sorted rows with a positive score."""
+        count = sum(rows.size for rows in touched)
+        if count * 8 < scores.size:
+            # Few rows scored: merging them beats scanning every row
+            rows = np.unique(np.concatenate(touched)) if count else np.zeros(0, dtype=np.int64)
+            return rows[scores[rows] > 0]
+        return np.flatnonzero(scores)
+
+    @staticmethod
+    def _kth(values: np.ndarray, k: int) -> float:
+        """The k-th largest value, 0 while there are fewer than k."""
+        if values.size < k:
+            return 0.0
+        return float(np.partition(values, values.size - k)[values.size - k])
+
+    def iter_records(self) -> List[ChunkRecord]:
+        return [record for record in self.records if record is not None]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[SearchHit]], limit: int, k: int = 60
+) -> List[SearchHit]:
+    """
+    Merge ranked hit lists by reciprocal rank fusion.
+
+    A chunk scores ``sum(1 / (k + rank))`` over the lists it appears in, so
+    chunks ranked well by both searches come first without having to
+    calibrate BM25 scores against cosine similarities.
+
+    Args:
+        rankings: Hit lists, best first
+        limit: Number of hits to return
+        k: Rank smoothing constant
+
+    Returns:
+        Fused hits, best first, carrying their fused score
+    """
+    fused: Dict[str, float] = {}
+    first: Dict[str, SearchHit] = {}
+    for hits in rankings:
+        for rank, hit in enumerate(hits, 1):
+            fused[hit.chunk_id] = fused.get(hit.chunk_id, 0.0) + 1.0 / (k + rank)
+            if hit.chunk_id not in first or first[hit.chunk_id].vector is None:
+                first[hit.chunk_id] = hit
+    best = sorted(fused, key=fused.__getitem__, reverse=True)[:limit]
+    return [
+        first[chunk_id].with_score(round(fused[chunk_id], 6)) for chunk_id in best
+    ]
+
+
+class LexicalStore:
+    """
+    Per-tenant lexical indexes, built from the chunks of a vector store.
+
+    A tenant is loaded in the background the first time it is searched and
+    returns no hits until then; writes made through this process are
+    mirrored into loaded tenants. With ``versions``, a tenant written by
+    another process returns no hits until it is reloaded, which starts as
+    soon as the write is seen; without, tenants are reloaded after
+    ``refresh_after`` seconds to pick up such writes. Index work runs in the
+    default executor so it overlaps with vector search.
+
+    Args:
+        source: Vector store whose chunk payloads are indexed
+        max_tenant_chunks: Largest tenant indexed in memory
+        refresh_after: Seconds before a loaded tenant is reloaded
+        versions: Write counters shared with the other processes
+        clock: Monotonic clock, injectable for tests
+    """
+
+    # Tenants remembered as too large or failing, at most
+    max_skipped = 65536
+
+    def __init__(
+        self,
+        source: VectorStore,
+        max_tenant_chunks: int = 200_000,
+        refresh_after: float = 300.0,
+        versions: Optional[TenantVersions] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.source = source
+        self.max_tenant_chunks = max_tenant_chunks
+        self.refresh_after = refresh_after
+        self.versions = versions
+        self.clock = clock
+        self.tenants: Dict[str, LexicalIndex] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # Tenant -> shared version of the loaded index
+        self._versions: Dict[str, Optional[int]] = {}
+        self._skip_until: "OrderedDict[str, float]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Task[bool]"] = {}
+        # Writes to tenants being loaded, to detect those racing the snapshot
+        self._loads: Dict[str, int] = {}
+        self._writes: Dict[str, int] = {}
+
+    async def _run(self, func: Callable, *args):
+        return await run_in_executor(None, func, *args)
+
+    async def search(
+        self,
+        tenant_id: str,
+        text: str,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        """BM25 top-k of a tenant; empty while the tenant is not loaded."""
+        now = self.clock()
+        loaded_at = self._loaded_at.get(tenant_id)
+        if loaded_at is not None and self.versions is not None:
+            version = await self.versions.get(tenant_id)
+            if version is None:
+                # Cannot tell whether the index is current
+                return []
+            if version != self._versions.get(tenant_id):
+                self._forget(tenant_id)
+                loaded_at = None
+        if loaded_at is None or now - loaded_at > self.refresh_after:
+            self._schedule_load(tenant_id, now)
+        index = self.tenants.get(tenant_id)
+        if index is None:
+            return []
+        return await self._run(index.search, text, top_k, filters)
+
+    def _schedule_load(self, tenant_id: str, now: float) -> None:
+        if tenant_id in self._loading:
+            return
+        skip_until = self._skip_until.get(tenant_id)
+        if skip_until is not None:
+            if skip_until > now:
+                return
+            del self._skip_until[tenant_id]
+        task = asyncio.get_running_loop().create_task(self.load(tenant_id))
+        self._loading[tenant_id] = task
+        task.add_done_callback(lambda _: self._loading.pop(tenant_id, None))
+
+    def _skip(self, tenant_id: str, seconds: float) -> None:
+        self._skip_until[tenant_id] = self.clock() + seconds
+        self._skip_until.move_to_end(tenant_id)
+        if len(self._skip_until) > self.max_skipped:
+            self._skip_until.popitem(last=False)
+
+    def _forget(self, tenant_id: str) -> None:
+        self.tenants.pop(tenant_id, None)
+        self._loaded_at.pop(tenant_id, None)
+        self._versions.pop(tenant_id, None)
+
+    async def load(self, tenant_id: str) -> bool:
+        """
+        Index a tenant's chunks from the source store.
+
+        Returns:
+            Whether the tenant is now searchable
+        """
+        self._loads[tenant_id] = self._loads.get(tenant_id, 0) + 1
+        try:
+            return await self._load(tenant_id)
+        finally:
+            self._loads[tenant_id] -= 1
+            if not self._loads[tenant_id]:
+                del self._loads[tenant_id]
+                self._writes.pop(tenant_id, None)
+
+    async def _load(self, tenant_id: str) -> bool:
+        writes = self._writes.get(tenant_id, 0)
+        version = None
+        if self.versions is not None:
+            version = await self.versions.get(tenant_id, fresh=True)
+            if version is None:
+                self._skip(tenant_id, min(self.refresh_after, 30.0))
+                return False
+        index = LexicalIndex()
+        try:
+            async for batch in self.source.scroll(tenant_id):
+                await self._run(index.add, batch)
+                if index.live > self.max_tenant_chunks:
+                    self._forget(tenant_id)
+                    self._skip(tenant_id, self.refresh_after)
+                    return False
+        except Exception as exc:
+            logger.warning("Loading tenant %s into the lexical index failed: %s", tenant_id, exc)
+            self._skip(tenant_id, min(self.refresh_after, 30.0))
+            return False
+        if self._writes.get(tenant_id, 0) != writes:
+            # A write raced the snapshot; the next search loads again
+            return False
+        self.tenants[tenant_id] = index
+        self._loaded_at[tenant_id] = self.clock()
+        self._versions[tenant_id] = version
+        return True
+
+    def _count_write(self, tenant_id: str) -> None:
+        if tenant_id in self._loads:
+            self._writes[tenant_id] = self._writes.get(tenant_id, 0) + 1
+
+    async def _bump(self, tenant_id: str) -> None:
+        """Publish a write; a loaded index that mirrors it stays current."""
+        if self.versions is None:
+            return
+        version = await self.versions.bump(tenant_id)
+        if tenant_id in self.tenants and version is not None and self._versions.get(tenant_id) == version - 1:
+            self._versions[tenant_id] = version
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        self._count_write(tenant_id)
+        await self._bump(tenant_id)
+        index = self.tenants.get(tenant_id)
+        if index is not None:
+            await self._run(index.add, records)
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        self._count_write(tenant_id)
+        await self._bump(tenant_id)
+        index = self.tenants.get(tenant_id)
+        if index is not None:
+            await self._run(index.delete_document, document_id)
+
+    async def aclose(self) -> None:
+        for task in list(self._loading.values()):
+            task.cancel()
+        await asyncio.gather(*self._loading.values(), return_exceptions=True)
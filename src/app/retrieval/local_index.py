@@ -0,0 +1,553 @@
+"""
+DocuQuery AI - Local Vector Index
+
+This module keeps document chunks in process memory for exact similarity
+search with NumPy. Each tenant's embeddings live in one contiguous float32
+matrix of unit vectors, so a query is a single matrix-vector product followed
+by ``argpartition`` for the top k. Filters are resolved to rows through
+per-tenant metadata bitmaps (see ``filters``) and either scored alone or
+applied as a mask over a full scan, whichever is cheaper. Deletes leave
+tombstones that are compacted away once they make up a quarter of the rows,
+and appends grow the matrix geometrically.
+
+``NumpyVectorStore`` serves as a self-contained vector store for tests and
+local development. ``RoutingVectorStore`` puts it in front of Qdrant: small
+tenants are loaded into memory and searched locally, without a network hop,
+while large tenants and writes go to Qdrant. Loaded tenants can optionally
+be compressed (see ``quantization``) and rescored against vectors on disk.
+With shared tenant versions (see ``app.common.versions``), a write made by
+any worker makes the others serve the tenant from Qdrant until they have
+reloaded it.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+from app.common.versions import TenantVersions
+from app.telemetry.tracing import run_in_executor
+
+from .filters import BRUTE_FORCE, MetadataIndex, SearchFilter, plan
+from .vector_store import ChunkRecord, FilterLike, SearchHit, VectorStore
+
+logger = logging.getLogger("docuquery.local_index")
+
+# Filter masks cached per tenant; dropped on every write
+_MASK_CACHE_SIZE = 32
+
+
+class TenantIndex:
+    """
+    Chunks of one tenant with their embeddings as rows of a float32 matrix.
+
+    Args:
+        dimensions: Embedding dimensions
+        capacity: Initial number of rows allocated
+        compact_ratio: Share of tombstoned rows that triggers compaction
+    """
+
+    # Filter selectivity below which only the matching rows are scored;
+    # gathering scattered rows costs about three times as much per row as a
+    # scan (see scripts/benchmarks/bench_filters.py)
+    brute_force_ratio = 0.25
+
+    def __init__(self, dimensions: int, capacity: int = 256, compact_ratio: float = 0.25):
+        self.dimensions = dimensions
+        self.compact_ratio = compact_ratio
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.records: List[Optional[ChunkRecord]] = []
+        self.live = 0
+        self.metadata = MetadataIndex()
+        self._rows_by_chunk: Dict[str, int] = {}
+        self._masks: "OrderedDict[Hashable, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        """Rows in use, including tombstones."""
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.alive.nbytes + self.metadata.nbytes
+
+    def _reserve(self, rows: int) -> None:
+        needed = self.size + rows
+        capacity = len(self.vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("vectors", "alive"):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[: self.size] = old[: self.size]
+            setattr(self, name, grown)
+
+    def append(self, records: Sequence[ChunkRecord]) -> None:
+        """Add chunks; a chunk ID already present replaces the stored chunk."""
+        if not records:
+            return
+        matrix = np.asarray([record.vector for record in records], dtype=np.float32)
+        if matrix.shape[1] != self.dimensions:
+            raise ValueError(f"expected {self.dimensions} dimensions, got {matrix.shape[1]}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        self._reserve(len(records))
+        start = self.size
+        for offset, record in enumerate(records):
+            previous = self._rows_by_chunk.get(record.chunk_id)
+            if previous is not None:
+                self._kill(previous)
+            row = start + offset
+            self._rows_by_chunk[record.chunk_id] = row
+            self.alive[row] = True
+            self.live += 1
+            self.records.append(record)
+        self.vectors[start : self.size] = matrix
+        self.metadata.add(start, records)
+        self._masks.clear()
+        self._maybe_compact()
+
+    def _kill(self, row: int) -> None:
+        if self.alive[row]:
+            self.alive[row] = False
+            self.live -= 1
+            record = self.records[row]
+            self.records[row] = None
+            if record is not None and self._rows_by_chunk.get(record.chunk_id) == row:
+                del self._rows_by_chunk[record.chunk_id]
+
+    def delete_document(self, document_id: str) -> int:
+        """Tombstone every chunk of a document; returns the number removed."""
+        rows = self.metadata.get("document", document_id).to_rows()
+        rows = rows[self.alive[rows]]
+        for row in rows:
+            self._kill(int(row))
+        if rows.size:
+            self._masks.clear()
+            self._maybe_compact()
+        return int(rows.size)
+
+    def _maybe_compact(self) -> None:
+        dead = self.size - self.live
+        if dead >= 64 and dead > self.compact_ratio * self.size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop tombstoned rows, renumbering the live ones."""
+        keep = np.flatnonzero(self.alive[: self.size])
+        capacity = max(256, 2 * keep.size)
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[: keep.size] = self.vectors[keep]
+        self.vectors = vectors
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[: keep.size] = True
+        self.records = [self.records[row] for row in keep]
+        self._rows_by_chunk = {
+            record.chunk_id: row for row, record in enumerate(self.records) if record is not None
+        }
+        self.metadata = MetadataIndex()
+        self.metadata.add(0, self.records)
+        self.live = keep.size
+        self._masks.clear()
+
+    def _filter(self, search_filter: SearchFilter) -> Tuple[np.ndarray, np.ndarray]:
+        """Live-row mask and row numbers of a filter, cached until the next write."""
+        key = search_filter.key
+        cached = self._masks.get(key)
+        if cached is not None:
+            self._masks.move_to_end(key)
+            return cached
+        rows = self.metadata.lookup(search_filter).to_rows()
+        rows = rows[self.alive[rows]]
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        cached = self._masks[key] = (mask, rows)
+        if len(self._masks) > _MASK_CACHE_SIZE:
+            self._masks.popitem(last=False)
+        return cached
+
+    def search(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        """
+        Exact top-k by cosine similarity.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of hits
+            filters: Optional restriction by document, tag and date
+
+        Returns:
+            Hits ordered by decreasing similarity
+        """
+        rows, scores = self._candidates(_unit(vector), top_k, filters)
+        return [self._hit(int(row), score) for row, score in zip(rows, scores)]
+
+    def _score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Similarity of the query to the given rows, or to all rows in use."""
+        if rows is None:
+            return self.vectors[: self.size] @ query
+        return self.vectors[rows] @ query
+
+    def _candidates(
+        self, query: np.ndarray, k: int, filters: FilterLike
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the k best live rows passing the filter, best first."""
+        size = self.size
+        if not self.live or k <= 0:
+            return _NO_ROWS, _NO_SCORES
+        search_filter = SearchFilter.coerce(filters)
+        if search_filter is not None:
+            mask, rows = self._filter(search_filter)
+            if not rows.size:
+                return _NO_ROWS, _NO_SCORES
+            if plan(rows.size, size, self.brute_force_ratio) == BRUTE_FORCE:
+                # Selective filter: score only the matching rows
+                scores = self._score(query, rows)
+                order = _top(scores, k)
+                return rows[order], scores[order]
+            scores = self._score(query)
+            scores[~mask] = -np.inf
+            candidates = rows.size
+        else:
+            scores = self._score(query)
+            if self.live < size:
+                scores[~self.alive[:size]] = -np.inf
+            candidates = self.live
+        order = _top(scores, min(k, candidates))
+        return order, scores[order]
+
+    def _hit(self, row: int, score: float) -> SearchHit:
+        record = self.records[row]
+        assert record is not None
+        return record.to_hit(float(score), self.vectors[row])
+
+    def iter_records(self) -> List[ChunkRecord]:
+        return [record for record in self.records if record is not None]
+
+    def close(self) -> None:
+        """Release resources held outside the process heap."""
+        return None
+
+
+_NO_ROWS = np.zeros(0, dtype=np.intp)
+_NO_SCORES = np.zeros(0, dtype=np.float32)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    query = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(query))
+    return query / norm if norm else query
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store holding one ``TenantIndex`` per tenant."""
+
+    def __init__(self) -> None:
+        self.tenants: Dict[str, TenantIndex] = {}
+
+    def chunk_count(self, tenant_id: str) -> int:
+        index = self.tenants.get(tenant_id)
+        return index.live if index is not None else 0
+
+    def total_chunks(self) -> int:
+        return sum(index.live for index in self.tenants.values())
+
+    async def search(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        index = self.tenants.get(tenant_id)
+        if index is None:
+            return []
+        return index.search(vector, top_k, filters)
+
+    def add(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        """Synchronous ``upsert``."""
+        if not records:
+            return
+        index = self.tenants.get(tenant_id)
+        if index is None:
+            index = self.tenants[tenant_id] = TenantIndex(len(records[0].vector))
+        index.append(records)
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        self.add(tenant_id, records)
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        index = self.tenants.get(tenant_id)
+        if index is not None:
+            index.delete_document(document_id)
+
+    async def scroll(self, tenant_id: str, batch_size: int = 256) -> AsyncIterator[List[ChunkRecord]]:
+        index = self.tenants.get(tenant_id)
+        records = index.iter_records() if index is not None else []
+        for start in range(0, len(records), batch_size):
+            yield records[start : start + batch_size]
+
+    def drop_tenant(self, tenant_id: str) -> None:
+        index = self.tenants.pop(tenant_id, None)
+        if index is not None:
+            index.close()
+
+
+class RoutingVectorStore(VectorStore):
+    """
+    Serves small tenants from memory and everything else from a remote store.
+
+    A tenant is loaded in the background the first time it is searched; while
+    it loads, and whenever it is too large to hold locally, searches go to
+    the remote store. Writes go to the remote store and are mirrored into
+    loaded tenants. With ``versions``, a loaded tenant written by another
+    process is searched remotely and reloaded as soon as the write is seen;
+    without, loaded tenants are reloaded after ``refresh_after`` seconds to
+    pick up such writes. The least recently searched tenants are dropped to
+    stay within ``max_total_chunks``.
+
+    Args:
+        remote: Authoritative store, e.g. ``QdrantVectorStore``
+        max_tenant_chunks: Largest tenant served locally
+        max_total_chunks: Chunks held locally across all tenants
+        refresh_after: Seconds before a loaded tenant is reloaded
+        compress: Optional conversion of a loaded tenant index into a
+            compressed one, run in a worker thread; compressed tenants are
+            reloaded rather than updated in place on upsert
+        compress_min_chunks: Smallest tenant that is compressed
+        versions: Write counters shared with the other processes
+        clock: Monotonic clock, injectable for tests
+    """
+
+    # Tenants remembered as too large or failing, at most
+    max_skipped = 65536
+
+    def __init__(
+        self,
+        remote: VectorStore,
+        max_tenant_chunks: int = 5_000,
+        max_total_chunks: int = 25_000,
+        refresh_after: float = 300.0,
+        compress: Optional[Callable[[TenantIndex], TenantIndex]] = None,
+        compress_min_chunks: int = 1_000,
+        versions: Optional[TenantVersions] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.remote = remote
+        self.local = NumpyVectorStore()
+        self.max_tenant_chunks = max_tenant_chunks
+        self.max_total_chunks = max_total_chunks
+        self.refresh_after = refresh_after
+        self.compress = compress
+        self.compress_min_chunks = compress_min_chunks
+        self.versions = versions
+        self.clock = clock
+        # Tenant -> load time, in least recently searched order
+        self._loaded: "OrderedDict[str, float]" = OrderedDict()
+        # Tenant -> shared version of the loaded copy
+        self._versions: Dict[str, Optional[int]] = {}
+        # Tenant -> time before which it is not loaded again (too large or failed)
+        self._skip_until: "OrderedDict[str, float]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Task[None]"] = {}
+        # Writes to tenants being loaded, to detect those racing the snapshot
+        self._loads: Dict[str, int] = {}
+        self._writes: Dict[str, int] = {}
+        self._compressed: Set[str] = set()
+        self.local_searches = 0
+        self.remote_searches = 0
+
+    def is_local(self, tenant_id: str) -> bool:
+        return tenant_id in self._loaded
+
+    async def search(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        now = self.clock()
+        loaded_at = self._loaded.get(tenant_id)
+        if loaded_at is not None and self.versions is not None:
+            version = await self.versions.get(tenant_id)
+            if version is None:
+                # Cannot tell whether the copy is current
+                loaded_at = None
+            elif version != self._versions.get(tenant_id):
+                self._forget(tenant_id)
+                loaded_at = None
+        if loaded_at is None or now - loaded_at > self.refresh_after:
+            self._schedule_load(tenant_id, now)
+        if loaded_at is not None:
+            self._loaded.move_to_end(tenant_id)
+            self.local_searches += 1
+            return await self.local.search(tenant_id, vector, top_k, filters)
+        self.remote_searches += 1
+        return await self.remote.search(tenant_id, vector, top_k, filters)
+
+    def _schedule_load(self, tenant_id: str, now: float) -> None:
+        if tenant_id in self._loading:
+            return
+        skip_until = self._skip_until.get(tenant_id)
+        if skip_until is not None:
+            if skip_until > now:
+                return
+            del self._skip_until[tenant_id]
+        task = asyncio.get_running_loop().create_task(self.load(tenant_id))
+        self._loading[tenant_id] = task
+        task.add_done_callback(lambda _: self._loading.pop(tenant_id, None))
+
+    def _skip(self, tenant_id: str, seconds: float) -> None:
+        self._skip_until[tenant_id] = self.clock() + seconds
+        self._skip_until.move_to_end(tenant_id)
+        if len(self._skip_until) > self.max_skipped:
+            self._skip_until.popitem(last=False)
+
+    async def load(self, tenant_id: str) -> bool:
+        """
+        Load a tenant from the remote store into memory.
+
+        Returns:
+            Whether the tenant is now served locally
+        """
+        self._loads[tenant_id] = self._loads.get(tenant_id, 0) + 1
+        try:
+            return await self._load(tenant_id)
+        finally:
+            self._loads[tenant_id] -= 1
+            if not self._loads[tenant_id]:
+                del self._loads[tenant_id]
+                self._writes.pop(tenant_id, None)
+
+    async def _load(self, tenant_id: str) -> bool:
+        writes = self._writes.get(tenant_id, 0)
+        version = None
+        if self.versions is not None:
+            version = await self.versions.get(tenant_id, fresh=True)
+            if version is None:
+                self._skip(tenant_id, min(self.refresh_after, 30.0))
+                return False
+        staged = NumpyVectorStore()
+        try:
+            async for batch in self.remote.scroll(tenant_id):
+                staged.add(tenant_id, batch)
+                if staged.chunk_count(tenant_id) > self.max_tenant_chunks:
+                    self._forget(tenant_id)
+                    self._skip(tenant_id, self.refresh_after)
+                    return False
+        except Exception as exc:
+            logger.warning("Loading tenant %s into the local index failed: %s", tenant_id, exc)
+            self._skip(tenant_id, min(self.refresh_after, 30.0))
+            return False
+
+        index = staged.tenants.get(tenant_id)
+        compressed = False
+        if index is not None and self.compress is not None and index.live >= self.compress_min_chunks:
+            try:
+                index = await run_in_executor(None, self.compress, index)
+                compressed = True
+            except Exception as exc:
+                logger.warning("Compressing tenant %s failed: %s", tenant_id, exc)
+        if self._writes.get(tenant_id, 0) != writes:
+            # A write raced the snapshot; the next search loads again
+            if compressed:
+                index.close()
+            return False
+
+        self.local.drop_tenant(tenant_id)
+        self._compressed.discard(tenant_id)
+        if index is not None:
+            self.local.tenants[tenant_id] = index
+            if compressed:
+                self._compressed.add(tenant_id)
+        self._loaded[tenant_id] = self.clock()
+        self._loaded.move_to_end(tenant_id)
+        self._versions[tenant_id] = version
+        self._enforce_budget()
+        return True
+
+    def _enforce_budget(self) -> None:
+        while self.local.total_chunks() > self.max_total_chunks and len(self._loaded) > 1:
+            coldest = next(iter(self._loaded))
+            self._forget(coldest)
+
+    def _forget(self, tenant_id: str) -> None:
+        self._loaded.pop(tenant_id, None)
+        self._versions.pop(tenant_id, None)
+        self._compressed.discard(tenant_id)
+        self.local.drop_tenant(tenant_id)
+
+    def _count_write(self, tenant_id: str) -> None:
+        if tenant_id in self._loads:
+            self._writes[tenant_id] = self._writes.get(tenant_id, 0) + 1
+
+    async def _bump(self, tenant_id: str) -> None:
+        """Publish a write; a loaded copy that mirrors it stays current."""
+        if self.versions is None:
+            return
+        version = await self.versions.bump(tenant_id)
+        if tenant_id in self._loaded and version is not None and self._versions.get(tenant_id) == version - 1:
+            self._versions[tenant_id] = version
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        self._count_write(tenant_id)
+        await self.remote.upsert(tenant_id, records)
+        await self._bump(tenant_id)
+        if tenant_id in self._compressed:
+            # Compressed indexes are rebuilt; serve remotely until reloaded
+            self._forget(tenant_id)
+        elif tenant_id in self._loaded:
+            self.local.add(tenant_id, records)
+            if self.local.chunk_count(tenant_id) > self.max_tenant_chunks:
+                self._forget(tenant_id)
+            else:
+                self._enforce_budget()
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        self._count_write(tenant_id)
+        await self.remote.delete_document(tenant_id, document_id)
+        await self._bump(tenant_id)
+        if tenant_id in self._loaded:
+            await self.local.delete_document(tenant_id, document_id)
+
+    def scroll(self, tenant_id: str) -> AsyncIterator[List[ChunkRecord]]:
+        return self.remote.scroll(tenant_id)
+
+    async def aclose(self) -> None:
+        for task in list(self._loading.values()):
+            task.cancel()
+        await asyncio.gather(*self._loading.values(), return_exceptions=True)
+        for tenant_id in list(self.local.tenants):
+            self.local.drop_tenant(tenant_id)
+        await self.remote.aclose()
@@ -0,0 +1,225 @@
+"""
+DocuQuery AI - Reranking
+
+This module reorders retrieved chunks before they are sent to the LLM. A
+``Scorer`` rates each (question, chunk) pair, typically with a cross-encoder.
+Candidates are scored in batches, a bounded number of batches at a time, and
+local models run in a thread pool so the event loop keeps serving requests.
+If scoring misses its deadline or fails, the retrieval scores are used
+instead.
+
+The final selection uses maximal marginal relevance (MMR): chunks are picked
+one at a time by relevance minus their similarity to the chunks already
+picked, so near-duplicate passages do not crowd out other evidence. The
+pairwise similarities of the candidates are one matrix product, after which
+each pick is a single vectorized pass over the candidates.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.telemetry.tracing import run_in_executor
+
+from .local_index import _top
+from .vector_store import SearchHit
+
+logger = logging.getLogger("docuquery.rerank")
+
+
+class Scorer:
+    """Relevance of chunk texts to a question; higher is more relevant."""
+
+    async def score(self, question: str, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        return None
+
+
+class ThreadPoolScorer(Scorer):
+    """
+    Scorer running a blocking function, such as a local model, in threads.
+
+    Args:
+        func: ``func(question, texts)`` returning one score per text
+        workers: Threads scoring batches concurrently
+    """
+
+    def __init__(self, func: Callable[[str, List[str]], Sequence[float]], workers: int = 2):
+        self.func = func
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+
+    async def score(self, question: str, texts: Sequence[str]) -> np.ndarray:
+        scores = await run_in_executor(self._executor, self.func, question, list(texts))
+        return np.asarray(scores, dtype=np.float32)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def cross_encoder_scorer(model: str, workers: int = 2) -> ThreadPoolScorer:
+    """
+    Scorer backed by a sentence-transformers cross-encoder.
+
+    Requires the optional ``sentence-transformers`` package; the model is
+    loaded when this is called.
+    """
+    from sentence_transformers import CrossEncoder
+
+    encoder = CrossEncoder(model)
+    return ThreadPoolScorer(
+        lambda question, texts: encoder.predict([(question, text) for text in texts]), workers
+    )
+
+
+def mmr(
+    relevance: np.ndarray,
+    similarities: Optional[np.ndarray],
+    k: int,
+    diversity: float,
+) -> np.ndarray:
+    """
+    Indices chosen by maximal marginal relevance, in the order picked.
+
+    Each pick maximizes ``(1 - diversity) * relevance - diversity * s``,
+    where ``s`` is the candidate's highest similarity to the picks so far.
+    Relevance is rescaled to [0, 1] to be comparable with cosine similarity.
+
+    Args:
+        relevance: Score of each candidate
+        similarities: Candidate-by-candidate similarity matrix, or None to
+            rank by relevance alone
+        k: Number of candidates to pick
+        diversity: Weight of redundancy against relevance, from 0 to 1
+
+    Returns:
+        Indices of the picked candidates
+    """
+    count = len(relevance)
+    k = min(k, count)
+    if similarities is None or diversity <= 0 or k <= 1:
+        return _top(relevance, k)
+    low, high = float(relevance.min()), float(relevance.max())
+    scaled = (relevance - low) / (high - low) if high > low else np.zeros(count, dtype=np.float32)
+    gain = (1 - diversity) * scaled
+
+    picked = np.empty(k, dtype=np.intp)
+    picked[0] = int(np.argmax(gain))
+    redundancy = similarities[picked[0]].astype(np.float32)
+    available = np.ones(count, dtype=bool)
+    available[picked[0]] = False
+    for i in range(1, k):
+        objective = np.where(available, gain - diversity * redundancy, -np.inf)
+        best = int(np.argmax(objective))
+        picked[i] = best
+        available[best] = False
+        np.maximum(redundancy, similarities[best], out=redundancy)
+    return picked
+
+
+def similarity_matrix(hits: Sequence[SearchHit]) -> Optional[np.ndarray]:
+    """
+    Cosine similarities between hits, from the embeddings they carry.
+
+    Hits without an embedding (keyword-only matches) count as dissimilar to
+    every other hit. Returns None if no hit has an embedding.
+    """
+    with_vectors = [i for i, hit in enumerate(hits) if hit.vector is not None]
+    if not with_vectors:
+        return None
+    matrix = np.zeros((len(hits), len(hits[with_vectors[0]].vector)), dtype=np.float32)  # type: ignore[arg-type]
+    for i in with_vectors:
+        matrix[i] = hits[i].vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+    return matrix @ matrix.T
+
+
+class Reranker:
+    """
+    Rescores retrieved chunks and picks a relevant, diverse subset.
+
+    Args:
+        scorer: Relevance scorer; None keeps the retrieval scores and only
+            diversifies
+        batch_size: Candidates per scorer call
+        max_concurrency: Scorer calls in flight across all requests
+        timeout: Seconds to wait for scores before using retrieval scores
+        diversity: MMR weight of redundancy; 0 ranks by relevance alone
+    """
+
+    def __init__(
+        self,
+        scorer: Optional[Scorer] = None,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        timeout: float = 0.3,
+        diversity: float = 0.3,
+    ):
+        self.scorer = scorer
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.diversity = diversity
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def rerank(
+        self, question: str, hits: Sequence[SearchHit], top_k: int
+    ) -> Tuple[List[SearchHit], int]:
+        """
+        Choose the chunks to answer from.
+
+        Args:
+            question: The user's question
+            hits: Retrieved candidates, best first
+            top_k: Number of chunks to keep
+
+        Returns:
+            The chosen hits, carrying their reranked score, and the number
+            of candidates the scorer rated (0 if it was skipped or failed)
+        """
+        if not hits:
+            return [], 0
+        relevance: Optional[np.ndarray] = None
+        if self.scorer is not None:
+            try:
+                relevance = await asyncio.wait_for(
+                    self._score(question, [hit.text for hit in hits]), self.timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Reranking %d chunks exceeded %.0f ms; using retrieval scores",
+                    len(hits),
+                    self.timeout * 1000,
+                )
+            except Exception:
+                logger.exception("Reranking failed; using retrieval scores")
+        reranked = len(hits) if relevance is not None else 0
+        if relevance is None:
+            relevance = np.array([hit.score for hit in hits], dtype=np.float32)
+
+        similarities = similarity_matrix(hits) if self.diversity > 0 else None
+        chosen = mmr(relevance, similarities, top_k, self.diversity)
+        return [hits[i].with_score(round(float(relevance[i]), 6)) for i in chosen], reranked
+
+    async def _score(self, question: str, texts: List[str]) -> np.ndarray:
+        assert self.scorer is not None
+        scorer = self.scorer
+
+        async def batch(start: int) -> np.ndarray:
+            part = texts[start : start + self.batch_size]
+            async with self._semaphore:
+                scores = await scorer.score(question, part)
+            if len(scores) != len(part):
+                raise ValueError(f"scorer returned {len(scores)} scores for {len(part)} texts")
+            return scores
+
+        parts = await asyncio.gather(*(batch(start) for start in range(0, len(texts), self.batch_size)))
+        return np.concatenate(parts).astype(np.float32)
+
+    def close(self) -> None:
+        if self.scorer is not None:
+            self.scorer.close()
@@ -2,122 +2,238 @@
 DocuQuery AI - Query and Retrieval Routes
 
 This module contains the query endpoints for submitting natural language
-queries and retrieving AI-generated answers with citations.
+queries and retrieving AI-generated answers with citations, either as one
+response, streamed as server-sent events, or queued and polled by query ID.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any, List
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Request, status
+from typing import Any, AsyncIterator, Optional, Tuple
 
-# TODO: Import actual schemas and services
-# from app.retrieval.schemas import QueryRequest, QueryResponse, QueryList
-# from app.retrieval.service import RetrievalService
-# from app.common.deps import get_current_user, get_current_tenant
+from app.common.deps import get_current_tenant, get_query_history, get_query_jobs, get_retrieval_service
+from app.common.exceptions import NotFoundError
+from app.common.serialization import ModelResponse
+from app.common.sse import EventSourceResponse
+from app.config import get_settings
+from app.db.pagination import parse_date_range
+from app.ratelimit import charge_llm_usage
+from app.retrieval.jobs import QueryJobs
+from app.retrieval.schemas import (
+    HistoryPagination,
+    QueryAccepted,
+    QueryHistoryItem,
+    QueryHistoryPage,
+    QueryMetadata,
+    QueryRequest,
+    QueryResponse,
+    QueryStatus,
+)
+from app.retrieval.service import RetrievalService
+
+# TODO: Import actual user dependency
+# from app.common.deps import get_current_user
 
 retrieval_router = APIRouter()
 
 
-@retrieval_router.post("/")
-async def submit_query(request: Dict[str, Any]) -> Dict[str, Any]:
+def _charge_tokens(state: Any, metadata: QueryMetadata) -> None:
+    """Charge the LLM tokens of an answer against the quotas of the request owning ``state``."""
+    # A coalesced answer reports the tokens of the call it shared
+    if not metadata.coalesced:
+        charge_llm_usage(state, metadata.prompt_tokens + metadata.completion_tokens)
+
+
+async def _charged_stream(
+    events: AsyncIterator[Tuple[str, Any]], state: Any
+) -> AsyncIterator[Tuple[str, Any]]:
+    async for event, data in events:
+        if event == "done":
+            _charge_tokens(state, data["metadata"])
+        yield event, data
+
+
+@retrieval_router.post("/", response_model=QueryResponse)
+async def submit_query(
+    query: QueryRequest,
+    request: Request,
+    tenant_id: str = Depends(get_current_tenant),
+    service: RetrievalService = Depends(get_retrieval_service),
+):
     """
     Submit a natural language query and get AI-generated answer with citations.
     
+    With ``mode=async`` the query is queued and ``202 Accepted`` is returned
+    at once with its ``query_id``; the answer is read from
+    ``GET /query/{query_id}``.
+    
     Args:
-        request: Query request with question and filters
+        query: Query request with question and filters
+        request: The HTTP request, for the asynchronous query executor and quotas
+        tenant_id: Tenant whose documents are searched
+        service: Retrieval service
         
     Returns:
-        AI-generated answer with citations and metadata
+        AI-generated answer with citations and metadata, as a ``ModelResponse``
         
     Raises:
         HTTPException: When query processing fails
+        RateLimitError: When too many asynchronous queries are waiting
     """
-    # TODO: Implement query processing
-    # TODO: Generate query embedding
-    # TODO: Perform vector search
-    # TODO: Generate AI response
-    # TODO: Format citations
-    
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Query processing not implemented yet"
-    )
+    if query.mode == "async":
+        state = request.state
+        job = get_query_jobs(request).submit(
+            tenant_id, query, on_answer=lambda answered: _charge_tokens(state, answered.metadata)
+        )
+        accepted = QueryAccepted(query_id=job.query_id, status=job.status, created_at=job.created_at)
+        return ModelResponse(
+            accepted,
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"{request.url.path.rstrip('/')}/{job.query_id}"},
+        )
+    response = await service.answer(tenant_id, query)
+    _charge_tokens(request.state, response.metadata)
+    return ModelResponse(response)
 
 
-@retrieval_router.get("/{query_id}")
-async def get_query(query_id: str) -> Dict[str, Any]:
+@retrieval_router.get("/history", response_model=QueryHistoryPage)
+async def get_query_history(
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    size: int = Query(default=20, ge=1, le=100, description="Queries per page"),
+    start: Optional[date] = Query(default=None, description="First day included (UTC)"),
+    end: Optional[date] = Query(default=None, description="Last day included (UTC)"),
+    page: Optional[int] = Query(default=None, ge=1, description="Page number, for older clients"),
+    date_range: Optional[str] = Query(default=None, description="START..END, for older clients"),
+    tenant_id: str = Depends(get_current_tenant),
+    history: Any = Depends(get_query_history),
+):
     """
-    Get query details and processing status.
+    Get the tenant's query history, newest first.
+    
+    Pages are linked by opaque cursors: pass ``next_cursor`` of one page as
+    ``cursor`` to get the next, which takes the same time however deep the
+    page is. ``page`` numbers are still accepted without a cursor, at a cost
+    that grows with the page number.
     
     Args:
-        query_id: Query identifier
+        cursor: Cursor of the page to read; the first page if absent
+        size: Page size
+        start: First day included
+        end: Last day included
+        page: Page number, from 1
+        date_range: ``START..END`` in ISO dates, used when start and end are absent
+        tenant_id: Tenant whose history is read
+        history: Query history store
         
     Returns:
-        Query information and results
+        A page of queries and the cursor of the next one
         
     Raises:
-        HTTPException: When query is not found
+        ValidationError: When the cursor or date range is malformed
     """
-    # TODO: Implement query retrieval
-    # TODO: Get query metadata
-    # TODO: Get processing status
-    # TODO: Get results and citations
-    
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Query retrieval not implemented yet"
+    if start is None and end is None:
+        start, end = parse_date_range(date_range)
+    if page is not None and cursor is None:
+        result = await history.page_number(tenant_id, page, size, start, end)
+    else:
+        result = await history.page(tenant_id, size, cursor, start, end)
+        page = None
+    return ModelResponse(
+        QueryHistoryPage(
+            queries=[
+                QueryHistoryItem(id=row.id, query=row.question, status=row.status, created_at=row.created_at)
+                for row in result.items
+            ],
+            pagination=HistoryPagination(size=size, next_cursor=result.next_cursor, page=page),
+        )
     )
 
 
-@retrieval_router.get("/history")
-async def get_query_history(
-    page: int = 1,
-    size: int = 20,
-    date_range: str = None
-) -> Dict[str, Any]:
+@retrieval_router.get("/{query_id}", response_model=QueryStatus)
+async def get_query(
+    query_id: str,
+    request: Request,
+    wait: float = Query(default=0.0, ge=0.0, description="Seconds to wait for the query to finish"),
+    tenant_id: str = Depends(get_current_tenant),
+    jobs: QueryJobs = Depends(get_query_jobs),
+):
     """
-    Get user's query history with pagination.
+    Get query details and processing status.
+    
+    With ``wait``, a pending query is long-polled: the response is sent when
+    the query finishes or after ``wait`` seconds (capped by
+    ``QUERY_LONG_POLL_MAX_SECONDS``), whichever is first. Queries no longer
+    held as jobs, because their result expired or they were answered by
+    another worker or synchronously, are read from the query history when
+    one is configured, without their citations.
     
     Args:
-        page: Page number
-        size: Page size
-        date_range: Date range filter
+        query_id: Query identifier, as returned by a submission
+        request: The HTTP request, for the query history
+        wait: Seconds to wait for a pending query to finish
+        tenant_id: Tenant that submitted the query
+        jobs: Asynchronous query execution
         
     Returns:
-        Paginated list of queries
+        Query status, with the answer and citations once completed
         
     Raises:
-        HTTPException: When history retrieval fails
+        NotFoundError: When the query is unknown, expired or another tenant's
     """
-    # TODO: Implement query history
-    # TODO: Add pagination
-    # TODO: Add date filtering
-    # TODO: Add user-specific filtering
-    
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Query history not implemented yet"
+    job = jobs.get(tenant_id, query_id)
+    if job is None:
+        history = getattr(getattr(request.app.state, "retrieval", None), "history", None)
+        record = await history.get(tenant_id, query_id) if history is not None else None
+        if record is None:
+            raise NotFoundError("Query not found", error_code="QUERY_NOT_FOUND")
+        return ModelResponse(_recorded_status(record))
+    job = await jobs.wait(job, min(wait, get_settings().QUERY_LONG_POLL_MAX_SECONDS))
+    return ModelResponse(job.to_status())
+
+
+def _recorded_status(record: Any) -> QueryStatus:
+    try:
+        metadata: Optional[QueryMetadata] = QueryMetadata.model_validate(record.details)
+    except ValueError:
+        # Recorded before the metadata fields were renamed
+        metadata = None
+    return QueryStatus(
+        id=record.id,
+        query=record.question,
+        status=record.status,
+        answer=record.answer,
+        metadata=metadata,
+        created_at=record.created_at,
+        completed_at=record.completed_at,
     )
 
 
 @retrieval_router.post("/stream")
-async def stream_query(request: Dict[str, Any]):
+async def stream_query(
+    query: QueryRequest,
+    request: Request,
+    tenant_id: str = Depends(get_current_tenant),
+    service: RetrievalService = Depends(get_retrieval_service),
+) -> EventSourceResponse:
     """
-    Submit a query and stream the response in real-time.
-    
+    Submit a query and stream the answer as server-sent events.
+
+    The stream sends a ``citations`` event once retrieval finishes, a
+    ``token`` event per piece of the answer as it is generated and a final
+    ``done`` event with the metadata; failures after the stream has started
+    arrive as an ``error`` event. Disconnecting cancels the generation.
+
     Args:
-        request: Query request with streaming options
-        
-    Yields:
-        Streaming response chunks
-        
-    Raises:
-        HTTPException: When streaming fails
+        query: Query request with question and filters
+        request: The HTTP request, whose quotas are charged for the tokens used
+        tenant_id: Tenant whose documents are searched
+        service: Retrieval service
+
+    Returns:
+        A ``text/event-stream`` response
     """
-    # TODO: Implement streaming queries
-    # TODO: Stream response generation
-    # TODO: Handle streaming errors
-    # TODO: Add streaming metadata
-    
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Streaming queries not implemented yet"
+    settings = get_settings()
+    return EventSourceResponse(
+        _charged_stream(service.stream_answer(tenant_id, query), request.state),
+        heartbeat=settings.STREAM_HEARTBEAT_SECONDS,
+        buffer=settings.STREAM_BUFFER_EVENTS,
     )
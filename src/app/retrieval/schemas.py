@@ -0,0 +1,198 @@
+"""
+DocuQuery AI - Query Schemas
+
+This module defines the request and response models of the query endpoints.
+Query responses are returned as ``ModelResponse`` so the citation payload is
+serialized once, straight from the models.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from .filters import SearchFilter
+
+
+class DateRange(BaseModel):
+    """Inclusive range of document dates."""
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    @model_validator(mode="after")
+    def check_order(self) -> "DateRange":
+        if self.start is not None and self.end is not None and self.start > self.end:
+            raise ValueError("date_range.start must not be after date_range.end")
+        return self
+
+
+class QueryFilters(BaseModel):
+    """Metadata restrictions; chunks must satisfy every filter given."""
+
+    document_ids: Optional[List[str]] = Field(
+        default=None, max_length=1000, description="Restrict retrieval to these documents"
+    )
+    tags: Optional[List[str]] = Field(
+        default=None, max_length=100, description="Restrict retrieval to chunks with any of these tags"
+    )
+    date_range: Optional[DateRange] = Field(default=None, description="Restrict retrieval by document date")
+
+
+class QueryOptions(BaseModel):
+    """How the answer is returned."""
+
+    include_citations: bool = Field(default=True, description="Return the cited chunks")
+    max_citations: int = Field(default=5, ge=1, le=50, description="Number of chunks to cite")
+
+
+class QueryRequest(BaseModel):
+    """
+    A natural language question with optional retrieval filters.
+
+    The question is sent as ``query``; ``question``, and ``top_k`` and
+    ``include_citations`` outside ``options``, are still accepted from older
+    clients.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    question: str = Field(..., alias="query", min_length=1, max_length=4000, description="Question to answer")
+    document_ids: Optional[List[str]] = Field(
+        default=None, description="Restrict retrieval to these documents"
+    )
+    filters: Optional[QueryFilters] = Field(default=None, description="Metadata restrictions")
+    options: QueryOptions = Field(default_factory=QueryOptions, description="Citation options")
+    mode: Literal["sync", "async"] = Field(
+        default="sync", description="``async`` returns a query ID at once; poll GET /query/{query_id}"
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def lift_options(cls, data: Any) -> Any:
+        """Move the top-level options of older clients into ``options``."""
+        if isinstance(data, dict) and ("top_k" in data or "include_citations" in data):
+            data = dict(data)
+            options = dict(data.get("options") or {})
+            if "top_k" in data:
+                options.setdefault("max_citations", data.pop("top_k"))
+            if "include_citations" in data:
+                options.setdefault("include_citations", data.pop("include_citations"))
+            data["options"] = options
+        return data
+
+    @property
+    def top_k(self) -> int:
+        """Number of chunks to cite."""
+        return self.options.max_citations
+
+    @property
+    def include_citations(self) -> bool:
+        return self.options.include_citations
+
+    def search_filter(self) -> Optional[SearchFilter]:
+        """The filters as one ``SearchFilter``; top-level and nested document IDs must both match."""
+        filters = self.filters or QueryFilters()
+        document_ids = None
+        for ids in (self.document_ids, filters.document_ids):
+            if ids is not None:
+                document_ids = set(ids) if document_ids is None else document_ids & set(ids)
+        date_range = filters.date_range or DateRange()
+        return SearchFilter.coerce(
+            SearchFilter(document_ids, filters.tags, date_range.start, date_range.end)
+        )
+
+
+class Citation(BaseModel):
+    """A retrieved chunk supporting the answer."""
+
+    document_id: str
+    document_title: str
+    chunk_id: str
+    content: str
+    page_number: Optional[int] = None
+    relevance_score: float
+
+
+class QueryMetadata(BaseModel):
+    """How the answer was produced."""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_used: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    processing_time_ms: float = Field(default=0.0, description="Time taken to answer")
+    stages_ms: Dict[str, float] = Field(
+        default_factory=dict, description="Part of processing_time_ms spent in each stage"
+    )
+    cache_hit: bool = Field(default=False, description="Answer served from the semantic answer cache")
+    chunks_retrieved: int = Field(default=0, description="Candidate chunks returned by search")
+    chunks_reranked: int = Field(default=0, description="Candidates rescored by the reranker")
+    context_tokens: int = Field(default=0, description="Tokens of the sources packed into the prompt")
+    coalesced: bool = Field(default=False, description="Answer shared with an identical concurrent query")
+    first_token_ms: Optional[float] = Field(
+        default=None, description="Time to the first streamed answer token"
+    )
+    similarity: Optional[float] = Field(
+        default=None, description="Similarity to the cached question on a cache hit"
+    )
+
+
+class QueryResponse(BaseModel):
+    """An answer with its citations."""
+
+    query_id: str
+    query: str
+    answer: str
+    citations: List[Citation] = Field(default_factory=list)
+    metadata: QueryMetadata
+    created_at: datetime
+
+
+class QueryAccepted(BaseModel):
+    """An asynchronous query waiting to be answered."""
+
+    query_id: str
+    status: str
+    created_at: datetime
+
+
+class QueryStatus(BaseModel):
+    """An asynchronous query and, once completed, its answer."""
+
+    id: str
+    query: str
+    status: str = Field(..., description="pending, running, completed or failed")
+    answer: Optional[str] = None
+    citations: List[Citation] = Field(default_factory=list)
+    metadata: Optional[QueryMetadata] = None
+    error: Optional[Dict[str, str]] = Field(default=None, description="Message and code of a failed query")
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class QueryHistoryItem(BaseModel):
+    """A past query in the history listing."""
+
+    id: str
+    query: str
+    status: str
+    created_at: datetime
+
+
+class HistoryPagination(BaseModel):
+    """Position of a history page."""
+
+    size: int
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass as ``cursor`` for the next page; absent on the last page"
+    )
+    page: Optional[int] = Field(default=None, description="Page number, when requested by number")
+
+
+class QueryHistoryPage(BaseModel):
+    """A page of past queries, newest first."""
+
+    queries: List[QueryHistoryItem] = Field(default_factory=list)
+    pagination: HistoryPagination
@@ -0,0 +1,424 @@
+"""
+DocuQuery AI - Retrieval Service
+
+This module answers questions over a tenant's documents: it embeds the
+question through the embedding cache, serves paraphrases of answered
+questions from the semantic answer cache, and otherwise searches the vector
+store for the most similar chunks and asks the LLM for an answer citing
+them. With a lexical index, BM25 search runs concurrently with vector search
+and the two rankings are merged by reciprocal rank fusion. A reranker, if
+configured, rescores a deeper candidate list and picks a diverse subset of
+it for the prompt. A context packer, if configured, then chooses the chunks
+of highest total relevance that fit the model's token budget. Identical
+questions asked concurrently share one computation, and answered queries
+are recorded in the query history when one is configured. Each phase is
+recorded as a request stage, so the breakdown appears in the
+``Server-Timing`` header and in the response metadata.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.llm.client import ChatCompletion
+from app.llm.context import ContextPacker, pack_sources
+from app.llm.prompts import build_messages
+from app.telemetry.stages import stage, stage_breakdown
+
+from .answer_cache import CachedAnswer, Scope, SemanticAnswerCache
+from .embeddings import EmbeddingCache, normalize_query
+from .filters import SearchFilter
+from .lexical import LexicalStore, reciprocal_rank_fusion
+from .rerank import Reranker
+from .schemas import Citation, QueryMetadata, QueryRequest, QueryResponse
+from .vector_store import ChunkRecord, SearchHit, VectorStore
+
+logger = logging.getLogger("docuquery.retrieval")
+
+NO_CONTEXT_ANSWER = "I could not find information about this in your documents."
+
+
+class RetrievalService:
+    """
+    Retrieval-augmented question answering.
+
+    Args:
+        embeddings: Cached query embeddings
+        vector_store: Chunk similarity search
+        llm: Chat completion client, see ``app.llm.client.OpenAIClient``
+        chat_model: Model answering the questions
+        max_tokens: Completion token limit
+        temperature: Sampling temperature
+        answer_cache: Optional semantic cache of earlier answers
+        lexical: Optional BM25 index searched alongside the vector store
+        fusion_k: Rank smoothing constant of reciprocal rank fusion
+        fusion_depth: Hits fetched from each search before fusion
+        reranker: Optional reranking and diversification of the hits
+        rerank_depth: Candidates retrieved for the reranker to choose from
+        packer: Optional token-budget packing of the chunks into the prompt;
+            without it every retrieved chunk is sent
+        coalesce: Share one answer between identical concurrent questions
+        history: Optional store recording answered queries, see
+            ``app.db.history.QueryHistory``
+    """
+
+    def __init__(
+        self,
+        embeddings: EmbeddingCache,
+        vector_store: VectorStore,
+        llm: Any,
+        chat_model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.1,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        lexical: Optional[LexicalStore] = None,
+        fusion_k: int = 60,
+        fusion_depth: int = 20,
+        reranker: Optional[Reranker] = None,
+        rerank_depth: int = 20,
+        packer: Optional[ContextPacker] = None,
+        coalesce: bool = True,
+        history: Optional[Any] = None,
+    ):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.llm = llm
+        self.chat_model = chat_model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.answer_cache = answer_cache
+        self.lexical = lexical
+        self.fusion_k = fusion_k
+        self.fusion_depth = fusion_depth
+        self.reranker = reranker
+        self.rerank_depth = rerank_depth
+        self.packer = packer
+        self.coalesce = coalesce
+        self._inflight: Dict[Tuple[Any, ...], "asyncio.Task[QueryResponse]"] = {}
+        self.coalesced = 0
+        self.history = history
+
+    async def answer(
+        self, tenant_id: str, query: QueryRequest, query_id: Optional[str] = None
+    ) -> QueryResponse:
+        """
+        Answer a question with citations.
+
+        A question asked while an identical one (same tenant, normalized
+        text, filters and options) is being answered waits for that answer
+        instead of repeating the work. The shared computation runs as its
+        own task, so it finishes for the others if the first caller goes
+        away.
+
+        Args:
+            tenant_id: Tenant whose documents are searched
+            query: The question and retrieval options
+            query_id: ID of the query, e.g. of its asynchronous job; a new one if None
+
+        Returns:
+            The answer, its citations and how it was produced
+        """
+        query_id = query_id or uuid.uuid4().hex
+        if self.coalesce:
+            response = await self._shared_answer(tenant_id, query, query_id)
+        else:
+            response = await self._answer(tenant_id, query, query_id)
+        await self._record(tenant_id, response)
+        return response
+
+    async def _record(self, tenant_id: str, response: QueryResponse) -> None:
+        if self.history is not None:
+            try:
+                await self.history.record(tenant_id, response)
+            except Exception:
+                # History is best effort; the answer is still returned
+                logger.exception("Recording query %s in the history failed", response.query_id)
+
+    async def _shared_answer(self, tenant_id: str, query: QueryRequest, query_id: str) -> QueryResponse:
+        started = time.perf_counter()
+        key = (
+            tenant_id,
+            normalize_query(query.question),
+            SemanticAnswerCache.scope(query.top_k, query.search_filter()),
+            query.include_citations,
+        )
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._answer(tenant_id, query, query_id))
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._landed, key))
+            return await asyncio.shield(task)
+
+        self.coalesced += 1
+        shared = await asyncio.shield(task)
+        metadata = shared.metadata.model_copy(
+            update={"coalesced": True, "processing_time_ms": round((time.perf_counter() - started) * 1000, 3)}
+        )
+        return shared.model_copy(
+            update={"query_id": query_id, "query": query.question, "metadata": metadata}
+        )
+
+    def _landed(self, key: Tuple[Any, ...], task: "asyncio.Task[QueryResponse]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller went away before it finished
+            task.exception()
+
+    async def _answer(self, tenant_id: str, query: QueryRequest, query_id: str) -> QueryResponse:
+        started = time.perf_counter()
+        retrieval = await self._retrieve(tenant_id, query)
+        metadata = retrieval.metadata
+        if retrieval.cached is not None:
+            cached = retrieval.cached
+            return self._response(query_id, query, cached.answer, cached.citations, metadata, started)
+
+        hits = retrieval.hits
+        if hits:
+            with stage("llm"):
+                completion = await self.llm.chat(
+                    build_messages(query.question, retrieval.sources),
+                    self.chat_model,
+                    self.max_tokens,
+                    self.temperature,
+                )
+            answer = completion.text
+            metadata.prompt_tokens = completion.prompt_tokens
+            metadata.completion_tokens = completion.completion_tokens
+        else:
+            # Nothing to ground an answer in; skip the LLM call
+            answer = NO_CONTEXT_ANSWER
+
+        citations = self._citations(hits)
+        self._remember(tenant_id, retrieval, answer, citations)
+        return self._response(query_id, query, answer, citations, metadata, started)
+
+    async def stream_answer(
+        self, tenant_id: str, query: QueryRequest
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """
+        Answer a question as a stream of events.
+
+        Yields ``("citations", ...)`` as soon as retrieval finishes, then one
+        ``("token", {"text": ...})`` per piece of the answer as the LLM
+        produces it, and finally ``("done", ...)`` with the metadata. The
+        answer is cached and recorded in the history only if the stream is
+        read to the end.
+
+        Args:
+            tenant_id: Tenant whose documents are searched
+            query: The question and retrieval options
+
+        Yields:
+            Event names and their data
+        """
+        started = time.perf_counter()
+        query_id = uuid.uuid4().hex
+        retrieval = await self._retrieve(tenant_id, query)
+        metadata = retrieval.metadata
+        cached = retrieval.cached
+        citations = cached.citations if cached is not None else self._citations(retrieval.hits)
+        yield "citations", {
+            "query_id": query_id,
+            "citations": citations if query.include_citations else [],
+        }
+
+        if cached is not None:
+            answer = cached.answer
+            yield "token", {"text": answer}
+        elif not retrieval.hits:
+            answer = NO_CONTEXT_ANSWER
+            yield "token", {"text": answer}
+        else:
+            parts: List[str] = []
+            with stage("llm"):
+                async for chunk in self._stream_completion(
+                    build_messages(query.question, retrieval.sources)
+                ):
+                    if chunk.text:
+                        if not parts:
+                            metadata.first_token_ms = round((time.perf_counter() - started) * 1000, 3)
+                        parts.append(chunk.text)
+                        yield "token", {"text": chunk.text}
+                    if chunk.completion_tokens:
+                        metadata.prompt_tokens = chunk.prompt_tokens
+                        metadata.completion_tokens = chunk.completion_tokens
+            answer = "".join(parts)
+
+        self._remember(tenant_id, retrieval, answer, citations)
+        response = self._response(query_id, query, answer, citations, metadata, started)
+        await self._record(tenant_id, response)
+        yield "done", {"query_id": query_id, "metadata": metadata, "created_at": response.created_at}
+
+    async def _retrieve(self, tenant_id: str, query: QueryRequest) -> "_Retrieval":
+        """Embed the question, then find a cached answer or the chunks to answer from."""
+        with stage("embed"):
+            vector = await self.embeddings.get(tenant_id, query.question)
+
+        search_filter = query.search_filter()
+        scope = SemanticAnswerCache.scope(query.top_k, search_filter)
+        if self.answer_cache is not None:
+            with stage("answer_cache"):
+                cached = self.answer_cache.lookup(tenant_id, vector, scope)
+            if cached is not None:
+                entry, similarity = cached
+                metadata = QueryMetadata(
+                    model_used=self.chat_model, cache_hit=True, similarity=round(similarity, 4)
+                )
+                return _Retrieval(vector, scope, [], metadata, entry)
+
+        depth = query.top_k if self.reranker is None else max(query.top_k, self.rerank_depth)
+        if self.lexical is None:
+            with stage("vector_search"):
+                hits = await self.vector_store.search(tenant_id, vector, depth, search_filter)
+        else:
+            with stage("hybrid_search"):
+                hits = await self._hybrid_search(tenant_id, query, vector, search_filter, depth)
+
+        metadata = QueryMetadata(model_used=self.chat_model, chunks_retrieved=len(hits))
+        if self.reranker is not None and hits:
+            with stage("rerank"):
+                hits, metadata.chunks_reranked = await self.reranker.rerank(
+                    query.question, hits, query.top_k
+                )
+        sources: List[str] = []
+        if hits:
+            with stage("pack"):
+                sources, hits, metadata.context_tokens = pack_sources(self.packer, query.question, hits)
+        return _Retrieval(vector, scope, hits, metadata, sources=sources)
+
+    async def _stream_completion(self, messages: List[Dict[str, str]]) -> AsyncIterator[ChatCompletion]:
+        """Stream from the LLM, or yield the whole completion if it cannot stream."""
+        stream_chat = getattr(self.llm, "stream_chat", None)
+        if stream_chat is None:
+            yield await self.llm.chat(messages, self.chat_model, self.max_tokens, self.temperature)
+            return
+        async for chunk in stream_chat(messages, self.chat_model, self.max_tokens, self.temperature):
+            yield chunk
+
+    def _remember(
+        self, tenant_id: str, retrieval: "_Retrieval", answer: str, citations: List[Citation]
+    ) -> None:
+        if self.answer_cache is not None and retrieval.cached is None:
+            self.answer_cache.store(tenant_id, retrieval.vector, retrieval.scope, answer, citations)
+
+    async def _hybrid_search(
+        self,
+        tenant_id: str,
+        query: QueryRequest,
+        vector: Any,
+        search_filter: Optional[SearchFilter],
+        limit: int,
+    ) -> List[SearchHit]:
+        assert self.lexical is not None
+        depth = max(limit, self.fusion_depth)
+        dense, sparse = await asyncio.gather(
+            self.vector_store.search(tenant_id, vector, depth, search_filter),
+            self.lexical.search(tenant_id, query.question, depth, search_filter),
+        )
+        if not sparse:
+            return dense[:limit]
+        return reciprocal_rank_fusion([dense, sparse], limit, self.fusion_k)
+
+    async def index_chunks(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        """Store chunks in the vector store and the lexical index."""
+        uncounted = [record for record in records if record.tokens is None]
+        if self.packer is not None and uncounted:
+            # Count once at ingestion so packing never tokenizes stored chunks
+            counts = self.packer.counter.count_many([record.text for record in uncounted])
+            for record, tokens in zip(uncounted, counts):
+                record.tokens = tokens
+        await self.vector_store.upsert(tenant_id, records)
+        if self.lexical is not None:
+            await self.lexical.upsert(tenant_id, records)
+        for document_id in {record.document_id for record in records}:
+            self.document_changed(tenant_id, document_id)
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        """Remove a document's chunks from both indexes."""
+        await self.vector_store.delete_document(tenant_id, document_id)
+        if self.lexical is not None:
+            await self.lexical.delete_document(tenant_id, document_id)
+        self.document_changed(tenant_id, document_id)
+
+    def document_changed(self, tenant_id: str, document_id: str) -> None:
+        """
+        Forget what was derived from a document; call after it is re-ingested
+        or deleted.
+        """
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate_document(tenant_id, document_id)
+
+    @staticmethod
+    def _response(
+        query_id: str,
+        query: QueryRequest,
+        answer: str,
+        citations: List[Citation],
+        metadata: QueryMetadata,
+        started: float,
+    ) -> QueryResponse:
+        metadata.processing_time_ms = round((time.perf_counter() - started) * 1000, 3)
+        metadata.stages_ms = stage_breakdown()
+        return QueryResponse(
+            query_id=query_id,
+            query=query.question,
+            answer=answer,
+            citations=citations if query.include_citations else [],
+            metadata=metadata,
+            created_at=datetime.utcnow(),
+        )
+
+    @staticmethod
+    def _citations(hits: List[SearchHit]) -> List[Citation]:
+        return [
+            Citation(
+                document_id=hit.document_id,
+                document_title=hit.title,
+                chunk_id=hit.chunk_id,
+                content=hit.text,
+                page_number=hit.page,
+                relevance_score=hit.score,
+            )
+            for hit in hits
+        ]
+
+    async def aclose(self) -> None:
+        """Release the clients owned by the service."""
+        if self.reranker is not None:
+            self.reranker.close()
+        if self.history is not None:
+            await self.history.aclose()
+        if self.lexical is not None:
+            await self.lexical.aclose()
+        await self.vector_store.aclose()
+        if self.embeddings.redis is not None:
+            await self.embeddings.redis.aclose()
+        if hasattr(self.llm, "aclose"):
+            await self.llm.aclose()
+
+
+class _Retrieval:
+    """What answering a question needs from the retrieval phase."""
+
+    __slots__ = ("vector", "scope", "hits", "metadata", "cached", "sources")
+
+    def __init__(
+        self,
+        vector: Any,
+        scope: Scope,
+        hits: List[SearchHit],
+        metadata: QueryMetadata,
+        cached: Optional[CachedAnswer] = None,
+        sources: Optional[List[str]] = None,
+    ):
+        self.vector = vector
+        self.scope = scope
+        self.hits = hits
+        self.metadata = metadata
+        self.cached = cached
+        self.sources = sources or []
@@ -0,0 +1,480 @@
+"""
+DocuQuery AI - Vector Store
+
+This module defines the interface retrieval uses to store and search
+document chunks by embedding, and its Qdrant implementation. Chunks of every
+tenant share one collection and are isolated by a ``tenant_id`` payload
+filter; document, tag and date filters are pushed down to Qdrant as payload
+conditions on indexed fields.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import httpx
+import numpy as np
+
+from app.common.exceptions import VectorStoreError
+
+from .filters import SearchFilter
+
+# A SearchFilter, or for short a list of document IDs
+FilterLike = Union[SearchFilter, Sequence[str], None]
+
+
+class SearchHit:
+    """A chunk returned by vector search."""
+
+    __slots__ = (
+        "document_id", "chunk_id", "title", "text", "score", "page", "vector", "position", "tokens"
+    )
+
+    def __init__(
+        self,
+        document_id: str,
+        chunk_id: str,
+        title: str,
+        text: str,
+        score: float,
+        page: Optional[int] = None,
+        vector: Optional[np.ndarray] = None,
+        position: Optional[int] = None,
+        tokens: Optional[int] = None,
+    ):
+        self.document_id = document_id
+        self.chunk_id = chunk_id
+        self.title = title
+        self.text = text
+        self.score = score
+        self.page = page
+        # Embedding of the chunk, when the store returns it (used for diversity)
+        self.vector = vector
+        # Ordinal of the chunk in its document, and its token count
+        self.position = position
+        self.tokens = tokens
+
+    @classmethod
+    def from_payload(
+        cls, payload: Dict[str, Any], score: float, vector: Optional[Sequence[float]] = None
+    ) -> "SearchHit":
+        return cls(
+            str(payload.get("document_id", "")),
+            str(payload.get("chunk_id", "")),
+            payload.get("title", ""),
+            payload.get("text", ""),
+            float(score),
+            payload.get("page"),
+            np.asarray(vector, dtype=np.float32) if vector is not None else None,
+            payload.get("position"),
+            payload.get("tokens"),
+        )
+
+    def with_score(self, score: float) -> "SearchHit":
+        return SearchHit(
+            self.document_id,
+            self.chunk_id,
+            self.title,
+            self.text,
+            score,
+            self.page,
+            self.vector,
+            self.position,
+            self.tokens,
+        )
+
+
+class ChunkRecord:
+    """A document chunk with its embedding, as stored in a vector store."""
+
+    __slots__ = (
+        "chunk_id", "document_id", "title", "text", "vector", "page", "tags", "date", "position", "tokens"
+    )
+
+    def __init__(
+        self,
+        chunk_id: str,
+        document_id: str,
+        title: str,
+        text: str,
+        vector: np.ndarray,
+        page: Optional[int] = None,
+        tags: Sequence[str] = (),
+        date: Optional[date] = None,
+        position: Optional[int] = None,
+        tokens: Optional[int] = None,
+    ):
+        self.chunk_id = chunk_id
+        self.document_id = document_id
+        self.title = title
+        self.text = text
+        self.vector = vector
+        self.page = page
+        self.tags = tuple(tags)
+        self.date = date
+        self.position = position
+        self.tokens = tokens
+
+    def payload(self, tenant_id: str) -> Dict[str, Any]:
+        return {
+            "tenant_id": tenant_id,
+            "document_id": self.document_id,
+            "chunk_id": self.chunk_id,
+            "title": self.title,
+            "text": self.text,
+            "page": self.page,
+            "tags": list(self.tags),
+            "date": _datetime(self.date) if self.date is not None else None,
+            "position": self.position,
+            "tokens": self.tokens,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], vector: np.ndarray) -> "ChunkRecord":
+        day = payload.get("date")
+        return cls(
+            str(payload.get("chunk_id", "")),
+            str(payload.get("document_id", "")),
+            payload.get("title", ""),
+            payload.get("text", ""),
+            vector,
+            payload.get("page"),
+            payload.get("tags") or (),
+            date.fromisoformat(day[:10]) if day else None,
+            payload.get("position"),
+            payload.get("tokens"),
+        )
+
+    def with_vector(self, vector: np.ndarray) -> "ChunkRecord":
+        return ChunkRecord(
+            self.chunk_id,
+            self.document_id,
+            self.title,
+            self.text,
+            vector,
+            self.page,
+            self.tags,
+            self.date,
+            self.position,
+            self.tokens,
+        )
+
+    def to_hit(self, score: float, vector: Optional[np.ndarray] = None) -> SearchHit:
+        return SearchHit(
+            self.document_id,
+            self.chunk_id,
+            self.title,
+            self.text,
+            score,
+            self.page,
+            vector,
+            self.position,
+            self.tokens,
+        )
+
+
+def _datetime(day: date) -> str:
+    """RFC 3339 timestamp of a date, as Qdrant datetime payload indexes expect."""
+    return f"{day.isoformat()}T00:00:00Z"
+
+
+class VectorStore:
+    """Similarity search over a tenant's document chunks."""
+
+    async def search(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        """
+        Find the chunks most similar to a query vector.
+
+        Args:
+            tenant_id: Tenant whose chunks are searched
+            vector: Query embedding
+            top_k: Number of hits to return
+            filters: Optional restriction by document, tag and date, or
+                a list of document IDs
+
+        Returns:
+            Hits ordered by decreasing similarity
+        """
+        raise NotImplementedError
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        """Insert chunks, replacing stored chunks with the same ``chunk_id``."""
+        raise NotImplementedError
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        """Remove every chunk of a document."""
+        raise NotImplementedError
+
+    def scroll(self, tenant_id: str) -> AsyncIterator[List[ChunkRecord]]:
+        """Iterate over all chunks of a tenant, in batches."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        return None
+
+
+class QdrantVectorStore(VectorStore):
+    """
+    Vector store backed by the Qdrant REST API.
+
+    With ``quantization`` set, the collection is created with full-precision
+    vectors on disk and compressed vectors in RAM; searches run over the
+    compressed vectors and rescore ``oversampling * limit`` candidates
+    against the originals.
+
+    Filtered searches are planned like in-process ones: the number of
+    matching points is counted (approximately, from Qdrant's payload
+    indexes, and cached briefly), and when at most ``exact_max_points``
+    match, the search scores the filtered points exactly instead of
+    walking the HNSW graph with the filter pushed down.
+
+    Args:
+        url: Qdrant base URL
+        collection: Collection holding the chunks of all tenants
+        api_key: Optional API key
+        timeout: Request timeout in seconds
+        quantization: None, "int8" (scalar) or "pq" (product)
+        oversampling: Candidates rescored per requested hit
+        exact_max_points: Largest filtered set searched exactly; 0 disables
+            counting and always uses the graph
+        count_ttl: Seconds a filter's point count is reused
+        with_vectors: Return the embeddings of hits, for diversity reranking
+    """
+
+    def __init__(
+        self,
+        url: str,
+        collection: str,
+        api_key: Optional[str] = None,
+        timeout: float = 30.0,
+        quantization: Optional[str] = None,
+        oversampling: float = 4.0,
+        exact_max_points: int = 5_000,
+        count_ttl: float = 60.0,
+        with_vectors: bool = False,
+    ):
+        if quantization not in (None, "int8", "pq"):
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        self.collection = collection
+        self.quantization = quantization
+        self.oversampling = oversampling
+        self.exact_max_points = exact_max_points
+        self.count_ttl = count_ttl
+        self.with_vectors = with_vectors
+        self._counts: "OrderedDict[Tuple[str, Hashable], Tuple[float, int]]" = OrderedDict()
+        self._client = httpx.AsyncClient(
+            base_url=url.rstrip("/"),
+            headers={"api-key": api_key} if api_key else None,
+            timeout=timeout,
+        )
+
+    async def _request(
+        self, method: str, action: str, payload: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Call a collection endpoint; None if the collection does not exist."""
+        try:
+            response = await self._client.request(
+                method, f"/collections/{self.collection}/{action}", json=payload
+            )
+        except httpx.HTTPError as exc:
+            raise VectorStoreError(
+                "Vector store unavailable", error_code="VECTOR_STORE_UNAVAILABLE", status_code=503
+            ) from exc
+        if response.status_code == 404:
+            # No collection yet: nothing has been ingested
+            return None
+        if response.status_code >= 400:
+            raise VectorStoreError(
+                "Vector store request failed",
+                error_code="VECTOR_STORE_REQUEST_FAILED",
+                details={"status": response.status_code, "action": action},
+            )
+        return response.json()
+
+    def collection_config(self, dimensions: int) -> Dict[str, Any]:
+        """Body of the create-collection request."""
+        config: Dict[str, Any] = {
+            "vectors": {"size": dimensions, "distance": "Cosine", "on_disk": self.quantization is not None}
+        }
+        if self.quantization == "int8":
+            config["quantization_config"] = {
+                "scalar": {"type": "int8", "quantile": 0.99, "always_ram": True}
+            }
+        elif self.quantization == "pq":
+            config["quantization_config"] = {
+                "product": {"compression": "x16", "always_ram": True}
+            }
+        return config
+
+    # Payload indexes created with the collection, for tenant isolation and filters
+    PAYLOAD_INDEXES = (
+        ("tenant_id", "keyword"),
+        ("document_id", "keyword"),
+        ("tags", "keyword"),
+        ("date", "datetime"),
+    )
+
+    async def ensure_collection(self, dimensions: int) -> None:
+        """Create the collection and its payload indexes if they do not exist."""
+        try:
+            response = await self._client.put(
+                f"/collections/{self.collection}", json=self.collection_config(dimensions)
+            )
+            if response.status_code < 400:
+                for field, schema in self.PAYLOAD_INDEXES:
+                    await self._client.put(
+                        f"/collections/{self.collection}/index?wait=true",
+                        json={"field_name": field, "field_schema": schema},
+                    )
+        except httpx.HTTPError as exc:
+            raise VectorStoreError(
+                "Vector store unavailable", error_code="VECTOR_STORE_UNAVAILABLE", status_code=503
+            ) from exc
+        # 409: created concurrently by another worker
+        if response.status_code >= 400 and response.status_code != 409:
+            raise VectorStoreError(
+                "Vector collection could not be created",
+                error_code="VECTOR_COLLECTION_MISSING",
+                details={"collection": self.collection, "status": response.status_code},
+            )
+
+    @staticmethod
+    def _filter(tenant_id: str, search_filter: Optional[SearchFilter] = None) -> Dict[str, Any]:
+        must: List[Dict[str, Any]] = [{"key": "tenant_id", "match": {"value": tenant_id}}]
+        if search_filter is None:
+            return {"must": must}
+        if search_filter.document_ids is not None:
+            must.append({"key": "document_id", "match": {"any": sorted(search_filter.document_ids)}})
+        if search_filter.tags is not None:
+            must.append({"key": "tags", "match": {"any": sorted(search_filter.tags)}})
+        if search_filter.start is not None or search_filter.end is not None:
+            bounds = {}
+            if search_filter.start is not None:
+                bounds["gte"] = _datetime(search_filter.start)
+            if search_filter.end is not None:
+                bounds["lte"] = _datetime(search_filter.end)
+            must.append({"key": "date", "range": bounds})
+        return {"must": must}
+
+    async def _count(self, tenant_id: str, search_filter: SearchFilter) -> Optional[int]:
+        """Approximate number of points matching a filter, cached for ``count_ttl``."""
+        key = (tenant_id, search_filter.key)
+        now = time.monotonic()
+        cached = self._counts.get(key)
+        if cached is not None and now - cached[0] < self.count_ttl:
+            return cached[1]
+        data = await self._request(
+            "POST", "points/count", {"filter": self._filter(tenant_id, search_filter), "exact": False}
+        )
+        if data is None:
+            return None
+        count = int((data.get("result") or {}).get("count", 0))
+        self._counts[key] = (now, count)
+        if len(self._counts) > 1024:
+            self._counts.popitem(last=False)
+        return count
+
+    @staticmethod
+    def point_id(tenant_id: str, chunk_id: str) -> str:
+        """Qdrant point IDs must be UUIDs or integers; derive one per chunk."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"docuquery:{tenant_id}:{chunk_id}"))
+
+    async def search(
+        self,
+        tenant_id: str,
+        vector: np.ndarray,
+        top_k: int,
+        filters: FilterLike = None,
+    ) -> List[SearchHit]:
+        search_filter = SearchFilter.coerce(filters)
+        payload: Dict[str, Any] = {
+            "vector": vector.tolist(),
+            "limit": top_k,
+            "with_payload": True,
+            "with_vector": self.with_vectors,
+            "filter": self._filter(tenant_id, search_filter),
+        }
+        params: Dict[str, Any] = {}
+        if self.quantization is not None:
+            params["quantization"] = {"rescore": True, "oversampling": self.oversampling}
+        if search_filter is not None and self.exact_max_points:
+            matching = await self._count(tenant_id, search_filter)
+            if matching is not None and matching <= self.exact_max_points:
+                # Few matches: brute force over the filtered points beats the graph
+                params["exact"] = True
+        if params:
+            payload["params"] = params
+        data = await self._request("POST", "points/search", payload)
+        if data is None:
+            return []
+        return [
+            SearchHit.from_payload(point.get("payload") or {}, point["score"], point.get("vector"))
+            for point in data.get("result", [])
+        ]
+
+    async def upsert(self, tenant_id: str, records: Sequence[ChunkRecord]) -> None:
+        points = [
+            {
+                "id": self.point_id(tenant_id, record.chunk_id),
+                "vector": np.asarray(record.vector, dtype=np.float32).tolist(),
+                "payload": record.payload(tenant_id),
+            }
+            for record in records
+        ]
+        if not points:
+            return
+        if await self._request("PUT", "points?wait=true", {"points": points}) is None:
+            # First write: create the collection with the configured storage
+            await self.ensure_collection(len(points[0]["vector"]))
+            if await self._request("PUT", "points?wait=true", {"points": points}) is None:
+                raise VectorStoreError(
+                    "Vector collection does not exist",
+                    error_code="VECTOR_COLLECTION_MISSING",
+                    details={"collection": self.collection},
+                )
+
+    async def delete_document(self, tenant_id: str, document_id: str) -> None:
+        await self._request(
+            "POST",
+            "points/delete?wait=true",
+            {"filter": self._filter(tenant_id, SearchFilter(document_ids=[document_id]))},
+        )
+
+    async def scroll(self, tenant_id: str, batch_size: int = 256) -> AsyncIterator[List[ChunkRecord]]:
+        offset: Any = None
+        while True:
+            payload: Dict[str, Any] = {
+                "filter": self._filter(tenant_id),
+                "limit": batch_size,
+                "with_payload": True,
+                "with_vector": True,
+            }
+            if offset is not None:
+                payload["offset"] = offset
+            data = await self._request("POST", "points/scroll", payload)
+            if data is None:
+                return
+            result = data.get("result") or {}
+            batch = []
+            for point in result.get("points", []):
+                batch.append(
+                    ChunkRecord.from_payload(
+                        point.get("payload") or {}, np.asarray(point["vector"], dtype=np.float32)
+                    )
+                )
+            if batch:
+                yield batch
+            offset = result.get("next_page_offset")
+            if offset is None:
+                return
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
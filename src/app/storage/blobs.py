@@ -0,0 +1,125 @@
+"""
+DocuQuery AI - Document File Storage
+
+This module stores the files of uploaded documents under keys such as
+``tenants/{tenant_id}/documents/{document_id}/{filename}``. Files are
+written by appending blocks as an upload streams in, so no file is ever
+held in memory whole, and are moved to their final key once complete.
+"""
+
+import os
+from typing import Any, BinaryIO, Callable, Union
+
+from app.telemetry.tracing import run_in_executor
+
+Block = Union[bytes, bytearray, memoryview]
+
+
+class StoredFile:
+    """Where a document's file is stored and what it holds."""
+
+    __slots__ = ("key", "size", "sha256", "content_type")
+
+    def __init__(self, key: str, size: int, sha256: str, content_type: str):
+        self.key = key
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+
+class BlobStore:
+    """Files by key."""
+
+    async def append(self, key: str, data: Block) -> None:
+        """Add bytes to the end of a file, creating it if needed."""
+        raise NotImplementedError
+
+    async def size(self, key: str) -> int:
+        """Bytes stored under a key; 0 if there is no file."""
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        A seekable binary file for reading; blocking, so call it and read
+        from it in an executor.
+        """
+        raise NotImplementedError
+
+    async def move(self, source: str, target: str) -> None:
+        """Rename a file, replacing any file at ``target``."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Remove a file if it exists."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Files in a local directory, for ``STORAGE_TYPE=local``.
+
+    File operations run in the default executor so that disk latency never
+    stalls the event loop.
+
+    Args:
+        root: Directory holding the files; created if missing
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Local path of a key; keys may not leave the root directory."""
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    async def append(self, key: str, data: Block) -> None:
+        await self._run(self._append, self.path(key), data)
+
+    async def size(self, key: str) -> int:
+        return await self._run(self._size, self.path(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    async def move(self, source: str, target: str) -> None:
+        await self._run(self._move, self.path(source), self.path(target))
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, self.path(key))
+
+    @staticmethod
+    async def _run(function: Callable[..., Any], *args: Any) -> Any:
+        return await run_in_executor(None, function, *args)
+
+    @staticmethod
+    def _append(path: str, data: Block) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as file:
+            file.write(data)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _move(source: str, target: str) -> None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+
+    @staticmethod
+    def _delete(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
@@ -0,0 +1,60 @@
+"""
+DocuQuery AI - Telemetry Package
+
+This package contains the logging, metrics and timing instrumentation used by
+the middleware pipeline and the services.
+"""
+
+from .logs import (
+    AccessLogSampler,
+    AsyncLogHandler,
+    JSONFormatter,
+    configure_logging,
+    shutdown_logging,
+)
+from .metrics import MetricsExporter, MetricsRegistry, MetricsSnapshot, collect_directory
+from .stages import StageTimer, current_timer, stage, stage_breakdown
+from .tracing import (
+    FileSpanExporter,
+    HTTPSpanExporter,
+    Span,
+    SpanContext,
+    SpanExporter,
+    Tracer,
+    configure_tracing,
+    current_span,
+    extract,
+    get_tracer,
+    inject,
+    shutdown_tracing,
+    start_span,
+)
+
+__all__ = [
+    "AccessLogSampler",
+    "AsyncLogHandler",
+    "FileSpanExporter",
+    "HTTPSpanExporter",
+    "JSONFormatter",
+    "MetricsExporter",
+    "MetricsRegistry",
+    "MetricsSnapshot",
+    "Span",
+    "SpanContext",
+    "SpanExporter",
+    "StageTimer",
+    "Tracer",
+    "collect_directory",
+    "configure_logging",
+    "configure_tracing",
+    "current_span",
+    "current_timer",
+    "extract",
+    "get_tracer",
+    "inject",
+    "shutdown_logging",
+    "shutdown_tracing",
+    "stage",
+    "stage_breakdown",
+    "start_span",
+]
@@ -0,0 +1,281 @@
+"""
+DocuQuery AI - Health Monitor
+
+This module probes the service dependencies from a background task instead of
+from the health endpoints. All probes run concurrently, each bounded by its
+own timeout, and the results are cached together with a short latency
+history. Health, readiness and liveness endpoints answer from the cached
+state, treating results older than the staleness threshold as unknown, so a
+load balancer probe never waits on Postgres, Redis, Qdrant or OpenAI.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("docuquery.health")
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+UNKNOWN = "unknown"
+
+
+class Probe:
+    """
+    A named dependency check.
+
+    Args:
+        name: Dependency name reported by the health endpoints
+        check: Coroutine function raising if the dependency is unavailable
+        timeout: Seconds before the probe counts as failed
+        critical: Whether readiness depends on this probe; non-critical
+            failures only degrade the health status
+    """
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[], Awaitable[Any]],
+        timeout: float = 2.0,
+        critical: bool = True,
+    ):
+        self.name = name
+        self.check = check
+        self.timeout = timeout
+        self.critical = critical
+
+
+class ProbeState:
+    """
+    Latest result of one probe plus its recent latencies.
+
+    ``error`` is the failure as logged; only ``error_code``, which names no
+    host or internal detail, is reported by the health endpoint.
+    """
+
+    __slots__ = ("status", "latency_ms", "checked_at", "checked_at_iso", "error", "error_code", "history")
+
+    def __init__(self, history_size: int):
+        self.status = UNKNOWN
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.checked_at_iso: Optional[str] = None
+        self.error: Optional[str] = None
+        self.error_code: Optional[str] = None
+        self.history: Deque[float] = deque(maxlen=history_size)
+
+
+def error_code(exc: BaseException) -> str:
+    """Short, fixed code of a probe failure."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"http_{exc.response.status_code}"
+    if isinstance(exc, (OSError, httpx.TransportError)):
+        return "connection_failed"
+    return "check_failed"
+
+
+class HealthMonitor:
+    """
+    Periodically probes dependencies and serves the cached results.
+
+    Args:
+        probes: Dependency checks to run
+        interval: Seconds between refreshes
+        stale_after: Age in seconds after which a result is reported as
+            unknown, e.g. when the refresher is stuck or stopped
+        history_size: Probe latencies kept per dependency
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        probes: Sequence[Probe],
+        interval: float = 10.0,
+        stale_after: float = 30.0,
+        history_size: int = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.probes = list(probes)
+        self.interval = interval
+        self.stale_after = stale_after
+        self.clock = clock
+        self.started_at = clock()
+        self.states: Dict[str, ProbeState] = {p.name: ProbeState(history_size) for p in self.probes}
+        self.refreshes = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _run_probe(self, probe: Probe) -> None:
+        state = self.states[probe.name]
+        started = time.perf_counter()
+        code: Optional[str] = None
+        try:
+            await asyncio.wait_for(probe.check(), timeout=probe.timeout)
+        except asyncio.TimeoutError as exc:
+            status, error, code = UNHEALTHY, f"timed out after {probe.timeout:g}s", error_code(exc)
+        except Exception as exc:
+            status, error, code = UNHEALTHY, f"{type(exc).__name__}: {exc}"[:200], error_code(exc)
+        else:
+            status, error = HEALTHY, None
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        if status != state.status:
+            logger.log(
+                logging.INFO if status == HEALTHY else logging.WARNING,
+                "Dependency %s is %s%s",
+                probe.name,
+                status,
+                f" ({error})" if error else "",
+            )
+        state.status = status
+        state.error = error
+        state.error_code = code
+        state.latency_ms = latency_ms
+        state.checked_at = self.clock()
+        state.checked_at_iso = datetime.utcnow().isoformat() + "Z"
+        state.history.append(latency_ms)
+
+    async def refresh(self) -> None:
+        """Run every probe concurrently and update the cached results."""
+        await asyncio.gather(*(self._run_probe(probe) for probe in self.probes))
+        self.refreshes += 1
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:  # never let the refresher die
+                logger.exception("Health refresh failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background refresher on the running loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_running(self) -> bool:
+        """Whether the background refresher is alive."""
+        return self._task is not None and not self._task.done()
+
+    def status_of(self, name: str, now: Optional[float] = None) -> str:
+        """Cached status of a dependency, or unknown if missing or stale."""
+        state = self.states[name]
+        if state.checked_at is None:
+            return UNKNOWN
+        now = self.clock() if now is None else now
+        if now - state.checked_at > self.stale_after:
+            return UNKNOWN
+        return state.status
+
+    def statuses(self) -> Dict[str, str]:
+        now = self.clock()
+        return {name: self.status_of(name, now) for name in self.states}
+
+    def overall_status(self, statuses: Optional[Dict[str, str]] = None) -> str:
+        """healthy, degraded if only non-critical dependencies fail, or unhealthy."""
+        statuses = statuses if statuses is not None else self.statuses()
+        status = HEALTHY
+        for probe in self.probes:
+            if statuses[probe.name] != HEALTHY:
+                if probe.critical:
+                    return UNHEALTHY
+                status = "degraded"
+        return status
+
+    def is_ready(self) -> bool:
+        """Ready once every critical dependency has a fresh healthy result."""
+        now = self.clock()
+        return all(
+            self.status_of(probe.name, now) == HEALTHY
+            for probe in self.probes
+            if probe.critical
+        )
+
+    def uptime_seconds(self) -> float:
+        return self.clock() - self.started_at
+
+    def uptime(self) -> str:
+        """Uptime formatted as "2d 5h 30m 15s"."""
+        seconds = int(self.uptime_seconds())
+        days, seconds = divmod(seconds, 86400)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return f"{days}d {hours}h {minutes}m {seconds}s"
+
+    def probe_details(self) -> Dict[str, Dict[str, Any]]:
+        """Latest result and latency history per dependency."""
+        now = self.clock()
+        return {
+            name: {
+                "status": self.status_of(name, now),
+                "latency_ms": state.latency_ms,
+                "checked_at": state.checked_at_iso,
+                "error": state.error_code,
+                "latency_history_ms": list(state.history),
+            }
+            for name, state in self.states.items()
+        }
+
+
+async def tcp_check(host: str, port: int) -> None:
+    """Open and close a TCP connection."""
+    _, writer = await asyncio.open_connection(host, port)
+    writer.close()
+    await writer.wait_closed()
+
+
+def tcp_probe(name: str, url: str, default_port: int, timeout: float = 2.0, critical: bool = True) -> Probe:
+    """Probe that a service URL's host accepts TCP connections."""
+    parts = urlsplit(url)
+    host = parts.hostname or "localhost"
+    port = parts.port or default_port
+    return Probe(name, lambda: tcp_check(host, port), timeout=timeout, critical=critical)
+
+
+def http_probe(
+    name: str,
+    url: str,
+    timeout: float = 2.0,
+    critical: bool = True,
+    headers: Optional[Dict[str, str]] = None,
+) -> Probe:
+    """Probe that a URL answers with a non-error status."""
+
+    async def check() -> None:
+        async with httpx.AsyncClient(timeout=timeout, headers=headers) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+
+    return Probe(name, check, timeout=timeout, critical=critical)
+
+
+def build_default_probes(settings: Any, timeout: float) -> List[Probe]:
+    """Probes for the dependencies configured in ``settings``."""
+    qdrant_headers = {"api-key": settings.QDRANT_API_KEY} if settings.QDRANT_API_KEY else None
+    return [
+        tcp_probe("database", settings.DATABASE_URL, 5432, timeout=timeout),
+        tcp_probe("redis", settings.REDIS_URL, 6379, timeout=timeout),
+        http_probe(
+            "qdrant",
+            settings.QDRANT_URL.rstrip("/") + "/readyz",
+            timeout=timeout,
+            headers=qdrant_headers,
+        ),
+        # The LLM provider degrades answers but does not make the API unready
+        tcp_probe("openai", "https://api.openai.com", 443, timeout=timeout, critical=False),
+    ]
@@ -0,0 +1,273 @@
+"""
+DocuQuery AI - Structured Logging
+
+This module moves log formatting and I/O off the event loop. Records go into
+a bounded in-memory queue through ``AsyncLogHandler``; a listener thread
+formats them as single-line JSON (with the static fields pre-serialized) and
+writes them out. When the queue is full records are dropped and counted
+instead of blocking the request path; the count is published through the
+metrics registry. ``AccessLogSampler`` decides which access log records are
+worth keeping.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .tracing import current_span
+
+# Attributes of a bare LogRecord; anything else was passed through ``extra``
+_RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "access"}
+
+# Metric families reported by ``LoggingPipeline.metric_samples``
+LOG_METRICS = {
+    "docuquery_log_records_dropped_total": ("counter", "Log records dropped because the log queue was full."),
+}
+
+# Field names of the ``access`` tuple attached by the logging stage
+ACCESS_FIELDS = (
+    "method",
+    "path",
+    "status_code",
+    "duration_ms",
+    "request_id",
+    "client_ip",
+)
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def __init__(self, static_fields: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        # Fields shared by every record are serialized once, up front
+        static = json.dumps(static_fields or {}, separators=(",", ":"))
+        self._prefix = static[:-1] + "," if len(static) > 2 else "{"
+        self._encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        access = getattr(record, "access", None)
+        if access is not None:
+            payload.update(zip(ACCESS_FIELDS, access))
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return self._prefix + self._encoder.encode(payload)[1:]
+
+
+class AsyncLogHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller.
+
+    Records are enqueued as-is: formatting, including the message ``%``
+    interpolation, happens in the listener thread. Arguments passed to a log
+    call must therefore not be mutated afterwards. The current trace id is
+    captured here, since the listener thread has no request context.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if "trace_id" not in record.__dict__:
+            span = current_span()
+            if span is not None:
+                record.trace_id = span.context.trace_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.count_drop()
+
+    def count_drop(self) -> None:
+        with self._drop_lock:
+            self.dropped += 1
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """
+    Queue listener that can be stopped while the queue is full.
+
+    The stop sentinel waits up to ``stop_timeout`` seconds for the listener
+    thread to make room; if the writer is stuck, the oldest records are
+    dropped instead, since ``put_nowait`` would raise ``queue.Full``.
+    """
+
+    def __init__(
+        self,
+        handler: AsyncLogHandler,
+        target: logging.Handler,
+        respect_handler_level: bool = False,
+        stop_timeout: float = 5.0,
+    ):
+        super().__init__(handler.queue, target, respect_handler_level=respect_handler_level)
+        self.handler = handler
+        self.stop_timeout = stop_timeout
+
+    def enqueue_sentinel(self) -> None:
+        try:
+            self.queue.put(self._sentinel, timeout=self.stop_timeout)
+            return
+        except queue.Full:
+            pass
+        while True:
+            try:
+                self.queue.put_nowait(self._sentinel)
+                return
+            except queue.Full:
+                pass
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            self.queue.task_done()
+            self.handler.count_drop()
+
+
+class AccessLogSampler:
+    """
+    Per-route sampling for access logs.
+
+    Requests that failed with a server error or ran longer than
+    ``slow_threshold_ms`` are always kept; everything else is kept with the
+    rate of the longest matching path prefix, or ``default_rate``.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = 1.0,
+        route_rates: Optional[Dict[str, float]] = None,
+        slow_threshold_ms: float = 1000.0,
+    ):
+        self.default_rate = default_rate
+        # Longest prefix first so the most specific rule wins
+        self.route_rates: List[Tuple[str, float]] = sorted(
+            (route_rates or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.slow_threshold_ms = slow_threshold_ms
+        self._random = random.random
+
+    def rate_for(self, path: str) -> float:
+        for prefix, rate in self.route_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    def should_log(self, path: str, status_code: int, duration_ms: float) -> bool:
+        if status_code >= 500 or duration_ms >= self.slow_threshold_ms:
+            return True
+        rate = self.rate_for(path)
+        return rate >= 1.0 or (rate > 0.0 and self._random() < rate)
+
+
+class LoggingPipeline:
+    """The queue handler together with the listener thread that drains it."""
+
+    def __init__(
+        self,
+        handler: AsyncLogHandler,
+        listener: logging.handlers.QueueListener,
+        loggers: List[str],
+    ):
+        self.handler = handler
+        self.listener = listener
+        self.loggers = loggers
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def metric_samples(self) -> List[Tuple[str, str, float]]:
+        """Counters for the metrics registry; families are in ``LOG_METRICS``."""
+        return [("docuquery_log_records_dropped_total", "", self.handler.dropped)]
+
+    def stop(self) -> None:
+        """Flush queued records, stop the listener thread and detach the handler."""
+        self.listener.stop()
+        for name in self.loggers:
+            logger = logging.getLogger(name)
+            logger.removeHandler(self.handler)
+            logger.propagate = True
+
+
+_pipeline: Optional[LoggingPipeline] = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    log_format: str = "json",
+    queue_size: int = 10000,
+    static_fields: Optional[Dict[str, Any]] = None,
+    loggers: Iterable[str] = ("docuquery",),
+    target: Optional[logging.Handler] = None,
+) -> LoggingPipeline:
+    """
+    Route the application loggers through a non-blocking queue.
+
+    Args:
+        level: Log level for the application loggers
+        log_format: "json" for structured output, "text" for plain lines
+        queue_size: Records buffered before new ones are dropped
+        static_fields: Fields added to every JSON record
+        loggers: Logger names to attach the queue handler to
+        target: Handler doing the actual I/O; defaults to stdout
+
+    Returns:
+        The running pipeline; call ``stop()`` on shutdown to flush it
+    """
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+
+    if target is None:
+        target = logging.StreamHandler(sys.stdout)
+    if log_format == "json":
+        target.setFormatter(JSONFormatter(static_fields))
+    else:
+        target.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+
+    handler = AsyncLogHandler(queue_size)
+    listener = _LogListener(handler, target, respect_handler_level=True)
+    logger_names = list(loggers)
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        logger.setLevel(level.upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+    listener.start()
+
+    _pipeline = LoggingPipeline(handler, listener, logger_names)
+    return _pipeline
+
+
+def shutdown_logging() -> None:
+    """Stop the pipeline started by ``configure_logging``, if any."""
+    global _pipeline
+    if _pipeline is None:
+        return
+    _pipeline.stop()
+    _pipeline = None
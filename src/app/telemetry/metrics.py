@@ -0,0 +1,493 @@
+"""
+DocuQuery AI - Request Metrics
+
+This module records per-route latency histograms, status counters and an
+in-flight gauge into a fixed-layout memory map. Each worker process owns one
+map and is its only writer, so recording is a handful of array increments
+with no locks. Components keeping their own counters (caches, the log
+queue) publish them into the same map as named counter and gauge series,
+read from them at each flush. When a metrics directory is configured the
+maps are files, and the exporter sums the files of every worker into one
+Prometheus text page served on its own port.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import socket
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger("docuquery.telemetry")
+
+# Latency bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests that matched no route, and for series past the cap
+UNMATCHED_ROUTE = "<unmatched>"
+OVERFLOW_ROUTE = "<overflow>"
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+COUNTER = "counter"
+GAUGE = "gauge"
+
+# A published sample: metric family, Prometheus label pairs ('a="x",b="y"' or ""), value
+Sample = Tuple[str, str, float]
+# Family -> (counter or gauge, help text)
+Families = Mapping[str, Tuple[str, str]]
+
+_MAGIC = 0x3276_5254_454D_5144  # "DQMETRv2", little-endian
+_HEADER_WORDS = 8  # magic, buckets, max series, series count, in flight, max values, value count
+_NAME_SIZE = 128
+_FILE_PREFIX = "metrics-"
+
+
+class _Layout:
+    """Byte offsets of the regions of a metrics map."""
+
+    def __init__(self, n_buckets: int, max_series: int, max_values: int):
+        self.n_buckets = n_buckets
+        self.max_series = max_series
+        self.max_values = max_values
+        # One block of bucket counts (including +Inf) per status class; the
+        # status counters are the block totals
+        self.block = n_buckets + 1
+        self.stride = self.block * len(STATUS_CLASSES)
+        self.bounds = _HEADER_WORDS * 8
+        self.names = self.bounds + n_buckets * 8
+        self.counts = self.names + max_series * _NAME_SIZE
+        self.sums = self.counts + max_series * self.stride * 8
+        # Published values: "kind family labels" names, then the values
+        self.value_names = self.sums + max_series * 8
+        self.values = self.value_names + max_values * _NAME_SIZE
+        self.size = self.values + max_values * 8
+
+
+class MetricsRegistry:
+    """
+    Request metrics of one worker process.
+
+    Series are keyed by method and route template. Only the event loop of the
+    owning process may record or flush; readers of the map tolerate counters
+    that are mid-update. ``in_flight`` is adjusted directly by the caller.
+    Sources added with ``add_source`` are read at every flush; their gauges
+    are zeroed when the registry closes, their counters kept.
+
+    Args:
+        buckets: Latency bucket upper bounds in seconds
+        max_series: Method/route pairs tracked before folding into overflow
+        directory: Directory for file-backed maps shared between workers;
+            None keeps the map private to this process
+        worker_id: Name of this worker's file; defaults to the process id
+        max_values: Published counter and gauge series kept; later ones are dropped
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        max_series: int = 512,
+        directory: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        max_values: int = 256,
+    ):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self.directory = directory
+        self._layout = layout = _Layout(len(self.buckets), max_series, max_values)
+
+        if directory is None:
+            self.path: Optional[Path] = None
+            self._mmap = mmap.mmap(-1, layout.size)
+        else:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            self.path = Path(directory) / f"{_FILE_PREFIX}{worker_id or os.getpid()}.db"
+            with open(self.path, "w+b") as fh:
+                fh.truncate(layout.size)
+                self._mmap = mmap.mmap(fh.fileno(), layout.size)
+
+        view = memoryview(self._mmap)
+        self._header = view[: layout.bounds].cast("q")
+        view[layout.bounds : layout.names].cast("d")[:] = array("d", self.buckets)
+        self._counts = view[layout.counts : layout.sums].cast("q")
+        self._sums = view[layout.sums : layout.value_names].cast("d")
+        self._values = view[layout.values :].cast("d")
+        self._view = view
+        self._header[1] = layout.n_buckets
+        self._header[2] = max_series
+        self._header[5] = max_values
+        self._header[0] = _MAGIC
+
+        self._bounds = self.buckets
+        self._stride = layout.stride
+        # First column of each status class block, indexed by ``status_code // 100``
+        self._status_offsets = tuple(
+            layout.block * (c - 1 if 1 <= c <= 5 else 4) for c in range(10)
+        )
+        self._series: Dict[Tuple[str, str], List] = {}
+        self._rows: List[List] = []
+        self.in_flight = 0
+        self._sources: List[Tuple[Callable[[], Iterable[Sample]], Families]] = []
+        self.families: Dict[str, Tuple[str, str]] = {}
+        # (family, labels) -> slot of a published value, and the gauge slots
+        self._value_slots: Dict[Tuple[str, str], int] = {}
+        self._gauge_slots: List[int] = []
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        """
+        Record one finished request.
+
+        Args:
+            method: HTTP method
+            route: Route template, e.g. "/api/v1/documents/{document_id}"
+            status_code: Response status code
+            seconds: Request duration
+        """
+        row = self._series.get((method, route))
+        if row is None:
+            row = self._register(method, route)
+        row[self._status_offsets[status_code // 100] + bisect_left(self._bounds, seconds)] += 1
+        row[-1] += seconds
+
+    def _register(self, method: str, route: str) -> List:
+        rows = self._rows
+        slot = len(rows)
+        if slot >= self._layout.max_series - 1:
+            # The last slot is reserved for everything past the cap, and
+            # overflowing keys are not cached so the index stays bounded
+            if slot == self._layout.max_series - 1:
+                self._add_row(slot, "*", OVERFLOW_ROUTE)
+            return rows[-1]
+        row = self._add_row(slot, method, route)
+        self._series[(method, route)] = row
+        return row
+
+    def _add_row(self, slot: int, method: str, route: str) -> List:
+        # Counters, then the duration sum as the last column
+        row: List = [0] * self._stride + [0.0]
+        self._rows.append(row)
+        raw = f"{method} {route}".encode("utf-8")[: _NAME_SIZE - 1]
+        start = self._layout.names + slot * _NAME_SIZE
+        self._view[start : start + _NAME_SIZE] = raw.ljust(_NAME_SIZE, b"\x00")
+        # Publish the name before the count so readers never see a blank slot
+        self._header[3] = slot + 1
+        return row
+
+    def add_source(self, source: Callable[[], Iterable[Sample]], families: Families) -> None:
+        """
+        Publish counters kept elsewhere.
+
+        Args:
+            source: Returns the current samples; called at every flush
+            families: Kind and help text of each family the source reports
+        """
+        self._sources.append((source, families))
+        self.families.update(families)
+
+    def _publish(self, family: str, labels: str, value: float, kind: str) -> None:
+        slot = self._value_slots.get((family, labels))
+        if slot is None:
+            slot = len(self._value_slots)
+            if slot >= self._layout.max_values:
+                return
+            raw = f"{kind} {family} {labels}".encode("utf-8")[: _NAME_SIZE - 1]
+            start = self._layout.value_names + slot * _NAME_SIZE
+            self._view[start : start + _NAME_SIZE] = raw.ljust(_NAME_SIZE, b"\x00")
+            self._value_slots[(family, labels)] = slot
+            if kind == GAUGE:
+                self._gauge_slots.append(slot)
+            self._header[6] = slot + 1
+        self._values[slot] = value
+
+    def flush(self) -> None:
+        """
+        Copy the counters into the memory map.
+
+        Recording only touches Python lists, which is several times cheaper
+        than writing through the map; the exporter flushes periodically and
+        before every scrape.
+        """
+        counts = self._counts
+        sums = self._sums
+        stride = self._stride
+        for slot, row in enumerate(self._rows):
+            base = slot * stride
+            counts[base : base + stride] = array("q", row[:stride])
+            sums[slot] = row[-1]
+        self._header[4] = self.in_flight
+        for source, families in self._sources:
+            try:
+                samples = list(source())
+            except Exception:
+                logger.exception("Reading metrics source %r failed", source)
+                continue
+            for family, labels, value in samples:
+                self._publish(family, labels, value, families[family][0])
+
+    def collect(self) -> "MetricsSnapshot":
+        """Aggregate this worker, or every worker sharing the directory."""
+        self.flush()
+        if self.directory is None:
+            snapshot = MetricsSnapshot.from_buffer(self._mmap)
+        else:
+            snapshot = collect_directory(self.directory)
+        snapshot.families = self.families
+        return snapshot
+
+    def close(self) -> None:
+        """Zero the gauges and release the map; the counters stay on disk."""
+        if self._mmap.closed:
+            return
+        self.in_flight = 0
+        self.flush()
+        for slot in self._gauge_slots:
+            self._values[slot] = 0.0
+        self._header.release()
+        self._counts.release()
+        self._sums.release()
+        self._values.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class SeriesSnapshot:
+    """Aggregated counters of one method/route series."""
+
+    __slots__ = ("buckets", "statuses", "total")
+
+    def __init__(self, n_buckets: int):
+        self.buckets = [0] * (n_buckets + 1)
+        self.statuses = [0] * len(STATUS_CLASSES)
+        self.total = 0.0
+
+
+class MetricsSnapshot:
+    """Point-in-time copy of one or more metrics maps, summed together."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.in_flight = 0
+        self.series: Dict[Tuple[str, str], SeriesSnapshot] = {}
+        # (kind, family, labels) -> value summed over workers
+        self.values: Dict[Tuple[str, str, str], float] = {}
+        # Help text of published families, for rendering
+        self.families: Mapping[str, Tuple[str, str]] = {}
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "MetricsSnapshot":
+        view = memoryview(buffer)
+        header = view[: _HEADER_WORDS * 8].cast("q")
+        if header[0] != _MAGIC:
+            raise ValueError("not a metrics map")
+        layout = _Layout(header[1], header[2], header[5])
+        snapshot = cls(view[layout.bounds : layout.names].cast("d").tolist())
+        snapshot.merge(view, layout, header)
+        return snapshot
+
+    def merge(self, view: memoryview, layout: _Layout, header: memoryview) -> None:
+        """Add the counters of a raw map with the same buckets to this snapshot."""
+        self.in_flight += header[4]
+        count = min(header[3], layout.max_series)
+        counts = view[layout.counts : layout.sums].cast("q")
+        sums = view[layout.sums : layout.value_names].cast("d")
+        n_buckets = layout.n_buckets
+        for slot in range(count):
+            start = layout.names + slot * _NAME_SIZE
+            raw = bytes(view[start : start + _NAME_SIZE]).rstrip(b"\x00")
+            method, _, route = raw.decode("utf-8", "replace").partition(" ")
+            series = self.series.get((method, route))
+            if series is None:
+                series = self.series[(method, route)] = SeriesSnapshot(n_buckets)
+            base = slot * layout.stride
+            row = counts[base : base + layout.stride].tolist()
+            for status in range(len(STATUS_CLASSES)):
+                block = row[status * layout.block : (status + 1) * layout.block]
+                for i, value in enumerate(block):
+                    series.buckets[i] += value
+                series.statuses[status] += sum(block)
+            series.total += sums[slot]
+
+        values = view[layout.values : layout.size].cast("d")
+        for slot in range(min(header[6], layout.max_values)):
+            start = layout.value_names + slot * _NAME_SIZE
+            raw = bytes(view[start : start + _NAME_SIZE]).rstrip(b"\x00")
+            kind, _, rest = raw.decode("utf-8", "replace").partition(" ")
+            family, _, labels = rest.partition(" ")
+            key = (kind, family, labels)
+            self.values[key] = self.values.get(key, 0.0) + values[slot]
+
+    def render(self) -> str:
+        """Render the snapshot in the Prometheus text exposition format."""
+        lines = [
+            "# HELP docuquery_http_requests_in_flight Requests currently being served.",
+            "# TYPE docuquery_http_requests_in_flight gauge",
+            f"docuquery_http_requests_in_flight {self.in_flight}",
+            "# HELP docuquery_http_requests_total Finished requests by route and status class.",
+            "# TYPE docuquery_http_requests_total counter",
+        ]
+        ordered = sorted(self.series.items())
+        for (method, route), series in ordered:
+            labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+            for name, value in zip(STATUS_CLASSES, series.statuses):
+                if value:
+                    lines.append(
+                        f'docuquery_http_requests_total{{{labels},status="{name}"}} {value}'
+                    )
+        lines.append(
+            "# HELP docuquery_http_request_duration_seconds Request latency by route."
+        )
+        lines.append("# TYPE docuquery_http_request_duration_seconds histogram")
+        for (method, route), series in ordered:
+            labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, value in zip(self.buckets, series.buckets):
+                cumulative += value
+                lines.append(
+                    f'docuquery_http_request_duration_seconds_bucket{{{labels},le="{bound:g}"}} '
+                    f"{cumulative}"
+                )
+            cumulative += series.buckets[-1]
+            lines.append(
+                f'docuquery_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                f"{cumulative}"
+            )
+            lines.append(
+                f"docuquery_http_request_duration_seconds_sum{{{labels}}} {series.total!r}"
+            )
+            lines.append(
+                f"docuquery_http_request_duration_seconds_count{{{labels}}} {cumulative}"
+            )
+        family = None
+        for (kind, name, labels), value in sorted(self.values.items(), key=lambda item: item[0][1:]):
+            if name != family:
+                family = name
+                if name in self.families:
+                    lines.append(f"# HELP {name} {self.families[name][1]}")
+                lines.append(f"# TYPE {name} {kind}")
+            text = str(int(value)) if value.is_integer() else repr(value)
+            lines.append(f"{name}{{{labels}}} {text}" if labels else f"{name} {text}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def collect_directory(directory: str) -> MetricsSnapshot:
+    """
+    Sum the metrics maps of every worker that wrote to ``directory``.
+
+    Maps whose bucket layout differs from the first one read are skipped.
+    """
+    snapshot: Optional[MetricsSnapshot] = None
+    for path in sorted(Path(directory).glob(f"{_FILE_PREFIX}*.db")):
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            part = MetricsSnapshot.from_buffer(data)
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable metrics file %s: %s", path, exc)
+            continue
+        if snapshot is None:
+            snapshot = part
+        elif part.buckets != snapshot.buckets:
+            logger.warning("Skipping metrics file %s with different buckets", path)
+        else:
+            snapshot.in_flight += part.in_flight
+            for key, series in part.series.items():
+                target = snapshot.series.get(key)
+                if target is None:
+                    snapshot.series[key] = series
+                    continue
+                target.buckets = [a + b for a, b in zip(target.buckets, series.buckets)]
+                target.statuses = [a + b for a, b in zip(target.statuses, series.statuses)]
+                target.total += series.total
+            for key, value in part.values.items():
+                snapshot.values[key] = snapshot.values.get(key, 0.0) + value
+    return snapshot if snapshot is not None else MetricsSnapshot(DEFAULT_BUCKETS)
+
+
+class MetricsExporter:
+    """
+    Minimal HTTP server exposing ``GET /metrics`` on its own port.
+
+    Every worker may run one: the socket is bound with ``SO_REUSEPORT`` where
+    available, and each exporter reports the aggregate of all workers.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        host: str = "0.0.0.0",
+        port: int = 9090,
+        flush_interval: float = 1.0,
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._flusher: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        """Start serving; a port that cannot be bound is logged, not raised."""
+        if self.registry.directory is not None:
+            # Other workers' exporters read this worker's counters from disk
+            self._flusher = asyncio.create_task(self._flush_loop())
+        try:
+            self._server = await asyncio.start_server(
+                self._handle,
+                self.host,
+                self.port,
+                reuse_port=hasattr(socket, "SO_REUSEPORT"),
+            )
+        except OSError as exc:
+            logger.warning("Metrics exporter could not bind port %s: %s", self.port, exc)
+            return
+        sockets: List = list(self._server.sockets or [])
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.registry.flush()
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Drain the request headers
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status = b"200 OK"
+                body = self.registry.collect().render().encode("utf-8")
+                content_type = b"text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = b"404 Not Found"
+                body = b"not found\n"
+                content_type = b"text/plain; charset=utf-8"
+            head = (
+                b"HTTP/1.1 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n"
+                b"Connection: close\r\n\r\n" % (status, content_type, len(body))
+            )
+            writer.write(head + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
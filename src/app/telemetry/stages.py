@@ -0,0 +1,134 @@
+"""
+DocuQuery AI - Stage Timing
+
+This module provides a contextvar-based timer for the phases of a request,
+such as embedding, vector search, rerank and LLM generation. Handlers and
+services wrap a phase in ``with stage("vector_search"):``; the timing stage of
+the middleware pipeline turns the collected durations into a ``Server-Timing``
+header, and the access log and query responses report the same breakdown.
+When no timer is active, ``stage()`` is a context variable lookup returning a
+shared no-op context manager.
+"""
+
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+
+_current: ContextVar[Optional["StageTimer"]] = ContextVar(
+    "docuquery_stage_timer", default=None
+)
+
+
+class StageTimer:
+    """Accumulated durations per stage name for one request."""
+
+    __slots__ = ("durations", "_token")
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = {}
+        self._token: Optional[Token] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time to a stage; repeated stages are summed."""
+        durations = self.durations
+        durations[name] = durations.get(name, 0.0) + seconds
+
+    def as_ms(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, in the order stages first ran."""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+
+    def server_timing(self, total: Optional[float] = None) -> bytes:
+        """
+        Render the stages as a ``Server-Timing`` header value.
+
+        Args:
+            total: Optional overall duration in seconds, added as ``total``
+        """
+        parts = [
+            b"%s;dur=%.1f" % (name.encode("latin-1", "replace"), seconds * 1000)
+            for name, seconds in self.durations.items()
+        ]
+        if total is not None:
+            parts.append(b"total;dur=%.1f" % (total * 1000))
+        return b", ".join(parts)
+
+    def activate(self) -> "StageTimer":
+        """Make this the current timer of the running context."""
+        self._token = _current.set(self)
+        return self
+
+    def deactivate(self) -> None:
+        """Restore the timer that was current before ``activate``."""
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+    async def __aenter__(self) -> "_Stage":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.__exit__(*exc_info)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    # Builtin methods are not bound to the instance and run without a Python
+    # frame; "".format accepts any arguments and returns a falsy "", so
+    # exceptions still propagate out of the block
+    __enter__ = "".format
+    __exit__ = "".format
+
+    async def __aenter__(self) -> "_NullStage":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str) -> Any:
+    """
+    Time a block of work as a named stage of the current request.
+
+    Works with both ``with`` and ``async with``. Outside a timed request the
+    returned context manager does nothing.
+
+    Args:
+        name: Stage name; must be a valid ``Server-Timing`` token
+
+    Returns:
+        A context manager measuring the block
+    """
+    timer = _current.get()
+    if timer is None:
+        return _NULL_STAGE
+    return _Stage(timer, name)
+
+
+def current_timer() -> Optional[StageTimer]:
+    """The stage timer of the current request, if timing is enabled."""
+    return _current.get()
+
+
+def stage_breakdown() -> Dict[str, float]:
+    """Stage durations of the current request in milliseconds, for response metadata."""
+    timer = _current.get()
+    return timer.as_ms() if timer is not None else {}
@@ -0,0 +1,478 @@
+"""
+DocuQuery AI - Tracing
+
+This module implements a small span tracer with W3C ``traceparent``
+propagation. The current span lives in a context variable, so it follows
+requests into ``asyncio`` tasks; ``run_in_executor`` carries it into thread
+pools and ``inject``/``extract`` carry it through task messages. Finished
+spans are held per trace until the local root span ends, then a tail-sampling
+decision keeps every trace with an error or a slow root plus a deterministic
+fraction of the rest, and a background thread writes kept spans in batches to
+a local JSON-lines file or an HTTP collector.
+"""
+
+import abc
+import asyncio
+import contextvars
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, TypeVar
+
+logger = logging.getLogger("docuquery.telemetry")
+
+T = TypeVar("T")
+
+TRACEPARENT_HEADER = "traceparent"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("docuquery_span", default=None)
+_HEX = frozenset("0123456789abcdef")
+
+
+class SpanContext(NamedTuple):
+    """Identity of a span as carried across process boundaries."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def to_traceparent(self) -> str:
+        """Render the context as a W3C ``traceparent`` header value."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Parse a W3C ``traceparent`` header value.
+
+    Returns:
+        The remote span context, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    if not _HEX.issuperset(trace_id + span_id + flags + version):
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    if version == "00" and len(parts) != 4:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def _new_id(bits: int) -> str:
+    return "%0*x" % (bits // 4, random.getrandbits(bits) or 1)
+
+
+class Span:
+    """
+    A timed operation within a trace.
+
+    Use as a context manager to make the span current for the enclosed
+    block; an exception escaping the block marks the span as an error.
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "context",
+        "parent_id",
+        "local_root",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        context: SpanContext,
+        parent_id: Optional[str],
+        local_root: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.local_root = local_root
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes if attributes is not None else {}
+        self.error = False
+        self._token: Optional[contextvars.Token] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: Optional[BaseException] = None) -> None:
+        """Mark the span as failed; failed traces are always kept."""
+        self.error = True
+        if exc is not None:
+            self.attributes["error.type"] = type(exc).__name__
+            self.attributes["error.message"] = str(exc)[:500]
+
+    def activate(self) -> "Span":
+        """Make this the current span of the running context."""
+        self._token = _current_span.set(self)
+        return self
+
+    def end(self) -> None:
+        """Finish the span, restoring the previously current span if activated."""
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from another context; leave that context alone
+                pass
+            self._token = None
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._on_end(self)
+
+    def __enter__(self) -> "Span":
+        return self.activate()
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(abc.ABC):
+    """Destination for batches of kept spans."""
+
+    @abc.abstractmethod
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """Write one batch of finished spans."""
+
+    def close(self) -> None:
+        """Release resources held by the exporter."""
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Append spans as JSON lines to a local file.
+
+    Raises ``OSError`` when the file cannot be created or opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(s, default=str) + "\n" for s in spans))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class HTTPSpanExporter(SpanExporter):
+    """POST span batches as a JSON array to a collector endpoint."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        body = json.dumps({"spans": spans}, default=str).encode("utf-8")
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BatchSpanProcessor:
+    """
+    Hand kept spans to an exporter from a background thread.
+
+    The queue is bounded; when it is full, spans are dropped and counted in
+    ``dropped`` rather than slowing down the request path.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_batch: int = 512,
+        interval: float = 2.0,
+        max_queue: int = 10000,
+    ):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: List["Span"]) -> None:
+        for span in spans:
+            try:
+                self._queue.put_nowait(span.to_dict())
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = {}
+            if item is None:
+                self._export(batch)
+                return
+            if item:
+                batch.append(item)
+            if len(batch) >= self.max_batch or time.monotonic() >= deadline:
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as exc:  # exporters must never take the worker down
+            logger.warning("Dropping %d spans, export failed: %s", len(batch), exc)
+
+    def shutdown(self) -> None:
+        """Export everything queued and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=10.0)
+        self.exporter.close()
+
+
+class Tracer:
+    """
+    Creates spans and makes the tail-sampling decision per trace.
+
+    Spans are buffered per trace until the local root ends - the request
+    span, or the span opened by a background task for a remote parent. The
+    trace is kept if any span failed or the root took at least
+    ``slow_threshold_ms``; otherwise it is kept when its trace id falls in
+    the ``sample_rate`` fraction, so every process sampling the same trace
+    reaches the same verdict. Without a processor spans are still created
+    and propagated, only nothing is recorded.
+    """
+
+    def __init__(
+        self,
+        processor: Optional[BatchSpanProcessor] = None,
+        sample_rate: float = 0.1,
+        slow_threshold_ms: float = 1000.0,
+        max_pending_traces: int = 10000,
+        max_spans_per_trace: int = 1000,
+    ):
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_pending_traces = max_pending_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._pending: "OrderedDict[str, List[Span]]" = OrderedDict()
+        # Verdicts of finished traces, for spans of detached tasks ending late
+        self._decided: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[SpanContext] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Span:
+        """
+        Start a span as a child of ``parent``, or of the current span.
+
+        Args:
+            name: Operation name
+            parent: Remote parent, e.g. from ``extract``; defaults to the
+                current span, and a new trace is started if there is none
+            attributes: Initial span attributes
+        """
+        if parent is None:
+            current = _current_span.get()
+            if current is not None:
+                return Span(
+                    self,
+                    name,
+                    SpanContext(current.context.trace_id, _new_id(64), current.context.sampled),
+                    current.context.span_id,
+                    False,
+                    attributes,
+                )
+            return Span(self, name, SpanContext(_new_id(128), _new_id(64)), None, True, attributes)
+        return Span(
+            self,
+            name,
+            SpanContext(parent.trace_id, _new_id(64), parent.sampled),
+            parent.span_id,
+            True,
+            attributes,
+        )
+
+    def _on_end(self, span: Span) -> None:
+        if self.processor is None:
+            return
+        trace_id = span.context.trace_id
+        with self._lock:
+            decided = self._decided.get(trace_id)
+            if decided is not None:
+                if decided:
+                    self.processor.submit([span])
+                return
+            spans = self._pending.get(trace_id)
+            if spans is None:
+                spans = self._pending[trace_id] = []
+                while len(self._pending) > self.max_pending_traces:
+                    self._pending.popitem(last=False)
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(span)
+            if not span.local_root:
+                return
+            del self._pending[trace_id]
+            keep = self._keep(span, spans)
+            self._decided[trace_id] = keep
+            while len(self._decided) > self.max_pending_traces:
+                self._decided.popitem(last=False)
+        if keep:
+            self.processor.submit(spans)
+
+    def _keep(self, root: Span, spans: List[Span]) -> bool:
+        if root.duration_ms >= self.slow_threshold_ms:
+            return True
+        if any(s.error for s in spans):
+            return True
+        return int(root.context.trace_id[-8:], 16) < self.sample_rate * 0x1_0000_0000
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer."""
+    return _tracer
+
+
+def configure_tracing(
+    exporter: Optional[SpanExporter],
+    sample_rate: float = 0.1,
+    slow_threshold_ms: float = 1000.0,
+    max_batch: int = 512,
+    interval: float = 2.0,
+) -> Tracer:
+    """
+    Start recording spans with a batching, tail-sampling exporter.
+
+    Args:
+        exporter: Where kept spans are written; None only propagates context
+        sample_rate: Fraction of healthy, fast traces to keep
+        slow_threshold_ms: Root duration from which a trace is always kept
+        max_batch: Spans per export call
+        interval: Seconds between exports of a partial batch
+    """
+    shutdown_tracing()
+    _tracer.sample_rate = sample_rate
+    _tracer.slow_threshold_ms = slow_threshold_ms
+    if exporter is not None:
+        _tracer.processor = BatchSpanProcessor(exporter, max_batch=max_batch, interval=interval)
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the exporter started by ``configure_tracing``."""
+    processor = _tracer.processor
+    _tracer.processor = None
+    if processor is not None:
+        processor.shutdown()
+
+
+def current_span() -> Optional[Span]:
+    """The span of the running context, if any."""
+    return _current_span.get()
+
+
+def start_span(
+    name: str,
+    parent: Optional[SpanContext] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Span:
+    """Start a span on the process-wide tracer; see ``Tracer.start_span``."""
+    return _tracer.start_span(name, parent, attributes)
+
+
+def inject(carrier: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Write the current span context into a message carrier.
+
+    Args:
+        carrier: Headers or metadata dict to update; a new one if None
+
+    Returns:
+        The carrier, with ``traceparent`` set when a span is current
+    """
+    carrier = {} if carrier is None else carrier
+    span = _current_span.get()
+    if span is not None:
+        carrier[TRACEPARENT_HEADER] = span.context.to_traceparent()
+    return carrier
+
+
+def extract(carrier: Optional[Mapping[str, Any]]) -> Optional[SpanContext]:
+    """Read a span context written by ``inject`` from a message carrier."""
+    if not carrier:
+        return None
+    return parse_traceparent(carrier.get(TRACEPARENT_HEADER))
+
+
+def run_in_executor(executor: Any, func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+    """
+    Run ``func`` in a thread pool with the caller's context variables.
+
+    ``loop.run_in_executor`` does not copy the context, so spans started in
+    the thread would otherwise begin a new trace.
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, contextvars.copy_context().run, func, *args)
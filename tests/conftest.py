@@ -0,0 +1,23 @@
+"""
+DocuQuery AI - Shared Test Configuration
+
+Tests marked ``slow`` (stress tests and large synthetic corpora) are skipped
+unless pytest is run with ``--runslow``.
+"""
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--runslow", action="store_true", default=False, help="run tests marked slow"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
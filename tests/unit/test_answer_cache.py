@@ -0,0 +1,164 @@
+"""
+DocuQuery AI - Semantic Answer Cache Tests
+
+Unit tests for serving paraphrased questions from earlier answers and for
+invalidating them when a cited document changes.
+"""
+
+import numpy as np
+import pytest
+
+from app.llm.client import ChatCompletion
+from app.retrieval.answer_cache import SemanticAnswerCache
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.schemas import Citation, QueryRequest
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import SearchHit, VectorStore
+
+SCOPE = SemanticAnswerCache.scope(5, None)
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def citation(document_id):
+    return Citation(document_id=document_id, chunk_id="c", document_title="T", content="x", relevance_score=0.9)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_similar_questions_hit_and_dissimilar_miss():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("t1", unit(1, 0, 0), SCOPE, "Answer A", [citation("d1")])
+    hit = cache.lookup("t1", unit(1, 0.2, 0), SCOPE)
+    assert hit is not None
+    entry, similarity = hit
+    assert entry.answer == "Answer A"
+    assert similarity == pytest.approx(0.98, abs=0.01)
+
+    assert cache.lookup("t1", unit(0.5, 1, 0), SCOPE) is None
+    assert cache.lookup("t2", unit(1, 0, 0), SCOPE) is None
+    assert cache.lookup("t1", unit(1, 0, 0), SemanticAnswerCache.scope(5, ["d1"])) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_answers_without_citations_are_not_cached():
+    cache = SemanticAnswerCache()
+    cache.store("t1", unit(1, 0), SCOPE, "No idea", [])
+    assert len(cache) == 0
+
+
+def test_document_change_invalidates_citing_answers():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("t1", unit(1, 0, 0), SCOPE, "A", [citation("d1"), citation("d2")])
+    cache.store("t1", unit(0, 1, 0), SCOPE, "B", [citation("d3")])
+    assert cache.invalidate_document("t1", "d2") == 1
+    assert cache.lookup("t1", unit(1, 0, 0), SCOPE) is None
+    assert cache.lookup("t1", unit(0, 1, 0), SCOPE) is not None
+    assert cache.invalidate_document("t1", "d1") == 0
+
+
+def test_ttl_and_lru_eviction():
+    clock = FakeClock()
+    cache = SemanticAnswerCache(threshold=0.99, max_entries=2, ttl=10, clock=clock)
+    cache.store("t1", unit(1, 0, 0), SCOPE, "A", [citation("d1")])
+    clock.now = 1
+    cache.store("t1", unit(0, 1, 0), SCOPE, "B", [citation("d1")])
+    clock.now = 2
+    assert cache.lookup("t1", unit(1, 0, 0), SCOPE) is not None
+    cache.store("t1", unit(0, 0, 1), SCOPE, "C", [citation("d1")])
+    assert cache.lookup("t1", unit(0, 1, 0), SCOPE) is None
+    assert len(cache) == 2
+
+    clock.now = 13
+    assert cache.lookup("t1", unit(0, 0, 1), SCOPE) is None
+    assert len(cache) == 0
+
+
+def test_memory_budget_evicts_least_recently_used_scopes_across_tenants():
+    clock = FakeClock()
+    probe = SemanticAnswerCache()
+    probe.store("t", unit(1, 0, 0), SCOPE, "A", [citation("d1")])
+    one_index = probe.bytes
+    cache = SemanticAnswerCache(threshold=0.99, max_bytes=3 * one_index, clock=clock)
+    for tenant in ("t1", "t2", "t3"):
+        clock.now += 1
+        cache.store(tenant, unit(1, 0, 0), SCOPE, "A", [citation("d1")])
+    clock.now += 1
+    assert cache.lookup("t1", unit(1, 0, 0), SCOPE) is not None
+    cache.store("t4", unit(1, 0, 0), SCOPE, "A", [citation("d1")])
+
+    # t2 was used least recently; its emptied index is dropped with it
+    assert cache.lookup("t2", unit(1, 0, 0), SCOPE) is None
+    assert "t2" not in cache._tenants and cache.bytes <= cache.max_bytes
+    assert len(cache) == 3
+
+    assert cache.invalidate_document("t1", "d1") == 1
+    assert "t1" not in cache._tenants and cache.bytes == 2 * one_index
+    cache.clear("t3")
+    assert cache.bytes == one_index
+    cache.clear()
+    assert cache.bytes == 0 and len(cache) == 0
+
+
+class TableEmbedder(Embedder):
+    model = "table"
+
+    def __init__(self, table):
+        self.table = table
+
+    async def embed(self, texts):
+        return np.stack([self.table[t] for t in texts])
+
+
+class CountingLLM:
+    calls = 0
+
+    async def chat(self, messages, model, max_tokens, temperature):
+        self.calls += 1
+        return ChatCompletion("The main requirements are X and Y [1].")
+
+
+class OneHitStore(VectorStore):
+    async def search(self, tenant_id, vector, top_k, document_ids=None):
+        return [SearchHit("d1", "c1", "Spec", "X and Y", 0.88)]
+
+
+@pytest.mark.asyncio
+async def test_service_serves_paraphrases_from_the_answer_cache():
+    embedder = TableEmbedder({
+        "main project requirements?": unit(1, 0.1, 0),
+        "what are the project's main requirements": unit(1, 0.12, 0.02),
+    })
+    llm = CountingLLM()
+    service = RetrievalService(
+        EmbeddingCache(embedder),
+        OneHitStore(),
+        llm,
+        chat_model="fake",
+        answer_cache=SemanticAnswerCache(threshold=0.95),
+    )
+
+    first = await service.answer("t1", QueryRequest(question="main project requirements?"))
+    second = await service.answer(
+        "t1", QueryRequest(question="what are the project's main requirements")
+    )
+    assert llm.calls == 1
+    assert not first.metadata.cache_hit
+    assert second.metadata.cache_hit
+    assert second.metadata.similarity > 0.95
+    assert second.answer == first.answer
+    assert second.citations == first.citations
+
+    service.document_changed("t1", "d1")
+    third = await service.answer("t1", QueryRequest(question="main project requirements?"))
+    assert not third.metadata.cache_hit
+    assert llm.calls == 2
@@ -0,0 +1,206 @@
+"""
+DocuQuery AI - Asynchronous Query Tests
+
+Unit tests for queries submitted with ``mode=async``: the immediate
+acceptance, long-polling ``GET /query/{query_id}``, tenant isolation and
+expiry of results, tier priority and bounds of the job queue, and the query
+IDs shared with the query history.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.common.error_handlers import register_error_handlers
+from app.common.exceptions import LLMError, RateLimitError
+from app.llm.client import ChatCompletion
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.jobs import QueryJobs, ResultStore
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.routes import retrieval_router
+from app.retrieval.schemas import QueryMetadata, QueryRequest, QueryResponse
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord
+
+
+class ConstantEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class SlowLLM:
+    async def chat(self, messages, model, max_tokens, temperature):
+        await asyncio.sleep(0.1)
+        return ChatCompletion("Thirty days [1].", prompt_tokens=30, completion_tokens=5)
+
+
+class MemoryHistory:
+    """Query history keeping records in a dict, as ``QueryHistory`` stores rows."""
+
+    def __init__(self):
+        self.records = {}
+
+    async def record(self, tenant_id, response):
+        self.records[response.query_id] = SimpleNamespace(
+            id=response.query_id,
+            tenant_id=tenant_id,
+            question=response.query,
+            answer=response.answer,
+            status="completed",
+            details=response.metadata.model_dump(mode="json"),
+            created_at=response.created_at,
+            completed_at=response.created_at,
+        )
+
+    async def get(self, tenant_id, query_id):
+        record = self.records.get(query_id)
+        return record if record is not None and record.tenant_id == tenant_id else None
+
+
+def build_app(history=None):
+    app = FastAPI()
+    register_error_handlers(app)
+    app.include_router(retrieval_router, prefix="/query")
+    store = NumpyVectorStore()
+    store.add("acme", [ChunkRecord("c1", "d1", "MSA", "Notice is thirty days.", np.ones(4, np.float32))])
+    service = RetrievalService(
+        EmbeddingCache(ConstantEmbedder()), store, SlowLLM(), chat_model="m", history=history
+    )
+    app.state.retrieval = service
+    app.state.query_jobs = QueryJobs(service.answer, ResultStore(), workers=2)
+    return app
+
+
+def response(question):
+    return QueryResponse(
+        query_id="q",
+        query=question,
+        answer=question,
+        metadata=QueryMetadata(model_used="m"),
+        created_at="2024-01-01T00:00:00",
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_query_is_accepted_at_once_and_long_polled():
+    app = build_app()
+    headers = {"X-Tenant-ID": "acme"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        accepted = await client.post(
+            "/query/", json={"question": "What is the notice period?", "mode": "async"}, headers=headers
+        )
+        assert accepted.status_code == 202
+        query_id = accepted.json()["query_id"]
+        assert accepted.headers["location"] == f"/query/{query_id}"
+
+        pending = await client.get(f"/query/{query_id}", headers=headers)
+        assert pending.json()["status"] in ("pending", "running")
+
+        done = await client.get(f"/query/{query_id}", params={"wait": 5}, headers=headers)
+        body = done.json()
+        assert body["status"] == "completed"
+        assert body["answer"] == "Thirty days [1]."
+        assert body["citations"][0]["chunk_id"] == "c1"
+        assert body["completed_at"] is not None
+
+        # Results are private to the tenant that submitted the query
+        other = await client.get(f"/query/{query_id}", headers={"X-Tenant-ID": "globex"})
+        assert other.status_code == 404
+        # The history route is not shadowed by the query ID route
+        history = await client.get("/query/history", headers=headers)
+        assert history.json()["error"] == "Query history is not enabled"
+
+    await app.state.query_jobs.aclose()
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_by_tenant_tier_then_arrival():
+    order = []
+    gate = asyncio.Event()
+
+    async def run(tenant_id, query, query_id):
+        await gate.wait()
+        order.append(query.question)
+        return response(query.question)
+
+    jobs = QueryJobs(
+        run,
+        ResultStore(),
+        workers=1,
+        tenant_tiers={"big": "enterprise"},
+        tier_priorities={"enterprise": 0, "free": 2},
+    )
+    first = jobs.submit("small", QueryRequest(question="first"))
+    await asyncio.sleep(0)
+    submitted = [("small", "free 1"), ("big", "enterprise 1"), ("small", "free 2"), ("big", "enterprise 2")]
+    for tenant, question in submitted:
+        jobs.submit(tenant, QueryRequest(question=question))
+    gate.set()
+    await jobs.wait(first, 1)
+    last = jobs.submit("small", QueryRequest(question="last"))
+    await jobs.wait(last, 1)
+    assert order == ["first", "enterprise 1", "enterprise 2", "free 1", "free 2", "last"]
+    await jobs.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failures_queue_bound_and_result_expiry():
+    now = [0.0]
+
+    async def run(tenant_id, query, query_id):
+        if query.question == "fail":
+            raise LLMError("LLM provider unavailable", error_code="LLM_UNAVAILABLE")
+        await asyncio.sleep(10)
+
+    store = ResultStore(ttl=60, clock=lambda: now[0])
+    jobs = QueryJobs(run, store, workers=1, max_pending=1)
+    failed = jobs.submit("t", QueryRequest(question="fail"))
+    await jobs.wait(failed, 1)
+    status = failed.to_status()
+    assert status.status == "failed"
+    assert status.error == {"error": "LLM provider unavailable", "code": "LLM_UNAVAILABLE"}
+
+    jobs.submit("t", QueryRequest(question="slow"))
+    await asyncio.sleep(0)
+    jobs.submit("t", QueryRequest(question="queued"))
+    with pytest.raises(RateLimitError):
+        jobs.submit("t", QueryRequest(question="refused"))
+
+    now[0] = 61.0
+    assert store.get("t", failed.query_id) is None
+    await jobs.aclose()
+
+
+@pytest.mark.asyncio
+async def test_query_ids_match_the_history_and_are_read_back_from_it():
+    history = MemoryHistory()
+    app = build_app(history)
+    headers = {"X-Tenant-ID": "acme"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        accepted = await client.post("/query/", json={"query": "Notice?", "mode": "async"}, headers=headers)
+        query_id = accepted.json()["query_id"]
+        done = await client.get(f"/query/{query_id}", params={"wait": 5}, headers=headers)
+        assert done.json()["metadata"] is not None
+        assert list(history.records) == [query_id]
+
+        answered = (await client.post("/query/", json={"query": "Notice period?"}, headers=headers)).json()
+        streamed = await client.post("/query/stream", json={"query": "How long?"}, headers=headers)
+        assert "event: done" in streamed.text
+        assert answered["query_id"] in history.records and len(history.records) == 3
+
+        # Not a job of this worker: read from the history, without citations
+        recorded = await client.get(f"/query/{answered['query_id']}", headers=headers)
+        assert recorded.status_code == 200
+        body = recorded.json()
+        assert (body["status"], body["answer"], body["citations"]) == ("completed", "Thirty days [1].", [])
+        assert body["metadata"]["model_used"] == "m"
+        other = await client.get(f"/query/{answered['query_id']}", headers={"X-Tenant-ID": "globex"})
+        assert other.status_code == 404
+
+    await app.state.query_jobs.aclose()
@@ -0,0 +1,107 @@
+"""
+DocuQuery AI - Query Coalescing Tests
+
+Unit tests for micro-batching of query embeddings and for sharing one answer
+between identical concurrent questions.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.common.exceptions import LLMError
+from app.llm.client import ChatCompletion
+from app.retrieval.embeddings import BatchingEmbedder, Embedder, EmbeddingCache
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.schemas import QueryRequest
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord
+
+
+class RecordingEmbedder(Embedder):
+    model = "fake"
+
+    def __init__(self, delay=0.01, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise LLMError("embedding provider unavailable")
+        return np.array([[len(text), 1, 0, 0] for text in texts], dtype=np.float32)
+
+
+class SlowLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, messages, model, max_tokens, temperature):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return ChatCompletion("Thirty days [1].", prompt_tokens=30, completion_tokens=5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_texts_share_one_provider_call():
+    inner = RecordingEmbedder()
+    batcher = BatchingEmbedder(inner, max_batch=64, max_wait=0.005)
+    rows = await asyncio.gather(*(batcher.embed(["x" * n]) for n in range(1, 11)))
+    assert len(inner.calls) == 1
+    assert [int(r[0, 0]) for r in rows] == list(range(1, 11))
+
+    # A full batch goes out without waiting for the deadline
+    batcher = BatchingEmbedder(inner, max_batch=4, max_wait=10.0)
+    rows = await asyncio.wait_for(asyncio.gather(*(batcher.embed(["x" * n]) for n in range(1, 9))), 1.0)
+    assert [len(c) for c in inner.calls[1:]] == [4, 4]
+    assert (batcher.batches, batcher.texts) == (2, 8)
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller():
+    batcher = BatchingEmbedder(RecordingEmbedder(fail=True), max_wait=0.001)
+    results = await asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True)
+    assert all(isinstance(r, LLMError) for r in results)
+
+
+def build_service(llm, embedder):
+    store = NumpyVectorStore()
+    store.add("t", [ChunkRecord("c1", "d1", "MSA", "Notice is thirty days.", np.array([1, 1, 0, 0], np.float32))])
+    return RetrievalService(EmbeddingCache(embedder), store, llm, chat_model="m")
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_questions_share_one_answer():
+    llm = SlowLLM()
+    embedder = RecordingEmbedder()
+    service = build_service(llm, BatchingEmbedder(embedder, max_wait=0.002))
+    questions = ["What is the notice period?", "what is the  notice period", "What is the term?"]
+    responses = await asyncio.gather(*(service.answer("t", QueryRequest(question=q)) for q in questions * 20))
+
+    # One computation per distinct normalized question
+    assert llm.calls == 2
+    assert service.coalesced == 58
+    assert len({r.query_id for r in responses}) == 60
+    assert responses[1].query == "what is the  notice period"
+    assert sum(r.metadata.coalesced for r in responses) == 58
+    # Both distinct questions were embedded in a single provider call
+    assert len(embedder.calls) == 1 and len(embedder.calls[0]) == 2
+    assert not service._inflight
+
+
+@pytest.mark.asyncio
+async def test_shared_answer_survives_the_first_caller_leaving():
+    llm = SlowLLM()
+    service = build_service(llm, RecordingEmbedder())
+    query = QueryRequest(question="What is the notice period?")
+    first = asyncio.create_task(service.answer("t", query))
+    await asyncio.sleep(0.02)
+    second = asyncio.create_task(service.answer("t", query))
+    await asyncio.sleep(0)
+    first.cancel()
+    response = await second
+    assert response.answer == "Thirty days [1]."
+    assert llm.calls == 1
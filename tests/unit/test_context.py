@@ -0,0 +1,120 @@
+"""
+DocuQuery AI - Context Packing Tests
+
+Unit tests for token counting and token-budget packing of retrieved chunks:
+the knapsack optimum, the budget bound, merging of adjacent chunks and the
+use of token counts stored at ingestion.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.llm.context import ContextPacker, knapsack
+from app.llm.prompts import build_messages
+from app.llm.tokens import TokenCounter, estimate_tokens
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord, SearchHit
+
+
+def hit(chunk_id, score, tokens, document_id="d1", position=None, text=None):
+    return SearchHit(
+        document_id, chunk_id, "Doc", text or f"text of {chunk_id}", score, position=position, tokens=tokens
+    )
+
+
+def prompt_tokens(counter, question, sources):
+    messages = build_messages(question, sources)
+    return sum(counter.count(m["content"]) + 4 for m in messages) + 3
+
+
+def test_knapsack_matches_brute_force():
+    rng = np.random.default_rng(3)
+    for _ in range(30):
+        costs = rng.integers(1, 20, size=8)
+        values = rng.random(8)
+        capacity = int(rng.integers(5, 60))
+        chosen = knapsack(costs, values, capacity)
+        assert costs[chosen].sum() <= capacity
+        best = max(
+            values[list(subset)].sum()
+            for r in range(9)
+            for subset in itertools.combinations(range(8), r)
+            if costs[list(subset)].sum() <= capacity
+        )
+        assert values[chosen].sum() == pytest.approx(best)
+
+
+def test_packing_prefers_total_relevance_over_greedy_order():
+    counter = TokenCounter()
+    packer = ContextPacker(counter, context_window=10_000, completion_tokens=0)
+    budget = packer.budget("q")
+    header = packer._header_tokens("Doc")
+    packer.context_window -= budget - (2 * (400 + header))
+    # One long best chunk, or two shorter ones worth more together
+    hits = [
+        hit("long", 1.0, 700, document_id="a"),
+        hit("x", 0.9, 400, document_id="b"),
+        hit("y", 0.85, 400, document_id="c"),
+    ]
+    packed = packer.pack("q", hits)
+    assert [h.chunk_id for h in packed.hits] == ["x", "y"]
+    assert packed.tokens <= packed.budget
+
+
+def test_packed_prompt_never_exceeds_the_window():
+    counter = TokenCounter()
+    rng = np.random.default_rng(0)
+    words = ["clause", "termination", "notice", "days", "party", "agreement", "1,200", "(b)"]
+    hits = []
+    for i in range(200):
+        text = " ".join(rng.choice(words, size=int(rng.integers(20, 200))))
+        hits.append(hit(f"c{i}", float(rng.random()), None, document_id=f"d{i % 7}", position=i, text=text))
+    packer = ContextPacker(counter, context_window=8192, completion_tokens=4000)
+    packed = packer.pack("What is the notice period?", hits)
+    assert packed.hits
+    total = prompt_tokens(counter, "What is the notice period?", packed.sources)
+    assert total <= 8192 - 4000
+
+
+def test_adjacent_chunks_merge_into_one_source():
+    packer = ContextPacker(TokenCounter(), context_window=4096, completion_tokens=0)
+    hits = [
+        hit("c2", 0.9, 10, position=2, text="second"),
+        hit("other", 0.8, 10, document_id="d2", position=2, text="elsewhere"),
+        hit("c1", 0.7, 10, position=1, text="first"),
+        hit("c4", 0.6, 10, position=4, text="fourth"),
+    ]
+    packed = packer.pack("q", hits)
+    assert packed.sources == ["[1] Doc\nfirst\nsecond", "[2] Doc\nelsewhere", "[3] Doc\nfourth"]
+    assert [h.chunk_id for h in packed.hits] == ["c1", "c2", "other", "c4"]
+
+
+def test_token_counter_caches_recent_texts():
+    counter = TokenCounter(cache_size=2)
+    assert counter.count("notice period") == estimate_tokens("notice period") or counter.exact
+    counter.count("notice period")
+    counter.count("a")
+    counter.count("b")
+    counter.count("notice period")
+    assert (counter.hits, counter.misses) == (1, 4)
+    assert counter.count_many(["a", "b"]) == [counter.count("a"), counter.count("b")]
+
+
+@pytest.mark.asyncio
+async def test_service_stores_counts_at_ingestion_and_packs_from_them():
+    counter = TokenCounter()
+    packer = ContextPacker(counter, context_window=8192, completion_tokens=1024)
+    store = NumpyVectorStore()
+    service = RetrievalService(None, store, llm=None, chat_model="m", packer=packer)
+    record = ChunkRecord("c1", "d1", "Doc", "Notice is thirty days.", np.ones(4, np.float32), position=0)
+    await service.index_chunks("t", [record])
+    assert record.tokens == counter.count_many([record.text])[0]
+
+    stored = (await store.search("t", np.ones(4, np.float32), 1))[0]
+    assert stored.tokens == record.tokens
+    packer.pack("q", [stored])
+    # The prompt and header are counted at query time, never the chunk text
+    assert record.text not in counter._cache
@@ -0,0 +1,115 @@
+"""
+DocuQuery AI - Distributed Rate Limiter Tests
+
+Unit tests for the Redis-backed limiter, run against fakeredis with Lua.
+"""
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from redis.exceptions import ConnectionError as RedisConnectionError  # noqa: E402
+
+from app.ratelimit import DistributedRateLimiter, GCRALimiter  # noqa: E402
+
+
+def make_limiter(server, limit=20, lease_size=5, **kwargs):
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    return DistributedRateLimiter(client, limit, 60, lease_size=lease_size, **kwargs)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.mark.asyncio
+async def test_limit_is_shared_between_workers(server):
+    workers = [make_limiter(server), make_limiter(server)]
+
+    allowed = 0
+    for i in range(60):
+        result = await workers[i % 2].acquire("10.0.0.1")
+        allowed += result.allowed
+
+    assert allowed == 20
+
+
+@pytest.mark.asyncio
+async def test_leases_avoid_round_trips(server):
+    limiter = make_limiter(server, limit=1000, lease_size=10)
+
+    for _ in range(100):
+        assert (await limiter.acquire("client")).allowed
+
+    assert limiter.round_trips == 10
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_round_trip(server):
+    limiter = make_limiter(server, limit=1000, lease_size=10)
+
+    results = await asyncio.gather(*(limiter.acquire("client") for _ in range(10)))
+
+    assert all(result.allowed for result in results)
+    assert limiter.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_unused_leases_are_returned_on_close(server):
+    first = make_limiter(server, limit=20, lease_size=10)
+    assert (await first.acquire("client")).allowed
+    await first.aclose()
+
+    second = make_limiter(server, limit=20, lease_size=10)
+    allowed = 0
+    for _ in range(30):
+        allowed += (await second.acquire("client")).allowed
+
+    assert allowed == 19
+
+
+@pytest.mark.asyncio
+async def test_reports_remaining_and_reset(server):
+    limiter = make_limiter(server, limit=20, lease_size=5)
+    result = await limiter.acquire("client")
+
+    assert result.limit == 20
+    assert result.remaining == 19
+    assert 0 < result.reset_after <= 60
+
+
+class BrokenPipeline:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self):
+        raise RedisConnectionError("connection refused")
+
+
+class BrokenRedis:
+    def register_script(self, script):
+        async def call(keys, args, client):
+            return client
+
+        return call
+
+    def pipeline(self, transaction=False):
+        return BrokenPipeline()
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_local_limiter_when_redis_is_down():
+    fallback = GCRALimiter(3, 60)
+    limiter = DistributedRateLimiter(BrokenRedis(), 100, 60, fallback=fallback)
+
+    results = [await limiter.acquire("client") for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert limiter.round_trips == 0
@@ -0,0 +1,237 @@
+"""
+DocuQuery AI - Document Search Tests
+
+Unit tests for the in-memory document search index: matching and ranking of
+search box terms, status facets, incremental updates from document events,
+the database fallback while a tenant loads, writes made through other
+workers, the memory budget and the document list endpoint.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.common.error_handlers import register_error_handlers
+from app.common.versions import TenantVersions
+from app.documents.routes import document_router
+from app.documents.search import (
+    DocumentEntry,
+    DocumentSearch,
+    DocumentSearchResult,
+    DocumentSource,
+    TenantDocumentIndex,
+    words,
+)
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def entry(document_id, title, filename="", tags=(), status="ready", minutes=0):
+    return DocumentEntry(document_id, title, filename, tags, status, BASE + timedelta(minutes=minutes))
+
+
+def ids(result):
+    return [item.document_id for item in result.items]
+
+
+class FakeSource(DocumentSource):
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.searches = 0
+        self.release = asyncio.Event()
+
+    async def search(self, tenant_id, text, status, offset, limit):
+        self.searches += 1
+        return DocumentSearchResult([], 0, {"fallback": 1})
+
+    async def scroll(self, tenant_id, batch_size=1000):
+        await self.release.wait()
+        yield list(self.entries)
+
+
+def test_terms_match_prefixes_and_substrings_and_rank_by_field():
+    index = TenantDocumentIndex.build(
+        [
+            entry("tags", "Minutes", "minutes.txt", tags=["quarterly-report"], minutes=3),
+            entry("file", "Budget", "Q3_report-final.pdf", minutes=2),
+            entry("title", "Quarterly Report", "q3.pdf", minutes=1),
+            entry("inner", "Misreported numbers", "numbers.pdf", minutes=0),
+        ]
+    )
+
+    assert words("Q3_report-final.PDF") == ["q3", "report", "final", "pdf"]
+    # Title beats filename beats tags, word starts add a little, ties go newest first
+    assert ids(index.search("report")) == ["title", "file", "inner", "tags"]
+    assert ids(index.search("repo")) == ["title", "file", "inner", "tags"]
+    # One and two letter terms only match word starts
+    assert ids(index.search("re")) == ["title", "file", "tags"]
+    assert ids(index.search("q3 fin")) == ["file"]
+    assert ids(index.search("quarterly report")) == ["title", "tags"]
+    assert index.search("reports").total == 0
+    # Without terms, newest first
+    assert ids(index.search(None)) == ["tags", "file", "title", "inner"]
+    assert ids(index.search("", offset=1, limit=2)) == ["file", "title"]
+
+
+def test_facets_count_matches_before_the_status_filter():
+    index = TenantDocumentIndex.build(
+        [
+            entry("a", "Design review", status="ready", minutes=1),
+            entry("b", "Design notes", status="processing", minutes=2),
+            entry("c", "Design draft", status="ready", minutes=3),
+            entry("d", "Budget", status="failed", minutes=4),
+        ]
+    )
+
+    result = index.search("design", status="ready")
+    assert ids(result) == ["c", "a"]
+    assert result.total == 2
+    assert result.facets == {"ready": 2, "processing": 1}
+    assert index.search("design", status="failed").facets == {"ready": 2, "processing": 1}
+    assert index.search("design", status="failed").total == 0
+    assert index.search("", status="failed").facets == {"ready": 2, "processing": 1, "failed": 1}
+
+
+def test_events_update_the_index_and_match_a_scan():
+    rng = random.Random(7)
+    vocabulary = ["report", "prepare", "rep", "alpha", "beta", "al", "q3", "invoice", "voice", "x"]
+    statuses = ["ready", "failed"]
+    index = TenantDocumentIndex()
+    documents = {}
+    for step in range(2000):
+        document_id = f"doc{rng.randrange(300)}"
+        if rng.random() < 0.15:
+            index.remove(document_id)
+            documents.pop(document_id, None)
+            continue
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4)))
+        document = entry(
+            document_id,
+            title,
+            f"{rng.choice(vocabulary)}-{rng.choice(vocabulary)}.pdf",
+            [rng.choice(vocabulary)],
+            rng.choice(statuses),
+            minutes=step,
+        )
+        index.add(document)
+        documents[document_id] = document
+
+    def contains(document, term):
+        found = [word for field in document.fields() for word in words(field)]
+        if len(term) < 3:
+            return any(word.startswith(term) for word in found)
+        return any(term in word for word in found)
+
+    for query in ["rep", "re", "r", "port alpha", "voice in", "q3 x", "al be", "", "zz"]:
+        for status in [None, "ready", "unknown"]:
+            expected = [d for d in documents.values() if all(contains(d, t) for t in words(query))]
+            facets = {}
+            for document in expected:
+                facets[document.status] = facets.get(document.status, 0) + 1
+            selected = {d.document_id for d in expected if status is None or d.status == status}
+            result = index.search(query, status, 0, 1000)
+            assert set(ids(result)) == selected and len(ids(result)) == len(selected)
+            assert result.total == len(selected)
+            assert result.facets == facets
+            # Pages concatenate to the full ranking
+            pages = []
+            for offset in range(0, len(selected), 7):
+                pages.extend(ids(index.search(query, status, offset, 7)))
+            assert pages == ids(result)
+
+
+@pytest.mark.asyncio
+async def test_cold_tenants_fall_back_to_the_source_and_replay_events_after_loading():
+    source = FakeSource([entry("old", "Old report", minutes=1), entry("gone", "Gone report", minutes=2)])
+    search = DocumentSearch(source)
+
+    # Cold: answered by the source while the tenant loads
+    assert (await search.search("acme", "report")).facets == {"fallback": 1}
+    assert not search.is_local("acme")
+    # Events arriving during the load are applied once it finishes
+    await search.upsert("acme", entry("new", "New report", minutes=5))
+    await search.delete("acme", "gone")
+    source.release.set()
+    for _ in range(100):
+        if search.is_local("acme"):
+            break
+        await asyncio.sleep(0.01)
+    assert search.is_local("acme")
+
+    result = await search.search("acme", "report")
+    assert ids(result) == ["new", "old"]
+    assert source.searches == 1
+    # Later events apply in place
+    await search.upsert("acme", entry("old", "Old summary", minutes=6))
+    assert ids(await search.search("acme", "report")) == ["new"]
+    await search.aclose()
+
+
+@pytest.mark.asyncio
+async def test_writes_through_another_worker_reload_the_tenant():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    source = FakeSource([entry("old", "Old report", minutes=1)])
+    source.release.set()
+    this, other = (
+        DocumentSearch(
+            source, versions=TenantVersions(fakeredis.aioredis.FakeRedis(server=server), "documents", check_interval=0)
+        )
+        for _ in range(2)
+    )
+    assert await this.load("acme") and await other.load("acme")
+    # Own writes keep the index current
+    await this.upsert("acme", entry("mine", "My report", minutes=2))
+    assert ids(await this.search("acme", "report")) == ["mine", "old"]
+
+    source.entries.append(entry("theirs", "Their report", minutes=3))
+    await other.upsert("acme", source.entries[-1])
+    # Stale until reloaded: the catalog answers meanwhile
+    assert (await this.search("acme", "report")).facets == {"fallback": 1}
+    await asyncio.gather(*this._loading.values())
+    assert ids(await this.search("acme", "report")) == ["theirs", "old"]
+    await this.aclose()
+
+
+@pytest.mark.asyncio
+async def test_least_recently_searched_tenants_are_dropped_over_budget():
+    source = FakeSource([entry(f"d{i}", f"Report {i}") for i in range(3)])
+    source.release.set()
+    search = DocumentSearch(source, max_documents=5)
+    assert await search.load("a") and await search.load("b")
+    assert not search.is_local("a") and search.is_local("b") and search.live == 3
+    await search.upsert("b", entry("new", "New report"))
+    await search.delete("b", "d0")
+    assert search.live == 3
+    await search.aclose()
+
+
+@pytest.mark.asyncio
+async def test_list_documents_endpoint_pages_and_filters_by_status():
+    app = FastAPI()
+    register_error_handlers(app)
+    app.include_router(document_router, prefix="/documents")
+    search = DocumentSearch()
+    for minute in range(5):
+        await search.upsert("acme", entry(f"r{minute}", f"Report {minute}", status="ready", minutes=minute))
+    await search.upsert("acme", entry("p", "Report pending", status="processing", minutes=9))
+    await search.upsert("other", entry("x", "Report elsewhere"))
+    app.state.document_search = search
+
+    headers = {"X-Tenant-ID": "acme"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            "/documents/", params={"search": "rep", "status": "ready", "page": 2, "size": 2}, headers=headers
+        )
+        missing = await client.get("/documents/", params={"size": 500}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [document["id"] for document in body["documents"]] == ["r2", "r1"]
+    assert body["pagination"] == {"page": 2, "size": 2, "total": 5, "pages": 3}
+    assert body["facets"] == {"ready": 5, "processing": 1}
+    assert missing.status_code == 422
@@ -0,0 +1,219 @@
+"""
+DocuQuery AI - Embedding Cache Tests
+
+Unit tests for the two-tier query embedding cache and the query endpoint
+built on it, using a local fake embedder, vector store and LLM.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.common.error_handlers import register_error_handlers
+from app.llm.client import ChatCompletion
+from app.retrieval.embeddings import Embedder, EmbeddingCache, normalize_query
+from app.retrieval.routes import retrieval_router
+from app.retrieval.service import NO_CONTEXT_ANSWER, RetrievalService
+from app.retrieval.vector_store import SearchHit, VectorStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeEmbedder(Embedder):
+    model = "fake-embedding"
+
+    def __init__(self, dimensions=8, delay=0.0):
+        self.dimensions = dimensions
+        self.delay = delay
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        rows = [np.random.default_rng(abs(hash(t)) % 2**32).random(self.dimensions) for t in texts]
+        return np.asarray(rows, dtype=np.float32)
+
+
+class FailingEmbedder(FakeEmbedder):
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0.01)
+        raise ConnectionError("embedding API down")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  What is   the SLA? ") == "what is the sla"
+    assert normalize_query("ｆｕｌｌ width") == "full width"
+
+
+@pytest.mark.asyncio
+async def test_repeat_queries_hit_the_local_tier():
+    embedder = FakeEmbedder()
+    cache = EmbeddingCache(embedder)
+    first = await cache.get("t1", "What is the SLA?")
+    second = await cache.get("t1", "what is the sla")
+    assert len(embedder.calls) == 1
+    assert second.dtype == np.float32
+    assert np.allclose(first, second)
+    assert cache.stats()["local_hits"] == 1
+    with pytest.raises(ValueError):
+        second[0] = 1.0
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_by_tenant_and_model():
+    embedder = FakeEmbedder()
+    cache = EmbeddingCache(embedder)
+    assert cache.key("t1", "q") != cache.key("t2", "q")
+    other_model = EmbeddingCache(FakeEmbedder())
+    other_model.embedder.model = "other"
+    assert other_model.key("t1", "q") != cache.key("t1", "q")
+    await cache.get("t1", "q")
+    await cache.get("t2", "q")
+    assert len(embedder.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    embedder = FakeEmbedder(delay=0.02)
+    cache = EmbeddingCache(embedder)
+    vectors = await asyncio.gather(*(cache.get("t1", "same question") for _ in range(10)))
+    assert len(embedder.calls) == 1
+    assert all(np.array_equal(v, vectors[0]) for v in vectors)
+    assert cache.stats()["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_coalesced_failures_propagate_to_every_waiter():
+    cache = EmbeddingCache(FailingEmbedder())
+    results = await asyncio.gather(*(cache.get("t1", "q") for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert len(cache._inflight) == 0
+
+
+@pytest.mark.asyncio
+async def test_first_caller_cancelling_does_not_cancel_waiters():
+    embedder = FakeEmbedder(delay=0.05)
+    cache = EmbeddingCache(embedder)
+    first = asyncio.ensure_future(cache.get("t1", "q"))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(cache.get("t1", "q"))
+    await asyncio.sleep(0)
+    first.cancel()
+    vector = await second
+    assert first.cancelled() and vector is not None
+    assert len(embedder.calls) == 1 and len(cache) == 1
+    assert len(cache._inflight) == 0
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_and_ttl():
+    clock = FakeClock()
+    vector_bytes = 8 * 2 + 200
+    cache = EmbeddingCache(FakeEmbedder(), max_bytes=vector_bytes * 2, ttl=60, clock=clock)
+    for text in ("a", "b", "c"):
+        await cache.get("t1", text)
+    assert len(cache) == 2
+    assert cache.bytes <= cache.max_bytes
+
+    clock.now = 61
+    await cache.get("t1", "c")
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_serves_other_workers():
+    server = fakeredis.FakeServer()
+    first = EmbeddingCache(FakeEmbedder(), redis=fakeredis.aioredis.FakeRedis(server=server))
+    embedder = FakeEmbedder()
+    second = EmbeddingCache(embedder, redis=fakeredis.aioredis.FakeRedis(server=server))
+
+    vector = await first.get("t1", "shared question")
+    shared = await second.get("t1", "shared question")
+    assert embedder.calls == []
+    assert np.array_equal(vector, shared)
+    assert second.stats()["shared_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_failure_falls_back_to_the_embedder():
+    class BrokenRedis:
+        calls = 0
+
+        async def get(self, key):
+            BrokenRedis.calls += 1
+            raise ConnectionError("redis down")
+
+        async def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+    cache = EmbeddingCache(FakeEmbedder(), redis=BrokenRedis())
+    await cache.get("t1", "a")
+    await cache.get("t1", "b")
+    assert cache.stats()["shared_errors"] == 1
+    assert BrokenRedis.calls == 1
+    assert ("docuquery_embedding_cache_requests_total", 'result="miss"', 2) in cache.metric_samples()
+
+
+class FakeVectorStore(VectorStore):
+    def __init__(self, hits):
+        self.hits = hits
+
+    async def search(self, tenant_id, vector, top_k, document_ids=None):
+        return self.hits[:top_k]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, messages, model, max_tokens, temperature):
+        self.calls += 1
+        return ChatCompletion("Thirty days [1].", 120, 6)
+
+
+def make_client(hits):
+    embedder = FakeEmbedder()
+    llm = FakeLLM()
+    app = FastAPI()
+    register_error_handlers(app)
+    app.include_router(retrieval_router, prefix="/query")
+    app.state.retrieval = RetrievalService(
+        EmbeddingCache(embedder), FakeVectorStore(hits), llm, chat_model="fake-chat"
+    )
+    return TestClient(app), embedder, llm
+
+
+def test_submit_query_answers_with_citations_and_reuses_the_embedding():
+    hits = [SearchHit("d1", "c1", "MSA", "Notice is thirty days.", 0.91, page=4)]
+    client, embedder, llm = make_client(hits)
+
+    for question in ("What notice period applies?", "what notice period applies"):
+        response = client.post("/query/", json={"question": question})
+        assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Thirty days [1]."
+    assert body["citations"][0]["page_number"] == 4
+    assert body["metadata"]["prompt_tokens"] == 120
+    assert body["metadata"]["processing_time_ms"] > 0
+    assert len(embedder.calls) == 1
+    assert llm.calls == 2
+
+
+def test_submit_query_without_context_skips_the_llm():
+    client, _, llm = make_client([])
+    response = client.post("/query/", json={"question": "Anything?"}, headers={"X-Tenant-ID": "t9"})
+    assert response.json()["answer"] == NO_CONTEXT_ANSWER
+    assert llm.calls == 0
@@ -0,0 +1,182 @@
+"""
+DocuQuery AI - Metadata Filter Tests
+
+Unit tests for the compressed row bitmaps, metadata indexes, filter planning
+in the in-process indexes and filter pushdown to Qdrant.
+"""
+
+import json
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+import pytest
+
+from app.retrieval.answer_cache import SemanticAnswerCache
+from app.retrieval.filters import BRUTE_FORCE, SCAN, Bitmap, MetadataIndex, SearchFilter, _date_keys, plan
+from app.retrieval.local_index import TenantIndex
+from app.retrieval.quantization import QuantizedIndex, ScalarQuantizer
+from app.retrieval.schemas import QueryOptions, QueryRequest
+from app.retrieval.vector_store import ChunkRecord, QdrantVectorStore
+
+TAGS = ["legal", "hr", "finance", "ops", "eng"]
+
+
+def make_records(count, seed=0, dimensions=16):
+    rng = np.random.default_rng(seed)
+    first = date(2023, 11, 20)
+    records = []
+    for i in range(count):
+        tags = [TAGS[int(t)] for t in rng.choice(len(TAGS), size=int(rng.integers(0, 3)), replace=False)]
+        day = first + timedelta(days=int(rng.integers(0, 120))) if i % 7 else None
+        vector = rng.standard_normal(dimensions).astype(np.float32)
+        records.append(ChunkRecord(f"c{i}", f"d{i % 40}", "", "", vector, tags=tags, date=day))
+    return records
+
+
+def expected_ids(records, query, top_k, search_filter):
+    passing = [r for r in records if search_filter.matches(r.document_id, r.tags, r.date)]
+    scores = [float(r.vector @ query / np.linalg.norm(r.vector)) for r in passing]
+    order = np.argsort(scores)[::-1][:top_k]
+    return [passing[i].chunk_id for i in order]
+
+
+def test_bitmap_set_operations_across_container_kinds():
+    rng = np.random.default_rng(1)
+    # Sparse and dense containers in the same and in different high halves
+    a = set(rng.integers(0, 70_000, size=300).tolist()) | set(range(65_536, 65_536 + 10_000))
+    b = set(rng.integers(0, 140_000, size=20_000).tolist())
+    left, right = Bitmap.from_rows(a), Bitmap.from_rows(b)
+    assert {c.dtype for c in left.containers.values()} == {np.dtype(np.uint16), np.dtype(np.uint64)}
+
+    assert len(left) == len(a)
+    assert (left | right).to_rows().tolist() == sorted(a | b)
+    assert (left & right).to_rows().tolist() == sorted(a & b)
+    assert (right & left).to_rows().tolist() == sorted(a & b)
+    assert all(row in left for row in list(a)[:50]) and 139_999 not in left
+
+
+def test_date_range_uses_whole_months_and_edge_days():
+    keys = _date_keys(date(2024, 1, 30), date(2024, 4, 2))
+    assert keys == [
+        ("day", "2024-01-30"),
+        ("day", "2024-01-31"),
+        ("month", "2024-02"),
+        ("month", "2024-03"),
+        ("day", "2024-04-01"),
+        ("day", "2024-04-02"),
+    ]
+
+
+def test_metadata_lookup_intersects_conditions():
+    records = make_records(2000)
+    metadata = MetadataIndex()
+    metadata.add(0, records)
+    search_filter = SearchFilter(
+        document_ids=["d1", "d2", "d3", "d9"], tags=["hr", "ops"], start=date(2024, 1, 3), end=date(2024, 2, 10)
+    )
+    expected = [i for i, r in enumerate(records) if search_filter.matches(r.document_id, r.tags, r.date)]
+    assert expected
+    assert metadata.lookup(search_filter).to_rows().tolist() == expected
+    assert metadata.estimate(search_filter) >= len(expected)
+    assert len(metadata.lookup(SearchFilter(tags=["unknown"]))) == 0
+
+
+@pytest.mark.parametrize("ratio", [0.0, 1.0])
+def test_filtered_search_matches_brute_force_under_both_plans(ratio):
+    records = make_records(1500)
+    index = TenantIndex(16)
+    index.brute_force_ratio = ratio
+    index.append(records)
+    index.delete_document("d4")
+    live = [r for r in records if r.document_id != "d4"]
+    query = np.random.default_rng(9).standard_normal(16).astype(np.float32)
+
+    filters = [
+        SearchFilter(tags=["legal"]),
+        SearchFilter(start=date(2024, 1, 1), end=date(2024, 1, 31)),
+        SearchFilter(document_ids=["d4", "d5", "d6"], tags=["eng", "hr"], end=date(2024, 2, 1)),
+        SearchFilter(tags=["missing"]),
+    ]
+    for search_filter in filters:
+        found = [h.chunk_id for h in index.search(query, 8, search_filter)]
+        assert found == expected_ids(live, query, 8, search_filter)
+    # A list of document IDs is still accepted as a filter
+    assert [h.document_id for h in index.search(query, 5, ["d5"])] == ["d5"] * 5
+
+
+def test_quantized_index_scores_selective_filters_exactly(tmp_path):
+    records = make_records(3000, dimensions=32)
+    index = QuantizedIndex(ScalarQuantizer(), records, np.stack([r.vector for r in records]), str(tmp_path))
+    search_filter = SearchFilter(document_ids=["d3"], tags=["finance"])
+    assert plan(len(index._filter(search_filter)[1]), index.size, index.brute_force_ratio) == BRUTE_FORCE
+    query = records[123].vector
+    found = index.search(query, 5, search_filter)
+    assert [h.chunk_id for h in found] == expected_ids(records, query, 5, search_filter)
+    assert plan(2900, index.size, index.brute_force_ratio) == SCAN
+    index.close()
+
+
+def test_query_request_combines_filters():
+    request = QueryRequest.model_validate(
+        {
+            "question": "q",
+            "document_ids": ["a", "b"],
+            "filters": {"document_ids": ["b", "c"], "tags": ["hr"], "date_range": {"start": "2024-01-01"}},
+        }
+    )
+    assert request.search_filter() == SearchFilter(["b"], ["hr"], date(2024, 1, 1), None)
+    assert QueryRequest(question="q").search_filter() is None
+    with pytest.raises(ValueError):
+        QueryRequest.model_validate(
+            {"question": "q", "filters": {"date_range": {"start": "2024-02-01", "end": "2024-01-01"}}}
+        )
+    # Answers are cached per filter
+    assert SemanticAnswerCache.scope(5, request.search_filter()) == SemanticAnswerCache.scope(
+        5, SearchFilter(["b"], ["hr"], date(2024, 1, 1))
+    )
+    assert SemanticAnswerCache.scope(5, SearchFilter(tags=["hr"])) != SemanticAnswerCache.scope(5, None)
+
+
+@pytest.mark.asyncio
+async def test_qdrant_pushes_filters_down_and_searches_small_sets_exactly():
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append((request.url.path.rsplit("/", 1)[-1], body))
+        if request.url.path.endswith("/count"):
+            tags = body["filter"]["must"][1]["match"]["any"]
+            return httpx.Response(200, json={"result": {"count": 40 if tags == ["legal"] else 90_000}})
+        return httpx.Response(200, json={"result": []})
+
+    store = QdrantVectorStore("http://qdrant", "chunks")
+    store._client = httpx.AsyncClient(base_url="http://qdrant", transport=httpx.MockTransport(handler))
+    vector = np.ones(4, dtype=np.float32)
+    legal = SearchFilter(tags=["legal"], start=date(2024, 1, 1))
+    await store.search("t1", vector, 5, legal)
+    await store.search("t1", vector, 5, legal)
+    await store.search("t1", vector, 5, SearchFilter(tags=["eng"]))
+    await store.search("t1", vector, 5)
+    await store._client.aclose()
+
+    assert [action for action, _ in requests] == ["count", "search", "search", "count", "search", "search"]
+    assert requests[1][1]["filter"]["must"] == [
+        {"key": "tenant_id", "match": {"value": "t1"}},
+        {"key": "tags", "match": {"any": ["legal"]}},
+        {"key": "date", "range": {"gte": "2024-01-01T00:00:00Z"}},
+    ]
+    assert requests[1][1]["params"] == {"exact": True}
+    assert "params" not in requests[4][1] and "params" not in requests[5][1]
+
+
+def test_query_request_reads_contract_and_older_fields():
+    request = QueryRequest.model_validate(
+        {"query": "q", "options": {"include_citations": False, "max_citations": 3}, "response_format": "detailed"}
+    )
+    assert (request.question, request.top_k, request.include_citations) == ("q", 3, False)
+    older = QueryRequest.model_validate({"question": "q", "top_k": 7, "include_citations": False})
+    assert older.options == QueryOptions(include_citations=False, max_citations=7)
+    assert QueryRequest(question="q", top_k=2).top_k == 2
+    with pytest.raises(ValueError):
+        QueryRequest.model_validate({"query": "q", "options": {"max_citations": 0}})
@@ -0,0 +1,143 @@
+"""
+DocuQuery AI - GCRA Rate Limiter Tests
+
+Unit tests for the GCRA limiter and its bounded, clock-swept key store.
+"""
+
+import resource
+import tracemalloc
+
+import pytest
+
+from app.ratelimit import GCRALimiter, GCRAStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGCRALimiter:
+    """Tests for the rate decisions and header values."""
+
+    def test_allows_burst_up_to_limit_then_rejects(self):
+        clock = FakeClock()
+        limiter = GCRALimiter(10, 60, clock=clock)
+
+        results = [limiter.acquire("a") for _ in range(11)]
+
+        assert [r.allowed for r in results] == [True] * 10 + [False]
+        assert [r.remaining for r in results[:10]] == list(range(9, -1, -1))
+        assert results[-1].retry_after == pytest.approx(6.0)
+
+    def test_no_double_burst_across_window_boundary(self):
+        clock = FakeClock()
+        limiter = GCRALimiter(10, 60, clock=clock)
+        for _ in range(10):
+            assert limiter.acquire("a").allowed
+
+        # A fixed window would reset here and allow another 10
+        clock.now += 60.5
+        allowed = sum(limiter.acquire("a").allowed for _ in range(20))
+        assert allowed == 10
+
+        clock.now += 0.5
+        allowed = sum(limiter.acquire("a").allowed for _ in range(20))
+        assert allowed == 0
+
+    def test_refills_one_token_per_emission_interval(self):
+        clock = FakeClock()
+        limiter = GCRALimiter(10, 60, clock=clock)
+        for _ in range(10):
+            limiter.acquire("a")
+
+        clock.now += 6.0
+        assert limiter.acquire("a").allowed
+        assert not limiter.acquire("a").allowed
+
+    def test_reset_after_reports_full_refill(self):
+        clock = FakeClock()
+        limiter = GCRALimiter(10, 60, clock=clock)
+        result = limiter.acquire("a", cost=4)
+
+        assert result.remaining == 6
+        assert result.reset_after == pytest.approx(24.0)
+        assert limiter.peek("a").remaining == 6
+
+    def test_keys_are_independent(self):
+        limiter = GCRALimiter(1, 60, clock=FakeClock())
+        assert limiter.acquire("a").allowed
+        assert limiter.acquire("b").allowed
+        assert not limiter.acquire("a").allowed
+
+
+class TestGCRAStore:
+    """Tests for bounded capacity and eviction."""
+
+    def test_capacity_is_never_exceeded(self):
+        store = GCRAStore(capacity=64, shards=4)
+        limiter = GCRALimiter(5, 60, store=store, clock=FakeClock())
+        for i in range(10_000):
+            limiter.acquire(f"client-{i}")
+
+        assert len(store) <= store.capacity == 64
+        assert store.evictions == 10_000 - 64
+
+    def test_idle_keys_are_evicted_before_busy_ones(self):
+        clock = FakeClock()
+        store = GCRAStore(capacity=4, shards=1)
+        limiter = GCRALimiter(2, 10, store=store, clock=clock)
+        for key in ("idle-1", "idle-2", "idle-3"):
+            limiter.acquire(key)
+        clock.now += 60  # the three buckets have fully refilled
+        for _ in range(2):
+            limiter.acquire("busy")
+
+        for key in ("new-1", "new-2", "new-3"):
+            limiter.acquire(key)
+
+        assert store.forced_evictions == 0
+        assert not limiter.acquire("busy").allowed
+
+    def test_rejects_non_power_of_two_shards(self):
+        with pytest.raises(ValueError):
+            GCRAStore(capacity=10, shards=3)
+
+    def test_memory_is_flat_under_key_scan(self):
+        store = GCRAStore(capacity=4096, shards=16)
+        limiter = GCRALimiter(100, 60, store=store, clock=FakeClock())
+        for i in range(store.capacity):
+            limiter.acquire(f"10.0.{i}")
+
+        tracemalloc.start()
+        for i in range(20_000):
+            limiter.acquire(f"10.1.{i}")
+        baseline, _ = tracemalloc.get_traced_memory()
+        for i in range(60_000):
+            limiter.acquire(f"10.2.{i}")
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert len(store) == store.capacity
+        assert current - baseline < 64 * 1024
+
+
+@pytest.mark.slow
+def test_ten_million_distinct_clients_keep_flat_rss():
+    """Stress test: a 10M-address scan must not grow the process."""
+    store = GCRAStore(capacity=65536, shards=16)
+    limiter = GCRALimiter(100, 60, store=store)
+    for i in range(1_000_000):
+        limiter.acquire(f"c{i}")
+    rss_after_warmup = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for i in range(1_000_000, 10_000_000):
+        limiter.acquire(f"c{i}")
+    rss_after_scan = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    assert len(store) == store.capacity
+    # ru_maxrss is in KiB on Linux; allow a few MiB of allocator noise
+    assert rss_after_scan - rss_after_warmup < 8 * 1024
@@ -0,0 +1,187 @@
+"""
+DocuQuery AI - Health Monitor Tests
+
+Unit tests for the cached, concurrent dependency probes and the health
+endpoints, using local stub dependencies that hang or fail.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.health import health_router
+from app.telemetry.health import HEALTHY, UNHEALTHY, UNKNOWN, HealthMonitor, Probe, tcp_probe
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok():
+    return None
+
+
+async def hang():
+    await asyncio.Event().wait()
+
+
+async def fail():
+    raise ConnectionRefusedError("connection refused")
+
+
+def make_monitor(clock=None, **probes):
+    return HealthMonitor(
+        [
+            Probe(name, check, timeout=0.05, critical=name != "openai")
+            for name, check in probes.items()
+        ],
+        stale_after=30.0,
+        history_size=3,
+        clock=clock or FakeClock(),
+    )
+
+
+class TestHealthMonitor:
+    """Tests for probing and caching."""
+
+    @pytest.mark.asyncio
+    async def test_probes_run_concurrently_with_timeouts(self):
+        monitor = make_monitor(database=hang, redis=hang, qdrant=fail, openai=ok)
+
+        started = time.perf_counter()
+        await monitor.refresh()
+        elapsed = time.perf_counter() - started
+
+        # Two hanging probes cost one timeout, not two
+        assert elapsed < 0.09
+        assert monitor.statuses() == {
+            "database": UNHEALTHY,
+            "redis": UNHEALTHY,
+            "qdrant": UNHEALTHY,
+            "openai": HEALTHY,
+        }
+        assert "timed out" in monitor.states["database"].error
+        assert "ConnectionRefusedError" in monitor.states["qdrant"].error
+        assert monitor.states["database"].error_code == "timeout"
+
+    @pytest.mark.asyncio
+    async def test_results_go_stale(self):
+        clock = FakeClock()
+        monitor = make_monitor(clock, database=ok)
+        assert monitor.status_of("database") == UNKNOWN
+
+        await monitor.refresh()
+        assert monitor.is_ready()
+
+        clock.now += 31
+        assert monitor.status_of("database") == UNKNOWN
+        assert not monitor.is_ready()
+
+    @pytest.mark.asyncio
+    async def test_non_critical_failure_only_degrades(self):
+        monitor = make_monitor(database=ok, openai=fail)
+        await monitor.refresh()
+
+        assert monitor.overall_status() == "degraded"
+        assert monitor.is_ready()
+
+    @pytest.mark.asyncio
+    async def test_latency_history_is_bounded(self):
+        monitor = make_monitor(database=ok)
+        for _ in range(5):
+            await monitor.refresh()
+
+        details = monitor.probe_details()["database"]
+        assert len(details["latency_history_ms"]) == 3
+        assert details["checked_at"].endswith("Z")
+
+    @pytest.mark.asyncio
+    async def test_background_refresher(self):
+        monitor = make_monitor(database=ok)
+        monitor.interval = 0.01
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            assert monitor.is_running()
+            assert monitor.refreshes >= 2
+        finally:
+            await monitor.stop()
+        assert not monitor.is_running()
+
+    @pytest.mark.asyncio
+    async def test_tcp_probe_against_local_stub(self):
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            monitor = HealthMonitor([tcp_probe("redis", f"redis://127.0.0.1:{port}/0", 6379)])
+            await monitor.refresh()
+            assert monitor.status_of("redis") == HEALTHY
+        finally:
+            server.close()
+            await server.wait_closed()
+
+        await monitor.refresh()
+        assert monitor.status_of("redis") == UNHEALTHY
+
+    def test_uptime_format(self):
+        clock = FakeClock()
+        monitor = make_monitor(clock)
+        clock.now += 2 * 86400 + 5 * 3600 + 30 * 60 + 15
+
+        assert monitor.uptime() == "2d 5h 30m 15s"
+
+
+def build_app(monitor: HealthMonitor) -> FastAPI:
+    app = FastAPI()
+    app.state.health = monitor
+    app.include_router(health_router)
+    return app
+
+
+class TestHealthEndpoints:
+    """Tests for answering from the cached state."""
+
+    def test_endpoints_do_not_probe(self):
+        calls = []
+
+        async def counting():
+            calls.append(1)
+
+        client = TestClient(build_app(make_monitor(database=counting)))
+        for path in ("/health", "/health/ready", "/health/live"):
+            client.get(path)
+
+        assert calls == []
+
+    def test_not_ready_until_first_refresh(self):
+        monitor = make_monitor(database=ok, openai=fail)
+        client = TestClient(build_app(monitor))
+
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"] == {"database_ready": False, "openai_ready": False}
+
+        asyncio.run(monitor.refresh())
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        body = client.get("/health").json()
+        assert body["status"] == "degraded"
+        assert body["dependencies"] == {"database": HEALTHY, "openai": UNHEALTHY}
+        # Failures are reported as codes; the exception text stays in the logs
+        assert body["checks"]["openai"]["error"] == "connection_failed"
+        assert body["checks"]["database"]["error"] is None
+
+    def test_liveness_ignores_dependencies(self):
+        monitor = make_monitor(database=fail)
+        asyncio.run(monitor.refresh())
+
+        body = TestClient(build_app(monitor)).get("/health/live").json()
+        assert body["status"] == "alive"
+        assert body["checks"]["health_refresher_running"] is False
@@ -0,0 +1,176 @@
+"""
+DocuQuery AI - Lexical Index Tests
+
+Unit tests for the BM25 inverted index, its compressed postings, rank fusion
+and hybrid search in the retrieval service.
+"""
+
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from app.common.versions import TenantVersions
+from app.llm.client import ChatCompletion
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.lexical import (
+    LexicalIndex,
+    LexicalStore,
+    decode_varints,
+    encode_varints,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.schemas import QueryRequest
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord, SearchHit
+
+WORDS = [f"w{i}" for i in range(300)]
+
+
+def make_records(count, seed=0, start=0, documents=25):
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, len(WORDS) + 1)
+    p = (1 / ranks) / (1 / ranks).sum()
+    records = []
+    for i in range(start, start + count):
+        words = rng.choice(WORDS, size=int(rng.integers(5, 40)), p=p)
+        vector = rng.standard_normal(8).astype(np.float32)
+        records.append(ChunkRecord(f"c{i}", f"d{i % documents}", "", " ".join(words), vector))
+    return records
+
+
+def exhaustive(index, text, top_k, documents=None):
+    """BM25 over every posting, with the index's own statistics."""
+    size = index.size
+    norms = index._length_norms()
+    scores = np.zeros(size)
+    for term in dict.fromkeys(tokenize(text)):
+        postings = index.terms.get(term)
+        if postings is None:
+            continue
+        idf = math.log(1 + (size - postings.count + 0.5) / (postings.count + 0.5))
+        rows, freqs = postings.decode()
+        scores[rows] += idf * freqs * (index.k1 + 1) / (freqs + norms[rows])
+    ranked = [
+        (score, index.records[row].chunk_id)
+        for row, score in enumerate(scores)
+        if score > 0 and index.alive[row]
+        and (documents is None or index.records[row].document_id in documents)
+    ]
+    return ranked_ties_by_id(ranked)[:top_k]
+
+
+def ranked_ties_by_id(pairs):
+    return sorted(pairs, key=lambda pair: (-round(float(pair[0]), 4), pair[1]))
+
+
+def test_tokenizer_keeps_identifiers_and_their_parts():
+    assert tokenize("Error ERR-1042 in v2.3.1, see user_id!") == [
+        "error", "err-1042", "err", "1042", "in", "v2.3.1", "v2", "3", "1", "see", "user_id", "user", "id",
+    ]
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2**21, 2**35 + 7], dtype=np.int64)
+    encoded = encode_varints(values)
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 4 + 6
+    assert decode_varints(np.frombuffer(encoded, dtype=np.uint8)).tolist() == values.tolist()
+
+
+def test_maxscore_matches_exhaustive_bm25_across_updates():
+    index = LexicalIndex()
+    records = make_records(3000)
+    for start in range(0, 3000, 700):
+        index.add(records[start : start + 700])
+    index.add([ChunkRecord("c5", "d5", "", "w299 w298 replaced", np.ones(8, np.float32))])
+    index.delete_document("d7")
+    assert index.live == 3000 - 120
+
+    for query in ("w0 w5 w120", "w250 w1", "w3 w9 w17 w40 w299", "replaced"):
+        for documents in (None, {"d1", "d2", "d5"}):
+            hits = index.search(query, 10, sorted(documents) if documents else None)
+            found = ranked_ties_by_id([(h.score, h.chunk_id) for h in hits])
+            expected = exhaustive(index, query, 10, documents)
+            assert [c for _, c in found] == [c for _, c in expected]
+            assert [s for s, _ in found] == pytest.approx([s for s, _ in expected], rel=1e-4)
+    assert index.search("replaced", 3)[0].chunk_id == "c5"
+    assert index.search("unknown words", 3) == []
+
+
+def test_deletes_compact_the_index():
+    index = LexicalIndex()
+    index.add(make_records(400, documents=4))
+    index.delete_document("d0")
+    index.delete_document("d1")
+    # Half the rows were dead: rebuilt from the live chunks
+    assert index.size == index.live == 200
+    assert all(h.document_id in ("d2", "d3") for h in index.search("w0 w1", 50))
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a = [SearchHit("d", c, "", "", 0.9) for c in ("x", "y", "z")]
+    b = [SearchHit("d", c, "", "", 12.0) for c in ("y", "q", "z")]
+    fused = reciprocal_rank_fusion([a, b], limit=3, k=60)
+    assert [h.chunk_id for h in fused] == ["y", "z", "x"]
+    assert fused[0].score == pytest.approx(1 / 62 + 1 / 61, abs=1e-6)
+
+
+class ConstantEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+class EchoLLM:
+    async def chat(self, messages, model, max_tokens, temperature):
+        return ChatCompletion("ok")
+
+
+@pytest.mark.asyncio
+async def test_service_fuses_keyword_hits_and_updates_incrementally():
+    store = NumpyVectorStore()
+    lexical = LexicalStore(store)
+    service = RetrievalService(
+        EmbeddingCache(ConstantEmbedder()), store, EchoLLM(), chat_model="fake", lexical=lexical
+    )
+    await service.index_chunks("t1", make_records(200))
+    assert await lexical.load("t1")
+
+    sku = ChunkRecord("sku", "manual", "Parts", "Replacement filter SKU-88231-B", np.zeros(8, np.float32))
+    await service.index_chunks("t1", [sku])
+    response = await service.answer("t1", QueryRequest(question="Where is SKU-88231-B?", top_k=3))
+    # The embedding does not match the chunk; the exact identifier does
+    assert "sku" in [c.chunk_id for c in response.citations]
+    assert "sku" not in [h.chunk_id for h in await store.search("t1", np.ones(8, np.float32), 3)]
+
+    await service.delete_document("t1", "manual")
+    assert await lexical.search("t1", "SKU-88231-B", 3) == []
+
+
+@pytest.mark.asyncio
+async def test_lexical_store_drops_tenants_written_by_other_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    store = NumpyVectorStore()
+    store.add("t1", make_records(50))
+    this, other = (
+        LexicalStore(
+            store, versions=TenantVersions(fakeredis.aioredis.FakeRedis(server=server), "lexical", check_interval=0)
+        )
+        for _ in range(2)
+    )
+    sku = ChunkRecord("sku", "manual", "Parts", "Replacement filter SKU-88231-B", np.zeros(8, np.float32))
+    assert await this.load("t1")
+    store.add("t1", [sku])
+    await this.upsert("t1", [sku])
+    assert [h.chunk_id for h in await this.search("t1", "SKU-88231-B", 3)] == ["sku"]
+
+    await store.delete_document("t1", "manual")
+    await other.delete_document("t1", "manual")
+    assert await this.search("t1", "SKU-88231-B", 3) == []
+    await asyncio.gather(*this._loading.values())
+    assert "t1" in this.tenants and await this.search("t1", "SKU-88231-B", 3) == []
@@ -0,0 +1,193 @@
+"""
+DocuQuery AI - Local Vector Index Tests
+
+Unit tests for the in-process NumPy vector index and the store routing small
+tenants to it, including invalidation by writes of other workers.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.common.versions import TenantVersions
+from app.retrieval.local_index import NumpyVectorStore, RoutingVectorStore, TenantIndex
+from app.retrieval.vector_store import ChunkRecord
+
+
+def make_records(count, dimensions=16, documents=10, seed=0, prefix="c"):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimensions)).astype(np.float32)
+    return [
+        ChunkRecord(f"{prefix}{i}", f"d{i % documents}", "T", f"text {i}", vectors[i])
+        for i in range(count)
+    ]
+
+
+def brute_force(records, query, top_k, documents=None):
+    scored = []
+    for record in records:
+        if documents and record.document_id not in documents:
+            continue
+        v = record.vector / np.linalg.norm(record.vector)
+        scored.append((float(v @ (query / np.linalg.norm(query))), record.chunk_id))
+    scored.sort(reverse=True)
+    return [chunk_id for _, chunk_id in scored[:top_k]]
+
+
+def test_exact_top_k_with_and_without_filters():
+    records = make_records(600)
+    index = TenantIndex(16)
+    index.append(records[:250])
+    index.append(records[250:])
+    query = np.random.default_rng(1).standard_normal(16).astype(np.float32)
+
+    hits = index.search(query, 10)
+    assert [h.chunk_id for h in hits] == brute_force(records, query, 10)
+    assert hits[0].score >= hits[-1].score
+
+    for documents in (["d3"], ["d1", "d2", "d3", "d4", "d5", "d6", "d7"]):
+        hits = index.search(query, 5, documents)
+        assert [h.chunk_id for h in hits] == brute_force(records, query, 5, set(documents))
+    assert index.search(query, 5, ["missing"]) == []
+
+
+def test_upsert_replaces_and_delete_tombstones_then_compacts():
+    records = make_records(400)
+    index = TenantIndex(16)
+    index.append(records)
+    query = records[7].vector
+
+    replacement = ChunkRecord("c7", "d7", "T", "new text", -records[7].vector)
+    index.append([replacement])
+    assert index.live == 400
+    assert all(h.text != "text 7" for h in index.search(query, 400))
+
+    removed = index.delete_document("d3")
+    assert removed == 40
+    assert index.live == 360
+    assert all(h.document_id != "d3" for h in index.search(query, 400))
+
+    for document in ("d4", "d5"):
+        index.delete_document(document)
+    # Tombstones passed a quarter of the rows: compacted
+    assert index.size == index.live == 280
+    remaining = [r for r in records if r.document_id not in ("d3", "d4", "d5") and r.chunk_id != "c7"]
+    remaining.append(replacement)
+    q = np.random.default_rng(5).standard_normal(16).astype(np.float32)
+    assert [h.chunk_id for h in index.search(q, 20)] == brute_force(remaining, q, 20)
+
+
+def test_dimension_mismatch_is_rejected():
+    index = TenantIndex(16)
+    with pytest.raises(ValueError):
+        index.append(make_records(2, dimensions=8))
+
+
+@pytest.mark.asyncio
+async def test_numpy_store_isolates_tenants_and_scrolls():
+    store = NumpyVectorStore()
+    await store.upsert("t1", make_records(300))
+    await store.upsert("t2", make_records(5, prefix="x"))
+    hits = await store.search("t2", make_records(1)[0].vector, 10)
+    assert {h.chunk_id for h in hits} == {f"x{i}" for i in range(5)}
+
+    batches = [batch async for batch in store.scroll("t1", batch_size=128)]
+    assert [len(b) for b in batches] == [128, 128, 44]
+    assert await store.search("nobody", make_records(1)[0].vector, 3) == []
+
+
+class CountingStore(NumpyVectorStore):
+    def __init__(self):
+        super().__init__()
+        self.searches = 0
+
+    async def search(self, tenant_id, vector, top_k, document_ids=None):
+        self.searches += 1
+        return await super().search(tenant_id, vector, top_k, document_ids)
+
+
+@pytest.mark.asyncio
+async def test_router_serves_small_tenants_locally():
+    remote = CountingStore()
+    remote.add("small", make_records(50))
+    remote.add("large", make_records(500, prefix="L"))
+    router = RoutingVectorStore(remote, max_tenant_chunks=100)
+    query = make_records(1, seed=3)[0].vector
+
+    first = await router.search("small", query, 5)
+    await asyncio.sleep(0)
+    await asyncio.gather(*router._loading.values())
+    assert router.is_local("small")
+    second = await router.search("small", query, 5)
+    assert [h.chunk_id for h in first] == [h.chunk_id for h in second]
+    assert remote.searches == 1
+
+    await router.search("large", query, 5)
+    await asyncio.gather(*router._loading.values())
+    assert not router.is_local("large")
+    await router.search("large", query, 5)
+    assert remote.searches == 3
+
+
+@pytest.mark.asyncio
+async def test_router_mirrors_writes_and_respects_the_budget():
+    remote = CountingStore()
+    for tenant in ("a", "b"):
+        remote.add(tenant, make_records(60, prefix=tenant))
+    router = RoutingVectorStore(remote, max_tenant_chunks=100, max_total_chunks=100)
+
+    assert await router.load("a")
+    await router.upsert("a", [ChunkRecord("new", "dnew", "T", "fresh", np.ones(16, dtype=np.float32))])
+    hits = await router.search("a", np.ones(16, dtype=np.float32), 1)
+    assert hits[0].chunk_id == "new"
+    await router.delete_document("a", "dnew")
+    hits = await router.search("a", np.ones(16, dtype=np.float32), 1)
+    assert hits[0].chunk_id != "new"
+    assert remote.chunk_count("a") == 60
+
+    assert await router.load("b")
+    assert router.is_local("b") and not router.is_local("a")
+
+
+@pytest.mark.asyncio
+async def test_router_sees_writes_of_other_workers_through_shared_versions():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    remote = CountingStore()
+    remote.add("a", make_records(60, prefix="a"))
+    this, other = (
+        RoutingVectorStore(
+            remote,
+            max_tenant_chunks=100,
+            versions=TenantVersions(fakeredis.aioredis.FakeRedis(server=server), "vectors", check_interval=0),
+        )
+        for _ in range(2)
+    )
+    fresh = ChunkRecord("new", "dnew", "T", "fresh", np.ones(16, dtype=np.float32))
+    query = np.ones(16, dtype=np.float32)
+
+    assert await this.load("a")
+    await this.upsert("a", [fresh])
+    # Its own write is mirrored, so the copy stays current
+    assert (await this.search("a", query, 1))[0].chunk_id == "new" and remote.searches == 0
+
+    await other.delete_document("a", "dnew")
+    # Deleted by another worker: served remotely, then reloaded without it
+    assert (await this.search("a", query, 1))[0].chunk_id != "new" and remote.searches == 1
+    await asyncio.gather(*this._loading.values())
+    assert this.is_local("a")
+    assert (await this.search("a", query, 1))[0].chunk_id != "new" and remote.searches == 1
+
+
+@pytest.mark.asyncio
+async def test_router_bounds_skipped_tenants_and_pending_writes():
+    remote = CountingStore()
+    router = RoutingVectorStore(remote, max_tenant_chunks=1)
+    router.max_skipped = 3
+    for i in range(5):
+        remote.add(f"t{i}", make_records(5, prefix=f"t{i}"))
+        assert not await router.load(f"t{i}")
+    assert list(router._skip_until) == ["t2", "t3", "t4"]
+    await router.upsert("t0", make_records(1))
+    assert router._writes == {} and router._loads == {}
@@ -0,0 +1,185 @@
+"""
+DocuQuery AI - Logging Pipeline Tests
+
+Unit tests for the JSON formatter, the bounded queue handler, access log
+sampling and the queue-backed logging pipeline.
+"""
+
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from app.telemetry.logs import (
+    LOG_METRICS,
+    AccessLogSampler,
+    AsyncLogHandler,
+    JSONFormatter,
+    configure_logging,
+    shutdown_logging,
+)
+from app.telemetry.metrics import MetricsRegistry
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def make_record(msg="hello", args=(), **extra):
+    record = logging.LogRecord("docuquery.test", logging.INFO, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestJSONFormatter:
+    """Tests for single-line JSON output."""
+
+    def test_static_fields_and_access_tuple(self):
+        formatter = JSONFormatter({"service": "docuquery", "version": "1.0"})
+        record = make_record(
+            "%s %s %s",
+            ("GET", "/x", 200),
+            access=("GET", "/x", 200, 1.5, "rid", "127.0.0.1"),
+        )
+
+        payload = json.loads(formatter.format(record))
+
+        assert payload["service"] == "docuquery"
+        assert payload["version"] == "1.0"
+        assert payload["message"] == "GET /x 200"
+        assert payload["status_code"] == 200
+        assert payload["duration_ms"] == 1.5
+        assert payload["request_id"] == "rid"
+        assert "access" not in payload
+
+    def test_extra_fields_and_no_static_fields(self):
+        payload = json.loads(JSONFormatter().format(make_record(document_id="doc-1")))
+
+        assert payload["document_id"] == "doc-1"
+        assert payload["level"] == "INFO"
+
+
+class TestAsyncLogHandler:
+    """Tests for the bounded, non-blocking queue handler."""
+
+    def test_drops_and_counts_when_full(self):
+        handler = AsyncLogHandler(maxsize=2)
+        for _ in range(5):
+            handler.handle(make_record())
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_record_is_not_formatted_on_the_caller(self):
+        handler = AsyncLogHandler(maxsize=1)
+        record = make_record("%s", ("late",))
+        handler.handle(record)
+
+        queued = handler.queue.get_nowait()
+        assert queued is record
+        assert queued.msg == "%s"
+
+
+class TestAccessLogSampler:
+    """Tests for per-route sampling."""
+
+    def test_errors_and_slow_requests_are_always_kept(self):
+        sampler = AccessLogSampler(default_rate=0.0, slow_threshold_ms=500)
+
+        assert sampler.should_log("/api/v1/query", 503, 1.0)
+        assert sampler.should_log("/api/v1/query", 200, 800.0)
+        assert not sampler.should_log("/api/v1/query", 200, 1.0)
+
+    def test_longest_prefix_rate_wins(self):
+        sampler = AccessLogSampler(
+            default_rate=1.0,
+            route_rates={"/api/v1": 0.5, "/api/v1/health": 0.0},
+        )
+
+        assert sampler.rate_for("/api/v1/health") == 0.0
+        assert sampler.rate_for("/api/v1/query") == 0.5
+        assert sampler.rate_for("/other") == 1.0
+        assert not sampler.should_log("/api/v1/health", 200, 1.0)
+
+    def test_partial_rate_uses_random_draw(self):
+        sampler = AccessLogSampler(route_rates={"/": 0.25})
+        sampler._random = lambda: 0.1
+        assert sampler.should_log("/x", 200, 1.0)
+        sampler._random = lambda: 0.9
+        assert not sampler.should_log("/x", 200, 1.0)
+
+
+class TestConfigureLogging:
+    """Tests for the queue-backed logging pipeline."""
+
+    @pytest.fixture(autouse=True)
+    def _shutdown(self):
+        shutdown_logging()
+        yield
+        shutdown_logging()
+
+    def test_records_reach_target_as_json(self):
+        target = ListHandler()
+        configure_logging(
+            static_fields={"service": "docuquery"},
+            loggers=("docuquery.test",),
+            target=target,
+        )
+        logging.getLogger("docuquery.test").info("queued %d", 1)
+        shutdown_logging()
+
+        assert len(target.lines) == 1
+        payload = json.loads(target.lines[0])
+        assert payload["message"] == "queued 1"
+        assert payload["service"] == "docuquery"
+
+    def test_is_idempotent_and_restores_propagation(self):
+        target = ListHandler()
+        first = configure_logging(loggers=("docuquery.test",), target=target)
+        assert configure_logging(loggers=("docuquery.test",)) is first
+        assert logging.getLogger("docuquery.test").propagate is False
+
+        shutdown_logging()
+
+        logger = logging.getLogger("docuquery.test")
+        assert logger.propagate is True
+        assert first.handler not in logger.handlers
+
+    def test_stops_with_a_full_queue_and_publishes_drops(self):
+        release = threading.Event()
+
+        class StuckHandler(ListHandler):
+            def emit(self, record):
+                release.wait()
+                super().emit(record)
+
+        target = StuckHandler()
+        pipeline = configure_logging(queue_size=2, loggers=("docuquery.test",), target=target)
+        pipeline.listener.stop_timeout = 0.05
+        registry = MetricsRegistry()
+        registry.add_source(pipeline.metric_samples, LOG_METRICS)
+        logger = logging.getLogger("docuquery.test")
+        logger.info("taken by the writer")
+        for _ in range(1000):
+            if pipeline.handler.queue.empty():
+                break
+            time.sleep(0.001)
+        for i in range(4):
+            logger.info("queued %d", i)
+        assert pipeline.dropped == 2
+
+        # The writer stays stuck past the stop timeout: the oldest record makes room
+        threading.Timer(0.2, release.set).start()
+        shutdown_logging()
+        assert pipeline.dropped == 3
+        assert len(target.lines) == 2
+        assert "docuquery_log_records_dropped_total 3" in registry.collect().render()
+        registry.close()
@@ -0,0 +1,160 @@
+"""
+DocuQuery AI - Metrics Tests
+
+Unit tests for the memory-mapped metrics registry, multi-worker aggregation,
+the metrics stage and the Prometheus exporter.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import MetricsMiddleware, MiddlewarePipeline
+from app.telemetry.metrics import (
+    OVERFLOW_ROUTE,
+    UNMATCHED_ROUTE,
+    MetricsExporter,
+    MetricsRegistry,
+    collect_directory,
+)
+
+
+class TestMetricsRegistry:
+    """Tests for recording and reading back metrics."""
+
+    def test_observe_fills_bucket_status_and_sum(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe("GET", "/a", 200, 0.05)
+        registry.observe("GET", "/a", 503, 0.5)
+        registry.observe("GET", "/a", 200, 3.0)
+
+        series = registry.collect().series[("GET", "/a")]
+        assert series.buckets == [1, 1, 1]
+        assert series.statuses == [0, 2, 0, 0, 1]
+        assert series.total == pytest.approx(3.55)
+
+    def test_bucket_bounds_are_inclusive(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe("GET", "/a", 200, 0.1)
+
+        assert registry.collect().series[("GET", "/a")].buckets == [1, 0, 0]
+
+    def test_series_past_the_cap_fold_into_overflow(self):
+        registry = MetricsRegistry(max_series=3)
+        for i in range(5):
+            registry.observe("GET", f"/r{i}", 200, 0.01)
+
+        series = registry.collect().series
+        assert set(series) == {("GET", "/r0"), ("GET", "/r1"), ("*", OVERFLOW_ROUTE)}
+        assert sum(series[("*", OVERFLOW_ROUTE)].statuses) == 3
+
+    def test_render_is_cumulative_prometheus_text(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe("GET", '/a"b', 200, 0.05)
+        registry.observe("GET", '/a"b', 200, 0.5)
+        registry.in_flight = 2
+
+        text = registry.collect().render()
+
+        assert "docuquery_http_requests_in_flight 2" in text
+        assert 'route="/a\\"b",le="0.1"} 1' in text
+        assert 'route="/a\\"b",le="1"} 2' in text
+        assert 'route="/a\\"b",le="+Inf"} 2' in text
+        assert 'docuquery_http_request_duration_seconds_count{method="GET",route="/a\\"b"} 2' in text
+        assert 'docuquery_http_requests_total{method="GET",route="/a\\"b",status="2xx"} 2' in text
+
+
+def test_workers_sharing_a_directory_are_summed(tmp_path):
+    first = MetricsRegistry(directory=str(tmp_path), worker_id="1")
+    second = MetricsRegistry(directory=str(tmp_path), worker_id="2")
+    first.observe("GET", "/a", 200, 0.01)
+    second.observe("GET", "/a", 404, 0.02)
+    second.observe("POST", "/b", 201, 0.02)
+    first.in_flight = 1
+    second.in_flight = 1
+
+    first.flush()
+    second.flush()
+    snapshot = collect_directory(str(tmp_path))
+    assert snapshot.in_flight == 2
+    assert snapshot.series[("GET", "/a")].statuses == [0, 1, 0, 1, 0]
+    assert ("POST", "/b") in snapshot.series
+
+    # Counters of a stopped worker stay, its in-flight gauge does not
+    first.close()
+    snapshot = second.collect()
+    assert snapshot.in_flight == 1
+    assert sum(snapshot.series[("GET", "/a")].statuses) == 2
+    second.close()
+
+
+def test_published_counters_are_summed_over_workers(tmp_path):
+    families = {
+        "docuquery_cache_requests_total": ("counter", "Cache lookups."),
+        "docuquery_cache_bytes": ("gauge", "Cache memory."),
+    }
+    first = MetricsRegistry(directory=str(tmp_path), worker_id="1")
+    second = MetricsRegistry(directory=str(tmp_path), worker_id="2")
+    first.add_source(
+        lambda: [("docuquery_cache_requests_total", 'result="miss"', 3), ("docuquery_cache_bytes", "", 100)],
+        families,
+    )
+    second.add_source(
+        lambda: [("docuquery_cache_requests_total", 'result="miss"', 4), ("docuquery_cache_bytes", "", 50)],
+        families,
+    )
+    second.flush()
+
+    text = first.collect().render()
+    assert "# HELP docuquery_cache_requests_total Cache lookups." in text
+    assert "# TYPE docuquery_cache_requests_total counter" in text
+    assert 'docuquery_cache_requests_total{result="miss"} 7' in text
+    assert "docuquery_cache_bytes 150" in text
+    assert "worker" not in text
+
+    # A stopped worker's counters stay, its gauges do not
+    first.close()
+    text = second.collect().render()
+    assert 'docuquery_cache_requests_total{result="miss"} 7' in text
+    assert "docuquery_cache_bytes 50" in text
+    second.close()
+
+
+def test_stage_records_route_template_not_raw_path():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MiddlewarePipeline, stages=[MetricsMiddleware(registry=registry)])
+
+    @app.get("/documents/{document_id}")
+    async def get_document(document_id: str):
+        return {"id": document_id}
+
+    client = TestClient(app)
+    client.get("/documents/one")
+    client.get("/documents/two")
+    client.get("/missing")
+
+    snapshot = registry.collect()
+    assert sum(snapshot.series[("GET", "/documents/{document_id}")].statuses) == 2
+    assert snapshot.series[("GET", UNMATCHED_ROUTE)].statuses[3] == 1
+    assert snapshot.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_exporter_serves_metrics_on_its_own_port():
+    registry = MetricsRegistry()
+    registry.observe("GET", "/a", 200, 0.01)
+    exporter = MetricsExporter(registry, host="127.0.0.1", port=0)
+    await exporter.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", exporter.port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: test\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+    finally:
+        await exporter.stop()
+
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b'docuquery_http_requests_total{method="GET",route="/a",status="2xx"} 1' in response
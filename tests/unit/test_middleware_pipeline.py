@@ -0,0 +1,183 @@
+"""
+DocuQuery AI - Middleware Pipeline Tests
+
+Unit tests for the pure-ASGI middleware pipeline and its stages.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app.middleware import (
+    LoggingMiddleware,
+    MiddlewarePipeline,
+    RateLimitMiddleware,
+    RequestIDMiddleware,
+    SecurityHeadersMiddleware,
+    TimingMiddleware,
+)
+
+
+def build_app(requests_per_window: int = 100) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        MiddlewarePipeline,
+        stages=[
+            RequestIDMiddleware(),
+            TimingMiddleware(),
+            LoggingMiddleware(),
+            RateLimitMiddleware(requests_per_window=requests_per_window),
+            SecurityHeadersMiddleware(),
+        ],
+    )
+
+    @app.get("/echo-id")
+    async def echo_id(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/own-headers")
+    async def own_headers():
+        return JSONResponse(
+            {},
+            headers={
+                "X-Frame-Options": "SAMEORIGIN",
+                "Content-Security-Policy": "default-src *",
+                "X-Request-ID": "inner",
+                "X-RateLimit-Remaining": "7",
+            },
+        )
+
+    @app.get("/busy")
+    async def busy():
+        return JSONResponse({"detail": "busy"}, status_code=429)
+
+    return app
+
+
+class TestMiddlewarePipeline:
+    """Tests for the combined pipeline."""
+
+    def test_all_stages_add_headers(self):
+        client = TestClient(build_app())
+        response = client.get("/echo-id")
+
+        assert response.status_code == 200
+        assert response.headers["x-request-id"] == response.json()["request_id"]
+        assert float(response.headers["x-process-time"]) >= 0
+        assert response.headers["x-ratelimit-limit"] == "100"
+        assert response.headers["x-ratelimit-remaining"] == "99"
+        assert response.headers["x-frame-options"] == "DENY"
+        assert "content-security-policy" in response.headers
+
+    def test_rate_limited_response_keeps_pipeline_headers(self):
+        client = TestClient(build_app(requests_per_window=1))
+        assert client.get("/echo-id").status_code == 200
+
+        response = client.get("/echo-id")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "60"
+        assert "x-request-id" in response.headers
+        assert response.headers["x-content-type-options"] == "nosniff"
+
+    def test_stage_headers_replace_endpoint_headers(self):
+        client = TestClient(build_app())
+        response = client.get("/own-headers")
+
+        assert response.headers.get_list("x-frame-options") == ["DENY"]
+        assert len(response.headers.get_list("content-security-policy")) == 1
+        assert response.headers["content-security-policy"] != "default-src *"
+        assert len(response.headers.get_list("x-request-id")) == 1
+        assert response.headers["x-request-id"] != "inner"
+        assert response.headers.get_list("x-ratelimit-remaining") == ["99"]
+
+    def test_endpoint_429_still_gets_rate_limit_headers(self):
+        client = TestClient(build_app())
+        response = client.get("/busy")
+
+        assert response.status_code == 429
+        assert response.json() == {"detail": "busy"}
+        assert response.headers["x-ratelimit-remaining"] == "99"
+
+    def test_rejections_replay_identical_response(self):
+        client = TestClient(build_app(requests_per_window=1))
+        client.get("/echo-id")
+
+        first = client.get("/echo-id")
+        second = client.get("/echo-id")
+        assert first.status_code == second.status_code == 429
+        assert first.content == second.content
+        assert first.json() == {"detail": "Rate limit exceeded. Please try again later."}
+        assert len(second.headers.get_list("retry-after")) == 1
+        assert second.headers.get_list("x-ratelimit-remaining") == ["0"]
+
+    def test_logging_stage_logs_completion(self, caplog):
+        client = TestClient(build_app())
+        with caplog.at_level("INFO", logger="docuquery.api"):
+            client.get("/echo-id?x=1")
+
+        records = [r for r in caplog.records if r.name == "docuquery.api"]
+        assert [r.getMessage() for r in records] == ["GET /echo-id 200"]
+        method, path, status, _, request_id, _ = records[0].access
+        assert (method, path, status) == ("GET", "/echo-id", 200)
+        assert request_id is not None
+
+    def test_stage_is_usable_as_standalone_middleware(self):
+        app = FastAPI()
+        app.add_middleware(SecurityHeadersMiddleware, headers={"X-Frame-Options": "SAMEORIGIN"})
+
+        @app.get("/")
+        async def root():
+            return {}
+
+        response = TestClient(app).get("/")
+        assert response.headers["x-frame-options"] == "SAMEORIGIN"
+
+
+@pytest.mark.asyncio
+async def test_streaming_body_is_not_buffered():
+    """Each body chunk must reach the server before the app finishes."""
+    events = []
+
+    async def stream():
+        for chunk in (b"a", b"b", b"c"):
+            events.append(("yield", chunk))
+            yield chunk
+
+    async def app(scope, receive, send):
+        await StreamingResponse(stream())(scope, receive, send)
+
+    received = []
+
+    async def receive():
+        if received:
+            # No disconnect arrives; StreamingResponse cancels this wait itself
+            await asyncio.Event().wait()
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            events.append(("send", message["body"]))
+
+    pipeline = MiddlewarePipeline(app, [RequestIDMiddleware(), TimingMiddleware()])
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [],
+        "query_string": b"",
+        "client": ("127.0.0.1", 1234),
+    }
+    await pipeline(scope, receive, send)
+
+    assert events == [
+        ("yield", b"a"),
+        ("send", b"a"),
+        ("yield", b"b"),
+        ("send", b"b"),
+        ("yield", b"c"),
+        ("send", b"c"),
+    ]
@@ -0,0 +1,125 @@
+"""
+DocuQuery AI - Vector Quantization Tests
+
+Unit tests for scalar and product quantization of stored embeddings and the
+compressed tenant index with exact rescoring.
+"""
+
+import os
+from functools import partial
+
+import numpy as np
+import pytest
+
+from app.retrieval.local_index import NumpyVectorStore, RoutingVectorStore, TenantIndex
+from app.retrieval.quantization import (
+    ProductQuantizer,
+    QuantizedIndex,
+    ScalarQuantizer,
+    quantize_index,
+)
+from app.retrieval.vector_store import ChunkRecord, QdrantVectorStore
+
+
+def clustered_records(count, dimensions=64, documents=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((16, dimensions))
+    vectors = centers[rng.integers(16, size=count)] + 0.6 * rng.standard_normal((count, dimensions))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return [
+        ChunkRecord(f"c{i}", f"d{i % documents}", "T", f"text {i}", vectors[i]) for i in range(count)
+    ]
+
+
+def exact_index(records):
+    index = TenantIndex(len(records[0].vector))
+    index.append(records)
+    return index
+
+
+def recall(expected, hits):
+    return len({h.chunk_id for h in expected} & {h.chunk_id for h in hits}) / len(expected)
+
+
+@pytest.mark.parametrize("quantizer", [ScalarQuantizer(), ProductQuantizer(subspaces=16)])
+def test_rescored_search_matches_exact_search(tmp_path, quantizer):
+    records = clustered_records(2000)
+    exact = exact_index(records)
+    index = QuantizedIndex.from_index(exact, quantizer, str(tmp_path), rescore_factor=10)
+    queries = clustered_records(20, seed=9)
+
+    recalls = [recall(exact.search(q.vector, 10), index.search(q.vector, 10)) for q in queries]
+    assert np.mean(recalls) >= 0.9
+    hits = index.search(queries[0].vector, 10)
+    # Rescored hits carry exact similarities
+    expected = {h.chunk_id: h.score for h in exact.search(queries[0].vector, 2000)}
+    for hit in hits:
+        assert hit.score == pytest.approx(expected[hit.chunk_id], abs=1e-5)
+    assert index.nbytes < exact.nbytes / 3
+
+
+def test_scalar_codes_approximate_inner_products():
+    records = clustered_records(500)
+    vectors = np.stack([r.vector for r in records])
+    quantizer = ScalarQuantizer().fit(vectors)
+    query = records[0].vector
+    approximate = quantizer.scores(quantizer.encode(vectors), query)
+    assert np.max(np.abs(approximate - vectors @ query)) < 0.02
+
+
+def test_filters_and_deletes_on_compressed_index(tmp_path):
+    records = clustered_records(1000)
+    index = quantize_index(exact_index(records), "int8", str(tmp_path))
+    query = records[5].vector
+
+    hits = index.search(query, 5, ["d5", "d6"])
+    assert hits[0].chunk_id == "c5"
+    assert {h.document_id for h in hits} <= {"d5", "d6"}
+    assert index.delete_document("d5") == 50
+    assert all(h.document_id != "d5" for h in index.search(query, 100))
+    with pytest.raises(NotImplementedError):
+        index.append(records[:1])
+
+    index.close()
+    assert not os.listdir(tmp_path)
+
+
+def test_product_quantizer_rejects_uneven_subspaces():
+    with pytest.raises(ValueError):
+        ProductQuantizer(subspaces=5).fit(np.ones((10, 64), dtype=np.float32))
+
+
+@pytest.mark.asyncio
+async def test_router_compresses_large_tenants_and_reloads_after_writes(tmp_path):
+    remote = NumpyVectorStore()
+    remote.add("big", clustered_records(1200))
+    remote.add("small", clustered_records(50))
+    router = RoutingVectorStore(
+        remote,
+        max_tenant_chunks=5000,
+        compress=partial(quantize_index, mode="int8", directory=str(tmp_path)),
+        compress_min_chunks=1000,
+    )
+
+    assert await router.load("big") and await router.load("small")
+    assert isinstance(router.local.tenants["big"], QuantizedIndex)
+    assert not isinstance(router.local.tenants["small"], QuantizedIndex)
+    query = clustered_records(1, seed=4)[0].vector
+    expected = await remote.search("big", query, 5)
+    assert [h.chunk_id for h in await router.search("big", query, 5)] == [h.chunk_id for h in expected]
+
+    await router.upsert("big", [ChunkRecord("new", "dn", "T", "fresh", query)])
+    assert not router.is_local("big")
+    assert len(os.listdir(tmp_path)) == 0
+    assert (await router.search("big", query, 1))[0].chunk_id == "new"
+    await router.aclose()
+
+
+def test_qdrant_collection_config_enables_quantization():
+    store = QdrantVectorStore("http://qdrant", "chunks", quantization="int8")
+    config = store.collection_config(1536)
+    assert config["vectors"]["on_disk"] is True
+    assert config["quantization_config"]["scalar"]["type"] == "int8"
+    assert "quantization_config" not in QdrantVectorStore("http://qdrant", "chunks").collection_config(8)
+    with pytest.raises(ValueError):
+        QdrantVectorStore("http://qdrant", "chunks", quantization="binary")
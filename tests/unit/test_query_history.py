@@ -0,0 +1,95 @@
+"""
+DocuQuery AI - Query History Tests
+
+Unit tests for keyset pagination of the query history: opaque cursors, the
+translation of date ranges into index range bounds and the dispatch of the
+history endpoint between cursors and legacy page numbers.
+"""
+
+from datetime import date, datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.common.error_handlers import register_error_handlers
+from app.common.exceptions import ValidationError
+from app.db.pagination import Page, date_bounds, decode_cursor, encode_cursor, parse_date_range
+from app.retrieval.routes import retrieval_router
+
+
+class Row:
+    def __init__(self, row_id, created_at):
+        self.id = row_id
+        self.question = f"question {row_id}"
+        self.status = "completed"
+        self.created_at = created_at
+
+
+class RecordingHistory:
+    def __init__(self):
+        self.calls = []
+
+    async def page(self, tenant_id, limit, cursor=None, start=None, end=None):
+        self.calls.append(("page", tenant_id, limit, cursor, start, end))
+        if cursor is not None:
+            decode_cursor(cursor)
+        row = Row("q2", datetime(2024, 1, 15, 10, tzinfo=timezone.utc))
+        return Page([row], encode_cursor(row.created_at, row.id))
+
+    async def page_number(self, tenant_id, page, size, start=None, end=None):
+        self.calls.append(("page_number", tenant_id, page, size, start, end))
+        return Page([], None)
+
+
+def test_cursor_round_trip_and_rejects_tampering():
+    created_at = datetime(2024, 1, 15, 10, 0, 0, 123456, tzinfo=timezone.utc)
+    token = encode_cursor(created_at, "query_123")
+    assert "=" not in token and "/" not in token
+    assert decode_cursor(token) == (created_at, "query_123")
+    for bad in ("", "not-a-cursor", token[:-4], encode_cursor(created_at, "x").swapcase()):
+        with pytest.raises(ValidationError):
+            decode_cursor(bad)
+
+
+def test_date_ranges_become_half_open_timestamp_bounds():
+    lower, upper = date_bounds(date(2024, 1, 1), date(2024, 1, 31))
+    assert lower == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert upper == datetime(2024, 2, 1, tzinfo=timezone.utc)
+    assert date_bounds(None, None) == (None, None)
+
+    assert parse_date_range("2024-01-01..2024-01-31") == (date(2024, 1, 1), date(2024, 1, 31))
+    assert parse_date_range("2024-01-01..") == (date(2024, 1, 1), None)
+    assert parse_date_range("2024-01-05") == (date(2024, 1, 5), date(2024, 1, 5))
+    for bad in ("2024-02-01..2024-01-01", "yesterday"):
+        with pytest.raises(ValidationError):
+            parse_date_range(bad)
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_uses_cursors_and_keeps_page_numbers():
+    app = FastAPI()
+    register_error_handlers(app)
+    app.include_router(retrieval_router, prefix="/query")
+    history = RecordingHistory()
+    app.state.retrieval = type("Service", (), {"history": history})()
+    headers = {"X-Tenant-ID": "acme"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        params = {"size": 10, "start": "2024-01-01"}
+        first = await client.get("/query/history", params=params, headers=headers)
+        body = first.json()
+        assert body["queries"][0]["id"] == "q2"
+        cursor = body["pagination"]["next_cursor"]
+        await client.get("/query/history", params={"cursor": cursor}, headers=headers)
+        legacy = await client.get(
+            "/query/history", params={"page": 3, "date_range": "2024-01-01..2024-01-31"}, headers=headers
+        )
+        assert legacy.json()["pagination"] == {"size": 20, "next_cursor": None, "page": 3}
+        bad = await client.get("/query/history", params={"cursor": "garbage"}, headers=headers)
+        assert bad.status_code == 400
+
+    assert history.calls[:3] == [
+        ("page", "acme", 10, None, date(2024, 1, 1), None),
+        ("page", "acme", 20, cursor, None, None),
+        ("page_number", "acme", 3, 20, date(2024, 1, 1), date(2024, 1, 31)),
+    ]
@@ -0,0 +1,208 @@
+"""
+DocuQuery AI - Tenant Quota Tests
+
+Unit tests for the cost-weighted, hierarchical quota engine, its
+integration with the rate limit stage and the charging of LLM tokens used
+by queries.
+"""
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.llm.client import ChatCompletion
+from app.middleware import MiddlewarePipeline, RateLimitMiddleware
+from app.ratelimit import QuotaEngine, QuotaTicket, charge_llm_usage
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.jobs import QueryJobs, ResultStore
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.routes import retrieval_router
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_engine(clock=None, **overrides):
+    options = dict(
+        global_units=10000,
+        tenant_units=1000,
+        user_units=500,
+        route_units=300,
+        period=60,
+        route_costs={"POST /api/v1/query": 100},
+        bypass_prefixes=["/api/v1/health", "/api/v1/info"],
+        tokens_per_unit=100,
+        clock=clock or FakeClock(),
+    )
+    options.update(overrides)
+    return QuotaEngine(**options)
+
+
+class TestQuotaEngine:
+    """Tests for route costs and nested limits."""
+
+    def test_route_costs_and_bypass(self):
+        engine = make_engine()
+
+        assert engine.route_cost("POST", "/api/v1/query/") == ("POST /api/v1/query", 100.0)
+        assert engine.route_cost("GET", "/api/v1/documents") == ("*", 1.0)
+        assert engine.route_cost("GET", "/api/v1/health/ready") == (None, 0.0)
+
+    def test_route_level_limits_expensive_route(self):
+        engine = make_engine()
+        ticket = QuotaTicket("acme", "alice", "POST /api/v1/query")
+
+        decisions = [engine.acquire(ticket, 100) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert decisions[-1].level == "route"
+
+    def test_noisy_tenant_does_not_consume_other_tenants(self):
+        engine = make_engine(user_units=10000, route_units=10000)
+        for i in range(20):
+            engine.acquire(QuotaTicket("noisy", f"user-{i}", "*"), 100)
+
+        blocked = engine.acquire(QuotaTicket("noisy", "fresh-user", "*"), 100)
+        other = engine.acquire(QuotaTicket("quiet", "bob", "*"), 100)
+
+        assert not blocked.allowed and blocked.level == "tenant"
+        assert other.allowed
+
+    def test_rejection_at_one_level_charges_nothing(self):
+        engine = make_engine(tenant_units=150)
+        ticket = QuotaTicket("acme", "alice", "*")
+        assert engine.acquire(ticket, 100).allowed
+        assert not engine.acquire(ticket, 100).allowed
+
+        # The rejected request must not have spent user quota
+        other_tenant = engine.acquire(QuotaTicket("other", "alice", "*"), 1)
+        assert other_tenant.allowed
+
+    def test_llm_tokens_are_charged_after_completion(self):
+        engine = make_engine()
+        ticket = QuotaTicket("acme", "alice", "*")
+        assert engine.acquire(ticket, 1).allowed
+
+        engine.charge_tokens(ticket, 50_000)  # 500 units, the whole user quota
+
+        decision = engine.acquire(ticket, 1)
+        assert not decision.allowed
+        assert decision.level == "user"
+
+
+def build_app(engine):
+    app = FastAPI()
+    app.add_middleware(
+        MiddlewarePipeline,
+        stages=[RateLimitMiddleware(requests_per_window=1000, quotas=engine)],
+    )
+
+    @app.post("/api/v1/query")
+    async def query(request: Request):
+        charge_llm_usage(request.state, 50_000)
+        return {"ticket": list(request.state.quota)}
+
+    @app.get("/api/v1/health")
+    async def health(request: Request):
+        return {"quota": getattr(request.state, "quota", None)}
+
+    return app
+
+
+class TestQuotaStage:
+    """Tests for quota enforcement in the rate limit stage."""
+
+    def test_tenant_header_and_rejection_body(self):
+        client = TestClient(build_app(make_engine()))
+        headers = {"X-Tenant-ID": "acme"}
+
+        first = client.post("/api/v1/query", headers=headers)
+        assert first.status_code == 200
+        assert first.json()["ticket"] == ["acme", "testclient", "POST /api/v1/query"]
+
+        # 100 units up front plus 500 units of LLM usage exhaust the user quota
+        second = client.post("/api/v1/query", headers=headers)
+        assert second.status_code == 429
+        assert second.json()["scope"] == "user"
+        assert int(second.headers["retry-after"]) > 0
+
+    def test_health_bypasses_quotas(self):
+        client = TestClient(build_app(make_engine(global_units=1)))
+        for _ in range(5):
+            response = client.get("/api/v1/health")
+            assert response.status_code == 200
+            assert response.json() == {"quota": None}
+
+
+class ConstantEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class CountingLLM:
+    async def chat(self, messages, model, max_tokens, temperature):
+        return ChatCompletion("Thirty days [1].", prompt_tokens=900, completion_tokens=100)
+
+
+class RecordingEngine(QuotaEngine):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.charged = []
+
+    def charge_tokens(self, ticket, tokens):
+        self.charged.append((ticket.tenant, tokens))
+        super().charge_tokens(ticket, tokens)
+
+
+def build_query_app(engine):
+    app = FastAPI()
+    app.include_router(retrieval_router, prefix="/api/v1/query")
+    store = NumpyVectorStore()
+    store.add("acme", [ChunkRecord("c1", "d1", "MSA", "Notice is thirty days.", np.ones(4, np.float32))])
+    service = RetrievalService(EmbeddingCache(ConstantEmbedder()), store, CountingLLM(), chat_model="m")
+    app.state.retrieval = service
+    app.state.query_jobs = QueryJobs(service.answer, ResultStore(), workers=1)
+    pipeline = MiddlewarePipeline(app, [RateLimitMiddleware(requests_per_window=1000, quotas=engine)])
+    return app, pipeline
+
+
+@pytest.mark.asyncio
+async def test_queries_charge_llm_tokens_to_the_tenant():
+    engine = RecordingEngine(
+        global_units=10000, tenant_units=1000, user_units=1000, route_units=1000, period=60, tokens_per_unit=100
+    )
+    app, pipeline = build_query_app(engine)
+    headers = {"X-Tenant-ID": "acme"}
+    question = {"question": "What is the notice period?"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=pipeline), base_url="http://test") as client:
+        answered = await client.post("/api/v1/query/", json=question, headers=headers)
+        assert answered.status_code == 200
+        assert engine.charged == [("acme", 1000)]
+
+        streamed = await client.post("/api/v1/query/stream", json={"question": "Notice?"}, headers=headers)
+        assert "event: done" in streamed.text
+        assert engine.charged == [("acme", 1000)] * 2
+
+        accepted = await client.post(
+            "/api/v1/query/", json={"question": "How long is notice?", "mode": "async"}, headers=headers
+        )
+        query_id = accepted.json()["query_id"]
+        done = await client.get(f"/api/v1/query/{query_id}", params={"wait": 5}, headers=headers)
+        assert done.json()["status"] == "completed"
+        assert engine.charged == [("acme", 1000)] * 3
+
+        # Four requests of one unit and three answers of ten units each
+        remaining = engine.acquire(QuotaTicket("acme", "someone", "*"), 1).result.remaining
+        assert remaining == pytest.approx(1000 - 4 - 30 - 1, abs=1)
+    await app.state.query_jobs.aclose()
@@ -0,0 +1,165 @@
+"""
+DocuQuery AI - Reranking Tests
+
+Unit tests for maximal marginal relevance selection, batched scoring with its
+concurrency bound and deadline, and the rerank stage of the retrieval service.
+"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.llm.client import ChatCompletion
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.rerank import Reranker, Scorer, ThreadPoolScorer, mmr, similarity_matrix
+from app.retrieval.schemas import QueryRequest
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord, SearchHit
+
+
+def overlap_scores(question, texts):
+    """Deterministic stand-in for a cross-encoder: shared words with the question."""
+    words = set(question.lower().split())
+    return [len(words & set(text.lower().split())) + 1 / (1 + len(text)) for text in texts]
+
+
+def naive_mmr(relevance, vectors, k, diversity):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scaled = (relevance - relevance.min()) / (relevance.max() - relevance.min())
+    picked = []
+    while len(picked) < k:
+        best, best_value = None, -np.inf
+        for i in range(len(relevance)):
+            if i in picked:
+                continue
+            redundancy = max((float(unit[i] @ unit[j]) for j in picked), default=0.0)
+            value = (1 - diversity) * scaled[i] - diversity * redundancy
+            if value > best_value:
+                best, best_value = i, value
+        picked.append(best)
+    return picked
+
+
+def make_hits(count, seed=0, dimensions=16):
+    rng = np.random.default_rng(seed)
+    return [
+        SearchHit(f"d{i % 5}", f"c{i}", "", f"text {i}", float(1 - i / count), None, rng.standard_normal(dimensions))
+        for i in range(count)
+    ]
+
+
+def test_mmr_matches_reference_implementation():
+    hits = make_hits(60)
+    relevance = np.random.default_rng(1).random(60).astype(np.float32)
+    vectors = np.stack([h.vector for h in hits])
+    for diversity in (0.0, 0.3, 0.7):
+        picked = mmr(relevance, similarity_matrix(hits), 10, diversity).tolist()
+        expected = naive_mmr(relevance, vectors, 10, diversity) if diversity else np.argsort(-relevance)[:10].tolist()
+        assert picked == expected
+
+
+def test_mmr_skips_near_duplicates():
+    vector = np.ones(4, dtype=np.float32)
+    hits = [
+        SearchHit("a", "top", "", "", 0.95, None, vector),
+        SearchHit("a", "copy", "", "", 0.94, None, vector * 2),
+        SearchHit("b", "other", "", "", 0.90, None, np.array([1, -1, 1, -1], dtype=np.float32)),
+        SearchHit("c", "keyword", "", "", 0.50),
+    ]
+    relevance = np.array([h.score for h in hits], dtype=np.float32)
+    assert mmr(relevance, similarity_matrix(hits), 3, 0.3).tolist() == [0, 2, 1]
+    assert mmr(relevance, similarity_matrix(hits), 3, 0.0).tolist() == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_scores_in_bounded_concurrent_batches():
+    calls = []
+    running = []
+    lock = threading.Lock()
+
+    def score(question, texts):
+        with lock:
+            running.append(1)
+            calls.append((len(texts), len(running)))
+        time.sleep(0.01)
+        with lock:
+            running.pop()
+        return overlap_scores(question, texts)
+
+    hits = [SearchHit("d", f"c{i}", "", f"chunk {i} mentions {'refund policy' if i % 7 == 3 else 'other'}", 0.5) for i in range(50)]
+    reranker = Reranker(ThreadPoolScorer(score, workers=4), batch_size=8, max_concurrency=2, timeout=5, diversity=0)
+    chosen, reranked = await reranker.rerank("what is the refund policy", hits, 7)
+    reranker.close()
+
+    assert reranked == 50
+    assert sorted(size for size, _ in calls) == [2] + [8] * 6
+    assert max(concurrent for _, concurrent in calls) <= 2
+    # Every chunk mentioning the policy, the shortest text first
+    assert chosen[0].chunk_id == "c3"
+    assert {h.chunk_id for h in chosen} == {f"c{i}" for i in range(3, 50, 7)}
+    assert chosen[0].score == pytest.approx(overlap_scores("what is the refund policy", [hits[3].text])[0], rel=1e-5)
+
+
+class SlowScorer(Scorer):
+    async def score(self, question, texts):
+        await asyncio.sleep(1)
+        return np.zeros(len(texts), dtype=np.float32)
+
+
+class BrokenScorer(Scorer):
+    async def score(self, question, texts):
+        return np.zeros(1, dtype=np.float32)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scorer", [SlowScorer(), BrokenScorer()])
+async def test_falls_back_to_retrieval_scores(scorer):
+    hits = make_hits(10)
+    reranker = Reranker(scorer, batch_size=4, timeout=0.05, diversity=0)
+    chosen, reranked = await reranker.rerank("q", hits, 3)
+    assert reranked == 0
+    assert [h.chunk_id for h in chosen] == ["c0", "c1", "c2"]
+
+
+class ConstantEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+class EchoLLM:
+    def __init__(self):
+        self.messages = None
+
+    async def chat(self, messages, model, max_tokens, temperature):
+        self.messages = messages
+        return ChatCompletion("ok")
+
+
+@pytest.mark.asyncio
+async def test_service_reranks_a_deeper_candidate_list():
+    store = NumpyVectorStore()
+    rng = np.random.default_rng(2)
+    store.add(
+        "t1",
+        [
+            ChunkRecord(f"c{i}", f"d{i}", "", "invoice due dates" if i == 17 else f"unrelated {i}", rng.standard_normal(8))
+            for i in range(30)
+        ],
+    )
+    reranker = Reranker(ThreadPoolScorer(overlap_scores), diversity=0.3)
+    service = RetrievalService(
+        EmbeddingCache(ConstantEmbedder()), store, EchoLLM(), chat_model="fake", reranker=reranker, rerank_depth=30
+    )
+    response = await service.answer("t1", QueryRequest(question="when are invoice payments due", top_k=4))
+    await service.aclose()
+
+    assert response.citations[0].chunk_id == "c17"
+    assert len(response.citations) == 4
+    assert response.metadata.chunks_retrieved == 30
+    assert response.metadata.chunks_reranked == 30
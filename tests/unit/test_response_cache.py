@@ -0,0 +1,105 @@
+"""
+DocuQuery AI - Response Cache Tests
+
+Unit tests for the precomputed, ETag-validated GET responses and their
+invalidation on settings reload.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.info import info_router
+from app.common.response_cache import (
+    GLOBAL_TENANT,
+    ResponseCache,
+    etag_matches,
+    response_cache,
+)
+from app.config import reload_settings
+
+
+def counting_builder(payload):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return payload
+
+    return build, calls
+
+
+def test_builder_runs_once_and_bytes_are_shared():
+    cache = ResponseCache()
+    build, calls = counting_builder({"a": 1})
+    first = cache.get_or_build(GLOBAL_TENANT, ("info",), build)
+    second = cache.get_or_build(GLOBAL_TENANT, ("info",), build)
+    assert len(calls) == 1
+    assert second.body is first.body
+    assert first.body == b'{"a":1}'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_tenants_are_separate_and_invalidated_by_prefix():
+    cache = ResponseCache()
+    cache.get_or_build("t1", ("documents", "d1"), lambda: {"t": 1})
+    cache.get_or_build("t2", ("documents", "d1"), lambda: {"t": 2})
+    cache.get_or_build("t1", ("stats",), lambda: {})
+    assert cache.get_or_build("t2", ("documents", "d1"), lambda: None).body == b'{"t":2}'
+
+    assert cache.invalidate("t1", ("documents",)) == 1
+    assert len(cache) == 2
+    assert cache.invalidate(None) == 2
+
+
+def test_lru_bound():
+    cache = ResponseCache(max_entries=2)
+    for name in ("a", "b"):
+        cache.get_or_build(GLOBAL_TENANT, (name,), dict)
+    cache.get_or_build(GLOBAL_TENANT, ("a",), dict)
+    cache.get_or_build(GLOBAL_TENANT, ("c",), dict)
+    assert len(cache) == 2
+    _, calls = counting_builder(None)
+    cache.get_or_build(GLOBAL_TENANT, ("a",), lambda: calls.append(1))
+    assert calls == []
+
+
+def test_reload_settings_clears_the_shared_cache():
+    response_cache.get_or_build(GLOBAL_TENANT, ("reload-test",), dict)
+    assert len(response_cache) > 0
+    reload_settings()
+    assert len(response_cache) == 0
+
+
+def test_info_endpoint_revalidates_with_etag():
+    app = FastAPI()
+    app.include_router(info_router)
+    client = TestClient(app)
+    response_cache.clear()
+
+    first = client.get("/info")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+    assert first.json()["name"] == "DocuQuery AI"
+
+    again = client.get("/info")
+    assert again.content == first.content
+    assert again.headers["etag"] == etag
+
+    not_modified = client.get("/info", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    features = client.get("/info/features", headers={"If-None-Match": etag})
+    assert features.status_code == 200
+    assert features.headers["etag"] != etag
@@ -0,0 +1,93 @@
+"""
+DocuQuery AI - Serialization Tests
+
+Unit tests for the fast JSON response classes and the pre-rendered error
+bodies.
+"""
+
+import json
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.common.error_handlers import register_error_handlers
+from app.common.exceptions import NotFoundError, ValidationError
+from app.common.serialization import ErrorBody, FastJSONResponse, ModelResponse, dumps
+from app.retrieval.schemas import Citation, QueryMetadata, QueryResponse
+
+
+def make_response() -> QueryResponse:
+    return QueryResponse(
+        query_id="q1",
+        query="Where?",
+        answer="Here — «quoted»",
+        citations=[Citation(document_id="d1", chunk_id="c1", document_title="T", content="x", relevance_score=0.5)],
+        metadata=QueryMetadata(model_used="gpt-4", stages_ms={"llm": 1.5}),
+        created_at=datetime(2024, 1, 15, 12, 30),
+    )
+
+
+def test_dumps_is_compact_utf8_and_handles_models():
+    model = make_response()
+    assert dumps({"a": [1, 2], 3: "é"}) == '{"a":[1,2],"3":"é"}'.encode()
+    assert json.loads(dumps({"model": model})) == {"model": model.model_dump(mode="json")}
+
+
+def test_model_response_matches_pydantic_json():
+    model = make_response()
+    response = ModelResponse(model, headers={"X-Test": "1"})
+    assert response.body == model.model_dump_json().encode()
+    assert response.media_type == "application/json"
+    assert response.headers["x-test"] == "1"
+
+
+def test_error_body_renders_valid_json():
+    body = ErrorBody("Internal server error", "INTERNAL_ERROR", "An unexpected error occurred")
+    assert json.loads(body.render("2024-01-15T00:00:00Z", None)) == {
+        "error": "Internal server error",
+        "code": "INTERNAL_ERROR",
+        "details": "An unexpected error occurred",
+        "timestamp": "2024-01-15T00:00:00Z",
+        "request_id": None,
+    }
+    assert json.loads(body.render('a"b', "req-1"))["timestamp"] == 'a"b'
+
+
+def test_error_handlers_return_real_timestamp_and_request_id():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    register_error_handlers(app)
+
+    @app.middleware("http")
+    async def set_request_id(request, call_next):
+        request.state.request_id = "req-42"
+        return await call_next(request)
+
+    @app.get("/missing")
+    async def missing():
+        raise NotFoundError("Document not found", error_code="DOC_404")
+
+    @app.get("/invalid")
+    async def invalid():
+        raise ValidationError(error_code="VAL_001", details={"field": "title"})
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("secret")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    first = client.get("/missing")
+    assert first.status_code == 404
+    assert first.json()["code"] == "DOC_404"
+    assert first.json()["request_id"] == "req-42"
+    assert first.json()["details"] == {}
+
+    invalid_body = client.get("/invalid").json()
+    assert invalid_body["details"] == {"field": "title"}
+
+    boom = client.get("/boom")
+    assert boom.status_code == 500
+    body = boom.json()
+    assert body["code"] == "INTERNAL_ERROR"
+    assert "secret" not in boom.text
+    assert body["timestamp"].endswith("Z")
@@ -0,0 +1,122 @@
+"""
+DocuQuery AI - Stage Timing Tests
+
+Unit tests for the contextvar stage timer and its Server-Timing and access
+log integration.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import LoggingMiddleware, MiddlewarePipeline, TimingMiddleware
+from app.telemetry.stages import StageTimer, current_timer, stage, stage_breakdown
+
+
+class TestStageTimer:
+    """Tests for recording stages."""
+
+    def test_stage_is_noop_without_timer(self):
+        assert current_timer() is None
+        with stage("embedding"):
+            pass
+        assert stage_breakdown() == {}
+
+    def test_disabled_stage_does_not_swallow_exceptions(self):
+        with pytest.raises(KeyError):
+            with stage("embedding"):
+                raise KeyError("boom")
+
+    def test_repeated_stages_are_summed_in_first_run_order(self):
+        timer = StageTimer().activate()
+        try:
+            with stage("embedding"):
+                pass
+            with stage("vector_search"):
+                pass
+            with stage("embedding"):
+                pass
+        finally:
+            timer.deactivate()
+
+        assert list(timer.durations) == ["embedding", "vector_search"]
+        assert current_timer() is None
+
+    def test_server_timing_header_value(self):
+        timer = StageTimer()
+        timer.add("embedding", 0.0125)
+        timer.add("llm", 0.5)
+
+        assert timer.server_timing(1.0) == b"embedding;dur=12.5, llm;dur=500.0, total;dur=1000.0"
+
+    @pytest.mark.asyncio
+    async def test_async_stage_and_child_tasks_share_the_timer(self):
+        timer = StageTimer().activate()
+        try:
+            async def search():
+                async with stage("vector_search"):
+                    await asyncio.sleep(0)
+
+            await asyncio.gather(asyncio.create_task(search()))
+        finally:
+            timer.deactivate()
+
+        assert "vector_search" in timer.durations
+
+
+def build_app(server_timing: bool = True) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        MiddlewarePipeline,
+        stages=[TimingMiddleware(server_timing=server_timing), LoggingMiddleware()],
+    )
+
+    @app.get("/query")
+    async def query():
+        with stage("embedding"):
+            pass
+        with stage("llm"):
+            pass
+        return {"breakdown": stage_breakdown()}
+
+    @app.get("/sync")
+    def sync_query():
+        with stage("rerank"):
+            pass
+        return {"breakdown": stage_breakdown()}
+
+    return app
+
+
+class TestTimingStage:
+    """Tests for Server-Timing and access log integration."""
+
+    def test_server_timing_header_and_breakdown(self):
+        response = TestClient(build_app()).get("/query")
+
+        header = response.headers["server-timing"]
+        assert header.startswith("embedding;dur=")
+        assert ", llm;dur=" in header
+        assert ", total;dur=" in header
+        assert set(response.json()["breakdown"]) == {"embedding", "llm"}
+
+    def test_sync_handlers_in_threadpool_are_timed(self):
+        response = TestClient(build_app()).get("/sync")
+
+        assert response.headers["server-timing"].startswith("rerank;dur=")
+
+    def test_stages_are_added_to_access_log(self, caplog):
+        with caplog.at_level("INFO", logger="docuquery.api"):
+            TestClient(build_app()).get("/query")
+
+        record = next(r for r in caplog.records if r.name == "docuquery.api")
+        assert set(record.stages_ms) == {"embedding", "llm"}
+
+    def test_disabled_timer_sends_no_header(self):
+        response = TestClient(build_app(server_timing=False)).get("/query")
+
+        assert "server-timing" not in response.headers
+        assert response.json()["breakdown"] == {}
+        assert "x-process-time" in response.headers
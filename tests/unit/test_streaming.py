@@ -0,0 +1,198 @@
+"""
+DocuQuery AI - Streaming Query Tests
+
+Unit tests for server-sent event streaming of answers: early citations,
+token forwarding through the middleware pipeline, heartbeats, bounded
+buffering and cancellation of the LLM when the client disconnects.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.common.exceptions import LLMError
+from app.common.sse import HEARTBEAT, event_stream
+from app.llm.client import ChatCompletion, OpenAIClient
+from app.middleware.pipeline import MiddlewarePipeline
+from app.middleware.request_id import RequestIDMiddleware
+from app.middleware.timing import TimingMiddleware
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.routes import retrieval_router
+from app.retrieval.service import RetrievalService
+from app.retrieval.vector_store import ChunkRecord
+
+TOKEN_DELAY = 0.05
+TOKENS = ["Notice ", "is ", "thirty ", "days", "."]
+
+
+class ConstantEmbedder(Embedder):
+    model = "fake"
+
+    async def embed(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class StreamingLLM:
+    """Fake LLM producing one token every ``TOKEN_DELAY`` seconds."""
+
+    def __init__(self):
+        self.produced = 0
+        self.closed = False
+
+    async def stream_chat(self, messages, model, max_tokens, temperature):
+        try:
+            for token in TOKENS:
+                await asyncio.sleep(TOKEN_DELAY)
+                self.produced += 1
+                yield ChatCompletion(token)
+            yield ChatCompletion("", prompt_tokens=40, completion_tokens=len(TOKENS))
+        finally:
+            self.closed = True
+
+
+def build_app(llm):
+    app = FastAPI()
+    app.include_router(retrieval_router, prefix="/query")
+    store = NumpyVectorStore()
+    store.add("default", [ChunkRecord("c1", "d1", "MSA", "Notice is thirty days.", np.ones(4, np.float32))])
+    app.state.retrieval = RetrievalService(EmbeddingCache(ConstantEmbedder()), store, llm, chat_model="fake")
+    return MiddlewarePipeline(app, [RequestIDMiddleware(), TimingMiddleware()])
+
+
+async def post_stream(app, disconnect_after_tokens=None):
+    """Drive the ASGI app directly, recording when each message is sent."""
+    started = time.perf_counter()
+    messages = []
+    disconnected = asyncio.Event()
+    body = json.dumps({"question": "What is the notice period?"}).encode()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append((time.perf_counter() - started, message))
+        chunk = message.get("body", b"")
+        tokens = sum(b"event: token" in m.get("body", b"") for _, m in messages)
+        if disconnect_after_tokens is not None and tokens >= disconnect_after_tokens and chunk:
+            disconnected.set()
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/query/stream",
+        "raw_path": b"/query/stream",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+        "http_version": "1.1",
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+def events(messages):
+    frames = []
+    for at, message in messages:
+        if message["type"] != "http.response.body" or not message.get("body"):
+            continue
+        for frame in message["body"].decode().split("\n\n"):
+            if frame.startswith("event: "):
+                name, data = frame.split("\n", 1)
+                frames.append((at, name[7:], json.loads(data[6:])))
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_citations_arrive_before_generation_and_tokens_as_produced():
+    llm = StreamingLLM()
+    messages = await post_stream(build_app(llm))
+
+    start = messages[0][1]
+    assert start["status"] == 200
+    headers = dict(start["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert b"x-request-id" in headers
+
+    frames = events(messages)
+    names = [name for _, name, _ in frames]
+    assert names == ["citations"] + ["token"] * len(TOKENS) + ["done"]
+    # First byte right after retrieval, a token's generation time before the first token
+    token_times = [at for at, name, _ in frames if name == "token"]
+    first_byte = frames[0][0]
+    assert first_byte - messages[0][0] < TOKEN_DELAY / 2
+    assert token_times[0] - first_byte >= TOKEN_DELAY * 0.8
+    assert frames[0][2]["citations"][0]["chunk_id"] == "c1"
+    # Tokens are forwarded one by one, not buffered until the end
+    assert token_times[-1] - token_times[0] >= (len(TOKENS) - 1) * TOKEN_DELAY * 0.8
+    assert "".join(data["text"] for _, name, data in frames if name == "token") == "Notice is thirty days."
+    metadata = frames[-1][2]["metadata"]
+    assert metadata["completion_tokens"] == len(TOKENS)
+    assert metadata["first_token_ms"] >= TOKEN_DELAY * 1000
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_generation():
+    llm = StreamingLLM()
+    await post_stream(build_app(llm), disconnect_after_tokens=1)
+    await asyncio.sleep(TOKEN_DELAY * 2)
+    assert llm.closed
+    assert llm.produced < len(TOKENS)
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_bounded_buffer_and_errors():
+    produced = []
+
+    async def source():
+        await asyncio.sleep(0.12)
+        for i in range(20):
+            produced.append(i)
+            yield "token", {"text": str(i)}
+        raise LLMError("LLM provider unavailable", error_code="LLM_UNAVAILABLE")
+
+    stream = event_stream(source(), heartbeat=0.05, buffer=2)
+    frames = []
+    async for frame in stream:
+        frames.append(frame)
+        if frame != HEARTBEAT:
+            # A slow client: the source may only run a bounded distance ahead
+            assert len(produced) - (len(frames) - frames.count(HEARTBEAT)) <= 3
+            await asyncio.sleep(0.005)
+
+    assert frames[:2] == [HEARTBEAT, HEARTBEAT]
+    assert frames[-1] == b'event: error\ndata: {"error":"LLM provider unavailable","code":"LLM_UNAVAILABLE"}\n\n'
+    assert sum(f.startswith(b"event: token") for f in frames) == 20
+
+
+@pytest.mark.asyncio
+async def test_openai_client_parses_streamed_deltas():
+    body = (
+        b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"Thirty"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":" days"}}]}\n\n'
+        b'data: {"choices":[],"usage":{"prompt_tokens":12,"completion_tokens":2}}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    client = OpenAIClient(api_key="k")
+    client._client = httpx.AsyncClient(
+        base_url="http://llm", transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+    chunks = [c async for c in client.stream_chat([{"role": "user", "content": "q"}], "m", 10, 0.0)]
+    await client.aclose()
+    assert [c.text for c in chunks] == ["Thirty", " days", ""]
+    assert (chunks[-1].prompt_tokens, chunks[-1].completion_tokens) == (12, 2)
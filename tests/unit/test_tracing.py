@@ -0,0 +1,230 @@
+"""
+DocuQuery AI - Tracing Tests
+
+Unit tests for traceparent handling, context propagation into background
+work, tail sampling and the tracing stage.
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.background import run_in_thread, spawn, task_headers, traced_task
+from app.common.error_handlers import register_error_handlers
+from app.common.exceptions import DocuQueryException
+from app.middleware import MiddlewarePipeline, RequestIDMiddleware, TracingMiddleware
+from app.telemetry.tracing import (
+    BatchSpanProcessor,
+    FileSpanExporter,
+    SpanContext,
+    SpanExporter,
+    Tracer,
+    current_span,
+    get_tracer,
+    parse_traceparent,
+    start_span,
+)
+
+PARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exported():
+    """Record every finished trace through the process-wide tracer."""
+    exporter = ListExporter()
+    tracer = get_tracer()
+    tracer.processor = BatchSpanProcessor(exporter, interval=0.01)
+    tracer.sample_rate = 1.0
+    yield exporter
+    processor, tracer.processor = tracer.processor, None
+    processor.shutdown()
+    tracer.sample_rate = 0.1
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent parsing and rendering."""
+
+    def test_round_trip(self):
+        context = parse_traceparent(PARENT)
+        assert context == SpanContext("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", True)
+        assert context.to_traceparent() == PARENT
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            "",
+            "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331",
+            "00-00000000000000000000000000000000-b7ad6b7169203331-01",
+            "00-0af7651916cd43dd8448eb211c80319c-0000000000000000-01",
+            "ff-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+            "00-0af7651916cd43dd8448eb211c80319z-b7ad6b7169203331-01",
+            "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01-extra",
+        ],
+    )
+    def test_invalid_values_are_ignored(self, value):
+        assert parse_traceparent(value) is None
+
+
+class TestPropagation:
+    """Tests for carrying the current span into background work."""
+
+    @pytest.mark.asyncio
+    async def test_asyncio_tasks_and_threads_continue_the_trace(self):
+        with start_span("request") as root:
+            task_span = await spawn(self._current_trace(), "child")
+            thread_trace = await run_in_thread(lambda: current_span().trace_id)
+
+        assert task_span == root.trace_id
+        assert thread_trace == root.trace_id
+        assert current_span() is None
+
+    async def _current_trace(self):
+        await asyncio.sleep(0)
+        return current_span().trace_id
+
+    def test_task_message_continues_the_trace(self):
+        @traced_task("ingest.parse")
+        def parse(document_id):
+            span = current_span()
+            return document_id, span.trace_id, span.parent_id
+
+        with start_span("request") as root:
+            headers = task_headers()
+
+        # The worker runs in another thread with no context of its own
+        with ThreadPoolExecutor(1) as pool:
+            result = pool.submit(parse, "doc-1", trace_context=headers).result()
+
+        assert result == ("doc-1", root.trace_id, root.context.span_id)
+
+    @pytest.mark.asyncio
+    async def test_async_task_without_context_starts_a_new_trace(self):
+        @traced_task()
+        async def embed():
+            return current_span()
+
+        span = await embed()
+        assert span.parent_id is None
+        assert span.name.startswith("task ")
+
+
+class TestTailSampling:
+    """Tests for keeping whole traces once their root finishes."""
+
+    def make_tracer(self, **options):
+        exporter = ListExporter()
+        processor = BatchSpanProcessor(exporter, interval=0.01)
+        return Tracer(processor, **options), exporter, processor
+
+    def test_error_traces_are_kept_and_fast_ones_dropped(self):
+        tracer, exporter, processor = self.make_tracer(sample_rate=0.0)
+        with tracer.start_span("ok"):
+            with tracer.start_span("child"):
+                pass
+        with pytest.raises(RuntimeError):
+            with tracer.start_span("failing") as failing:
+                with tracer.start_span("child"):
+                    raise RuntimeError("boom")
+        processor.shutdown()
+
+        assert {s["trace_id"] for s in exporter.spans} == {failing.trace_id}
+        assert len(exporter.spans) == 2
+        assert all(s["error"] for s in exporter.spans)
+
+    def test_slow_traces_are_kept(self):
+        tracer, exporter, processor = self.make_tracer(sample_rate=0.0, slow_threshold_ms=0.0)
+        with tracer.start_span("slow"):
+            pass
+        processor.shutdown()
+
+        assert [s["name"] for s in exporter.spans] == ["slow"]
+
+    def test_sampling_is_deterministic_per_trace(self):
+        tracer, _, processor = self.make_tracer(sample_rate=0.5)
+        processor.shutdown()
+        low = tracer.start_span("a", parent=SpanContext("0" * 24 + "00000001", "1" * 16))
+        high = tracer.start_span("b", parent=SpanContext("0" * 24 + "ffffffff", "1" * 16))
+
+        assert tracer._keep(low, [low])
+        assert not tracer._keep(high, [high])
+
+    def test_spans_ending_after_their_root_follow_the_verdict(self):
+        tracer, exporter, processor = self.make_tracer(sample_rate=1.0)
+        root = tracer.start_span("request").activate()
+        late = tracer.start_span("detached")
+        root.end()
+        late.end()
+        processor.shutdown()
+
+        assert [s["name"] for s in exporter.spans] == ["request", "detached"]
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        processor = BatchSpanProcessor(FileSpanExporter(str(path)), interval=0.01)
+        tracer = Tracer(processor, sample_rate=1.0)
+        with tracer.start_span("request", attributes={"tenant": "t1"}):
+            pass
+        processor.shutdown()
+
+        lines = path.read_text().splitlines()
+        assert json.loads(lines[0])["attributes"] == {"tenant": "t1"}
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        MiddlewarePipeline, stages=[RequestIDMiddleware(), TracingMiddleware()]
+    )
+    register_error_handlers(app)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"trace_id": current_span().trace_id}
+
+    @app.get("/fail")
+    async def fail():
+        raise DocuQueryException("down", error_code="DEP_001", status_code=503)
+
+    return app
+
+
+class TestTracingStage:
+    """Tests for the server span and traceparent headers."""
+
+    def test_continues_incoming_trace_and_returns_traceparent(self, exported):
+        response = TestClient(build_app()).get("/items/1", headers={"traceparent": PARENT})
+
+        trace_id = response.json()["trace_id"]
+        assert trace_id == "0af7651916cd43dd8448eb211c80319c"
+        returned = parse_traceparent(response.headers["traceparent"])
+        assert returned.trace_id == trace_id
+        assert returned.span_id != "b7ad6b7169203331"
+
+    def test_server_span_is_named_after_route_template(self, exported):
+        TestClient(build_app()).get("/items/42")
+        get_tracer().processor.shutdown()
+
+        [span] = exported.spans
+        assert span["name"] == "GET /items/{item_id}"
+        assert span["attributes"]["http.status_code"] == 200
+        assert span["attributes"]["request_id"]
+
+    def test_error_response_carries_real_request_id(self):
+        response = TestClient(build_app()).get("/fail")
+
+        body = response.json()
+        assert body["request_id"] == response.headers["x-request-id"]
+        assert body["timestamp"] != "2024-01-15T00:00:00Z"
@@ -0,0 +1,237 @@
+"""
+DocuQuery AI - Upload Tests
+
+Unit tests for streaming document uploads: MIME type detection, incremental
+chunking, resumption at the stored offset, size, type and checksum checks,
+extraction while the upload runs and after it completes, and the upload
+endpoints.
+"""
+
+import hashlib
+import io
+import zipfile
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.common.error_handlers import register_error_handlers
+from app.common.exceptions import ConflictError, DocuQueryException, NotFoundError, ValidationError
+from app.documents.ingest import (
+    DOCX,
+    MARKDOWN,
+    PDF,
+    TEXT,
+    TextChunker,
+    UploadManager,
+    sniff,
+)
+from app.documents.routes import document_router
+from app.documents.search import DocumentSearch
+from app.retrieval.embeddings import Embedder, EmbeddingCache
+from app.retrieval.local_index import NumpyVectorStore
+from app.retrieval.service import RetrievalService
+from app.storage.blobs import LocalBlobStore
+
+TEXT_BODY = "".join(
+    f"Paragraph {i} about the quarterly budget, naïve forecasts and €uro costs.\n\n" for i in range(60)
+).encode()
+
+
+class CountingEmbedder(Embedder):
+    model = "fake"
+
+    def __init__(self):
+        self.texts = 0
+
+    async def embed(self, texts):
+        self.texts += len(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def make_manager(tmp_path, retrieval=True, **kwargs):
+    store = NumpyVectorStore()
+    service = RetrievalService(EmbeddingCache(CountingEmbedder()), store, None, chat_model="m")
+    manager = UploadManager(
+        LocalBlobStore(str(tmp_path)),
+        search=DocumentSearch(),
+        retrieval=service if retrieval else None,
+        buffer_bytes=64,
+        chunk_characters=200,
+        **kwargs,
+    )
+    return manager, store
+
+
+async def pieces(data, size=50, fail_after=None):
+    for start in range(0, len(data), size):
+        if fail_after is not None and start >= fail_after:
+            raise ConnectionResetError("client went away")
+        yield data[start : start + size]
+
+
+async def chunks_of(store, tenant_id):
+    return [record async for batch in store.scroll(tenant_id) for record in batch]
+
+
+def docx_bytes(paragraphs):
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+def test_sniffing_and_incremental_chunking():
+    assert sniff(b"%PDF-1.7\n%\xe2\xe3", "scan.bin") == PDF
+    assert sniff(docx_bytes(["x"])[:512], "report.DOCX") == DOCX
+    assert sniff(docx_bytes(["x"])[:512], "archive.zip") is None
+    assert sniff(b"# Notes\n", "notes.md") == MARKDOWN
+    # A multibyte character cut off at the end of the head is still text
+    assert sniff("café".encode()[:-1], "a.txt") == TEXT
+    assert sniff("café".encode()[:-1], "a.txt", complete=True) is None
+    assert sniff(b"\x00\x01binary", "a.txt") is None
+
+    whole = TextChunker(200)
+    expected = whole.feed(TEXT_BODY) + whole.finish()
+    split = TextChunker(200)
+    chunks = []
+    for start in range(0, len(TEXT_BODY), 7):
+        chunks.extend(split.feed(TEXT_BODY[start : start + 7]))
+    chunks.extend(split.finish())
+    assert chunks == expected
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks).split() == TEXT_BODY.decode().split()
+
+
+@pytest.mark.asyncio
+async def test_text_upload_resumes_and_is_embedded_while_streaming(tmp_path):
+    manager, store = make_manager(tmp_path)
+    upload = await manager.create("acme", "budget.txt", len(TEXT_BODY), tags=["finance"])
+
+    with pytest.raises(ConnectionResetError):
+        await manager.write("acme", upload.upload_id, 0, pieces(TEXT_BODY, fail_after=3000))
+    # Bytes received before the disconnect are kept; chunks are embedded and
+    # staged, but not searchable before the file is complete
+    assert upload.offset == 3000 and upload.content_type == TEXT
+    assert await manager.store.size(upload.part_key) == 3000
+    assert await manager.store.size(upload.staged_key) > 0
+    assert await chunks_of(store, "acme") == []
+    assert manager.active == 0
+
+    with pytest.raises(ConflictError):
+        await manager.write("acme", upload.upload_id, 0, pieces(TEXT_BODY))
+    with pytest.raises(NotFoundError):
+        manager.get("other", upload.upload_id)
+    await manager.write("acme", upload.upload_id, 3000, pieces(TEXT_BODY[3000:], size=333))
+    await upload.done.wait()
+
+    assert upload.status == "ready"
+    assert upload.sha256 == hashlib.sha256(TEXT_BODY).hexdigest()
+    assert await manager.store.size(upload.staged_key) == 0
+    with open(manager.store.path(upload.key), "rb") as file:
+        assert file.read() == TEXT_BODY
+    records = sorted(await chunks_of(store, "acme"), key=lambda record: record.position)
+    assert [record.position for record in records] == list(range(len(records)))
+    assert " ".join(record.text for record in records).split() == TEXT_BODY.decode().split()
+    assert records[0].tags == ("finance",) and records[0].title == "budget"
+    listed = await manager.search.search("acme", "budget")
+    assert [(item.document_id, item.status) for item in listed.items] == [(upload.document_id, "ready")]
+
+
+@pytest.mark.asyncio
+async def test_uploads_refuse_oversized_unsupported_and_corrupted_files(tmp_path):
+    manager, store = make_manager(tmp_path, max_bytes=len(TEXT_BODY))
+    with pytest.raises(DocuQueryException) as raised:
+        await manager.create("acme", "big.txt", len(TEXT_BODY) + 1)
+    assert raised.value.status_code == 413
+
+    for tenant_id in ("..", ".", ""):
+        with pytest.raises(ValidationError):
+            await manager.create(tenant_id, "a.txt", 100)
+
+    upload = await manager.create("acme", "a.txt", 100)
+    with pytest.raises(DocuQueryException) as raised:
+        await manager.write("acme", upload.upload_id, 0, pieces(TEXT_BODY[:150], size=60))
+    assert raised.value.status_code == 413
+    assert upload.offset == 60 and upload.status == "uploading"
+    with pytest.raises(DocuQueryException) as raised:
+        await manager.write("acme", upload.upload_id, 60, pieces(TEXT_BODY[60:200]), length=140)
+    assert raised.value.status_code == 413 and upload.offset == 60
+
+    binary = await manager.create("acme", "image.txt", 1000)
+    with pytest.raises(DocuQueryException) as raised:
+        await manager.write("acme", binary.upload_id, 0, pieces(b"\x89PNG\r\n\x1a\n" + bytes(992)))
+    assert raised.value.status_code == 415
+    with pytest.raises(NotFoundError):
+        manager.get("acme", binary.upload_id)
+
+    corrupted = await manager.create("acme", "b.txt", 500, sha256=hashlib.sha256(b"other").hexdigest())
+    with pytest.raises(ValidationError):
+        await manager.write("acme", corrupted.upload_id, 0, pieces(TEXT_BODY[:500]))
+    assert corrupted.status == "failed" and await manager.store.size(corrupted.part_key) == 0
+    # Chunks of a file failing its checksum never reach the indexes
+    assert await manager.store.size(corrupted.staged_key) == 0
+    assert await chunks_of(store, "acme") == []
+    with pytest.raises(NotFoundError):
+        manager.get("acme", corrupted.upload_id)
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_word_documents_are_extracted_on_completion_and_pdfs_stay_pending(tmp_path):
+    manager, store = make_manager(tmp_path)
+    data = docx_bytes([f"Section {i} of the handbook" for i in range(30)])
+    docx = await manager.create("acme", "handbook.docx", len(data))
+    await manager.write("acme", docx.upload_id, 0, pieces(data))
+    await docx.done.wait()
+    assert docx.status == "ready" and docx.content_type == DOCX
+    texts = " ".join(record.text for record in await chunks_of(store, "acme"))
+    assert "Section 0 of the handbook" in texts and "Section 29 of the handbook" in texts
+
+    data = b"%PDF-1.7\n" + bytes(300)
+    pdf = await manager.create("acme", "scan.pdf", len(data))
+    await manager.write("acme", pdf.upload_id, 0, pieces(data))
+    await pdf.done.wait()
+    assert pdf.status == "pending" and pdf.content_type == PDF
+
+    unindexed, _ = make_manager(tmp_path / "plain", retrieval=False)
+    text = await unindexed.create("acme", "notes.md", 100)
+    await unindexed.write("acme", text.upload_id, 0, pieces(TEXT_BODY[:100]))
+    await text.done.wait()
+    assert text.status == "pending" and text.content_type == MARKDOWN
+
+
+@pytest.mark.asyncio
+async def test_upload_endpoints_stream_request_bodies(tmp_path):
+    app = FastAPI()
+    register_error_handlers(app)
+    app.include_router(document_router, prefix="/documents")
+    manager, _ = make_manager(tmp_path)
+    app.state.uploads = manager
+    headers = {"X-Tenant-ID": "acme"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        created = await client.post(
+            "/documents/uploads", json={"filename": "budget.txt", "size": len(TEXT_BODY)}, headers=headers
+        )
+        assert created.status_code == 201
+        location = created.headers["location"]
+        assert location == f"/documents/uploads/{created.json()['id']}"
+
+        first = await client.patch(location, content=TEXT_BODY[:1000], headers={**headers, "Upload-Offset": "0"})
+        assert first.json()["offset"] == 1000
+        stale = await client.patch(location, content=TEXT_BODY[:1000], headers={**headers, "Upload-Offset": "0"})
+        assert stale.status_code == 409
+        assert (await client.get(location, headers=headers)).json()["offset"] == 1000
+        last = await client.patch(
+            location, content=pieces(TEXT_BODY[1000:]), headers={**headers, "Upload-Offset": "1000"}
+        )
+        assert last.json()["status"] == "processing"
+        assert last.json()["sha256"] == hashlib.sha256(TEXT_BODY).hexdigest()
+        await manager.get("acme", created.json()["id"]).done.wait()
+        empty = await client.post("/documents/uploads", json={"filename": "x.txt", "size": 0}, headers=headers)
+        assert empty.status_code == 422